@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截面异常检测基准：5000只股票每个检测周期的耗时，逐只用 Python 计算规则 / CrossSectionAlertEvaluator 用数组一次计算全部规则
+
+逐只计算的规则与截面检测的股票规则相同（涨跌停、异常放量、价格异动、突破、反转），不含读取Redis的开销。
+运行方式（项目根目录）：python -m benchmarks.bench_alert_rules
+"""
+
+import os
+import random
+import time
+
+import numpy as np
+
+from mini_stock.cross_section_alerts import CrossSectionAlertEvaluator
+
+STOCK_COUNT = int(os.getenv('STOCK_COUNT', '5000'))
+ROUNDS = 50
+
+
+def make_rounds():
+    rng = random.Random(17)
+    prefixes = ('600', '601', '000', '002', '300', '688')
+    codes = [f"{prefixes[index % len(prefixes)]}{index:03d}.{'SH' if index % 2 else 'SZ'}" for index in range(STOCK_COUNT)]
+    prices = {code: 10.0 for code in codes}
+    volumes = {code: 1000.0 for code in codes}
+    rounds = []
+    for _ in range(ROUNDS):
+        snapshot = {}
+        for code in codes:
+            prices[code] = round(prices[code] * (1 + rng.gauss(0, 0.01)), 2)
+            volumes[code] += rng.randint(0, 500)
+            snapshot[code] = {'lastPrice': prices[code], 'volume': volumes[code], 'lastClose': 10.0}
+        rounds.append(snapshot)
+    return rounds
+
+
+def limit_threshold(code):
+    """AlertDetector._get_limit_threshold"""
+    if code.startswith(('300', '301', '688')):
+        return 0.199, -0.199
+    if code.startswith('8'):
+        return 0.299, -0.299
+    return 0.099, -0.099
+
+
+def evaluate_loop(snapshot, state, thresholds):
+    """逐只计算，每只股票一次Python函数调用；涨跌停、反转有冷却时间，基准运行期间只触发一次"""
+    triggered = []
+    for code, data in snapshot.items():
+        price, volume, preclose = data['lastPrice'], data['volume'], data['lastClose']
+        prev_price, prev_volume, high, low = state.get(code, (0.0, 0.0, 0.0, 0.0))
+        if price <= 0:
+            continue
+        limit_up, limit_down = limit_threshold(code)
+        change_pct = (price - preclose) / preclose
+        if change_pct >= limit_up:
+            triggered.append((code, "涨停", "高"))
+        if change_pct <= limit_down:
+            triggered.append((code, "跌停", "高"))
+        if prev_volume > 0 and volume > 0 and volume / prev_volume >= thresholds['volume_surge']:
+            triggered.append((code, "异常放量", "中"))
+        if prev_price > 0 and abs(price - prev_price) / prev_price >= thresholds['price_surge']:
+            triggered.append((code, "价格异动", "中"))
+        if high > 0 and price > high * (1 + thresholds['breakout']):
+            triggered.append((code, "突破", "中"))
+        day_high, day_low = max(high, price), min(low, price) if low > 0 else price
+        if ((day_high - preclose) / preclose >= thresholds['reversal'] and change_pct <= 0
+                or (day_low - preclose) / preclose <= -thresholds['reversal'] and change_pct >= 0):
+            triggered.append((code, "反转", "中"))
+        state[code] = (price, volume, day_high, day_low)
+    return [alert for alert in triggered if alert[1] not in ("涨停", "跌停", "反转") or not once(state, alert)]
+
+
+def once(state, alert):
+    """已经触发过返回True，第一次触发时记录"""
+    fired = alert in state
+    state[alert] = True
+    return fired
+
+
+def main():
+    rounds = make_rounds()
+    codes = list(rounds[0])
+    arrays = [tuple(np.array([data[field] for data in snapshot.values()]) for field in ('lastPrice', 'volume', 'lastClose'))
+              for snapshot in rounds]
+
+    thresholds = CrossSectionAlertEvaluator("stock").thresholds
+    state = {}
+    start = time.perf_counter()
+    loop_results = [evaluate_loop(snapshot, state, thresholds) for snapshot in rounds]
+    loop_seconds = (time.perf_counter() - start) / ROUNDS
+
+    evaluator = CrossSectionAlertEvaluator("stock")
+    start = time.perf_counter()
+    dict_results = [evaluator.evaluate(snapshot) for snapshot in rounds]
+    dict_seconds = (time.perf_counter() - start) / ROUNDS
+
+    evaluator = CrossSectionAlertEvaluator("stock")
+    start = time.perf_counter()
+    array_results = [evaluator.evaluate_arrays(codes, *columns) for columns in arrays]
+    array_seconds = (time.perf_counter() - start) / ROUNDS
+
+    for expected, *actual in zip(loop_results, dict_results, array_results):
+        assert all(sorted(result) == sorted(expected) for result in actual)
+
+    print(f"{STOCK_COUNT} 只股票 × {ROUNDS} 个检测周期，平均每周期触发 {sum(map(len, loop_results)) / ROUNDS:.0f} 条")
+    print(f"{'方式':<24}{'每周期 (ms)':>14}")
+    print(f"{'逐只 Python 计算':<24}{loop_seconds * 1000:>14.2f}")
+    print(f"{'数组（含 dict 组装）':<24}{dict_seconds * 1000:>14.2f}")
+    print(f"{'数组（已是列数据）':<24}{array_seconds * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
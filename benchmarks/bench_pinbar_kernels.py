@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PinbarHelper 滚动判断的微基准：原逐根取值实现 / 适配方法 / 数组内核（numba 与纯 numpy）
+
+运行方式（项目根目录）：python -m benchmarks.bench_pinbar_kernels
+"""
+
+import logging
+import timeit
+
+import numpy as np
+
+from pinbar import PinbarType
+from pinbar_helper import PinbarHelper
+from pinbar_kernels import PinbarKernels
+from test_pinbar_kernels import FakeData, make_bars, make_pinbar, legacy_at_recent_high_low, \
+    legacy_is_trend_following, legacy_no_obvious_acceleration, legacy_have_giant_price_gap
+
+NUMBER = 2000
+
+
+def per_call_us(func):
+    return timeit.timeit(func, number=NUMBER) / NUMBER * 1e6
+
+
+def kernel_timings(kernel, args):
+    """返回 (numba 编译版本, 纯 numpy 版本) 的单次耗时，没有 numba 时前者为 None"""
+    if PinbarKernels.enabled_numba:
+        kernel(*args)  # 触发编译
+        return per_call_us(lambda: kernel(*args)), per_call_us(lambda: kernel.py_func(*args))
+    return None, per_call_us(lambda: kernel(*args))
+
+
+def main():
+    logging.disable(logging.WARNING)
+    df = make_bars(0, 400, -1)
+    data = FakeData(df, len(df) - 1)
+    pinbar = make_pinbar(df, len(df) - 1, PinbarType.type_bullish, 3.0)
+    direction = PinbarHelper.direction_of(pinbar)
+    lookback = int(9.25 * 12)
+
+    highs16 = PinbarHelper.recent_values(data.high, 16)
+    lows16 = PinbarHelper.recent_values(data.low, 16)
+    closes25 = PinbarHelper.recent_values(data.close, 25)
+    trend_highs = PinbarHelper.recent_values(data.high, lookback + 1)
+    trend_lows = PinbarHelper.recent_values(data.low, lookback + 1)
+    trend_closes = PinbarHelper.recent_values(data.close, lookback + 51)
+
+    cases = [
+        ('at_recent_high_low',
+         lambda: legacy_at_recent_high_low(data, pinbar, 16),
+         lambda: PinbarHelper.at_recent_high_low(data, pinbar, 16, None),
+         PinbarKernels.at_recent_high_low,
+         (highs16, lows16, closes25, pinbar.get_high(), pinbar.get_low(), direction, 18, 8, 7)),
+        ('is_trend_following',
+         lambda: legacy_is_trend_following(data, pinbar, 'AU'),
+         lambda: PinbarHelper.is_trend_following(data, pinbar, 'AU'),
+         PinbarKernels.trend_following,
+         (trend_highs, trend_lows, trend_closes, pinbar.get_close(), direction, lookback, 50)),
+        ('no_obvious_acceleration',
+         lambda: legacy_no_obvious_acceleration(data, pinbar, 1.0),
+         lambda: PinbarHelper.no_obvious_acceleration(data, pinbar, 1.0),
+         PinbarKernels.no_obvious_acceleration,
+         (highs16[:-1], lows16[:-1], pinbar.get_close(), direction, 1.0)),
+        ('have_giant_price_gap',
+         lambda: legacy_have_giant_price_gap(data, pinbar, 1.0),
+         lambda: PinbarHelper.have_giant_price_gap(data, pinbar, 1.0),
+         PinbarKernels.have_giant_price_gap,
+         (pinbar.get_open(), float(df['close'].iloc[-2]), 1.0)),
+    ]
+
+    print(f"numba: {'已启用' if PinbarKernels.enabled_numba else '未安装'}，单位：微秒/次")
+    print(f"{'helper':<26}{'原实现':>10}{'适配方法':>10}{'内核(numba)':>14}{'内核(numpy)':>14}")
+    for name, legacy, adapter, kernel, args in cases:
+        numba_us, numpy_us = kernel_timings(kernel, args)
+        numba_text = f"{numba_us:.2f}" if numba_us is not None else '-'
+        print(f"{name:<26}{per_call_us(legacy):>10.2f}{per_call_us(adapter):>10.2f}"
+              f"{numba_text:>14}{numpy_us:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PinbarScanner 与逐品种 Cerebro 的延迟对比
+
+运行方式（项目根目录）：python -m benchmarks.bench_pinbar_scanner
+"""
+
+import logging
+import time
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+import environment
+from feature_info import FeatureInfo
+from pinbar_scanner import PinbarScanner
+from pinbar_strategy import PinbarStrategy
+from mini_stock.utils.interval_utils import IntervalUtils
+
+INTERVALS = ['1min', '5min', '15min', '30min', '60min']
+BARS = 2000
+
+
+class SilentPinbarStrategy(PinbarStrategy):
+    """只做判断，不写数据库"""
+
+    def next(self):
+        if len(self.data) == self.data.buflen():
+            self.check_pinbar()
+
+
+def make_universe(rng):
+    frames = []
+    for product_types in FeatureInfo.get_exchange_product_types().values():
+        for product_type in product_types:
+            for interval in INTERVALS:
+                closes = 1000 + np.cumsum(rng.normal(0, 1.0, BARS))
+                opens = np.concatenate([[closes[0]], closes[:-1]])
+                df = pd.DataFrame({
+                    'open': opens,
+                    'high': np.maximum(opens, closes) + rng.exponential(0.6, BARS),
+                    'low': np.minimum(opens, closes) - rng.exponential(0.6, BARS),
+                    'close': closes,
+                    'volume': np.ones(BARS),
+                }, index=pd.date_range('2025-01-01', periods=BARS, freq=interval))
+                df['product_type'] = product_type
+                df['interval'] = interval
+                frames.append(df)
+    return frames
+
+
+def run_cerebro(frames):
+    for df in frames:
+        interval_num = IntervalUtils.convert_interval_to_minutes(df['interval'].iloc[0])
+        cerebro = bt.Cerebro()
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(SilentPinbarStrategy, product_type=df['product_type'].iloc[0],
+                            atr_multiplier=environment.atr_muliter_of(interval_num),
+                            interval=df['interval'].iloc[0])
+        cerebro.run()
+
+
+def main():
+    logging.disable(logging.INFO)
+    frames = make_universe(np.random.default_rng(0))
+    print(f"品种/周期数: {len(frames)}, 每组 K 线: {BARS}")
+
+    start = time.perf_counter()
+    run_cerebro(frames)
+    cerebro_seconds = time.perf_counter() - start
+
+    scanner = PinbarScanner()
+    scanner.scan(frames)  # 预热交易时长缓存
+    rounds = 20
+    start = time.perf_counter()
+    for _ in range(rounds):
+        scanner.scan(frames)
+    scanner_seconds = (time.perf_counter() - start) / rounds
+
+    print(f"逐品种 Cerebro: {cerebro_seconds * 1000:.1f} ms")
+    print(f"PinbarScanner:  {scanner_seconds * 1000:.1f} ms")
+    print(f"加速比: {cerebro_seconds / scanner_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RedisCacheManager 代码枚举基准：原 KEYS 遍历 / 当天索引集合
+
+默认使用 fakeredis；设置 REDIS_URL（如 redis://localhost:6379/15）时使用本地 Redis，会清空该库。
+运行方式（项目根目录）：python -m benchmarks.bench_redis_active_index
+"""
+
+import json
+import logging
+import os
+import time
+import timeit
+from datetime import datetime, timedelta
+
+import fakeredis
+import redis
+
+from mini_stock.redis_cache_manager import RedisCacheManager
+
+STOCK_COUNT = 5000
+FUTURES_COUNT = 40
+HISTORY_DAYS = 3
+NUMBER = 5
+
+
+def make_client():
+    url = os.getenv('REDIS_URL')
+    if url:
+        client = redis.Redis.from_url(url, decode_responses=True)
+        client.flushdb()
+        return client, url
+    return fakeredis.FakeRedis(decode_responses=True), 'fakeredis'
+
+
+def make_codes():
+    stocks = [f"{index:06d}.{'SH' if index % 2 else 'SZ'}" for index in range(STOCK_COUNT)]
+    futures = [f"IF{2500 + index:04d}.IF" for index in range(FUTURES_COUNT)]
+    return stocks + futures
+
+
+def fill(manager, codes):
+    tick = {'time': 1700000000000, 'lastPrice': 10.0, 'open': 10.0, 'high': 10.0, 'low': 10.0,
+            'lastClose': 10.0, 'amount': 1000.0, 'volume': 100}
+    for start in range(0, len(codes), 500):
+        manager.cache_stocks_batch({code: tick for code in codes[start:start + 500]})
+
+    # 清理任务还没跑到的历史日期数据，让 keyspace 接近生产环境
+    pipe = manager.redis_client.pipeline(transaction=False)
+    for days in range(1, HISTORY_DAYS + 1):
+        day = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+        for code in codes:
+            prefix = 'futures_data' if manager._is_futures_code(code) else 'stock_data'
+            pipe.rpush(f"{prefix}:{code}:{day}", json.dumps(tick))
+    pipe.execute()
+
+
+def legacy_all_latest(manager):
+    """原 get_multiple_latest_data([])：先 KEYS 枚举代码，再批量读取"""
+    client = manager.redis_client
+    stock_codes = [key.split(':', 1)[1] for key in client.keys("stock_latest:*")]
+    stock_codes.extend(key.split(':', 1)[1] for key in client.keys("futures_latest:*"))
+    return manager.get_multiple_latest_data(stock_codes)
+
+
+def legacy_stats(client):
+    """原 get_cache_stats('all') 的 KEYS 部分"""
+    today = datetime.now().strftime('%Y%m%d')
+    today_keys = client.keys(f"stock_data:*:{today}") + client.keys(f"futures_data:*:{today}")
+    latest_keys = client.keys("stock_latest:*") + client.keys("futures_latest:*")
+    filter_keys = client.keys("filter_cache:*")
+    total_records = sum(client.llen(key) for key in today_keys)
+    return len(today_keys), len(latest_keys), len(filter_keys), total_records
+
+
+def per_call_ms(func):
+    return timeit.timeit(func, number=NUMBER) / NUMBER * 1000
+
+
+def main():
+    logging.disable(logging.WARNING)
+    client, backend = make_client()
+    manager = RedisCacheManager(redis_client=client)
+    codes = make_codes()
+
+    start = time.perf_counter()
+    fill(manager, codes)
+    print(f"后端: {backend}，代码 {len(codes)} 个，keyspace {client.dbsize()} 个 key，"
+          f"写入耗时 {time.perf_counter() - start:.2f}s")
+
+    assert manager.get_multiple_latest_data([]) == legacy_all_latest(manager)
+    print(f"{'操作':<28}{'KEYS 遍历 (ms)':>16}{'索引集合 (ms)':>16}")
+    rows = [
+        ('get_multiple_latest_data([])', lambda: legacy_all_latest(manager),
+         lambda: manager.get_multiple_latest_data([])),
+        ('get_cache_stats()', lambda: legacy_stats(client), lambda: manager.get_cache_stats()),
+        ('只枚举代码', lambda: client.keys("stock_latest:*") + client.keys("futures_latest:*"),
+         lambda: manager.get_active_codes()),
+    ]
+    for name, legacy, indexed in rows:
+        print(f"{name:<28}{per_call_ms(legacy):>16.2f}{per_call_ms(indexed):>16.2f}")
+    manager.running = False
+    print("注：fakeredis 的 KEYS 在客户端进程内执行；真实 Redis 上 KEYS 会在服务端阻塞 O(keyspace)，差距更大")
+
+
+if __name__ == "__main__":
+    main()
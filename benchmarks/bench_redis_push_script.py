@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RedisCacheManager 批量写 tick 的吞吐基准：管道写入 + 逐个截断 / EVALSHA 推入-截断-过期脚本
+
+默认使用 fakeredis（需要 lupa 支持 Lua），并给每次网络往返加上 SIMULATED_RTT_MS 毫秒的模拟延迟；
+设置 REDIS_URL（如 redis://localhost:6379/15）时使用本地 Redis，会清空该库，不再模拟延迟。
+运行方式（项目根目录）：python -m benchmarks.bench_redis_push_script
+"""
+
+import json
+import logging
+import os
+import time
+
+import fakeredis
+import redis
+
+from mini_stock.redis_cache_manager import RedisCacheManager
+
+STOCK_COUNT = 5000
+ROUNDS = 5
+
+
+class RoundTripCounter:
+    """统计（并可选地模拟）客户端到 Redis 的网络往返"""
+
+    def __init__(self, client, rtt_seconds):
+        self.count = 0
+        connection = client.connection_pool.get_connection()
+        self.connection_class = type(connection)
+        client.connection_pool.release(connection)
+        self.original = self.connection_class.send_packed_command
+        counter = self
+
+        def send_packed_command(connection, *args, **kwargs):
+            counter.count += 1
+            if rtt_seconds:
+                time.sleep(rtt_seconds)
+            return counter.original(connection, *args, **kwargs)
+
+        self.connection_class.send_packed_command = send_packed_command
+
+    def restore(self):
+        self.connection_class.send_packed_command = self.original
+
+
+def make_client():
+    url = os.getenv('REDIS_URL')
+    if url:
+        client = redis.Redis.from_url(url, decode_responses=True)
+        client.flushdb()
+        return client, url, 0.0
+    rtt_ms = float(os.getenv('SIMULATED_RTT_MS', '0.2'))
+    return fakeredis.FakeRedis(decode_responses=True), f'fakeredis（模拟往返 {rtt_ms}ms）', rtt_ms / 1000
+
+
+def make_entries(round_index):
+    entries = []
+    for index in range(STOCK_COUNT):
+        code = f"{index:06d}.{'SH' if index % 2 else 'SZ'}"
+        tick = {'time': 1700000000000 + round_index * 3000, 'lastPrice': 10.0 + round_index * 0.01, 'open': 10.0,
+                'high': 10.5, 'low': 9.8, 'lastClose': 10.0, 'amount': 1.0e6, 'volume': 1000,
+                'timestamp': '2025-06-03T10:00:00'}
+        entries.append((code, json.dumps(tick), tick['time']))
+    return entries
+
+
+def run(manager, write, counter):
+    manager.redis_client.flushdb()
+    rounds = [make_entries(round_index) for round_index in range(ROUNDS)]
+    counter.count = 0
+    start = time.perf_counter()
+    for entries in rounds:
+        write(entries)
+    elapsed = time.perf_counter() - start
+    return elapsed / ROUNDS, counter.count / ROUNDS
+
+
+def main():
+    logging.disable(logging.WARNING)
+    client, backend, rtt_seconds = make_client()
+    manager = RedisCacheManager(redis_client=client)
+    counter = RoundTripCounter(client, rtt_seconds)
+    try:
+        print(f"后端: {backend}，每轮 {STOCK_COUNT} 只股票，共 {ROUNDS} 轮，脚本分块 {manager.SCRIPT_CHUNK_SIZE}")
+        print(f"{'写入方式':<24}{'每轮耗时 (ms)':>14}{'每轮往返':>10}{'tick/s':>12}")
+        for name, write in (('管道 + 逐个截断', manager._write_ticks_pipeline), ('EVALSHA 脚本', manager._write_ticks)):
+            seconds, round_trips = run(manager, write, counter)
+            print(f"{name:<24}{seconds * 1000:>14.1f}{round_trips:>10.0f}{STOCK_COUNT / seconds:>12.0f}")
+    finally:
+        counter.restore()
+        manager.running = False
+
+
+if __name__ == "__main__":
+    main()
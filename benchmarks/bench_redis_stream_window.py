@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读取"最近N分钟"tick的基准：list 存储读取当天全部数据后按时间过滤 / stream 存储用 XREVRANGE 只读窗口
+
+默认使用 fakeredis（需要 lupa 支持 Lua）；设置 REDIS_URL（如 redis://localhost:6379/15）时使用本地 Redis，会清空该库。
+运行方式（项目根目录）：python -m benchmarks.bench_redis_stream_window
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+
+import fakeredis
+import redis
+
+from mini_stock.cache_config import CacheConfig
+from mini_stock.redis_cache_manager import RedisCacheManager
+
+# 一整个交易日（4小时）每3秒一条
+TICK_COUNT = 4800
+STOCK_CODE = '000001.SZ'
+WINDOW_MINUTES = (1, 5, 30)
+ROUNDS = 50
+
+
+def make_client():
+    url = os.getenv('REDIS_URL')
+    if url:
+        client = redis.Redis.from_url(url, decode_responses=True)
+        client.flushdb()
+        return client, url
+    return fakeredis.FakeRedis(decode_responses=True), 'fakeredis'
+
+
+def make_manager(client, history_backend):
+    manager = RedisCacheManager(redis_client=client, history_backend=history_backend)
+    config = dict(CacheConfig.DEFAULT_CONFIG)
+    config['max_cache_size'] = {'daily_records_per_stock': TICK_COUNT, 'total_stocks': 5000}
+    manager.config = CacheConfig(config)
+    return manager
+
+
+def fill(manager, start_ms):
+    for index in range(TICK_COUNT):
+        tick = {'time': start_ms + index * 3000, 'lastPrice': 10.0 + index * 0.001, 'open': 10.0,
+                'high': 10.5, 'low': 9.8, 'lastClose': 10.0, 'amount': 1.0e6, 'volume': 1000}
+        manager.cache_stock_data(STOCK_CODE, tick)
+
+
+def main():
+    logging.disable(logging.WARNING)
+    client, backend = make_client()
+    start_ms = int(datetime.now().replace(hour=9, minute=30, second=0, microsecond=0).timestamp() * 1000)
+    end_ms = start_ms + (TICK_COUNT - 1) * 3000
+    managers = {name: make_manager(client, name) for name in ('list', 'stream')}
+    for manager in managers.values():
+        fill(manager, start_ms)
+
+    print(f"后端: {backend}，单只股票当天 {TICK_COUNT} 条tick，每个窗口读取 {ROUNDS} 次取平均")
+    print(f"{'窗口 (分钟)':<12}{'存储':<8}{'返回条数':>10}{'耗时 (ms)':>12}")
+    try:
+        for minutes in WINDOW_MINUTES:
+            for name, manager in managers.items():
+                start = time.perf_counter()
+                for _ in range(ROUNDS):
+                    records = manager.get_stock_data_window(STOCK_CODE, minutes=minutes, end=end_ms)
+                elapsed = (time.perf_counter() - start) / ROUNDS
+                print(f"{minutes:<12}{name:<8}{len(records):>10}{elapsed * 1000:>12.2f}")
+    finally:
+        for manager in managers.values():
+            manager.running = False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列存tick基准：5000只股票的一轮行情，按 StockTickData / SlottedStockTickData / TickBatch 三种方式转换的耗时和内存，
+以及写入缓存前的编码、读出后的解码吞吐（struct 编码）
+
+运行方式（项目根目录）：python -m benchmarks.bench_tick_batch
+"""
+
+import os
+import random
+import timeit
+import tracemalloc
+
+from mini_stock.stock_data_model import SlottedStockTickData, StockDataFactory
+from mini_stock.tick_batch import TickBatch
+from mini_stock.tick_codec import decode_tick, get_tick_codec
+
+STOCK_COUNT = int(os.getenv('STOCK_COUNT', '5000'))
+
+
+def make_market_data():
+    """模拟 xtdata.get_full_tick 的返回"""
+    rng = random.Random(11)
+    data = {}
+    for index in range(STOCK_COUNT):
+        price = round(10 + rng.gauss(0, 0.5), 2)
+        data[f"{600000 + index}.SH"] = {
+            'time': str(1751338260000 + index), 'lastPrice': price, 'open': 10.0, 'high': price + 0.2,
+            'low': price - 0.2, 'lastClose': 9.9, 'amount': rng.uniform(1e6, 1e8),
+            'volume': rng.randint(100, 100000), 'pvolume': rng.randint(1000, 10000000),
+            'tickvol': rng.randint(1, 500), 'stockStatus': 3, 'openInt': 0, 'lastSettlementPrice': 0.0,
+            'askPrice': [round(price + 0.01 * level, 2) for level in range(1, 6)],
+            'bidPrice': [round(price - 0.01 * level, 2) for level in range(5)],
+            'askVol': [rng.randint(1, 2000) for _ in range(5)], 'bidVol': [rng.randint(1, 2000) for _ in range(5)],
+            'settlementPrice': 0.0, 'transactionNum': rng.randint(0, 100000), 'pe': rng.uniform(5, 60)}
+    return data
+
+
+def measure(build):
+    """返回 (平均耗时秒, 结果占用的内存字节)"""
+    seconds = timeit.timeit(build, number=3) / 3
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return seconds, size
+
+
+def main():
+    market_data = make_market_data()
+    builders = {
+        'StockTickData': lambda: StockDataFactory.create_batch_from_xtquant_data(market_data),
+        'SlottedStockTickData': lambda: {code: SlottedStockTickData.from_dict(data)
+                                         for code, data in market_data.items()},
+        'TickBatch': lambda: TickBatch.from_xtquant(market_data),
+    }
+    print(f"股票数量 {STOCK_COUNT}")
+    print(f"{'转换方式':<22}{'耗时 (ms)':>10}{'内存 (KB)':>12}{'字节/条':>10}")
+    for name, build in builders.items():
+        seconds, size = measure(build)
+        print(f"{name:<22}{seconds * 1000:>10.1f}{size / 1024:>12.1f}{size / STOCK_COUNT:>10.1f}")
+
+    codec = get_tick_codec('struct')
+    batch = TickBatch.from_xtquant(market_data)
+    ticks = StockDataFactory.create_batch_from_xtquant_data(market_data)
+    payloads = batch.encode(codec)
+    codes = list(market_data)
+    rounds = {
+        '逐条编码 StockTickData': lambda: [codec.encode(tick.get_full_fields()) for tick in ticks.values()],
+        '整列编码 TickBatch': lambda: batch.encode(codec),
+        '逐条解码为字典': lambda: [decode_tick(payload) for payload in payloads],
+        '整段解码为 TickBatch': lambda: TickBatch.from_encoded(codes, payloads),
+    }
+    print(f"{'编解码':<22}{'耗时 (ms)':>10}{'万条/s':>12}")
+    for name, run in rounds.items():
+        seconds = timeit.timeit(run, number=5) / 5
+        print(f"{name:<22}{seconds * 1000:>10.1f}{STOCK_COUNT / seconds / 1e4:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
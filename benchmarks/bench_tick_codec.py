@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tick 编码基准：每条 tick 占用的字节数和编码/解码吞吐，ESSENTIAL 与 FULL 两种缓存模式分别统计
+
+设置 REDIS_URL（如 redis://localhost:6379/15）时额外用 MEMORY USAGE 统计 Redis 列表中每条 tick 的实际内存，会清空该库。
+运行方式（项目根目录）：python -m benchmarks.bench_tick_codec
+"""
+
+import os
+import random
+import timeit
+from datetime import datetime, timedelta
+
+import redis
+
+from mini_stock.stock_data_model import StockTickData
+from mini_stock.tick_codec import TICK_CODECS, decode_tick
+
+TICK_COUNT = 2000
+LIST_LENGTH = 1000
+
+
+def make_ticks():
+    rng = random.Random(7)
+    start = datetime(2025, 7, 1, 9, 30)
+    ticks = []
+    for index in range(TICK_COUNT):
+        price = round(10 + rng.gauss(0, 0.5), 2)
+        moment = start + timedelta(seconds=3 * index)
+        ticks.append(StockTickData(
+            time=moment.strftime('%Y%m%d%H%M%S'), lastPrice=price, open=10.0, high=price + 0.2, low=price - 0.2,
+            lastClose=9.9, amount=rng.uniform(1e6, 1e8), volume=float(rng.randint(100, 100000)),
+            pvolume=float(rng.randint(1000, 10000000)), tickvol=float(rng.randint(1, 500)), stockStatus=3,
+            openInt=0, lastSettlementPrice=0.0,
+            askPrice=[round(price + 0.01 * level, 2) for level in range(1, 6)],
+            bidPrice=[round(price - 0.01 * level, 2) for level in range(5)],
+            askVol=[rng.randint(1, 2000) for _ in range(5)], bidVol=[rng.randint(1, 2000) for _ in range(5)],
+            settlementPrice=0.0, transactionNum=rng.randint(0, 100000), pe=rng.uniform(5, 60),
+            timestamp=moment.isoformat()))
+    return ticks
+
+
+def redis_bytes_per_tick(client, payloads):
+    client.delete('bench_tick_codec')
+    client.rpush('bench_tick_codec', *payloads[:LIST_LENGTH])
+    usage = client.memory_usage('bench_tick_codec', samples=0)
+    client.delete('bench_tick_codec')
+    return usage / LIST_LENGTH
+
+
+def main():
+    url = os.getenv('REDIS_URL')
+    client = None
+    if url:
+        client = redis.Redis.from_url(url)
+        client.flushdb()
+
+    ticks = make_ticks()
+    modes = {'ESSENTIAL': [tick.get_essential_fields() for tick in ticks],
+             'FULL': [tick.get_full_fields() for tick in ticks]}
+    header = f"{'模式':<10}{'编码':<9}{'字节/条':>8}{'编码 (万条/s)':>14}{'解码 (万条/s)':>14}"
+    if client is not None:
+        header += f"{'Redis 字节/条':>14}"
+    print(f"tick 数量 {TICK_COUNT}，已注册编码：{', '.join(TICK_CODECS)}")
+    print(header)
+    for mode, records in modes.items():
+        for name, codec in TICK_CODECS.items():
+            payloads = [codec.encode(data) for data in records]
+            size = sum(len(payload) for payload in payloads) / len(payloads)
+            encode_seconds = timeit.timeit(lambda: [codec.encode(data) for data in records], number=3) / 3
+            decode_seconds = timeit.timeit(lambda: [decode_tick(payload) for payload in payloads], number=3) / 3
+            line = (f"{mode:<10}{name:<9}{size:>8.1f}{TICK_COUNT / encode_seconds / 1e4:>14.1f}"
+                    f"{TICK_COUNT / decode_seconds / 1e4:>14.1f}")
+            if client is not None:
+                line += f"{redis_bytes_per_tick(client, payloads):>14.1f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
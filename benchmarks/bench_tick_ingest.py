@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情接入基准：5000只股票，每轮约30%的股票有新tick（另有10%原样重复推送），
+拉取模式每轮转换全部股票再按指纹跳过未变化的，推送模式回调里就只把有变化的股票入队，
+统计每轮写入耗时、写入条数和从推送到写入Redis的延迟
+
+使用 FakeQuotePublisher 模拟行情推送，不需要QMT；默认用 fakeredis，设置 REDIS_URL（如 redis://localhost:6379/15）时写入真实Redis，会清空该库。
+运行方式（项目根目录）：python -m benchmarks.bench_tick_ingest
+"""
+
+import os
+import time
+
+import fakeredis
+import redis
+
+from mini_stock.fake_quote_publisher import FakeQuotePublisher
+from mini_stock.redis_cache_manager import RedisCacheManager
+from mini_stock.tick_batch import TickBatch
+from mini_stock.tick_ingestor import QuoteIngestor
+
+STOCK_COUNT = int(os.getenv('STOCK_COUNT', '5000'))
+ROUNDS = 10
+INTERVAL = 0.5  # 模拟的推送间隔（秒），实盘约3秒
+
+
+def make_manager():
+    url = os.getenv('REDIS_URL')
+    if url:
+        client = redis.Redis.from_url(url, decode_responses=True)
+        client.flushdb()
+    else:
+        client = fakeredis.FakeRedis(decode_responses=True)
+    return RedisCacheManager(redis_client=client)
+
+
+def make_codes():
+    return [f"{600000 + index}.SH" for index in range(STOCK_COUNT)]
+
+
+def bench_poll(codes):
+    """拉取模式：每轮读取全部股票的最新行情并写入"""
+    manager = make_manager()
+    publisher = FakeQuotePublisher(codes)
+    seconds = []
+    for _ in range(ROUNDS):
+        publisher.publish_round()
+        start = time.perf_counter()
+        manager.cache_tick_batch(TickBatch.from_xtquant(publisher.get_full_tick(codes)))
+        seconds.append(time.perf_counter() - start)
+    return sum(seconds) / ROUNDS, len(codes)
+
+
+def bench_push(codes):
+    """推送模式：回调只把有变化的股票入队，写入线程批量写入"""
+    manager = make_manager()
+    publisher = FakeQuotePublisher(codes)
+    ingestor = QuoteIngestor(manager, xtdata_module=publisher)
+    ingestor.start(codes)
+    publisher.start(INTERVAL, rounds=ROUNDS)
+    publisher.join()
+    ingestor.stop()
+    return ingestor.stats()
+
+
+def main():
+    codes = make_codes()
+    print(f"股票数量 {STOCK_COUNT}，{ROUNDS} 轮，推送间隔 {INTERVAL}s")
+
+    seconds, written = bench_poll(codes)
+    print(f"拉取：每轮转换 {written} 条（未变化的由缓存管理器按指纹跳过），耗时 {seconds * 1000:.1f} ms；"
+          f"延迟约为拉取间隔的一半加写入耗时（3秒间隔时约 {1500 + seconds * 1000:.0f} ms）")
+
+    stats = bench_push(codes)
+    print(f"推送：收到 {stats['received']} 条，跳过未变化 {stats['unchanged']} 条，丢弃 {stats['dropped']} 条，"
+          f"写入 {stats['written']} 条（每轮 {stats['written'] / ROUNDS:.0f} 条，{stats['batches']} 批）")
+    print(f"推送：从回调到写入Redis的延迟 p50 {stats['latency_p50_ms']:.1f} ms，"
+          f"p99 {stats['latency_p99_ms']:.1f} ms，最大 {stats['latency_max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
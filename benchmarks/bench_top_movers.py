@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+涨幅榜前N名的查询基准：MGET 全部最新数据后在 Python 里排序 / 读取写入时维护的排行榜有序集合
+
+默认使用 fakeredis；设置 REDIS_URL（如 redis://localhost:6379/15）时使用本地 Redis，会清空该库。
+运行方式（项目根目录）：python -m benchmarks.bench_top_movers
+"""
+
+import logging
+import os
+import random
+import time
+from datetime import datetime
+
+import fakeredis
+import redis
+
+from mini_stock.redis_cache_manager import RedisCacheManager
+
+STOCK_COUNT = int(os.getenv('STOCK_COUNT', '5000'))
+TOP_N = 20
+ROUNDS = 20
+
+
+def make_client():
+    url = os.getenv('REDIS_URL')
+    if url:
+        client = redis.Redis.from_url(url, decode_responses=True)
+        client.flushdb()
+        return client, url
+    return fakeredis.FakeRedis(decode_responses=True), 'fakeredis'
+
+
+def make_snapshot():
+    rng = random.Random(5)
+    now = int(datetime.now().replace(hour=10, minute=30, second=0, microsecond=0).timestamp() * 1000)
+    snapshot = {}
+    for index in range(STOCK_COUNT):
+        price = round(10.0 * (1 + rng.uniform(-0.1, 0.1)), 2)
+        snapshot[f"{index:06d}.{'SH' if index % 2 else 'SZ'}"] = {
+            'time': now, 'lastPrice': price, 'open': 10.0, 'high': max(price, 10.0), 'low': min(price, 10.0),
+            'lastClose': 10.0, 'amount': rng.uniform(1e6, 1e9), 'volume': rng.randint(100, 100000)}
+    return snapshot
+
+
+def sort_latest(manager):
+    latest = manager.get_multiple_latest_data(manager.get_active_codes('stock'))
+    changes = [(code, (data['lastPrice'] - data['lastClose']) / data['lastClose'] * 100)
+               for code, data in latest.items()]
+    return sorted(changes, key=lambda item: item[1], reverse=True)[:TOP_N]
+
+
+def main():
+    logging.disable(logging.WARNING)
+    client, backend = make_client()
+    manager = RedisCacheManager(redis_client=client)
+    manager.cache_stocks_batch(make_snapshot())
+
+    print(f"后端: {backend}，{STOCK_COUNT} 只股票取涨幅前 {TOP_N}，每种方式 {ROUNDS} 次取平均")
+    print(f"{'方式':<16}{'耗时 (ms)':>12}")
+    try:
+        results = {}
+        for name, query in (('MGET + 排序', lambda: sort_latest(manager)),
+                            ('有序集合', lambda: manager.get_top_movers('pct_change', TOP_N))):
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                results[name] = query()
+            elapsed = (time.perf_counter() - start) / ROUNDS
+            print(f"{name:<16}{elapsed * 1000:>12.2f}")
+        # 涨跌幅相同的代码顺序可能不同，只比较数值
+        assert [round(value, 4) for _, value in results['MGET + 排序']] == \
+            [item['value'] for item in results['有序集合']]
+    finally:
+        manager.running = False
+
+
+if __name__ == "__main__":
+    main()
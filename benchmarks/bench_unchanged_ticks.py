@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+只写有变化的tick的效果：模拟一个交易日每3秒一次的全市场快照，比较追加到历史的条数、写入字节数和Redis内存
+
+快照按股票的活跃度生成：停牌股始终不变，低流动性股票大部分轮次没有成交，活跃股票大部分轮次有成交；
+没有成交时 xtquant 返回的快照与上一轮相同（tick时间、成交量、价格都不变）。
+默认使用 fakeredis；设置 REDIS_URL（如 redis://localhost:6379/15）时使用本地 Redis，会清空该库，并统计 used_memory。
+运行方式（项目根目录）：python -m benchmarks.bench_unchanged_ticks
+"""
+
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import redis
+
+from mini_stock.cache_config import CacheConfig
+from mini_stock.redis_cache_manager import RedisCacheManager
+
+STOCK_COUNT = int(os.getenv('STOCK_COUNT', '300'))
+ROUNDS = int(os.getenv('ROUNDS', '400'))
+# (占比, 每轮有成交的概率)
+ACTIVITY_PROFILE = ((0.02, 0.0), (0.38, 0.15), (0.60, 0.85))
+
+
+def make_day():
+    """生成每一轮的全市场快照"""
+    rng = random.Random(11)
+    probabilities = []
+    for share, probability in ACTIVITY_PROFILE:
+        probabilities.extend([probability] * int(STOCK_COUNT * share))
+    probabilities.extend([ACTIVITY_PROFILE[-1][1]] * (STOCK_COUNT - len(probabilities)))
+
+    start = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
+    codes = [f"{index:06d}.{'SH' if index % 2 else 'SZ'}" for index in range(STOCK_COUNT)]
+    state = {code: {'time': start.strftime('%Y%m%d%H%M%S'), 'lastPrice': 10.0, 'open': 10.0, 'high': 10.0,
+                    'low': 10.0, 'lastClose': 10.0, 'amount': 0.0, 'volume': 0.0} for code in codes}
+    rounds = []
+    for round_index in range(ROUNDS):
+        moment = (start + timedelta(seconds=3 * round_index)).strftime('%Y%m%d%H%M%S')
+        for code, probability in zip(codes, probabilities):
+            if rng.random() < probability:
+                tick = dict(state[code])
+                price = round(tick['lastPrice'] + rng.choice((-0.01, 0.0, 0.01)), 2)
+                volume = rng.randint(1, 50)
+                tick.update(time=moment, lastPrice=price, high=max(tick['high'], price), low=min(tick['low'], price),
+                            volume=tick['volume'] + volume, amount=tick['amount'] + volume * price * 100)
+                state[code] = tick
+        rounds.append({code: dict(tick) for code, tick in state.items()})
+    return rounds
+
+
+def make_client():
+    url = os.getenv('REDIS_URL')
+    if url:
+        return redis.Redis.from_url(url, decode_responses=True), url
+    return fakeredis.FakeRedis(decode_responses=True), 'fakeredis'
+
+
+def run(client, rounds, skip_unchanged):
+    client.flushdb()
+    manager = RedisCacheManager(redis_client=client)
+    config = dict(CacheConfig.DEFAULT_CONFIG)
+    config['skip_unchanged_ticks'] = skip_unchanged
+    config['max_cache_size'] = {'daily_records_per_stock': ROUNDS, 'total_stocks': 5000}
+    manager.config = CacheConfig(config)
+    start = time.perf_counter()
+    for snapshot in rounds:
+        manager.cache_stocks_batch(snapshot)
+    elapsed = time.perf_counter() - start
+    stats = manager.get_cache_stats()
+    memory = client.info('memory')['used_memory'] if os.getenv('REDIS_URL') else None
+    manager.running = False
+    return elapsed, stats, memory
+
+
+def main():
+    logging.disable(logging.WARNING)
+    client, backend = make_client()
+    rounds = make_day()
+    print(f"后端: {backend}，{STOCK_COUNT} 只股票 × {ROUNDS} 轮快照（每轮3秒）")
+    header = f"{'写入方式':<16}{'追加条数':>10}{'写入 (KB)':>12}{'耗时 (s)':>10}"
+    if os.getenv('REDIS_URL'):
+        header += f"{'used_memory (KB)':>18}"
+    print(header)
+    results = {}
+    for name, skip_unchanged in (('全部写入', False), ('只写有变化的', True)):
+        elapsed, stats, memory = run(client, rounds, skip_unchanged)
+        results[name] = stats
+        line = f"{name:<16}{stats['total_records']:>10}{stats['bytes_written'] / 1024:>12.1f}{elapsed:>10.2f}"
+        if memory is not None:
+            line += f"{memory / 1024:>18.1f}"
+        print(line)
+    full, changed = results['全部写入'], results['只写有变化的']
+    print(f"追加条数减少 {1 - changed['total_records'] / full['total_records']:.1%}，"
+          f"写入字节减少 {1 - changed['bytes_written'] / full['bytes_written']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
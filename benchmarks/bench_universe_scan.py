@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全市场筛选基准：5000只股票逐只调用 get_instrument_detail / get_full_tick 与批量读取、按列筛选的耗时和接口调用次数
+
+使用模拟的 xtdata，每次接口调用固定耗时 CALL_LATENCY_MS 毫秒（默认0.2，接近本地迅投客户端的单次调用开销）。
+运行方式（项目根目录）：python -m benchmarks.bench_universe_scan
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from mini_stock import instrument_registry, stock_data_manager
+from mini_stock.instrument_registry import InstrumentRegistry
+from mini_stock.stock_data_manager import StockDataManager, StockFilter
+
+STOCK_COUNT = int(os.getenv('STOCK_COUNT', '5000'))
+CALL_LATENCY = float(os.getenv('CALL_LATENCY_MS', '0.2')) / 1000
+TARGET_DATE = datetime(2025, 7, 1, 10, 30)
+
+
+class FakeXtdata:
+    def __init__(self):
+        rng = random.Random(5)
+        prefixes = ('600', '601', '000', '002', '300', '688')
+        self.codes = [f"{prefixes[index % len(prefixes)]}{index:03d}.{'SH' if index % 2 else 'SZ'}"
+                      for index in range(STOCK_COUNT)]
+        self.details, self.quotes = {}, {}
+        for code in self.codes:
+            name = ('*ST' if rng.random() < 0.03 else '') + '股票'
+            self.details[code] = {'InstrumentName': name, 'InstrumentStatus': 0,
+                                  'OpenDate': rng.choice(['20100105', '20180312', '20250520']),
+                                  'TotalVolume': rng.uniform(5e7, 5e9)}
+            last_close = rng.uniform(3, 60)
+            self.quotes[code] = {'lastPrice': last_close * (1 + rng.uniform(-0.1, 0.1)), 'lastClose': last_close,
+                                 'openInt': 1 if rng.random() < 0.01 else 0}
+        self.calls = 0
+
+    def get_stock_list_in_sector(self, sector):
+        return self.codes
+
+    def get_instrument_detail(self, stock):
+        self.calls += 1
+        time.sleep(CALL_LATENCY)
+        return self.details[stock]
+
+    def get_full_tick(self, stocks):
+        self.calls += 1
+        time.sleep(CALL_LATENCY)
+        return {stock: self.quotes[stock] for stock in stocks}
+
+
+def filter_one_by_one(xtdata, condition):
+    """逐只调用接口筛选（批量读取之前的 filter_stocks）"""
+    result = {}
+    for stock in xtdata.get_stock_list_in_sector('沪深A股'):
+        info = xtdata.get_instrument_detail(stock)
+        if condition.exclude_st and ('ST' in info['InstrumentName'] or info['InstrumentStatus'] > 0):
+            continue
+        days_listed = (TARGET_DATE - datetime.strptime(info['OpenDate'], '%Y%m%d')).days
+        if days_listed < condition.min_listed_days:
+            continue
+        quote = xtdata.get_full_tick([stock])[stock]
+        if condition.exclude_suspended and quote['openInt'] == 1:
+            continue
+        if condition.exclude_limit_up and (quote['lastPrice'] - quote['lastClose']) / quote['lastClose'] * 100 >= 9.5:
+            continue
+        result[stock] = quote['lastPrice'] * info['TotalVolume']
+    return result
+
+
+def run(name, fake, scan, selected=True):
+    fake.calls = 0
+    start = time.perf_counter()
+    result = scan()
+    count = len(result) if selected else '-'
+    print(f"{name:<24}{(time.perf_counter() - start) * 1000:>10.1f}{fake.calls:>10}{count:>8}")
+    return result
+
+
+def main():
+    fake = FakeXtdata()
+    stock_data_manager.xtdata = fake
+    instrument_registry.xtdata = fake
+    directory = tempfile.TemporaryDirectory()
+    instrument_registry.instrument_registry = InstrumentRegistry(directory.name, sectors={'沪深A股': 'stock'})
+    condition = StockFilter()
+    print(f"股票数量 {STOCK_COUNT}，单次接口耗时 {CALL_LATENCY * 1000:.2f} ms")
+    print(f"{'方式':<24}{'耗时 (ms)':>10}{'调用次数':>10}{'入选':>8}")
+    expected = run('逐只调用', fake, lambda: filter_one_by_one(fake, condition))
+    first = run('批量读取（读取合约信息）', fake, lambda: StockDataManager.filter_stocks(condition, TARGET_DATE))
+    run('批量读取（合约信息在内存）', fake, lambda: StockDataManager.filter_stocks(condition, TARGET_DATE))
+    run('市值占比（合约信息在内存）', fake, lambda: StockDataManager.get_market_share(list(expected)),
+        selected=False)
+    assert list(first) == list(expected)
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -74,6 +74,19 @@ class MarketDataClient:
             logging.error(f"获取异常统计失败: {e}")
             return {}
 
+    def fetch_top_movers(self, metric='pct_change', n=20, order='desc'):
+        """获取当天排行榜"""
+        try:
+            response = requests.get(f"{self.market_data_url}/top_movers",
+                                    params={'metric': metric, 'n': n, 'order': order})
+            if response.status_code == 200:
+                return response.json()
+            logging.error(f"获取排行榜失败: {response.status_code}")
+            return []
+        except Exception as e:
+            logging.error(f"获取排行榜失败: {e}")
+            return []
+
     def fetch_futures_alerts(self, minutes=30):
         """获取股指期货异常提示"""
         try:
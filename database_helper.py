@@ -12,7 +12,8 @@ import pandas as pd
 from sqlalchemy.pool import QueuePool
 from threading import Lock
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timedelta
 from sqlalchemy import text
@@ -873,3 +874,65 @@ class DatabaseHelper:
             return None
         finally:
             session.close()
+
+    def create_bar_feature_table(self):
+        table_name = 'bar_feature'
+        class BarFeature(self.Base):
+            __tablename__ = table_name
+            __table_args__ = (Index('uq_bar_feature_key', 'product_type', 'interval', 'time', unique=True),
+                              {'extend_existing': True})
+            id = Column(Integer, primary_key=True)
+            product_type = Column(String, index=True)
+            interval = Column(String, index=True)
+            time = Column(String, index=True)  # K 线时间
+            features = Column(String)  # JSON 格式的特征，如 {"atr_14": ..., "ma_20": ...}
+        meta = MetaData()
+        meta.reflect(bind=self.engine)
+        if table_name not in meta.tables:
+            self.Base.metadata.create_all(self.engine)
+        elif 'uq_bar_feature_key' not in {index.name for index in meta.tables[table_name].indexes}:
+            # 旧表没有唯一键：先删掉重复回填留下的行（保留最新写入的一条），再补建唯一索引
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DELETE FROM {table_name} WHERE id NOT IN "
+                                  f"(SELECT MAX(id) FROM {table_name} GROUP BY product_type, interval, time)"))
+                conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_bar_feature_key "
+                                  f"ON {table_name} (product_type, interval, time)"))
+        return BarFeature
+
+    def store_bar_features(self, product_type, interval, rows):
+        """
+        批量存入已收盘 K 线的特征，同一品种/周期/K 线时间已存在时覆盖特征
+        :param rows: [(K 线时间字符串, 特征 JSON 字符串)]
+        """
+        if not rows:
+            return
+        with self._write_lock:
+            BarFeature = self.create_bar_feature_table()
+            statement = sqlite_insert(BarFeature.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=['product_type', 'interval', 'time'],
+                set_={'features': statement.excluded.features})
+            session = sessionmaker(bind=self.engine)()
+            try:
+                session.execute(statement, [{'product_type': product_type, 'interval': interval, 'time': bar_time,
+                                             'features': features} for bar_time, features in rows])
+                session.commit()
+            except Exception as e:
+                logging.error(f"Error storing bar features: {e}")
+                session.rollback()
+            finally:
+                session.close()
+
+    def get_latest_bar_feature(self, product_type, interval):
+        """获取某品种/周期最新一根已存 K 线的特征，返回 (K 线时间字符串, 特征 JSON 字符串) 或 None"""
+        BarFeature = self.create_bar_feature_table()
+        session = sessionmaker(bind=self.engine)()
+        try:
+            row = session.query(BarFeature).filter_by(product_type=product_type, interval=interval) \
+                .order_by(BarFeature.time.desc()).first()
+            return (row.time, row.features) if row else None
+        except Exception as e:
+            logging.error(f"Error retrieving latest bar feature: {e}")
+            return None
+        finally:
+            session.close()
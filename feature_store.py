@@ -0,0 +1,335 @@
+import copy
+import json
+import logging
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from database_helper import DatabaseHelper
+from key_level_engine import KeyLevelEngine
+from pinbar_kernels import PinbarKernels
+
+
+class _SeriesState:
+    """单个 (品种, 周期) 已收盘 K 线的增量计算状态"""
+
+    def __init__(self, window, atr_periods):
+        self.last_time = None
+        self.count = 0
+        self.prev_close = np.nan
+        self.highs = deque(maxlen=window)
+        self.lows = deque(maxlen=window)
+        self.closes = deque(maxlen=window)
+        # ATR 在前 period 个 TR 凑齐之前用 warmup 累加，之后按 Wilder 平滑递推
+        self.atr = {period: np.nan for period in atr_periods}
+        self.atr_warmup = {period: [] for period in atr_periods}
+
+
+class FeatureStore:
+    """
+    K 线特征库
+
+    按 (品种, 周期, K 线时间) 缓存 ATR(n)、MA(n)、滚动最高/最低价和关键位，新 K 线重采样后增量更新，
+    策略直接读取，不用每次在整段窗口上重新计算。
+    - 已收盘的 K 线（DataFrame 除最后一根以外）提交到增量状态，持久化时写入 bar_feature 表；
+    - 最后一根 K 线可能还没走完，每次更新都基于已提交状态重新计算，只放在内存缓存里；
+    - 首次遇到某个品种/周期时，持久化时优先从 bar_feature 表最新一行恢复状态，否则对整段历史做一次向量化回填。
+    特征口径：
+    - atr_n 与 bt.indicators.AverageTrueRange(period=n) 一致，前 n 根为 NaN；
+    - ma_n / highest_n / lowest_n 包含当前 K 线，历史不足 n 根为 NaN；
+    - key_high_n / key_low_n / key_lookback_n 与 KeyLevelEngine.levels_for 一致（不含当前 K 线）。
+    """
+
+    default_atr_periods = (14,)
+    default_ma_periods = (5, 20, 50)
+    default_high_low_periods = (34,)
+    # 每个品种/周期在内存中保留的 K 线数量
+    cache_bars = 500
+
+    def __init__(self, atr_periods=default_atr_periods, ma_periods=default_ma_periods,
+                 high_low_periods=default_high_low_periods, key_level_lookbacks=KeyLevelEngine.default_lookbacks,
+                 db_helper=None, db_factory=None):
+        self.atr_periods = tuple(atr_periods)
+        self.ma_periods = tuple(ma_periods)
+        self.high_low_periods = tuple(high_low_periods)
+        self.key_level_lookbacks = tuple(key_level_lookbacks)
+        self.window = max(self.ma_periods + self.high_low_periods + self.key_level_lookbacks)
+        # bar_feature 表只在 update(persist=True) 时使用；db_helper 为 None 时第一次持久化才用 db_factory 打开数据库，
+        # 两者都没有时只使用内存缓存
+        self.db_helper = db_helper
+        self.db_factory = db_factory
+        self._states = {}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 更新
+    # ------------------------------------------------------------------
+    def update(self, df, persist=False):
+        """
+        用重采样后的 DataFrame 更新特征，只计算上次提交之后的新 K 线
+        :param df: resample_data_with 返回的 DataFrame，索引为 K 线时间
+        :param persist: 是否从 bar_feature 表恢复状态并把新提交的 K 线特征写入该表，只有实盘轮询需要（没有数据库时忽略）
+        :return: 最后一根 K 线的特征 dict，数据为空时返回 None
+        """
+        if df is None or df.empty or 'product_type' not in df.columns:
+            return None
+        product_type = df['product_type'].iloc[0]
+        interval = df['interval'].iloc[0] if 'interval' in df.columns else '1d'
+        key = (product_type, interval)
+
+        with self._lock:
+            database = self._database() if persist else None
+            state = self._states.get(key)
+            if state is not None and state.last_time is None:
+                state = None
+            elif state is not None and state.last_time not in df.index:
+                # 历史被截断或重建，已提交状态对不上，重新回填
+                logging.warning(f"{product_type} {interval} 特征库状态与数据不一致，重新计算")
+                state = None
+            if state is None:
+                state = self._restore(database, key, df)
+
+            closed = df.iloc[:-1]
+            if state is None:
+                state, rows = self._backfill(closed)
+            else:
+                rows = self._advance_all(state, closed[closed.index > state.last_time])
+            self._states[key] = state
+
+            # 最后一根 K 线基于已提交状态的副本计算，下次更新时可能被覆盖
+            latest_time = df.index[-1]
+            latest = None
+            if state.last_time is None or latest_time > state.last_time:
+                preview = copy.deepcopy(state)
+                latest = self._advance(preview, latest_time, df['high'].iloc[-1], df['low'].iloc[-1],
+                                       df['close'].iloc[-1])
+            self._remember(key, rows + ([(latest_time, latest)] if latest is not None else []))
+            cached = self._cache[key].get(pd.Timestamp(latest_time)) if key in self._cache else None
+
+        self._persist(database, product_type, interval, rows)
+        return cached
+
+    def _database(self):
+        if self.db_helper is None and self.db_factory is not None:
+            self.db_helper = self.db_factory()
+        return self.db_helper
+
+    def _advance_all(self, state, bars):
+        rows = []
+        for bar_time, high, low, close in zip(bars.index, bars['high'].to_numpy(dtype=np.float64),
+                                              bars['low'].to_numpy(dtype=np.float64),
+                                              bars['close'].to_numpy(dtype=np.float64)):
+            rows.append((bar_time, self._advance(state, bar_time, high, low, close)))
+        return rows
+
+    def _advance(self, state, bar_time, high, low, close):
+        """提交一根 K 线并返回它的特征"""
+        if state.count > 0:
+            true_range = max(high, state.prev_close) - min(low, state.prev_close)
+            for period in self.atr_periods:
+                if np.isnan(state.atr[period]):
+                    warmup = state.atr_warmup[period]
+                    warmup.append(true_range)
+                    if len(warmup) == period:
+                        state.atr[period] = float(np.mean(warmup))
+                        state.atr_warmup[period] = []
+                else:
+                    alpha = 1.0 / period
+                    state.atr[period] = state.atr[period] * (1 - alpha) + true_range * alpha
+        state.highs.append(high)
+        state.lows.append(low)
+        state.closes.append(close)
+        state.prev_close = close
+        state.count += 1
+        state.last_time = bar_time
+
+        features = {f'atr_{period}': float(state.atr[period]) for period in self.atr_periods}
+        closes = np.fromiter(state.closes, dtype=np.float64)
+        highs = np.fromiter(state.highs, dtype=np.float64)
+        lows = np.fromiter(state.lows, dtype=np.float64)
+        for period in self.ma_periods:
+            features[f'ma_{period}'] = float(closes[-period:].mean()) if state.count >= period else np.nan
+        for period in self.high_low_periods:
+            enough = state.count >= period
+            features[f'highest_{period}'] = float(highs[-period:].max()) if enough else np.nan
+            features[f'lowest_{period}'] = float(lows[-period:].min()) if enough else np.nan
+
+        width = max(self.key_level_lookbacks)
+        padded_highs = np.full((1, width), np.nan)
+        padded_lows = np.full((1, width), np.nan)
+        size = min(width, len(highs))
+        padded_highs[0, width - size:] = highs[-size:]
+        padded_lows[0, width - size:] = lows[-size:]
+        levels = KeyLevelEngine.last_bar_levels(padded_highs, padded_lows, np.array([state.count]),
+                                                self.key_level_lookbacks)
+        for lookback, (level_high, level_low, real_lookback) in levels.items():
+            features[f'key_high_{lookback}'] = float(level_high[0])
+            features[f'key_low_{lookback}'] = float(level_low[0])
+            features[f'key_lookback_{lookback}'] = int(real_lookback[0])
+        return features
+
+    def _backfill(self, bars):
+        """对整段已收盘历史做一次向量化计算，返回 (增量状态, [(K 线时间, 特征)])"""
+        state = _SeriesState(self.window, self.atr_periods)
+        if bars.empty:
+            return state, []
+        highs = bars['high'].to_numpy(dtype=np.float64)
+        lows = bars['low'].to_numpy(dtype=np.float64)
+        closes = bars['close'].to_numpy(dtype=np.float64)
+        length = len(closes)
+
+        columns = {}
+        for period in self.atr_periods:
+            columns[f'atr_{period}'] = PinbarKernels.average_true_range_series(highs, lows, closes, period)
+            state.atr[period] = float(columns[f'atr_{period}'][-1])
+            if np.isnan(state.atr[period]) and length > 1:
+                prev_close = np.concatenate([[np.nan], closes[:-1]])
+                true_range = np.maximum(highs, prev_close) - np.minimum(lows, prev_close)
+                state.atr_warmup[period] = list(true_range[1:])
+        for period in self.ma_periods:
+            columns[f'ma_{period}'] = pd.Series(closes).rolling(period).mean().to_numpy()
+        for period in self.high_low_periods:
+            columns[f'highest_{period}'] = pd.Series(highs).rolling(period).max().to_numpy()
+            columns[f'lowest_{period}'] = pd.Series(lows).rolling(period).min().to_numpy()
+        for lookback in self.key_level_lookbacks:
+            level_highs, level_lows = KeyLevelEngine.rolling_levels(highs, lows, lookback)
+            # 历史不足 lookback 根的 K 线按实际长度计算，与 levels_for 口径一致
+            head = min(lookback - 1, length)
+            padded_highs = np.concatenate([np.full(lookback - 1, np.nan), highs[:head]])
+            padded_lows = np.concatenate([np.full(lookback - 1, np.nan), lows[:head]])
+            head_levels = KeyLevelEngine.last_bar_levels(
+                np.lib.stride_tricks.sliding_window_view(padded_highs, lookback),
+                np.lib.stride_tricks.sliding_window_view(padded_lows, lookback),
+                np.arange(1, head + 1), (lookback,))
+            level_highs[:head], level_lows[:head], _ = head_levels[lookback]
+            columns[f'key_high_{lookback}'] = level_highs
+            columns[f'key_low_{lookback}'] = level_lows
+            columns[f'key_lookback_{lookback}'] = np.minimum(lookback, np.arange(1, length + 1))
+
+        features = pd.DataFrame(columns, index=bars.index)
+        for lookback in self.key_level_lookbacks:
+            features[f'key_lookback_{lookback}'] = features[f'key_lookback_{lookback}'].astype(int)
+
+        state.highs.extend(highs[-self.window:])
+        state.lows.extend(lows[-self.window:])
+        state.closes.extend(closes[-self.window:])
+        state.prev_close = closes[-1]
+        state.count = length
+        state.last_time = bars.index[-1]
+        return state, list(zip(features.index, features.to_dict('records')))
+
+    def _restore(self, database, key, df):
+        """从 bar_feature 表最新一行恢复增量状态，恢复不了时返回 None"""
+        if database is None:
+            return None
+        stored = database.get_latest_bar_feature(*key)
+        if stored is None:
+            return None
+        bar_time = pd.Timestamp(stored[0])
+        features = json.loads(stored[1])
+        position = df.index.get_indexer([bar_time])[0]
+        if position < 0 or position >= len(df) - 1:
+            return None
+        if any(np.isnan(features.get(f'atr_{period}', np.nan)) for period in self.atr_periods):
+            # ATR 还在预热阶段，状态不完整，直接回填
+            return None
+
+        history = df.iloc[:position + 1]
+        state = _SeriesState(self.window, self.atr_periods)
+        state.highs.extend(history['high'].to_numpy(dtype=np.float64)[-self.window:])
+        state.lows.extend(history['low'].to_numpy(dtype=np.float64)[-self.window:])
+        state.closes.extend(history['close'].to_numpy(dtype=np.float64)[-self.window:])
+        state.prev_close = float(history['close'].iloc[-1])
+        state.count = position + 1
+        state.last_time = df.index[position]
+        state.atr = {period: float(features[f'atr_{period}']) for period in self.atr_periods}
+        logging.info(f"{key[0]} {key[1]} 从特征表恢复到 {bar_time}")
+        return state
+
+    def _remember(self, key, rows):
+        cache = self._cache.setdefault(key, OrderedDict())
+        for bar_time, features in rows:
+            cache[pd.Timestamp(bar_time)] = features
+        while len(cache) > self.cache_bars:
+            cache.popitem(last=False)
+
+    def _persist(self, database, product_type, interval, rows):
+        if database is None or not rows:
+            return
+        database.store_bar_features(product_type, interval, [
+            (pd.Timestamp(bar_time).strftime('%Y-%m-%d %H:%M:%S'), json.dumps(features))
+            for bar_time, features in rows])
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def get(self, product_type, interval, bar_time=None):
+        """读取某根 K 线的全部特征，bar_time 为空时取最新一根，没有缓存时返回 None"""
+        with self._lock:
+            cache = self._cache.get((product_type, interval))
+            if not cache:
+                return None
+            if bar_time is None:
+                return next(reversed(cache.values()))
+            return cache.get(pd.Timestamp(bar_time))
+
+    def _value(self, product_type, interval, bar_time, name):
+        features = self.get(product_type, interval, bar_time)
+        if features is None:
+            return None
+        value = features.get(name)
+        if value is None or np.isnan(value):
+            return None
+        return value
+
+    def atr(self, product_type, interval, bar_time=None, period=14):
+        return self._value(product_type, interval, bar_time, f'atr_{period}')
+
+    def ma(self, product_type, interval, bar_time=None, period=20):
+        return self._value(product_type, interval, bar_time, f'ma_{period}')
+
+    def highest(self, product_type, interval, bar_time=None, period=34):
+        return self._value(product_type, interval, bar_time, f'highest_{period}')
+
+    def lowest(self, product_type, interval, bar_time=None, period=34):
+        return self._value(product_type, interval, bar_time, f'lowest_{period}')
+
+    def key_levels(self, product_type, interval, bar_time=None):
+        """返回格式与 KeyLevelEngine.levels_for 相同：{lookback: (关键高位, 关键低位, 实际 lookback)}"""
+        features = self.get(product_type, interval, bar_time)
+        if features is None:
+            return None
+        return {lookback: (features[f'key_high_{lookback}'], features[f'key_low_{lookback}'],
+                           features[f'key_lookback_{lookback}'])
+                for lookback in self.key_level_lookbacks}
+
+    def invalidate(self, product_type=None, interval=None):
+        """清除状态和缓存，不传参数时清除全部"""
+        with self._lock:
+            if product_type is None:
+                self._states.clear()
+                self._cache.clear()
+            else:
+                self._states.pop((product_type, interval), None)
+                self._cache.pop((product_type, interval), None)
+
+
+# 全局特征库实例，第一次使用时创建
+feature_store = None
+_feature_store_lock = threading.Lock()
+
+
+def get_feature_store():
+    """
+    获取全局特征库实例
+    只有 update(persist=True)（即 resample_data_with(persist_features=True)）时才打开 futures_data.db，
+    已收盘 K 线的特征写入 bar_feature 表；其他调用只使用内存缓存
+    """
+    global feature_store
+    with _feature_store_lock:
+        if feature_store is None:
+            feature_store = FeatureStore(db_factory=DatabaseHelper)
+        return feature_store
@@ -130,6 +130,62 @@ def get_futures_alerts_by_type():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@futures_blueprint.route('/alerts/by_code', methods=['GET'])
+def get_futures_alerts_by_code():
+    """获取指定合约的股指期货异常提示接口"""
+    futures_service = get_index_futures_service()
+    if not futures_service:
+        return jsonify({"error": "股指期货服务未启动"}), 503
+
+    try:
+        futures_code = request.args.get('code', '')
+        minutes = request.args.get('minutes', 30, type=int)
+
+        if not futures_code:
+            return jsonify({"error": "缺少合约代码参数"}), 400
+
+        alerts = futures_service.get_futures_alerts_by_code(futures_code, minutes)
+        return jsonify(alerts)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@futures_blueprint.route('/alerts/history', methods=['GET'])
+def get_futures_alert_history():
+    """按时间范围查询股指期货提示日志接口，参数 start、end（ISO时间）、day（YYYYMMDD，默认当天）"""
+    futures_service = get_index_futures_service()
+    if not futures_service:
+        return jsonify({"error": "股指期货服务未启动"}), 503
+
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({"error": "start/end 需要ISO格式时间，如 2025-01-20T09:30:00"}), 400
+
+    try:
+        alerts = futures_service.get_futures_alert_history(start, end, request.args.get('day'))
+        return jsonify(alerts)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@futures_blueprint.route('/alerts/rules', methods=['GET', 'POST'])
+def futures_alert_rules():
+    """查看股指期货异常检测规则；POST JSON {规则名: 阈值} 在运行中调整阈值"""
+    futures_service = get_index_futures_service()
+    if not futures_service:
+        return jsonify({"error": "股指期货服务未启动"}), 503
+
+    try:
+        if request.method == 'POST':
+            return jsonify(futures_service.update_futures_alert_rules(request.get_json(force=True) or {}))
+        return jsonify(futures_service.get_futures_alert_rules())
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @futures_blueprint.route('/alerts/stats', methods=['GET'])
 def get_futures_alert_stats():
     """获取股指期货异常提示统计接口"""
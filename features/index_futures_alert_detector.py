@@ -4,15 +4,18 @@
 """
 
 import logging
-import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Union
 from enum import Enum
-import json
+
+import numpy as np
 
 from mini_stock.utils.time_utils import TimeUtils
 from mini_stock.redis_cache_manager import get_cache_manager
+from mini_stock.alert_store import AlertStore
+from mini_stock.alert_rules import AlertRule, AlertRuleEngine, default_rules
+from mini_stock.alert_scheduler import get_alert_scheduler
 from mini_stock.utils.trading_time_utils import TradingTimeUtils
 from mini_stock.futures_instrument_model import FuturesInstrumentModel
 
@@ -59,46 +62,58 @@ class IndexFuturesAlert:
         }
 
 
+class FuturesAlertState:
+    """单个股指期货合约的增量检测状态，只保存最后两条tick和之前的最高/最低价，不保存历史tick"""
+
+    def __init__(self):
+        self.watermark = None  # 已处理的最后一条tick的写入时间戳
+        self.count = 0  # 已处理的tick数
+        self.high_price = 0  # 已处理tick的最高价
+        self.low_price = 0  # 已处理tick的最低价（忽略无效价格）
+        self.prev_high_price = 0  # 最后一条之前的最高价，用于突破检测
+        self.last_price = 0  # 最后一条tick的价格和成交量
+        self.last_volume = 0
+        self.prev_price = 0  # 倒数第二条tick的价格和成交量
+        self.prev_volume = 0
+
+
 class IndexFuturesAlertDetector:
     """股指期货异常检测器"""
 
-    def __init__(self):
-        self.cache_manager = get_cache_manager()
-        self.alert_history = []  # 提示历史记录
+    code_type = "futures"
+
+    def __init__(self, cache_manager=None, start_thread: bool = True, scheduler=None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            cache_manager: 缓存管理器，None时使用全局缓存管理器
+            start_thread: 是否注册到检测调度器定时检测，测试时手动调用检测
+            scheduler: 检测调度器，None时使用全局调度器
+            clock: 返回当前时间（秒）的函数，用于交易日切换、冷却时间和提示时间，回放时传入虚拟时钟
+        """
+        self.cache_manager = cache_manager or get_cache_manager()
+        self.clock = clock
         self.max_history = 1000  # 最大历史记录数
-        self.detected_alerts = set()  # 已检测的异常，避免重复提示
-
-        # 配置参数 - 股指期货的阈值通常比股票更严格
-        self.volume_surge_threshold = 2.0  # 成交量异动阈值（2倍）
-        self.price_surge_threshold = 0.02  # 价格异动阈值（2%）
-        self.breakout_threshold = 0.01  # 突破阈值（1%）
-        self.volatility_threshold = 0.03  # 高波动阈值（3%）
-        self.liquidity_threshold = 1000  # 流动性阈值（成交量）
-
-        # 启动检测线程
-        self.running = True
-        self.detection_thread = threading.Thread(target=self._detection_loop, daemon=True)
-        self.detection_thread.start()
-
-        logging.info("股指期货异常检测器已启动")
-
-    def _detection_loop(self):
-        """检测循环"""
-        while self.running:
-            try:
-                # 只在交易时间内进行检测
-                if TradingTimeUtils.is_trading_time():
-                    self._detect_all_futures_alerts()
-                    time.sleep(5)  # 交易时间内每5秒检测一次
-                else:
-                    # 非交易时间，减少检测频率
-                    time.sleep(60)  # 非交易时间每60秒检查一次
-            except Exception as e:
-                logging.error(f"股指期货异常检测循环出错: {e}")
-                time.sleep(10)
+        self.alert_store = AlertStore(self.max_history, 'futures_code')  # 提示历史记录，按类型、代码、级别建立索引
+        self.detected_alerts = self.alert_store.dedup  # 已检测的异常，避免重复提示，一天后过期
+
+        # 增量检测状态 {股指期货代码: FuturesAlertState}，日期变化时清空
+        self.futures_states = {}
+
+        # 检测规则 - 股指期货的阈值通常比股票更严格，可以在运行中调整
+        self.rule_engine = AlertRuleEngine(default_rules('futures'))
+        self.rules_day = None
+
+        # 注册到共享的检测调度器，和股票检测器共用一个检测线程和同一份快照
+        self.scheduler = None
+        if start_thread:
+            self.scheduler = scheduler or get_alert_scheduler()
+            self.scheduler.register(self)
+
+            logging.info("股指期货异常检测器已启动")
 
     def _detect_all_futures_alerts(self):
-        """检测所有股指期货的异常情况"""
+        """检测所有股指期货的异常情况（不经过调度器时手动触发一个检测周期）"""
         try:
             # 再次确认是否在交易时间
             if not TradingTimeUtils.is_trading_time():
@@ -109,15 +124,9 @@ class IndexFuturesAlertDetector:
                 logging.warning("缓存管理器不可用，跳过股指期货异常检测")
                 return
 
-            # 获取股指期货的最新数据
-            # 这里需要根据实际的缓存键模式来获取股指期货数据
             futures_data = self._get_futures_data()
-            
-            if not futures_data:
-                return
-
-            for futures_code, data in futures_data.items():
-                self._detect_futures_alerts(futures_code, data)
+            if futures_data:
+                self.on_snapshot(futures_data)
 
         except Exception as e:
             logging.error(f"检测所有股指期货异常时出错: {e}")
@@ -125,299 +134,201 @@ class IndexFuturesAlertDetector:
     def _get_futures_data(self) -> Dict[str, Any]:
         """获取股指期货数据"""
         try:
-            # 这里需要根据实际的缓存键模式来获取股指期货数据
-            # 假设股指期货数据存储在特定的键模式中
-            futures_keys = self.cache_manager.redis_client.keys("futures_latest:*")
-            futures_data = {}
-            
-            for key in futures_keys:
-                futures_code = key.decode().split(":")[1]  # 提取期货代码
-                data = self.cache_manager.redis_client.get(key)
-                if data:
-                    futures_data[futures_code] = json.loads(data)
-            
-            return futures_data
+            # 从当天索引取股指期货代码，由缓存管理器负责解码
+            futures_codes = self.cache_manager.get_active_codes("futures")
+            if not futures_codes:
+                return {}
+            return self.cache_manager.get_multiple_latest_data(futures_codes)
         except Exception as e:
             logging.error(f"获取股指期货数据失败: {e}")
             return {}
 
-    def _detect_futures_alerts(self, futures_code: str, data: Dict[str, Any]):
-        """检测单个股指期货的异常情况"""
-        try:
-            # 获取该股指期货当天的所有历史数据
-            today_data = self._get_futures_data_today(futures_code)
-            if not today_data or len(today_data) < 2:
-                return
+    def on_snapshot(self, latest_data: Dict[str, Dict[str, Any]]):
+        """
+        处理一轮最新数据快照：逐个合约读取新写入的tick，再用规则引擎一次检测所有合约的最新一条tick
+        价格异动、成交量异动与上一条tick比较，突破与之前tick的最高价比较，与逐条读取当天数据检测的结果相同
 
-            # 按时间排序
-            sorted_data = sorted(today_data, key=lambda x: x.get('timestamp', ''))
-
-            # 检测各种异常
-            self._detect_price_alerts(futures_code, sorted_data)
-            self._detect_volume_alerts(futures_code, sorted_data)
-            self._detect_volatility_alerts(futures_code, sorted_data)
-            self._detect_liquidity_alerts(futures_code, sorted_data)
-
-        except Exception as e:
-            logging.error(f"检测股指期货 {futures_code} 异常时出错: {e}")
-
-    def _get_futures_data_today(self, futures_code: str) -> List[Dict]:
-        """获取股指期货当天的历史数据"""
+        Args:
+            latest_data: {股指期货代码: 最新数据}
+        """
         try:
-            # 这里需要根据实际的缓存键模式来获取历史数据
-            today_key = f"futures_data_today:{futures_code}"
-            data = self.cache_manager.redis_client.get(today_key)
-            if data:
-                return json.loads(data)
-            return []
-        except Exception as e:
-            logging.error(f"获取股指期货 {futures_code} 当天数据失败: {e}")
-            return []
-
-    def _detect_price_alerts(self, futures_code: str, sorted_data: List[Dict]):
-        """检测价格相关异常"""
-        try:
-            if len(sorted_data) < 2:
-                return
-
-            latest_record = sorted_data[-1]
-            prev_record = sorted_data[-2]
-
-            # 提取价格数据
-            current_price = latest_record.get('close', latest_record.get('lastPrice', 0))
-            prev_price = prev_record.get('close', prev_record.get('lastPrice', 0))
-
-            if current_price <= 0 or prev_price <= 0:
+            # 新的交易日清空增量状态和冷却时间
+            today = self._now().strftime('%Y%m%d')
+            if self.rules_day != today:
+                self.futures_states.clear()
+                self.rule_engine.reset()
+                self.rules_day = today
+
+            rows = []
+            for futures_code, latest_record in latest_data.items():
+                row = self._collect_futures(futures_code, latest_record)
+                if row:
+                    rows.append(row)
+            if not rows:
                 return
 
-            # 检测价格异动
-            price_change = abs(current_price - prev_price) / prev_price
-            if price_change >= self.price_surge_threshold:
-                alert_id = f"{futures_code}_price_surge_{latest_record.get('timestamp', '')}"
+            columns = np.array([row[1:8] for row in rows], dtype=float)
+            preclose, price, volume, prev_price, prev_volume, high, low = columns.T
+            triggered = self.rule_engine.evaluate_frame(
+                [row[0] for row in rows], price, volume, preclose,
+                previous={'price': prev_price, 'volume': prev_volume, 'high': high, 'low': low}, now=self.clock())
+            for index, rule, value in triggered:
+                futures_code, timestamp = rows[index][0], rows[index][8]
+                # 同一条tick的同一种提示只提示一次
+                alert_id = f"{futures_code}_{rule.name}_{timestamp}"
                 if alert_id not in self.detected_alerts:
                     self.detected_alerts.add(alert_id)
-                    alert = IndexFuturesAlert(
-                        futures_code=futures_code,
-                        alert_type=IndexFuturesAlertType.PRICE_SURGE,
-                        level=IndexFuturesAlertLevel.MEDIUM,
-                        message=f"{futures_code} 价格异动！价格变化 {price_change:.2%}",
-                        data={
-                            'price_change': price_change,
-                            'current_price': current_price,
-                            'prev_price': prev_price
-                        },
-                        timestamp=datetime.now()
-                    )
-                    self._add_alert(alert)
-
-            # 检测突破
-            high_prices = [r.get('close', r.get('lastPrice', 0)) for r in sorted_data[:-1]]
-            high_price = max(high_prices, default=0)
-            if high_price > 0 and current_price > high_price * (1 + self.breakout_threshold):
-                alert_id = f"{futures_code}_breakout_{latest_record.get('timestamp', '')}"
-                if alert_id not in self.detected_alerts:
-                    self.detected_alerts.add(alert_id)
-                    alert = IndexFuturesAlert(
-                        futures_code=futures_code,
-                        alert_type=IndexFuturesAlertType.BREAKOUT,
-                        level=IndexFuturesAlertLevel.MEDIUM,
-                        message=f"{futures_code} 突破新高！当前价格 {current_price}",
-                        data={
-                            'current_price': current_price,
-                            'high_price': high_price,
-                            'breakout_pct': (current_price - high_price) / high_price
-                        },
-                        timestamp=datetime.now()
-                    )
-                    self._add_alert(alert)
+                    self._add_rule_alert(futures_code, rule, value, latest_data[futures_code])
 
         except Exception as e:
-            logging.error(f"检测价格异常时出错 {futures_code}: {e}")
-
-    def _detect_volume_alerts(self, futures_code: str, sorted_data: List[Dict]):
-        """检测成交量相关异常"""
-        try:
-            if len(sorted_data) < 2:
-                return
+            logging.error(f"检测股指期货快照异常时出错: {e}")
 
-            latest_record = sorted_data[-1]
-            prev_record = sorted_data[-2]
-
-            # 提取成交量数据
-            current_volume = latest_record.get('volume', 0)
-            prev_volume = prev_record.get('volume', 0)
-
-            if prev_volume > 0 and current_volume > 0:
-                volume_ratio = current_volume / prev_volume
-                if volume_ratio >= self.volume_surge_threshold:
-                    alert_id = f"{futures_code}_volume_surge_{latest_record.get('timestamp', '')}"
-                    if alert_id not in self.detected_alerts:
-                        self.detected_alerts.add(alert_id)
-                        alert = IndexFuturesAlert(
-                            futures_code=futures_code,
-                            alert_type=IndexFuturesAlertType.VOLUME_SURGE,
-                            level=IndexFuturesAlertLevel.MEDIUM,
-                            message=f"{futures_code} 成交量异动！成交量放大 {volume_ratio:.1f}倍",
-                            data={
-                                'volume_ratio': volume_ratio,
-                                'current_volume': current_volume,
-                                'prev_volume': prev_volume
-                            },
-                            timestamp=datetime.now()
-                        )
-                        self._add_alert(alert)
+    def _collect_futures(self, futures_code: str, latest_record: Dict[str, Any]) -> Optional[tuple]:
+        """
+        只读取并处理水位之后新写入的tick，返回规则引擎检测最新一条需要的数据
 
-        except Exception as e:
-            logging.error(f"检测成交量异常时出错 {futures_code}: {e}")
-
-    def _detect_volatility_alerts(self, futures_code: str, sorted_data: List[Dict]):
-        """检测波动性异常"""
+        Returns:
+            tuple: (代码, 前收盘价, 最新价, 最新成交量, 前一条价格, 前一条成交量, 之前的最高价, 最低价, 最新时间戳)，
+                   数据不足两条时返回None
+        """
         try:
-            if len(sorted_data) < 10:  # 需要足够的数据来计算波动性
-                return
+            state = self.futures_states.get(futures_code)
+            if state is None:
+                state = self.futures_states[futures_code] = FuturesAlertState()
 
-            # 计算最近10个价格点的波动性
-            recent_prices = [r.get('close', r.get('lastPrice', 0)) for r in sorted_data[-10:]]
-            recent_prices = [p for p in recent_prices if p > 0]
+            # 最新数据就是已处理的最后一条时不需要读取历史
+            if state.watermark is None or str(latest_record.get('timestamp', '')) > state.watermark:
+                for record in self.cache_manager.get_stock_data_since(futures_code, state.watermark):
+                    self._consume_tick(state, record)
 
-            if len(recent_prices) < 5:
-                return
-
-            # 计算价格变化的标准差
-            price_changes = []
-            for i in range(1, len(recent_prices)):
-                if recent_prices[i-1] > 0:
-                    change = abs(recent_prices[i] - recent_prices[i-1]) / recent_prices[i-1]
-                    price_changes.append(change)
-
-            if price_changes:
-                avg_volatility = sum(price_changes) / len(price_changes)
-                if avg_volatility >= self.volatility_threshold:
-                    alert_id = f"{futures_code}_high_volatility_{datetime.now().strftime('%Y%m%d%H%M')}"
-                    if alert_id not in self.detected_alerts:
-                        self.detected_alerts.add(alert_id)
-                        alert = IndexFuturesAlert(
-                            futures_code=futures_code,
-                            alert_type=IndexFuturesAlertType.HIGH_VOLATILITY,
-                            level=IndexFuturesAlertLevel.HIGH,
-                            message=f"{futures_code} 高波动！平均波动率 {avg_volatility:.2%}",
-                            data={
-                                'avg_volatility': avg_volatility,
-                                'price_changes': price_changes
-                            },
-                            timestamp=datetime.now()
-                        )
-                        self._add_alert(alert)
+            if state.count >= 2:
+                return (futures_code, self._to_float(latest_record.get('lastClose')), state.last_price,
+                        state.last_volume, state.prev_price, state.prev_volume, state.prev_high_price,
+                        state.low_price, state.watermark)
 
         except Exception as e:
-            logging.error(f"检测波动性异常时出错 {futures_code}: {e}")
-
-    def _detect_liquidity_alerts(self, futures_code: str, sorted_data: List[Dict]):
-        """检测流动性异常"""
+            logging.error(f"检测股指期货 {futures_code} 异常时出错: {e}")
+        return None
+
+    def _consume_tick(self, state: FuturesAlertState, record: Dict[str, Any]):
+        """把一条新tick并入检测状态"""
+        current_price = self._to_float(record.get('close', record.get('lastPrice', 0)))
+        current_volume = self._to_float(record.get('volume', 0))
+        state.watermark = str(record.get('timestamp', ''))
+        state.count += 1
+        state.prev_high_price = state.high_price
+        state.high_price = max(state.high_price, current_price)
+        if current_price > 0:
+            state.low_price = min(state.low_price, current_price) if state.low_price else current_price
+        state.prev_price, state.prev_volume = state.last_price, state.last_volume
+        state.last_price, state.last_volume = current_price, current_volume
+
+    @staticmethod
+    def _to_float(value: Any) -> float:
+        """缓存记录中的数值，缺失或无法转换时为0"""
         try:
-            if len(sorted_data) < 5:
-                return
-
-            # 检查最近5个时间点的成交量
-            recent_volumes = [r.get('volume', 0) for r in sorted_data[-5:]]
-            avg_volume = sum(recent_volumes) / len(recent_volumes)
-
-            if avg_volume < self.liquidity_threshold:
-                alert_id = f"{futures_code}_liquidity_crisis_{datetime.now().strftime('%Y%m%d%H%M')}"
-                if alert_id not in self.detected_alerts:
-                    self.detected_alerts.add(alert_id)
-                    alert = IndexFuturesAlert(
-                        futures_code=futures_code,
-                        alert_type=IndexFuturesAlertType.LIQUIDITY_CRISIS,
-                        level=IndexFuturesAlertLevel.CRITICAL,
-                        message=f"{futures_code} 流动性危机！平均成交量 {avg_volume:.0f}",
-                        data={
-                            'avg_volume': avg_volume,
-                            'recent_volumes': recent_volumes
-                        },
-                        timestamp=datetime.now()
-                    )
-                    self._add_alert(alert)
-
-        except Exception as e:
-            logging.error(f"检测流动性异常时出错 {futures_code}: {e}")
+            return float(value or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _add_rule_alert(self, futures_code: str, rule: AlertRule, value: float, data: Dict[str, Any]):
+        """按触发的规则生成提示"""
+        alert_type = IndexFuturesAlertType(rule.alert_type)
+        current_price = data.get('lastPrice', data.get('close', 0))
+
+        if alert_type == IndexFuturesAlertType.PRICE_SURGE:
+            message = f"{futures_code} 价格异动！价格变化 {value:.2%}"
+            alert_data = {'price_change': value, 'current_price': current_price}
+        elif alert_type == IndexFuturesAlertType.VOLUME_SURGE:
+            message = f"{futures_code} 成交量异动！成交量放大 {value:.1f}倍"
+            alert_data = {'volume_ratio': value, 'current_volume': data.get('volume', 0)}
+        elif alert_type == IndexFuturesAlertType.BREAKOUT:
+            message = f"{futures_code} 突破新高！当前价格 {current_price}"
+            alert_data = {'current_price': current_price, 'breakout_pct': value}
+        elif alert_type == IndexFuturesAlertType.REVERSAL:
+            message = f"{futures_code} 价格反转！盘中最大涨跌幅 {value:.2%}"
+            alert_data = {'reversal_pct': value, 'current_price': current_price}
+        elif alert_type == IndexFuturesAlertType.HIGH_VOLATILITY:
+            message = f"{futures_code} 高波动！平均波动率 {value:.2%}"
+            alert_data = {'avg_volatility': value}
+        elif alert_type == IndexFuturesAlertType.LIQUIDITY_CRISIS:
+            message = f"{futures_code} 流动性危机！平均成交量 {value:.0f}"
+            alert_data = {'avg_volume': value}
+        else:
+            message = f"{futures_code} {rule.alert_type}！{rule.metric} {value:.4g}"
+            alert_data = {rule.metric: value, 'current_price': current_price}
+
+        self._add_alert(IndexFuturesAlert(futures_code=futures_code, alert_type=alert_type,
+                                          level=IndexFuturesAlertLevel(rule.level), message=message,
+                                          data=alert_data, timestamp=self._now()))
+
+    def _now(self) -> datetime:
+        """检测器时钟的当前时间"""
+        return datetime.fromtimestamp(self.clock())
+
+    def get_rules(self) -> List[Dict[str, Any]]:
+        """当前生效的检测规则"""
+        return [rule.to_dict() for rule in self.rule_engine.rules]
+
+    def set_threshold(self, name: str, threshold: float, cooldown: Optional[float] = None):
+        """运行中调整规则阈值（和冷却时间），下一个检测周期生效"""
+        self.rule_engine.set_threshold(name, threshold, cooldown)
+        logging.info(f"股指期货异常检测规则 {name} 阈值调整为 {threshold}")
+
+    def add_rule(self, rule: Union[AlertRule, Dict[str, Any]]):
+        """增加检测规则，提示类型和级别必须是 IndexFuturesAlertType / IndexFuturesAlertLevel 的取值"""
+        rule = rule if isinstance(rule, AlertRule) else AlertRule.from_dict(rule)
+        IndexFuturesAlertType(rule.alert_type)
+        IndexFuturesAlertLevel(rule.level)
+        self.rule_engine.add_rule(rule)
 
     def _add_alert(self, alert: IndexFuturesAlert):
         """添加异常提示"""
-        self.alert_history.append(alert)
-        if len(self.alert_history) > self.max_history:
-            self.alert_history.pop(0)
+        self.alert_store.add(alert)
 
-        # 缓存到Redis
+        # 写入Redis当天的提示日志，其他进程按时间范围查询或用消费组增量读取
         try:
             if self.cache_manager:
-                alert_data = [alert.to_dict()]
-                self.cache_manager.cache_filter_result(
-                    {'type': 'index_futures_alerts', 'timestamp': datetime.now().isoformat()},
-                    alert_data,
-                    300  # 5分钟过期
-                )
+                self.cache_manager.append_alert(alert.to_dict(), "futures")
         except Exception as e:
-            logging.error(f"缓存股指期货异常提示失败: {e}")
+            logging.error(f"写入股指期货异常提示日志失败: {e}")
+
+    @property
+    def alert_history(self) -> List[IndexFuturesAlert]:
+        """提示历史记录，按时间正序"""
+        return list(self.alert_store)
 
     def get_recent_alerts(self, minutes: int = 30) -> List[IndexFuturesAlert]:
         """获取最近的异常提示"""
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        return [alert for alert in self.alert_history if alert.timestamp >= cutoff_time]
+        return self.alert_store.recent(minutes)
 
     def get_alerts_by_type(self, alert_type: IndexFuturesAlertType, minutes: int = 30) -> List[IndexFuturesAlert]:
         """获取指定类型的最近提示"""
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        return [alert for alert in self.alert_history
-                if alert.alert_type == alert_type and alert.timestamp >= cutoff_time]
+        return self.alert_store.by_type(alert_type, minutes)
 
     def get_alerts_by_futures(self, futures_code: str, minutes: int = 30) -> List[IndexFuturesAlert]:
         """获取指定股指期货的最近提示"""
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        return [alert for alert in self.alert_history
-                if alert.futures_code == futures_code and alert.timestamp >= cutoff_time]
+        return self.alert_store.by_code(futures_code, minutes)
+
+    def get_alerts_by_level(self, level: IndexFuturesAlertLevel, minutes: int = 30) -> List[IndexFuturesAlert]:
+        """获取指定级别的最近提示"""
+        return self.alert_store.by_level(level, minutes)
 
     def clear_old_alerts(self, hours: int = 24):
         """清理旧提示"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        self.alert_history = [alert for alert in self.alert_history if alert.timestamp >= cutoff_time]
+        self.alert_store.clear_before(self._now() - timedelta(hours=hours))
 
         # 清理已检测的异常标识
         self.detected_alerts.clear()
 
     def get_alert_stats(self) -> Dict[str, Any]:
         """获取提示统计信息"""
-        now = datetime.now()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        today_alerts = [alert for alert in self.alert_history if alert.timestamp >= today_start]
-
-        stats = {
-            'total_alerts': len(self.alert_history),
-            'today_alerts': len(today_alerts),
-            'by_type': {},
-            'by_level': {}
-        }
-
-        # 按类型统计
-        for alert_type in IndexFuturesAlertType:
-            count = len([a for a in today_alerts if a.alert_type == alert_type])
-            if count > 0:
-                stats['by_type'][alert_type.value] = count
-
-        # 按级别统计
-        for level in IndexFuturesAlertLevel:
-            count = len([a for a in today_alerts if a.level == level])
-            if count > 0:
-                stats['by_level'][level.value] = count
-
-        return stats
+        return self.alert_store.stats()
 
     def stop(self):
         """停止检测器"""
-        self.running = False
-        if hasattr(self, 'detection_thread'):
-            self.detection_thread.join(timeout=5)
+        if self.scheduler:
+            self.scheduler.unregister(self)
 
 
 # 全局检测器实例
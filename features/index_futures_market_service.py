@@ -9,7 +9,7 @@ import pandas as pd
 
 import environment
 from mini_stock.redis_cache_manager import init_cache_manager
-from mini_stock.stock_data_model import StockDataFactory
+from mini_stock.tick_batch import TickBatch
 # 使用导入工具设置项目路径
 from utils.import_utils import setup_project_path
 setup_project_path()
@@ -17,6 +17,7 @@ setup_project_path()
 from app import UPLOAD_FOLDER, allowed_file
 from xtquant import xtdata
 from mini_stock.futures_instrument_model import FuturesInstrumentModel
+from mini_stock.instrument_registry import get_instrument_registry
 from mini_stock.utils.trading_time_utils import TradingTimeUtils
 from date_utils import DateUtils
 from mini_stock.utils.stock_price_utils import StockPriceUtils
@@ -35,6 +36,8 @@ class IndexFuturesMarketService:
         self.report_date = report_date if report_date else datetime.now()
         self.sector_name = sector_name
         self.futures_list = self.load_futures_list()
+        # 合约代码到模型的映射，期货列表变化时重建，不在每次更新行情时重建
+        self.futures_models = FuturesDataEnhancer._build_code_to_model_map(self.futures_list)
 
         # 初始化Redis缓存管理器
         self.cache_manager = init_cache_manager(
@@ -55,14 +58,15 @@ class IndexFuturesMarketService:
         self.update_thread.start()
 
     def load_futures_list(self):
-        """只获取期货合约详细信息列表，不包含期权且只保留正在交易且主力合约(MainContract=1或2)"""
+        """只获取期货合约详细信息列表，不包含期权且只保留正在交易且主力合约(MainContract=1或2)，合约信息从注册表读取"""
         try:
-            codes = xtdata.get_stock_list_in_sector(self.sector_name)
+            registry = get_instrument_registry()
+            codes = registry.codes(sector=self.sector_name, kind='futures')
             # 只保留不包含 '-C-' 和 '-P-' 的合约（即期货）
             filtered = [c for c in codes if '-C-' not in c and '-P-' not in c]
             result = []
             for code in filtered:
-                info = xtdata.get_instrument_detail(code)
+                info = registry.get(code)
                 if info:
                     model = FuturesInstrumentModel(**info)
                     if getattr(model, 'IsTrading', True) and getattr(model, 'MainContract', 0) in (1, 2, 3):
@@ -97,44 +101,30 @@ class IndexFuturesMarketService:
 
         while self.running:
             try:
-                code_list = []
-                for model in self.futures_list:
-                    if isinstance(model, FuturesInstrumentModel):
-                        instrument_id = getattr(model, 'InstrumentID', None)
-                        if instrument_id:
-                            code_list.append(instrument_id + ".IF")
+                futures_models = self.futures_models
+                code_list = [instrument_id + ".IF" for instrument_id in futures_models]
                 if not code_list:
                     time.sleep(10)
                     continue
                 kline_data = TradingTimeUtils.get_latest_trading_data(code_list, DateUtils.now())
                 
                 # 使用数据增强器为行情数据添加 feature 字段
-                enhanced_kline_data = FuturesDataEnhancer.enhance_kline_data(kline_data, self.futures_list)
+                enhanced_kline_data = FuturesDataEnhancer.enhance_kline_data(kline_data, futures_models)
                 
                 with self.data_lock:
                     self.last_data = enhanced_kline_data
 
                 # 缓存数据到Redis
                 if self.cache_manager and kline_data and TradingTimeUtils.is_trading_time():
-                    # 使用StockDataFactory转换数据格式
+                    # 按列转换数据格式
                     try:
                         if not self.cache_manager.get_preclose_data():
                             self.preclose_dict = self.get_all_preclose()
                             # 使用专门的方法缓存前收盘价
                             self.cache_preclose_if_needed()
 
-                        # 将原始数据转换为StockTickData实例
-                        stock_data_dict = StockDataFactory.create_batch_from_xtquant_data(kline_data)
-
-                        # 批量缓存到Redis - 修复类型问题
-                        # 直接转换为字典格式，避免类型不匹配
-                        cache_data = {}
-                        for code, stock_data in stock_data_dict.items():
-                            if hasattr(stock_data, 'to_dict'):
-                                cache_data[code] = stock_data.to_dict()
-                            else:
-                                cache_data[code] = stock_data
-                        self.cache_manager.cache_stocks_batch(cache_data)
+                        # 按列组装成TickBatch后批量缓存，不为每个合约构造StockTickData
+                        self.cache_manager.cache_tick_batch(TickBatch.from_xtquant(kline_data))
                     except Exception as e:
                         logging.error(f"转换和缓存期货数据失败: {e}")
 
@@ -202,6 +192,7 @@ class IndexFuturesMarketService:
                 raise ValueError("文件中没有有效的期货代码")
             with self.data_lock:
                 self.futures_list = codes
+                self.futures_models = FuturesDataEnhancer._build_code_to_model_map(codes)
             logging.info(f"成功从文件更新期货列表，共{len(codes)}个期货")
             return True, f"成功更新期货列表，共{len(codes)}个期货"
         except Exception as e:
@@ -210,9 +201,9 @@ class IndexFuturesMarketService:
             return False, error_msg
     
     def get_futures_info(self, futures_code):
-        """获取期货详细信息（xtdata）"""
+        """获取期货详细信息（合约信息注册表）"""
         try:
-            info = xtdata.get_instrument_detail(futures_code)
+            info = get_instrument_registry().get(futures_code)
             if not info:
                 return {"code": futures_code, "error": "未找到合约信息"}
             return info
@@ -263,6 +254,43 @@ class IndexFuturesMarketService:
             logging.error(f"获取指定类型股指期货异常提示失败: {e}")
             return []
 
+    def get_futures_alerts_by_code(self, futures_code: str, minutes: int = 30):
+        """获取指定合约的股指期货异常提示"""
+        try:
+            if self.alert_detector:
+                alerts = self.alert_detector.get_alerts_by_futures(futures_code, minutes)
+                return [alert.to_dict() for alert in alerts]
+            return []
+        except Exception as e:
+            logging.error(f"获取指定合约股指期货异常提示失败: {e}")
+            return []
+
+    def get_futures_alert_history(self, start=None, end=None, day: str = None):
+        """从Redis提示日志按时间范围读取某天的股指期货异常提示"""
+        if not self.cache_manager:
+            return []
+        return self.cache_manager.get_alerts("futures", start, end, day)
+
+    def get_futures_alert_rules(self):
+        """获取股指期货异常检测规则"""
+        return self.alert_detector.get_rules() if self.alert_detector else []
+
+    def update_futures_alert_rules(self, updates: dict):
+        """
+        运行中调整股指期货异常检测规则的阈值
+
+        Args:
+            updates: {规则名: 阈值} 或 {规则名: {"threshold": 阈值, "cooldown": 冷却秒数}}，规则名不存在时抛出ValueError
+        """
+        if not self.alert_detector:
+            return []
+        for name, value in updates.items():
+            if isinstance(value, dict):
+                self.alert_detector.set_threshold(name, value['threshold'], value.get('cooldown'))
+            else:
+                self.alert_detector.set_threshold(name, value)
+        return self.alert_detector.get_rules()
+
     def get_futures_alert_stats(self):
         """获取股指期货异常提示统计信息"""
         try:
@@ -8,6 +8,8 @@ import logging
 
 from data_frame_helper import DataFrameHelper
 from database_helper import DatabaseHelper
+from feature_store import get_feature_store
+from pinbar_scanner import PinbarScanner
 from pinbar_strategy import PinbarStrategy
 from power_wave_strategy_backup import PowerWaveStrategy
 from utils import IntervalUtils
@@ -37,10 +39,21 @@ class FeatureProcessCenter:
         return df
 
     @staticmethod
-    def resample_data_with(product_type, interval='1min'):
+    def resample_data_with(product_type, interval='1min', persist_features=False):
         """
         根据 interval 返回重采样后的数据，日线直接返回，无需重采样
+        新重采样出的 K 线增量写入特征库，策略直接读取 ATR / 关键位
+        :param persist_features: 是否把新收盘 K 线的特征写入 bar_feature 表，只有实盘轮询需要，
+                                 回测和多进程统计不要打开，避免多个进程同时写同一个 SQLite 文件
         """
+        df = FeatureProcessCenter.read_resampled_data(product_type, interval=interval)
+        if df is not None:
+            get_feature_store().update(df, persist=persist_features)
+        return df
+
+    @staticmethod
+    def read_resampled_data(product_type, interval='1min'):
+        """只读取并重采样，不更新特征库，供只需要 K 线的离线统计使用"""
         df = FeatureProcessCenter.read_feature_data(product_type, interval=interval)
         if df is None or df.empty:
             return None
@@ -100,6 +113,17 @@ class FeatureProcessCenter:
                             interval=m_interval)
         cerebro.run()
 
+    @staticmethod
+    def run_pinbar_scanner_with_resampled_data(dfs):
+        """
+        一次性扫描多个品种/周期的最新 K 线，替代逐个 DataFrame 调用 run_pinbar_strategy_with_resampled_data
+        :param dfs: resample_data_with 返回的 DataFrame 列表
+        """
+        if not dfs:
+            logging.error("DataFrame list is empty")
+            return None
+        return PinbarScanner().scan_and_store(dfs)
+
     @staticmethod
     def run_power_wave_strategy_with_resampled_data(df):
         if df is None or df.empty:
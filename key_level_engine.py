@@ -0,0 +1,142 @@
+import logging
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class KeyLevelEngine:
+    """
+    多周期关键位引擎
+
+    与 KeyLevelHelper.identify_key_levels_without_noise 的规则一致：在最近 lookback-2 根 K 线（不含最新一根）中，
+    按 lookback 大小剔除 1~3 个最高/最低价作为噪音，剩下的最高价和最低价即为关键位。
+    这里用 np.partition 取前几个顺序统计量，一次调用算完所有配置的 lookback；
+    关键位只依赖已经收盘的 K 线，所以按 (品种, 周期) 缓存到最新一根 K 线变化为止。
+    """
+
+    default_lookbacks = (22, 64, 126)
+    # 最多剔除 3 个噪音，需要前 4 个顺序统计量
+    max_rank = 3
+    rolling_chunk_size = 20000
+
+    def __init__(self, lookbacks=default_lookbacks):
+        self.lookbacks = tuple(lookbacks)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def noise_rank(real_lookback):
+        """剔除噪音后取第几个极值（0 开始），对应原实现中 lookback < 23 / < 65 / 其他 三档"""
+        return np.where(real_lookback < 23, 1, np.where(real_lookback < 65, 2, 3))
+
+    @staticmethod
+    def last_bar_levels(highs, lows, lengths, lookbacks=default_lookbacks):
+        """
+        计算每行最新一根 K 线在各个 lookback 下的关键位
+        :param highs: 右对齐的二维数组（行：品种/周期），宽度至少为最大 lookback，左侧不足部分为 NaN
+        :param lengths: 每行的有效 K 线数量
+        :return: {lookback: (关键高位, 关键低位, 实际 lookback)}
+        """
+        highs = np.atleast_2d(highs)
+        lows = np.atleast_2d(lows)
+        lengths = np.atleast_1d(lengths)
+        width = highs.shape[1]
+        rows = np.arange(highs.shape[0])
+
+        levels = {}
+        for lookback in lookbacks:
+            real_lookback = np.minimum(lookback, lengths)
+            window = lookback - 2
+            prev_highs = highs[:, width - 1 - window:width - 1]
+            prev_lows = lows[:, width - 1 - window:width - 1]
+
+            # 实际 lookback 更短的行，把超出范围的 K 线屏蔽掉
+            ago = np.arange(window, 0, -1)
+            outside = ago[None, :] > (real_lookback - 2)[:, None]
+            neg_highs = np.where(outside, np.inf, -prev_highs)
+            masked_lows = np.where(outside, np.inf, prev_lows)
+
+            kth = np.arange(min(KeyLevelEngine.max_rank + 1, window))
+            top_highs = -np.partition(neg_highs, kth, axis=1)[:, kth]
+            bottom_lows = np.partition(masked_lows, kth, axis=1)[:, kth]
+
+            rank = np.minimum(KeyLevelEngine.noise_rank(real_lookback), np.maximum(real_lookback - 3, 0))
+            rank = np.minimum(rank, kth[-1])
+            levels[lookback] = (top_highs[rows, rank], bottom_lows[rows, rank], real_lookback)
+        return levels
+
+    @staticmethod
+    def rolling_levels(highs, lows, lookback):
+        """
+        计算整段历史上每一根 K 线的关键位（滚动顺序统计量）
+        历史不足 lookback 根的 K 线返回 NaN
+        :return: (关键高位数组, 关键低位数组)
+        """
+        highs = np.asarray(highs, dtype=np.float64)
+        lows = np.asarray(lows, dtype=np.float64)
+        length = len(highs)
+        level_highs = np.full(length, np.nan)
+        level_lows = np.full(length, np.nan)
+        window = lookback - 2
+        if length < lookback:
+            return level_highs, level_lows
+
+        rank = int(KeyLevelEngine.noise_rank(lookback))
+        if rank >= window:
+            return level_highs, level_lows
+        # 第 i 个窗口覆盖 [i, i+window)，对应第 i+window 根 K 线，从第 lookback-1 根开始才有完整历史
+        high_windows = sliding_window_view(highs[:-1], window)
+        low_windows = sliding_window_view(lows[:-1], window)
+        for start in range(1, len(high_windows), KeyLevelEngine.rolling_chunk_size):
+            end = min(start + KeyLevelEngine.rolling_chunk_size, len(high_windows))
+            target = slice(start + window, end + window)
+            level_highs[target] = -np.partition(-high_windows[start:end], rank, axis=1)[:, rank]
+            level_lows[target] = np.partition(low_windows[start:end], rank, axis=1)[:, rank]
+        return level_highs, level_lows
+
+    def levels_for(self, product_type, interval, bar_time, highs, lows):
+        """
+        带缓存的关键位查询，同一 (品种, 周期) 在最新 K 线时间不变时直接返回缓存结果
+        :param highs: 一维数组，按时间升序，最后一个元素为最新一根 K 线
+        :return: {lookback: (关键高位, 关键低位, 实际 lookback)}
+        """
+        key = (product_type, interval)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == bar_time:
+                return cached[1]
+
+        highs = np.asarray(highs, dtype=np.float64)
+        lows = np.asarray(lows, dtype=np.float64)
+        width = max(max(self.lookbacks), len(highs))
+        stacked_highs = np.full((1, width), np.nan)
+        stacked_lows = np.full((1, width), np.nan)
+        stacked_highs[0, width - len(highs):] = highs
+        stacked_lows[0, width - len(lows):] = lows
+
+        stacked = self.last_bar_levels(stacked_highs, stacked_lows, np.array([len(highs)]), self.lookbacks)
+        levels = {lookback: (float(high[0]), float(low[0]), int(real[0]))
+                  for lookback, (high, low, real) in stacked.items()}
+        logging.debug(f"{product_type} {interval} {bar_time} 关键位: {levels}")
+
+        with self._lock:
+            self._cache[key] = (bar_time, levels)
+        return levels
+
+    def invalidate(self, product_type=None, interval=None):
+        """清除缓存，不传参数时清除全部"""
+        with self._lock:
+            if product_type is None:
+                self._cache.clear()
+            else:
+                self._cache.pop((product_type, interval), None)
+
+
+# 全局关键位引擎实例
+key_level_engine = KeyLevelEngine()
+
+
+def get_key_level_engine():
+    """获取全局关键位引擎实例"""
+    return key_level_engine
@@ -1,15 +1,18 @@
 import logging
-import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Union
 from enum import Enum
-import json
+
+import numpy as np
 
 from mini_stock.utils.time_utils import TimeUtils
 from mini_stock.redis_cache_manager import get_cache_manager
+from mini_stock.alert_store import AlertStore
+from mini_stock.alert_rules import AlertRule, AlertRuleEngine, default_rules
+from mini_stock.alert_scheduler import get_alert_scheduler
 from mini_stock.utils.trading_time_utils import TradingTimeUtils
-from mini_stock.stock_data_model import StockTickData, StockDataFactory
+from mini_stock.stock_data_model import StockDataFactory
 
 
 class AlertType(Enum):
@@ -56,26 +59,59 @@ class StockAlert:
         }
 
 
+class StockAlertState:
+    """单只股票的增量检测状态，只保存检测需要的汇总值，不保存历史tick"""
+
+    def __init__(self):
+        self.watermark = None  # 已处理的最后一条tick的写入时间戳
+        self.count = 0  # 已处理的tick数
+        self.high_price = 0  # 已处理tick的最高价
+        self.low_price = 0  # 已处理tick的最低价（忽略无效价格）
+        self.prev_high_price = 0  # 最后一条之前的最高价，用于突破检测
+        self.had_limit_up = False  # 是否处于涨停中（等待开板）
+        self.limit_up_time = None  # 本次涨停开始的时间戳
+        self.last_price = 0  # 最后一条tick的价格和成交量
+        self.last_volume = 0
+        self.prev_price = 0  # 倒数第二条tick的价格和成交量
+        self.prev_volume = 0
+
+
 class AlertDetector:
     """异常检测器 - 基于Redis历史数据"""
 
-    def __init__(self):
-        self.cache_manager = get_cache_manager()
-        self.alert_history = []  # 提示历史记录
+    code_type = "stock"
+
+    def __init__(self, cache_manager=None, incremental: bool = True, start_thread: bool = True, scheduler=None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            cache_manager: 缓存管理器，None时使用全局缓存管理器
+            incremental: True 时每只股票保存检测状态，每个周期只处理新写入的tick；False 时每个周期重新扫描当天全部数据
+            start_thread: 是否注册到检测调度器定时检测，回放和测试时手动调用检测
+            scheduler: 检测调度器，None时使用全局调度器
+            clock: 返回当前时间（秒）的函数，用于交易日切换、冷却时间和提示时间，回放时传入虚拟时钟
+        """
+        self.cache_manager = cache_manager or get_cache_manager()
+        self.incremental = incremental
+        self.clock = clock
         self.max_history = 1000  # 最大历史记录数
-        self.detected_alerts = set()  # 已检测的异常，避免重复提示
+        self.alert_store = AlertStore(self.max_history, 'stock_code')  # 提示历史记录，按类型、代码、级别建立索引
+        self.detected_alerts = self.alert_store.dedup  # 已检测的异常，避免重复提示，一天后过期
+
+        # 增量检测状态 {股票代码: StockAlertState}，日期变化时清空
+        self.stock_states = {}
+        self.states_day = None
 
-        # 配置参数
-        self.volume_surge_threshold = 3.0  # 成交量异动阈值（3倍）
-        self.price_surge_threshold = 0.05  # 价格异动阈值（5%）
-        self.breakout_threshold = 0.02  # 突破阈值（2%）
+        # 按最新一条tick检测的规则（涨跌停、异常放量、价格异动、突破，以及配置中开启的可选规则），阈值可以在运行中调整
+        self.rule_engine = AlertRuleEngine(default_rules('stock'))
 
-        # 启动检测线程
-        self.running = True
-        self.detection_thread = threading.Thread(target=self._detection_loop, daemon=True)
-        self.detection_thread.start()
+        # 注册到共享的检测调度器，和股指期货检测器共用一个检测线程和同一份快照
+        self.scheduler = None
+        if start_thread:
+            self.scheduler = scheduler or get_alert_scheduler()
+            self.scheduler.register(self)
 
-        logging.info("异常检测器已启动")
+            logging.info("异常检测器已启动")
 
     def _get_limit_threshold(self, stock_code: str) -> tuple:
         """
@@ -97,23 +133,8 @@ class AlertDetector:
         else:  # 主板（包括000、001、002、600、601、603等）
             return 0.099, -0.099  # 10%
 
-    def _detection_loop(self):
-        """检测循环"""
-        while self.running:
-            try:
-                # 只在交易时间内进行检测
-                if TradingTimeUtils.is_trading_time():
-                    self._detect_all_alerts()
-                    time.sleep(5)  # 交易时间内每5秒检测一次
-                else:
-                    # 非交易时间，减少检测频率
-                    time.sleep(60)  # 非交易时间每60秒检查一次
-            except Exception as e:
-                logging.error(f"异常检测循环出错: {e}")
-                time.sleep(10)
-
     def _detect_all_alerts(self):
-        """检测所有股票的异常情况"""
+        """检测所有股票的异常情况（不经过调度器时手动触发一个检测周期）"""
         try:
             # 再次确认是否在交易时间
             if not TradingTimeUtils.is_trading_time():
@@ -124,33 +145,127 @@ class AlertDetector:
                 logging.warning("缓存管理器不可用，跳过异常检测")
                 return
 
-            # 获取缓存统计，了解有哪些股票
-            stats = self.cache_manager.get_cache_stats()
-            today_stocks = stats.get('today_stocks', 0)
-
-            if today_stocks == 0:
-                return
-
-            # 获取所有股票的最新数据
-            latest_data = self.cache_manager.get_multiple_latest_data([])  # 空列表会返回所有股票
-
-            for stock_code, latest_record in latest_data.items():
-                self._detect_stock_alerts(stock_code, latest_record)
+            stock_codes = self.cache_manager.get_active_codes("stock")
+            if stock_codes:
+                self.on_snapshot(self.cache_manager.get_multiple_latest_data(stock_codes))
 
         except Exception as e:
             logging.error(f"检测所有异常时出错: {e}")
 
+    def on_snapshot(self, latest_data: Dict[str, Dict[str, Any]]):
+        """
+        处理一轮最新数据快照：逐只处理新tick（开板），再用规则引擎一次检测所有股票的最新一条
+
+        Args:
+            latest_data: {股票代码: 最新数据}
+        """
+        # 新的交易日重新开始增量检测
+        today = self._now().strftime('%Y%m%d')
+        if self.states_day != today:
+            self.stock_states.clear()
+            self.rule_engine.reset()
+            self.states_day = today
+
+        rows = []
+        for stock_code, latest_record in latest_data.items():
+            row = self._collect_stock(stock_code, latest_record)
+            if row:
+                rows.append(row)
+        self._evaluate_latest(rows)
+
     def _detect_stock_alerts(self, stock_code: str, latest_record: Dict[str, Any]):
         """检测单只股票的异常情况"""
+        row = self._collect_stock(stock_code, latest_record)
+        if row:
+            self._evaluate_latest([row])
+
+    def _collect_stock(self, stock_code: str, latest_record: Dict[str, Any]) -> Optional[tuple]:
+        """
+        处理单只股票的新tick（检测开板），返回规则引擎检测最新一条需要的数据
+
+        Returns:
+            tuple: (股票代码, 前收盘价, 最新价, 最新成交量, 前一条价格, 前一条成交量, 之前的最高价, 最低价, 最新时间戳)，
+                   数据不足两条或缺少前收盘价时返回None
+        """
+        if self.incremental:
+            return self._detect_stock_alerts_incremental(stock_code, latest_record)
+        return self._detect_stock_alerts_full(stock_code, latest_record)
+
+    def _detect_stock_alerts_incremental(self, stock_code: str, latest_record: Dict[str, Any]) -> Optional[tuple]:
+        """
+        增量检测单只股票：只读取并处理水位之后新写入的tick，与全量扫描产生相同的提示
+        开板状态、最高价和最后两条tick保存在 StockAlertState 里，每个周期的开销与新tick数成正比
+        """
         try:
-            # 检查缓存管理器是否可用
             if not self.cache_manager:
                 return
 
+            # 无法获取前收盘价时跳过，不推进水位，拿到前收盘价后再处理这些tick
+            preclose = self.cache_manager.get_stock_preclose(stock_code)
+            if preclose <= 0:
+                logging.info(f"无法获取 {stock_code} 的前收盘价，跳过检测")
+                return
+
+            state = self.stock_states.get(stock_code)
+            if state is None:
+                state = self.stock_states[stock_code] = StockAlertState()
+            limit_up_threshold, _ = self._get_limit_threshold(stock_code)
+
+            # 最新数据就是已处理的最后一条时不需要读取历史
+            if state.watermark is None or str(latest_record.get('timestamp', '')) > state.watermark:
+                for record in self.cache_manager.get_stock_data_since(stock_code, state.watermark):
+                    self._consume_tick(stock_code, state, record, preclose, limit_up_threshold)
+
+            if state.count >= 2:
+                return (stock_code, preclose, state.last_price, state.last_volume, state.prev_price,
+                        state.prev_volume, state.prev_high_price, state.low_price, state.watermark)
+
+        except Exception as e:
+            logging.error(f"检测股票 {stock_code} 异常时出错: {e}")
+        return None
+
+    def _consume_tick(self, stock_code: str, state: StockAlertState, record: Dict[str, Any], preclose: float,
+                      limit_up_threshold: float):
+        """把一条新tick并入检测状态，涨停后回落到涨停价以下时提示开板"""
+        current_price, current_volume = self._extract_price_volume(stock_code, record)
+        state.watermark = str(record.get('timestamp', ''))
+        state.count += 1
+        state.prev_high_price = state.high_price
+        state.high_price = max(state.high_price, current_price)
+        if current_price > 0:
+            state.low_price = min(state.low_price, current_price) if state.low_price else current_price
+        state.prev_price, state.prev_volume = state.last_price, state.last_volume
+        state.last_price, state.last_volume = current_price, current_volume
+
+        if current_price <= 0:
+            return
+        change_pct = (current_price - preclose) / preclose
+        if change_pct >= limit_up_threshold:
+            if not state.had_limit_up:
+                state.had_limit_up = True
+                state.limit_up_time = record.get('timestamp')
+        elif state.had_limit_up:
+            self._alert_open_limit_up(stock_code, record, state.limit_up_time, change_pct, current_price,
+                                      limit_up_threshold)
+            state.had_limit_up = False
+            state.limit_up_time = None
+
+    def _extract_price_volume(self, stock_code: str, record: Dict[str, Any]) -> tuple:
+        """从一条缓存记录中取出价格和成交量，按StockTickData的规则转换（缺失或无法转换时为0），不构造StockTickData"""
+        return (StockDataFactory._safe_convert_to_float(record.get('lastPrice', 0)),
+                StockDataFactory._safe_convert_to_float(record.get('volume', 0)))
+
+    def _detect_stock_alerts_full(self, stock_code: str, latest_record: Dict[str, Any]) -> Optional[tuple]:
+        """全量检测单只股票：读取当天全部数据重新扫描"""
+        try:
+            # 检查缓存管理器是否可用
+            if not self.cache_manager:
+                return None
+
             # 获取该股票当天的所有历史数据
             today_data = self.cache_manager.get_stock_data_today(stock_code)
             if not today_data or len(today_data) < 2:
-                return
+                return None
 
             # 按时间排序
             sorted_data = sorted(today_data, key=lambda x: x.get('timestamp', ''))
@@ -161,19 +276,20 @@ class AlertDetector:
             # 如果无法获取前收盘价，则跳过
             if preclose <= 0:
                 logging.info(f"无法获取 {stock_code} 的前收盘价，跳过检测")
-                return
+                return None
 
-            # 获取该股票的涨跌停阈值
-            limit_up_threshold, limit_down_threshold = self._get_limit_threshold(stock_code)
+            # 获取该股票的涨停阈值
+            limit_up_threshold, _ = self._get_limit_threshold(stock_code)
 
             # 检测开板
             self._detect_open_limit_up(stock_code, sorted_data, preclose, limit_up_threshold)
 
-            # 检测其他异常
-            self._detect_other_alerts(stock_code, sorted_data, preclose, limit_up_threshold, limit_down_threshold)
+            # 最新一条交给规则引擎检测
+            return self._latest_row(stock_code, sorted_data, preclose)
 
         except Exception as e:
             logging.error(f"检测股票 {stock_code} 异常时出错: {e}")
+        return None
 
     def _detect_open_limit_up(self, stock_code: str, sorted_data: List[Dict], preclose: float, limit_up_threshold: float):
         """检测开板"""
@@ -183,22 +299,7 @@ class AlertDetector:
             limit_up_time = None
 
             for record in sorted_data:
-                # 首先尝试使用原有的数据提取逻辑（经过验证的）
-                current_price = 0
-                current_time = ""
-
-                # 尝试使用StockTickData格式
-                try:
-                    stock_data = StockTickData.from_dict(record)
-                    current_price = stock_data.lastPrice
-                    current_time = stock_data.time
-                except Exception as e:
-                    # 如果StockTickData转换失败，使用原始字段
-                    current_price = record.get('lastPrice', record.get('lastClose', 0))
-                    current_time = record.get('time', record.get('timestamp', ''))
-                    logging.info(f"使用原始字段提取数据 {stock_code}: {e}")
-
-
+                current_price, _ = self._extract_price_volume(stock_code, record)
                 if current_price <= 0:
                     continue
 
@@ -211,41 +312,8 @@ class AlertDetector:
                         limit_up_time = record.get('timestamp')
                 # 检查是否开板（之前涨停过，现在不是涨停）
                 elif had_limit_up and change_pct < limit_up_threshold:
-                    # 生成唯一标识，避免重复提示
-                    alert_id = f"{stock_code}_open_limit_up_{limit_up_time}"
-                    if alert_id not in self.detected_alerts:
-                        self.detected_alerts.add(alert_id)
-
-                        # 计算涨停持续时间
-                        if limit_up_time:
-                            try:
-                                limit_up_dt = datetime.fromisoformat(limit_up_time.replace('Z', '+00:00'))
-                                current_dt = datetime.fromisoformat(record.get('timestamp', '').replace('Z', '+00:00'))
-                                duration = (current_dt - limit_up_dt).total_seconds()
-                            except:
-                                duration = 0
-                        else:
-                            duration = 0
-
-                        # 获取涨停幅度描述
-                        limit_pct = limit_up_threshold * 100
-                        alert = StockAlert(
-                            stock_code=stock_code,
-                            alert_type=AlertType.OPEN_LIMIT_UP,
-                            level=AlertLevel.CRITICAL,
-                            message=f"{stock_code} 开板！涨停({limit_pct:.0f}%)持续 {duration:.0f}秒，当前涨幅 {change_pct:.2%}",
-                            data={
-                                'change_pct': change_pct,
-                                'current_price': current_price,
-                                'limit_up_duration': duration,
-                                'limit_up_time': limit_up_time,
-                                'limit_up_threshold': limit_up_threshold
-                            },
-                            timestamp=datetime.now()
-                        )
-
-                        self._add_alert(alert)
-                        logging.warning(f"[ALERT] {alert.message}")
+                    self._alert_open_limit_up(stock_code, record, limit_up_time, change_pct, current_price,
+                                              limit_up_threshold)
 
                     # 重置涨停状态，允许检测下一次开板
                     had_limit_up = False
@@ -254,249 +322,181 @@ class AlertDetector:
         except Exception as e:
             logging.error(f"检测开板时出错 {stock_code}: {e}")
 
-    def _detect_other_alerts(self, stock_code: str, sorted_data: List[Dict], preclose: float, 
-                           limit_up_threshold: float, limit_down_threshold: float):
-        """检测其他异常情况"""
-        try:
-            if len(sorted_data) < 2:
-                return
-
-            latest_record = sorted_data[-1]
-
-            # 尝试使用StockTickData格式
+    def _alert_open_limit_up(self, stock_code: str, record: Dict[str, Any], limit_up_time: Optional[str],
+                             change_pct: float, current_price: float, limit_up_threshold: float):
+        """生成开板提示，同一次涨停只提示一次"""
+        # 生成唯一标识，避免重复提示
+        alert_id = f"{stock_code}_open_limit_up_{limit_up_time}"
+        if alert_id in self.detected_alerts:
+            return
+        self.detected_alerts.add(alert_id)
+
+        # 计算涨停持续时间
+        if limit_up_time:
             try:
-                stock_data = StockTickData.from_dict(latest_record)
-                current_price = stock_data.lastPrice
-                current_volume = stock_data.volume
-            except Exception as e:
-                # 如果StockTickData转换失败，使用原始字段
-                current_price = latest_record.get('lastPrice',
-                                                  latest_record.get('close', latest_record.get('price', 0)))
-                current_volume = latest_record.get('volume', 0)
-                logging.debug(f"使用原始字段提取数据 {stock_code}: {e}")
-
-
-            if current_price <= 0:
-                return
-
-            change_pct = (current_price - preclose) / preclose
-
-            # 检测涨停
-            if change_pct >= limit_up_threshold:
-                alert_id = f"{stock_code}_limit_up"
-                if alert_id not in self.detected_alerts:
-                    self.detected_alerts.add(alert_id)
-                    limit_pct = limit_up_threshold * 100
-                    alert = StockAlert(
-                        stock_code=stock_code,
-                        alert_type=AlertType.LIMIT_UP,
-                        level=AlertLevel.HIGH,
-                        message=f"{stock_code} 涨停({limit_pct:.0f}%)！涨幅 {change_pct:.2%}",
-                        data={
-                            'change_pct': change_pct,
-                            'current_price': current_price,
-                            'preclose': preclose,
-                            'limit_up_threshold': limit_up_threshold
-                        },
-                        timestamp=datetime.now()
-                    )
-                    self._add_alert(alert)
-
-            # 检测跌停
-            if change_pct <= limit_down_threshold:
-                alert_id = f"{stock_code}_limit_down"
-                if alert_id not in self.detected_alerts:
-                    self.detected_alerts.add(alert_id)
-                    limit_pct = abs(limit_down_threshold) * 100
-                    alert = StockAlert(
-                        stock_code=stock_code,
-                        alert_type=AlertType.LIMIT_DOWN,
-                        level=AlertLevel.HIGH,
-                        message=f"{stock_code} 跌停({limit_pct:.0f}%)！跌幅 {change_pct:.2%}",
-                        data={
-                            'change_pct': change_pct,
-                            'current_price': current_price,
-                            'preclose': preclose,
-                            'limit_down_threshold': limit_down_threshold
-                        },
-                        timestamp=datetime.now()
-                    )
-                    self._add_alert(alert)
-
-            # 检测异常放量（需要至少两条记录）
-            if len(sorted_data) >= 2:
-                prev_record = sorted_data[-2]
-                
-                # 提取前一条记录的成交量
-                try:
-                    prev_stock_data = StockTickData.from_dict(prev_record)
-                    prev_volume = prev_stock_data.volume
-                except Exception as e:
-                    prev_volume = prev_record.get('volume', 0)
-                    logging.debug(f"使用原始字段提取前一条记录数据 {stock_code}: {e}")
-
-
-                if prev_volume > 0 and current_volume > 0:
-                    volume_ratio = current_volume / prev_volume
-                    if volume_ratio >= self.volume_surge_threshold:
-                        alert_id = f"{stock_code}_volume_surge_{latest_record.get('timestamp', '')}"
-                        if alert_id not in self.detected_alerts:
-                            self.detected_alerts.add(alert_id)
-                            alert = StockAlert(
-                                stock_code=stock_code,
-                                alert_type=AlertType.HIGH_VOLUME,
-                                level=AlertLevel.MEDIUM,
-                                message=f"{stock_code} 异常放量！成交量放大 {volume_ratio:.1f}倍",
-                                data={
-                                    'volume_ratio': volume_ratio,
-                                    'current_volume': current_volume,
-                                    'prev_volume': prev_volume
-                                },
-                                timestamp=datetime.now()
-                            )
-                            self._add_alert(alert)
-
-            # 检测价格异动
-            if len(sorted_data) >= 2:
-                prev_record = sorted_data[-2]
-
-                try:
-                    prev_stock_data = StockTickData.from_dict(prev_record)
-                    prev_price = prev_stock_data.lastPrice
-                except Exception as e:
-                    prev_price = prev_record.get('lastPrice', prev_record.get('close', prev_record.get('price', 0)))
-                    logging.debug(f"使用原始字段提取前一条记录价格 {stock_code}: {e}")
-
-
-                if prev_price > 0:
-                    price_change = abs(current_price - prev_price) / prev_price
-                    if price_change >= self.price_surge_threshold:
-                        alert_id = f"{stock_code}_price_surge_{latest_record.get('timestamp', '')}"
-                        if alert_id not in self.detected_alerts:
-                            self.detected_alerts.add(alert_id)
-                            alert = StockAlert(
-                                stock_code=stock_code,
-                                alert_type=AlertType.PRICE_SURGE,
-                                level=AlertLevel.MEDIUM,
-                                message=f"{stock_code} 价格异动！价格变化 {price_change:.2%}",
-                                data={
-                                    'price_change': price_change,
-                                    'current_price': current_price,
-                                    'prev_price': prev_price
-                                },
-                                timestamp=datetime.now()
-                            )
-                            self._add_alert(alert)
-
-            # 检测突破（当日新高）
-            high_prices = []
-            for r in sorted_data[:-1]:
-                try:
-                    stock_data = StockTickData.from_dict(r)
-                    high_prices.append(stock_data.lastPrice)
-                except Exception as e:
-                    high_prices.append(r.get('lastPrice', r.get('close', r.get('price', 0))))
-                    logging.debug(f"使用原始字段提取历史价格 {stock_code}: {e}")
-
-            
-            high_price = max(high_prices, default=0)
-            if high_price > 0 and current_price > high_price * (1 + self.breakout_threshold):
-                alert_id = f"{stock_code}_breakout_{latest_record.get('timestamp', '')}"
+                limit_up_dt = datetime.fromisoformat(limit_up_time.replace('Z', '+00:00'))
+                current_dt = datetime.fromisoformat(record.get('timestamp', '').replace('Z', '+00:00'))
+                duration = (current_dt - limit_up_dt).total_seconds()
+            except:
+                duration = 0
+        else:
+            duration = 0
+
+        # 获取涨停幅度描述
+        limit_pct = limit_up_threshold * 100
+        alert = StockAlert(
+            stock_code=stock_code,
+            alert_type=AlertType.OPEN_LIMIT_UP,
+            level=AlertLevel.CRITICAL,
+            message=f"{stock_code} 开板！涨停({limit_pct:.0f}%)持续 {duration:.0f}秒，当前涨幅 {change_pct:.2%}",
+            data={
+                'change_pct': change_pct,
+                'current_price': current_price,
+                'limit_up_duration': duration,
+                'limit_up_time': limit_up_time,
+                'limit_up_threshold': limit_up_threshold
+            },
+            timestamp=self._now()
+        )
+
+        self._add_alert(alert)
+        logging.warning(f"[ALERT] {alert.message}")
+
+    def _latest_row(self, stock_code: str, sorted_data: List[Dict], preclose: float) -> tuple:
+        """从按时间排序的当天数据取出规则引擎检测最新一条需要的数据"""
+        prices = [self._extract_price_volume(stock_code, record)[0] for record in sorted_data]
+        current_price, current_volume = self._extract_price_volume(stock_code, sorted_data[-1])
+        prev_price, prev_volume = self._extract_price_volume(stock_code, sorted_data[-2])
+        # 当日新高取最新一条之前的最高价
+        high_price = max(prices[:-1], default=0)
+        low_price = min((price for price in prices if price > 0), default=0)
+        return (stock_code, preclose, current_price, current_volume, prev_price, prev_volume, high_price, low_price,
+                sorted_data[-1].get('timestamp', ''))
+
+    def _evaluate_latest(self, rows: List[tuple]):
+        """用规则引擎一次检测多只股票的最新一条tick，同一条tick的同一种提示只提示一次"""
+        if not rows:
+            return
+        try:
+            columns = np.array([row[1:8] for row in rows], dtype=float)
+            preclose, price, volume, prev_price, prev_volume, high, low = columns.T
+            triggered = self.rule_engine.evaluate_frame(
+                [row[0] for row in rows], price, volume, preclose,
+                previous={'price': prev_price, 'volume': prev_volume, 'high': high, 'low': low}, now=self.clock())
+            for index, rule, value in triggered:
+                row = rows[index]
+                alert_id = f"{row[0]}_{rule.name}_{row[8]}"
                 if alert_id not in self.detected_alerts:
                     self.detected_alerts.add(alert_id)
-                    alert = StockAlert(
-                        stock_code=stock_code,
-                        alert_type=AlertType.BREAKOUT,
-                        level=AlertLevel.MEDIUM,
-                        message=f"{stock_code} 突破新高！当前价格 {current_price}",
-                        data={
-                            'current_price': current_price,
-                            'high_price': high_price,
-                            'breakout_pct': (current_price - high_price) / high_price
-                        },
-                        timestamp=datetime.now()
-                    )
-                    self._add_alert(alert)
+                    self._add_rule_alert(rule, value, row)
 
         except Exception as e:
-            logging.error(f"检测其他异常时出错 {stock_code}: {e}")
+            logging.error(f"检测最新数据异常时出错: {e}")
+
+    def _add_rule_alert(self, rule: AlertRule, value: float, row: tuple):
+        """按触发的规则生成提示"""
+        stock_code, preclose, current_price, current_volume, prev_price, prev_volume, high_price, low_price, _ = row
+        alert_type = AlertType(rule.alert_type)
+        change_pct = (current_price - preclose) / preclose
+        limit_up_threshold, limit_down_threshold = self._get_limit_threshold(stock_code)
+
+        if alert_type == AlertType.LIMIT_UP:
+            message = f"{stock_code} 涨停({limit_up_threshold * 100:.0f}%)！涨幅 {change_pct:.2%}"
+            data = {'change_pct': change_pct, 'current_price': current_price, 'preclose': preclose,
+                    'limit_up_threshold': limit_up_threshold}
+        elif alert_type == AlertType.LIMIT_DOWN:
+            message = f"{stock_code} 跌停({abs(limit_down_threshold) * 100:.0f}%)！跌幅 {change_pct:.2%}"
+            data = {'change_pct': change_pct, 'current_price': current_price, 'preclose': preclose,
+                    'limit_down_threshold': limit_down_threshold}
+        elif alert_type in (AlertType.HIGH_VOLUME, AlertType.VOLUME_SURGE):
+            message = f"{stock_code} {rule.alert_type}！成交量放大 {value:.1f}倍"
+            data = {'volume_ratio': value, 'current_volume': current_volume, 'prev_volume': prev_volume}
+        elif alert_type == AlertType.PRICE_SURGE:
+            message = f"{stock_code} 价格异动！价格变化 {value:.2%}"
+            data = {'price_change': value, 'current_price': current_price, 'prev_price': prev_price}
+        elif alert_type == AlertType.BREAKOUT:
+            message = f"{stock_code} 突破新高！当前价格 {current_price}"
+            data = {'current_price': current_price, 'high_price': high_price,
+                    'breakout_pct': (current_price - high_price) / high_price}
+        elif alert_type == AlertType.REVERSAL:
+            message = f"{stock_code} 价格反转！盘中最大涨跌幅 {value:.2%}，当前涨跌幅 {change_pct:.2%}"
+            data = {'reversal_pct': value, 'change_pct': change_pct, 'current_price': current_price,
+                    'high_price': max(high_price, current_price), 'low_price': low_price}
+        else:
+            message = f"{stock_code} {rule.alert_type}！{rule.metric} {value:.4g}"
+            data = {rule.metric: value, 'current_price': current_price}
+
+        level = AlertLevel(rule.level)
+        self._add_alert(StockAlert(stock_code=stock_code, alert_type=alert_type, level=level, message=message,
+                                   data=data, timestamp=self._now()))
+
+    def _now(self) -> datetime:
+        """检测器时钟的当前时间"""
+        return datetime.fromtimestamp(self.clock())
+
+    def get_rules(self) -> List[Dict[str, Any]]:
+        """当前生效的检测规则"""
+        return [rule.to_dict() for rule in self.rule_engine.rules]
+
+    def set_threshold(self, name: str, threshold: float, cooldown: Optional[float] = None):
+        """运行中调整规则阈值（和冷却时间），下一个检测周期生效"""
+        self.rule_engine.set_threshold(name, threshold, cooldown)
+        logging.info(f"异常检测规则 {name} 阈值调整为 {threshold}")
+
+    def add_rule(self, rule: Union[AlertRule, Dict[str, Any]]):
+        """增加检测规则，提示类型和级别必须是 AlertType / AlertLevel 的取值"""
+        rule = rule if isinstance(rule, AlertRule) else AlertRule.from_dict(rule)
+        AlertType(rule.alert_type)
+        AlertLevel(rule.level)
+        self.rule_engine.add_rule(rule)
 
     def _add_alert(self, alert: StockAlert):
         """添加异常提示"""
-        self.alert_history.append(alert)
-        if len(self.alert_history) > self.max_history:
-            self.alert_history.pop(0)
+        self.alert_store.add(alert)
 
-        # 缓存到Redis
+        # 写入Redis当天的提示日志，其他进程按时间范围查询或用消费组增量读取
         try:
             if self.cache_manager:
-                alert_data = [alert.to_dict()]
-                self.cache_manager.cache_filter_result(
-                    {'type': 'alerts', 'timestamp': datetime.now().isoformat()},
-                    alert_data,
-                    300  # 5分钟过期
-                )
+                self.cache_manager.append_alert(alert.to_dict(), "stock")
         except Exception as e:
-            logging.error(f"缓存异常提示失败: {e}")
+            logging.error(f"写入异常提示日志失败: {e}")
+
+    @property
+    def alert_history(self) -> List[StockAlert]:
+        """提示历史记录，按时间正序"""
+        return list(self.alert_store)
 
     def get_recent_alerts(self, minutes: int = 30) -> List[StockAlert]:
         """获取最近的异常提示"""
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        return [alert for alert in self.alert_history if alert.timestamp >= cutoff_time]
+        return self.alert_store.recent(minutes)
 
     def get_alerts_by_type(self, alert_type: AlertType, minutes: int = 30) -> List[StockAlert]:
         """获取指定类型的最近提示"""
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        return [alert for alert in self.alert_history
-                if alert.alert_type == alert_type and alert.timestamp >= cutoff_time]
+        return self.alert_store.by_type(alert_type, minutes)
 
     def get_alerts_by_stock(self, stock_code: str, minutes: int = 30) -> List[StockAlert]:
         """获取指定股票的最近提示"""
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        return [alert for alert in self.alert_history
-                if alert.stock_code == stock_code and alert.timestamp >= cutoff_time]
+        return self.alert_store.by_code(stock_code, minutes)
+
+    def get_alerts_by_level(self, level: AlertLevel, minutes: int = 30) -> List[StockAlert]:
+        """获取指定级别的最近提示"""
+        return self.alert_store.by_level(level, minutes)
 
     def clear_old_alerts(self, hours: int = 24):
         """清理旧提示"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        self.alert_history = [alert for alert in self.alert_history if alert.timestamp >= cutoff_time]
+        self.alert_store.clear_before(self._now() - timedelta(hours=hours))
 
         # 清理已检测的异常标识
         self.detected_alerts.clear()
 
     def get_alert_stats(self) -> Dict[str, Any]:
         """获取提示统计信息"""
-        now = datetime.now()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        today_alerts = [alert for alert in self.alert_history if alert.timestamp >= today_start]
-
-        stats = {
-            'total_alerts': len(self.alert_history),
-            'today_alerts': len(today_alerts),
-            'by_type': {},
-            'by_level': {}
-        }
-
-        # 按类型统计
-        for alert_type in AlertType:
-            count = len([a for a in today_alerts if a.alert_type == alert_type])
-            if count > 0:
-                stats['by_type'][alert_type.value] = count
-
-        # 按级别统计
-        for level in AlertLevel:
-            count = len([a for a in today_alerts if a.level == level])
-            if count > 0:
-                stats['by_level'][level.value] = count
-
-        return stats
+        return self.alert_store.stats()
 
     def stop(self):
         """停止检测器"""
-        self.running = False
-        if hasattr(self, 'detection_thread'):
-            self.detection_thread.join(timeout=5)
+        if self.scheduler:
+            self.scheduler.unregister(self)
 
 
 # 全局检测器实例
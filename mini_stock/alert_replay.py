@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异常检测快照录制与离线回放
+AlertSnapshotRecorder 挂在检测调度器上，把每个周期分给检测器的快照按天写入 gzip 压缩的 JSON Lines 文件；
+AlertReplayPlayer 用录制的快照代替Redis、用虚拟时钟代替系统时间，不等待地把一天的快照依次送进检测器；
+sweep_thresholds 在多个进程中并行回放阈值网格，统计每组阈值的提示数和相对默认阈值的提前量。回放不需要Redis和行情连接。
+
+录制文件每行一个JSON对象：
+    {"t": 录制时间, "preclose": {代码: 前收盘价}}                              新出现代码的前收盘价
+    {"t": 录制时间, "full": true, "changed": {代码: 最新数据}, "removed": []}    录制器打开文件后的第一个快照
+    {"t": 录制时间, "changed": {代码: 最新数据}, "removed": [代码]}             与上一个快照相比有变化的代码和消失的代码
+
+回放时当天历史只包含录制到的快照，两个检测周期之间被覆盖的tick看不到（开板检测可能晚一个周期）。
+运行方式（项目根目录）：python -m mini_stock.alert_replay 20250612 --kind stock --grid price_surge=0.03,0.05 volume_surge=2,3
+开启前校准可选规则：python -m mini_stock.alert_replay 20250612 --kind futures --optional liquidity --grid liquidity=500,1000
+"""
+
+import argparse
+import gzip
+import itertools
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from features.index_futures_alert_detector import IndexFuturesAlertDetector
+from mini_stock.alert_detector import AlertDetector
+from mini_stock.alert_rules import default_rules
+from mini_stock.alert_scheduler import AlertScheduler
+from mini_stock.cache_config import get_cache_config
+from mini_stock.redis_cache_manager import get_cache_manager
+from utils.code_type_utils import CodeTypeRecognizer
+
+
+def recording_path(directory: str, day: str) -> str:
+    """某天的录制文件路径，day 格式 YYYYMMDD"""
+    return os.path.join(directory, f"alert_snapshots_{day}.jsonl.gz")
+
+
+class AlertSnapshotRecorder:
+    """
+    异常检测快照录制器，由 AlertScheduler.run_once 在分发快照前调用 record
+
+    Args:
+        directory: 录制文件目录
+        cache_manager: 读取前收盘价的缓存管理器，None时使用全局缓存管理器
+        clock: 返回当前时间（秒）的函数，决定录制时间和文件日期
+        compresslevel: gzip 压缩级别
+    """
+
+    def __init__(self, directory: str = 'alert_recordings', cache_manager=None,
+                 clock: Callable[[], float] = time.time, compresslevel: int = 6):
+        self.directory = directory
+        self.cache_manager = cache_manager
+        self.clock = clock
+        self.compresslevel = compresslevel
+        self._lock = threading.Lock()
+        self._file = None
+        self._day = None
+        self._last = {}  # {代码: 上一个快照的数据}，只写入有变化的代码
+        self._preclose_codes = set()  # 已写入前收盘价的代码
+
+    def record(self, snapshot: Dict[str, Dict[str, Any]]):
+        """写入一个检测周期的快照"""
+        now = self.clock()
+        day = datetime.fromtimestamp(now).strftime('%Y%m%d')
+        with self._lock:
+            full = self._file is None or day != self._day
+            if full:
+                self._open(day)
+
+            # 新出现的代码先写前收盘价，还没有前收盘价的代码下个周期再取
+            cache_manager = self.cache_manager or get_cache_manager()
+            preclose = {}
+            for code in snapshot:
+                if code not in self._preclose_codes and cache_manager:
+                    value = cache_manager.get_stock_preclose(code)
+                    if value > 0:
+                        preclose[code] = value
+            if preclose:
+                self._write({'t': now, 'preclose': preclose})
+                self._preclose_codes.update(preclose)
+
+            entry = {'t': now, 'changed': {code: data for code, data in snapshot.items()
+                                           if full or self._last.get(code) != data},
+                     'removed': [code for code in self._last if code not in snapshot]}
+            if full:
+                entry['full'] = True
+            self._write(entry)
+            # 每个周期刷新到磁盘，进程中断时最多丢失最后一个周期
+            self._file.flush()
+            self._last = dict(snapshot)
+
+    def _open(self, day: str):
+        """切换到某天的录制文件，追加写入时新建一个 gzip 成员"""
+        self._close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = gzip.open(recording_path(self.directory, day), 'at', encoding='utf-8',
+                               compresslevel=self.compresslevel)
+        self._day = day
+        self._last = {}
+        self._preclose_codes = set()
+        logging.info(f"开始录制异常检测快照: {recording_path(self.directory, day)}")
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str))
+        self._file.write('\n')
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """关闭录制文件"""
+        with self._lock:
+            self._close()
+
+
+def load_recording(path: str) -> List[Dict[str, Any]]:
+    """
+    读取录制文件的全部行，文件末尾不完整（录制进程中断）时保留已读取的完整行
+
+    Returns:
+        List[Dict]: 按录制顺序排列的前收盘价行和快照行
+    """
+    entries = []
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.warning(f"录制文件 {path} 末尾不完整，已忽略")
+                    break
+    except (EOFError, gzip.BadGzipFile, zlib.error):
+        logging.warning(f"录制文件 {path} 末尾不完整，已读取 {len(entries)} 行")
+    return entries
+
+
+class VirtualClock:
+    """回放用的虚拟时钟，调用时返回当前回放到的录制时间"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ReplayCacheManager:
+    """
+    用录制的快照代替Redis，提供检测调度器和检测器用到的读取接口
+    当天历史由依次出现的快照数据组成，每个代码最多保留 daily_records_per_stock 条；提示日志写入 alerts
+    """
+
+    def __init__(self, max_records: Optional[int] = None):
+        self.max_records = max_records or get_cache_config().max_cache_size['daily_records_per_stock']
+        self.snapshot = {}
+        self.preclose = {}
+        self.history = {}  # {代码: [数据]}，按出现顺序
+        self._stamps = {}  # {代码: [timestamp]}，与 history 对应，用于按水位查找
+        self.alerts = {"stock": [], "futures": []}
+
+    def apply(self, entry: Dict[str, Any]) -> bool:
+        """
+        应用录制文件的一行
+
+        Returns:
+            bool: 是否是快照行（需要执行一个检测周期）
+        """
+        if 'preclose' in entry:
+            self.preclose.update(entry['preclose'])
+            return False
+        if entry.get('full'):
+            self.snapshot = {}
+        for code in entry.get('removed', ()):
+            self.snapshot.pop(code, None)
+        for code, data in entry['changed'].items():
+            self.snapshot[code] = data
+            records = self.history.setdefault(code, [])
+            stamps = self._stamps.setdefault(code, [])
+            if records and records[-1] == data:
+                continue
+            records.append(data)
+            stamps.append(str(data.get('timestamp', '')))
+            if len(records) > self.max_records * 2:
+                del records[:-self.max_records]
+                del stamps[:-self.max_records]
+        return True
+
+    def get_active_codes(self, code_type: str = "all", day: str = None) -> List[str]:
+        if code_type == "all":
+            return list(self.snapshot)
+        want_futures = code_type == "futures"
+        return [code for code in self.snapshot if CodeTypeRecognizer.is_futures_code(code) == want_futures]
+
+    def get_multiple_latest_data(self, stock_codes: List[str], return_stock_data: bool = False) -> Dict[str, Any]:
+        return {code: self.snapshot[code] for code in stock_codes if code in self.snapshot}
+
+    def get_stock_preclose(self, stock_code: str) -> float:
+        return self.preclose.get(stock_code, 0)
+
+    def get_preclose_data(self, key_prefix="", code_type: str = "stock") -> Dict[str, float]:
+        want_futures = code_type == "futures"
+        return {code: value for code, value in self.preclose.items()
+                if CodeTypeRecognizer.is_futures_code(code) == want_futures}
+
+    def get_stock_data_today(self, stock_code: str, limit: Optional[int] = None,
+                             return_stock_data: bool = False) -> List[Dict[str, Any]]:
+        records = self.history.get(stock_code, [])[-self.max_records:][::-1]
+        return records[:limit] if limit else records
+
+    def get_stock_data_since(self, stock_code: str, watermark: Optional[str] = None) -> List[Dict[str, Any]]:
+        records = self.history.get(stock_code, [])[-self.max_records:]
+        if watermark is None:
+            return list(records)
+        stamps = self._stamps[stock_code][-self.max_records:]
+        return records[bisect_right(stamps, watermark):]
+
+    def append_alert(self, alert_dict: Dict[str, Any], code_type: str = "stock") -> bool:
+        self.alerts[code_type].append(alert_dict)
+        return True
+
+
+def _create_detector(kind: str, cache_manager, clock):
+    if kind == "stock":
+        return AlertDetector(cache_manager=cache_manager, start_thread=False, clock=clock)
+    if kind == "futures":
+        return IndexFuturesAlertDetector(cache_manager=cache_manager, start_thread=False, clock=clock)
+    raise ValueError(f"不支持的检测器类型: {kind}")
+
+
+class AlertReplayPlayer:
+    """
+    异常检测回放器：按录制顺序把快照送进检测调度器，检测器的时钟拨到录制时间，不等待
+
+    Args:
+        entries: load_recording 读取的录制内容
+        kinds: 回放的检测器类型，"stock" 和/或 "futures"
+        optional: 回放时额外开启的可选规则名（alert_rules.OPTIONAL_*_RULES），用于开启前校准阈值
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]], kinds: Iterable[str] = ("stock", "futures"),
+                 optional: Optional[List[str]] = None):
+        self.entries = entries
+        self.kinds = tuple(kinds)
+        self.optional = list(optional or ())
+
+    def play(self, thresholds: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        回放一遍
+
+        Args:
+            thresholds: 覆盖默认阈值 {检测器类型: {规则名: 阈值}}
+
+        Returns:
+            Dict: {检测器类型: [提示字典]}，与写入提示日志的内容相同
+        """
+        clock = VirtualClock()
+        cache_manager = ReplayCacheManager()
+        scheduler = AlertScheduler(cache_manager=cache_manager, start_thread=False)
+        for kind in self.kinds:
+            detector = _create_detector(kind, cache_manager, clock)
+            for rule in default_rules(kind, optional=self.optional):
+                if rule['name'] in self.optional:
+                    detector.add_rule(rule)
+            for name, threshold in (thresholds or {}).get(kind, {}).items():
+                detector.set_threshold(name, threshold)
+            scheduler.register(detector)
+
+        for entry in self.entries:
+            if cache_manager.apply(entry):
+                clock.now = entry['t']
+                scheduler.run_once()
+        return {kind: cache_manager.alerts[kind] for kind in self.kinds}
+
+
+def threshold_grid(grid: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """阈值网格的全部组合，{规则名: [候选阈值]} -> [{规则名: 阈值}]"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def first_alert_times(alerts: List[tuple]) -> Dict[tuple, float]:
+    """每个 (代码, 提示类型) 第一次提示的时间"""
+    first = {}
+    for code, alert_type, moment in alerts:
+        first.setdefault((code, alert_type), moment)
+    return first
+
+
+def summarize_alerts(alerts: List[tuple], baseline: Dict[tuple, float]) -> Dict[str, Any]:
+    """
+    统计一组阈值的回放结果
+
+    提前量：同一代码同一提示类型的第一次提示比默认阈值的第一次提示早的秒数，负数表示更晚；
+    new 为默认阈值没有提示过的 (代码, 类型)，missed 为默认阈值提示过、这组阈值没有提示的 (代码, 类型)
+    """
+    first = first_alert_times(alerts)
+    leads = [baseline[key] - moment for key, moment in first.items() if key in baseline]
+    return {
+        'alerts': len(alerts),
+        'by_type': dict(Counter(alert_type for _, alert_type, _ in alerts)),
+        'codes': len({code for code, _, _ in alerts}),
+        'matched': len(leads),
+        'new': len(first) - len(leads),
+        'missed': len(baseline) - len(leads),
+        'lead_mean': statistics.mean(leads) if leads else 0.0,
+        'lead_median': statistics.median(leads) if leads else 0.0,
+    }
+
+
+# 阈值网格扫描的工作进程各自读取一次录制文件
+_worker_player = None
+_worker_kind = None
+
+
+def _init_worker(path: str, kind: str, optional: List[str]):
+    global _worker_player, _worker_kind
+    logging.getLogger().setLevel(logging.ERROR)
+    _worker_player = AlertReplayPlayer(load_recording(path), kinds=(kind,), optional=optional)
+    _worker_kind = kind
+
+
+def _replay_setting(thresholds: Dict[str, float]) -> List[tuple]:
+    alerts = _worker_player.play({_worker_kind: thresholds})[_worker_kind]
+    code_key = 'stock_code' if _worker_kind == "stock" else 'futures_code'
+    return [(alert[code_key], alert['alert_type'], datetime.fromisoformat(alert['timestamp']).timestamp())
+            for alert in alerts]
+
+
+def sweep_thresholds(path: str, kind: str, grid: Dict[str, List[float]], max_workers: Optional[int] = None,
+                     optional: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    在进程池中并行回放阈值网格，每组阈值与默认阈值的回放结果比较
+
+    Args:
+        path: 录制文件路径
+        kind: 检测器类型，"stock" 或 "futures"
+        grid: {规则名: [候选阈值]}，未列出的规则使用默认阈值
+        max_workers: 进程数，None时使用CPU核数
+        optional: 额外开启的可选规则名，默认阈值的回放同样开启
+
+    Returns:
+        List[Dict]: 每组阈值一项，包含 thresholds 和 summarize_alerts 的统计，顺序与 threshold_grid 相同
+    """
+    settings = threshold_grid(grid)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(path, kind, list(optional or ()))) as executor:
+        results = list(executor.map(_replay_setting, [{}] + settings))
+    baseline = first_alert_times(results[0])
+    return [dict(thresholds=setting, **summarize_alerts(alerts, baseline))
+            for setting, alerts in zip(settings, results[1:])]
+
+
+def _parse_grid(items: List[str]) -> Dict[str, List[float]]:
+    grid = {}
+    for item in items:
+        name, _, values = item.partition('=')
+        if not values:
+            raise ValueError(f"阈值网格格式应为 规则名=阈值1,阈值2: {item}")
+        grid[name] = [float(value) for value in values.split(',')]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线回放异常检测快照，扫描阈值网格")
+    parser.add_argument('day', help="日期 YYYYMMDD")
+    parser.add_argument('--directory', default=get_cache_config().alert_recording['directory'], help="录制文件目录")
+    parser.add_argument('--kind', choices=("stock", "futures"), default="stock", help="检测器类型")
+    parser.add_argument('--grid', nargs='+', default=[], help="阈值网格，如 price_surge=0.03,0.05")
+    parser.add_argument('--optional', nargs='+', default=[], help="额外开启的可选规则，如 reversal liquidity")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认CPU核数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    path = recording_path(args.directory, args.day)
+    if not os.path.exists(path):
+        logging.error(f"录制文件不存在: {path}")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    results = sweep_thresholds(path, args.kind, _parse_grid(args.grid) if args.grid else {}, args.workers,
+                               args.optional)
+    elapsed = time.perf_counter() - start
+    print(f"{'阈值':<40}{'提示数':>8}{'代码数':>8}{'匹配':>8}{'新增':>8}{'漏掉':>8}{'平均提前(秒)':>14}{'中位提前(秒)':>14}")
+    for result in results:
+        setting = ' '.join(f"{name}={value:g}" for name, value in result['thresholds'].items()) or '默认'
+        print(f"{setting:<40}{result['alerts']:>8}{result['codes']:>8}{result['matched']:>8}{result['new']:>8}"
+              f"{result['missed']:>8}{result['lead_mean']:>14.1f}{result['lead_median']:>14.1f}")
+    print(f"回放 {len(results) + 1} 组阈值，耗时 {elapsed:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
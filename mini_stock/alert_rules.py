@@ -0,0 +1,467 @@
+"""
+异常提示规则引擎
+规则用数据声明（指标、比较方式、阈值、回看长度、冷却时间、级别），编译成对整轮快照的数组计算。
+同一轮里多条规则用到的同一个指标只计算一次，增加提示类型不需要再遍历一遍数据；
+阈值、冷却时间在运行中修改后下一轮生效，不需要重启检测器。
+
+回看长度为1时与上一条比较：检测器提供上一条tick时用上一条tick，否则用上一轮快照；
+大于1时使用最近有量价变化的快照组成的窗口。
+"""
+
+import operator
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from mini_stock.cache_config import get_cache_config
+
+LEVEL_MEDIUM = "中"
+LEVEL_HIGH = "高"
+LEVEL_CRITICAL = "紧急"
+
+COMPARATORS = {
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt,
+}
+
+
+class AlertRule:
+    """
+    一条提示规则
+
+    Args:
+        name: 规则名，用于运行中调整阈值
+        alert_type: 提示类型（AlertType / IndexFuturesAlertType 的取值）
+        metric: 指标名，METRICS 之一
+        comparator: 比较方式，COMPARATORS 之一，指标值与阈值比较
+        threshold: 阈值
+        lookback: 回看长度
+        cooldown: 同一代码触发后多少秒内不再触发，0表示不限制
+        level: 提示级别（级别枚举的取值）
+    """
+
+    def __init__(self, name: str, alert_type: str, metric: str, comparator: str, threshold: float,
+                 lookback: int = 1, cooldown: float = 0, level: str = LEVEL_MEDIUM):
+        if metric not in METRICS:
+            raise ValueError(f"不支持的指标: {metric}，可选 {', '.join(METRICS)}")
+        if comparator not in COMPARATORS:
+            raise ValueError(f"不支持的比较方式: {comparator}，可选 {', '.join(COMPARATORS)}")
+        if lookback < 1:
+            raise ValueError(f"回看长度至少为1: {lookback}")
+        self.name = name
+        self.alert_type = alert_type
+        self.metric = metric
+        self.comparator = comparator
+        self.threshold = float(threshold)
+        self.lookback = int(lookback)
+        self.cooldown = float(cooldown)
+        self.level = level
+        self.compare = COMPARATORS[comparator]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AlertRule':
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'alert_type': self.alert_type,
+            'metric': self.metric,
+            'comparator': self.comparator,
+            'threshold': self.threshold,
+            'lookback': self.lookback,
+            'cooldown': self.cooldown,
+            'level': self.level,
+        }
+
+    def window_size(self) -> int:
+        """规则需要的最近快照窗口长度"""
+        if self.metric in ('price_move', 'volume_ratio'):
+            return self.lookback + 1 if self.lookback > 1 else 1
+        if self.metric in ('volatility', 'avg_volume'):
+            return self.lookback
+        return 1
+
+
+# 股票和股指期货的默认规则，阈值与原来检测器里的配置参数一致
+STOCK_RULES = [
+    # 涨跌停：涨跌幅与按板块计算的涨跌停幅度之差，每只股票每天提示一次
+    {'name': 'limit_up', 'alert_type': "涨停", 'metric': 'limit_up_gap', 'comparator': '>=', 'threshold': 0,
+     'cooldown': 86400, 'level': LEVEL_HIGH},
+    {'name': 'limit_down', 'alert_type': "跌停", 'metric': 'limit_down_gap', 'comparator': '<=', 'threshold': 0,
+     'cooldown': 86400, 'level': LEVEL_HIGH},
+    {'name': 'volume_surge', 'alert_type': "异常放量", 'metric': 'volume_ratio', 'comparator': '>=', 'threshold': 3.0},
+    {'name': 'price_surge', 'alert_type': "价格异动", 'metric': 'price_move', 'comparator': '>=', 'threshold': 0.05},
+    {'name': 'breakout', 'alert_type': "突破", 'metric': 'breakout', 'comparator': '>', 'threshold': 0.02},
+]
+FUTURES_RULES = [
+    {'name': 'volume_surge', 'alert_type': "成交量异动", 'metric': 'volume_ratio', 'comparator': '>=', 'threshold': 2.0},
+    {'name': 'price_surge', 'alert_type': "价格异动", 'metric': 'price_move', 'comparator': '>=', 'threshold': 0.02},
+    {'name': 'breakout', 'alert_type': "突破", 'metric': 'breakout', 'comparator': '>', 'threshold': 0.01},
+]
+# 可选规则，默认不开启，在缓存配置 alert_rules.optional 中按规则名开启
+OPTIONAL_STOCK_RULES = [
+    # 盘中最大涨跌幅达到阈值后回到前收盘价另一侧
+    {'name': 'reversal', 'alert_type': "反转", 'metric': 'reversal', 'comparator': '>=', 'threshold': 0.05,
+     'cooldown': 300},
+]
+OPTIONAL_FUTURES_RULES = [
+    {'name': 'reversal', 'alert_type': "反转", 'metric': 'reversal', 'comparator': '>=', 'threshold': 0.02,
+     'cooldown': 300},
+    # 最近10个、5个有量价变化的快照（不是tick）的平均波动和成交量均值，每分钟最多提示一次；
+    # 窗口的间隔取决于检测周期，开启前用 alert_replay 按录制的快照校准阈值
+    {'name': 'volatility', 'alert_type': "高波动", 'metric': 'volatility', 'comparator': '>=', 'threshold': 0.03,
+     'lookback': 10, 'cooldown': 60, 'level': LEVEL_HIGH},
+    {'name': 'liquidity', 'alert_type': "流动性危机", 'metric': 'avg_volume', 'comparator': '<', 'threshold': 1000,
+     'lookback': 5, 'cooldown': 60, 'level': LEVEL_CRITICAL},
+]
+
+
+def default_rules(kind: str, optional: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    检测器使用的规则：默认规则加上开启的可选规则（副本）
+
+    Args:
+        kind: "stock" 或 "futures"
+        optional: 开启的可选规则名，None时读取缓存配置 alert_rules.optional
+    """
+    if kind not in ("stock", "futures"):
+        raise ValueError(f"不支持的品种类型: {kind}")
+    if optional is None:
+        optional = get_cache_config().alert_rules['optional']
+    rules, extra = (STOCK_RULES, OPTIONAL_STOCK_RULES) if kind == "stock" else (FUTURES_RULES, OPTIONAL_FUTURES_RULES)
+    return [dict(rule) for rule in rules] + [dict(rule) for rule in extra if rule['name'] in optional]
+
+
+def limit_thresholds(codes: List[str]) -> tuple:
+    """
+    按代码批量计算涨跌停阈值，规则与 AlertDetector._get_limit_threshold 相同
+
+    Returns:
+        tuple: (涨停阈值数组, 跌停阈值数组)
+    """
+    names = np.asarray(codes, dtype=str)
+    limit_up = np.full(len(names), 0.099)  # 主板 10%
+    growth = np.char.startswith(names, '300') | np.char.startswith(names, '301') | np.char.startswith(names, '688')
+    limit_up[growth] = 0.199  # 创业板、科创板 20%
+    limit_up[np.char.startswith(names, '8')] = 0.299  # 北交所 30%
+    return limit_up, -limit_up
+
+
+def field_array(records: List[Dict[str, Any]], *names: str) -> np.ndarray:
+    """按字段名依次取第一个存在的值组成数组，缺失或无法转换的记为0"""
+    values = np.zeros(len(records))
+    for position, record in enumerate(records):
+        for name in names:
+            value = record.get(name)
+            if value is not None:
+                try:
+                    values[position] = float(value)
+                except (TypeError, ValueError):
+                    pass
+                break
+    return values
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """mask 为 True 的位置计算比值，其余为 NaN（与任何阈值比较都不触发）"""
+    result = np.full(len(numerator), np.nan)
+    np.divide(numerator, denominator, out=result, where=mask)
+    return result
+
+
+class RuleFrame:
+    """一轮检测的输入数组，指标按 (指标名, 回看长度) 计算一次后缓存，供所有规则共用"""
+
+    def __init__(self, price, volume, preclose, prev_price, prev_volume, high, low, limit_up, limit_down,
+                 recent_prices, recent_volumes, changed):
+        self.price = price
+        self.volume = volume
+        self.preclose = preclose
+        self.prev_price = prev_price
+        self.prev_volume = prev_volume
+        self.high = high  # 本条之前的最高价
+        self.low = low
+        self.limit_up = limit_up
+        self.limit_down = limit_down
+        self.recent_prices = recent_prices  # 已追加本轮的最近窗口
+        self.recent_volumes = recent_volumes
+        self.changed = changed  # 本轮量价有变化（进入了窗口）
+        self.valid = price > 0
+        self.has_preclose = self.valid & (preclose > 0)
+        self._metrics = {}
+
+    def metric(self, name: str, lookback: int = 1) -> np.ndarray:
+        key = (name, lookback)
+        if key not in self._metrics:
+            self._metrics[key] = METRICS[name](self, lookback)
+        return self._metrics[key]
+
+    def reference(self, field: str, lookback: int) -> np.ndarray:
+        """回看 lookback 条之前的价格或成交量"""
+        if lookback == 1:
+            return self.prev_price if field == 'price' else self.prev_volume
+        window = self.recent_prices if field == 'price' else self.recent_volumes
+        if lookback >= window.shape[1]:
+            return np.full(len(self.price), np.nan)
+        # 窗口最后一列是本轮，只有本轮进入了窗口的代码才有意义
+        return np.where(self.changed, window[:, -1 - lookback], np.nan)
+
+
+def _metric_change_pct(frame: RuleFrame, lookback: int) -> np.ndarray:
+    return _ratio(frame.price - frame.preclose, frame.preclose, frame.has_preclose)
+
+
+def _metric_limit_up_gap(frame: RuleFrame, lookback: int) -> np.ndarray:
+    return frame.metric('change_pct') - frame.limit_up
+
+
+def _metric_limit_down_gap(frame: RuleFrame, lookback: int) -> np.ndarray:
+    return frame.metric('change_pct') - frame.limit_down
+
+
+def _metric_price_move(frame: RuleFrame, lookback: int) -> np.ndarray:
+    reference = frame.reference('price', lookback)
+    with np.errstate(invalid='ignore'):
+        return _ratio(np.abs(frame.price - reference), reference, frame.valid & (reference > 0))
+
+
+def _metric_volume_ratio(frame: RuleFrame, lookback: int) -> np.ndarray:
+    reference = frame.reference('volume', lookback)
+    with np.errstate(invalid='ignore'):
+        return _ratio(frame.volume, reference, frame.valid & (reference > 0) & (frame.volume > 0))
+
+
+def _metric_breakout(frame: RuleFrame, lookback: int) -> np.ndarray:
+    return _ratio(frame.price - frame.high, frame.high, frame.valid & (frame.high > 0))
+
+
+def _metric_reversal(frame: RuleFrame, lookback: int) -> np.ndarray:
+    """冲高回落到前收盘价以下时为盘中最大涨幅，探底回升到前收盘价以上时为盘中最大跌幅的绝对值"""
+    change_pct = frame.metric('change_pct')
+    day_high = np.maximum(frame.high, frame.price)
+    day_low = np.where(frame.low > 0, np.minimum(frame.low, frame.price), frame.price)
+    high_pct = _ratio(day_high - frame.preclose, frame.preclose, frame.has_preclose)
+    low_pct = _ratio(day_low - frame.preclose, frame.preclose, frame.has_preclose)
+    with np.errstate(invalid='ignore'):
+        fell_back = np.where(change_pct <= 0, high_pct, -np.inf)
+        bounced = np.where(change_pct >= 0, -low_pct, -np.inf)
+    return np.where(frame.has_preclose, np.maximum(fell_back, bounced), np.nan)
+
+
+def _metric_volatility(frame: RuleFrame, lookback: int) -> np.ndarray:
+    """最近 lookback 个价格相邻变化幅度的均值，不足一半价格时为 NaN"""
+    window = frame.recent_prices[:, -lookback:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moves = np.abs(np.diff(window, axis=1)) / window[:, :-1]
+    counted = ~np.isnan(moves)
+    average = np.where(counted.any(axis=1), np.nansum(moves, axis=1) / np.maximum(counted.sum(axis=1), 1), 0)
+    enough = (~np.isnan(window)).sum(axis=1) >= max(2, lookback // 2)
+    return np.where(enough, average, np.nan)
+
+
+def _metric_avg_volume(frame: RuleFrame, lookback: int) -> np.ndarray:
+    """最近 lookback 个成交量的均值，窗口未满时为 NaN"""
+    return frame.recent_volumes[:, -lookback:].mean(axis=1)
+
+
+# 指标名 -> 计算函数(RuleFrame, 回看长度)，返回每个代码的指标值，不适用的位置为 NaN
+METRICS = {
+    'change_pct': _metric_change_pct,  # 相对前收盘价的涨跌幅
+    'limit_up_gap': _metric_limit_up_gap,  # 涨跌幅减涨停幅度
+    'limit_down_gap': _metric_limit_down_gap,  # 涨跌幅减跌停幅度
+    'price_move': _metric_price_move,  # 相对回看价格的变化幅度（绝对值）
+    'volume_ratio': _metric_volume_ratio,  # 相对回看成交量的倍数
+    'breakout': _metric_breakout,  # 超过之前最高价的幅度
+    'reversal': _metric_reversal,  # 反转前的盘中最大涨跌幅
+    'volatility': _metric_volatility,  # 最近价格的平均波动
+    'avg_volume': _metric_avg_volume,  # 最近成交量的均值
+}
+
+
+class AlertRuleEngine:
+    """
+    规则引擎，保存每个代码上一轮的价格、成交量、盘中最高/最低价、最近窗口和每条规则最后触发的时间
+
+    Args:
+        rules: AlertRule 或规则字典的列表
+    """
+
+    def __init__(self, rules: List[Union[AlertRule, Dict[str, Any]]]):
+        self.rules = [rule if isinstance(rule, AlertRule) else AlertRule.from_dict(rule) for rule in rules]
+        self.reset()
+
+    @property
+    def thresholds(self) -> Dict[str, float]:
+        """{规则名: 阈值}"""
+        return {rule.name: rule.threshold for rule in self.rules}
+
+    def get_rule(self, name: str) -> AlertRule:
+        for rule in self.rules:
+            if rule.name == name:
+                return rule
+        raise ValueError(f"规则不存在: {name}，可选 {', '.join(rule.name for rule in self.rules)}")
+
+    def set_threshold(self, name: str, threshold: float, cooldown: Optional[float] = None):
+        """运行中修改规则的阈值（和冷却时间），下一轮检测生效"""
+        rule = self.get_rule(name)
+        rule.threshold = float(threshold)
+        if cooldown is not None:
+            rule.cooldown = float(cooldown)
+
+    def add_rule(self, rule: Union[AlertRule, Dict[str, Any]]):
+        """增加规则，同名规则被替换"""
+        rule = rule if isinstance(rule, AlertRule) else AlertRule.from_dict(rule)
+        self.rules = [one for one in self.rules if one.name != rule.name] + [rule]
+        self._fit_window()
+
+    def remove_rule(self, name: str):
+        self.get_rule(name)
+        self.rules = [rule for rule in self.rules if rule.name != name]
+        self._fired_at.pop(name, None)
+
+    def _window_size(self) -> int:
+        return max((rule.window_size() for rule in self.rules), default=1)
+
+    def _fit_window(self):
+        """新规则需要更长的窗口时在左侧补 NaN"""
+        missing = self._window_size() - self.recent_prices.shape[1]
+        if missing > 0:
+            padding = np.full((len(self.codes), missing), np.nan)
+            self.recent_prices = np.hstack((padding, self.recent_prices))
+            self.recent_volumes = np.hstack((padding, self.recent_volumes))
+
+    def reset(self):
+        """清空所有代码的状态（新的交易日）"""
+        self.codes = []
+        self.index = {}
+        self.prev_price = np.zeros(0)
+        self.prev_volume = np.zeros(0)
+        self.high = np.zeros(0)  # 之前各轮的最高价（不含本轮），用于突破
+        self.low = np.zeros(0)
+        self.limit_up = np.zeros(0)
+        self.limit_down = np.zeros(0)
+        self.recent_prices = np.full((0, self._window_size()), np.nan)
+        self.recent_volumes = np.full((0, self._window_size()), np.nan)
+        self._fired_at = {}  # {规则名: 每个代码最后触发的时间}
+        # 每轮的代码列表通常不变，缓存上一轮的位置数组
+        self._last_codes = None
+        self._last_position = None
+
+    def _register(self, codes: List[str]) -> np.ndarray:
+        """返回代码在状态数组中的位置，新代码追加到数组末尾"""
+        if codes == self._last_codes:
+            return self._last_position
+        new_codes = [code for code in dict.fromkeys(codes) if code not in self.index]
+        if new_codes:
+            for code in new_codes:
+                self.index[code] = len(self.codes)
+                self.codes.append(code)
+            count = len(new_codes)
+            self.prev_price = np.concatenate((self.prev_price, np.zeros(count)))
+            self.prev_volume = np.concatenate((self.prev_volume, np.zeros(count)))
+            self.high = np.concatenate((self.high, np.zeros(count)))
+            self.low = np.concatenate((self.low, np.zeros(count)))
+            limit_up, limit_down = limit_thresholds(new_codes)
+            self.limit_up = np.concatenate((self.limit_up, limit_up))
+            self.limit_down = np.concatenate((self.limit_down, limit_down))
+            width = self.recent_prices.shape[1]
+            self.recent_prices = np.vstack((self.recent_prices, np.full((count, width), np.nan)))
+            self.recent_volumes = np.vstack((self.recent_volumes, np.full((count, width), np.nan)))
+            for name, fired_at in self._fired_at.items():
+                self._fired_at[name] = np.concatenate((fired_at, np.full(count, -np.inf)))
+        self._last_codes = list(codes)
+        self._last_position = np.fromiter((self.index[code] for code in codes), dtype=np.intp, count=len(codes))
+        return self._last_position
+
+    def evaluate_snapshot(self, latest: Dict[str, Dict[str, Any]], preclose: Optional[Dict[str, float]] = None,
+                          now: Optional[float] = None) -> tuple:
+        """
+        检测一轮最新快照
+
+        Args:
+            latest: {代码: 最新数据}，与 get_multiple_latest_data 的返回一致
+            preclose: {代码: 前收盘价}，缺少的代码使用数据里的 lastClose
+
+        Returns:
+            tuple: (代码列表, evaluate_frame 的结果)
+        """
+        codes = list(latest)
+        records = list(latest.values())
+        previous_close = field_array(records, 'lastClose')
+        if preclose:
+            previous_close = np.array([preclose.get(code) or value for code, value in zip(codes, previous_close)],
+                                      dtype=float)
+        return codes, self.evaluate_frame(codes, field_array(records, 'lastPrice', 'close', 'price'),
+                                          field_array(records, 'volume'), previous_close, now=now)
+
+    def evaluate_frame(self, codes: List[str], price: np.ndarray, volume: np.ndarray, preclose: np.ndarray,
+                       previous: Optional[Dict[str, np.ndarray]] = None, now: Optional[float] = None) -> List[tuple]:
+        """
+        检测一轮已经组装成数组的数据，数组与 codes 一一对应
+
+        Args:
+            previous: 检测器按tick计算的上一条数据 {'price', 'volume', 'high', 'low'}，None时使用上一轮快照
+            now: 当前时间（秒），用于冷却时间，None时取系统时间
+
+        Returns:
+            List[tuple]: [(codes 中的位置, 触发的 AlertRule, 指标值)]，按规则顺序
+        """
+        if not codes:
+            return []
+        now = time.time() if now is None else now
+        position = self._register(codes)
+        price = np.asarray(price, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        preclose = np.asarray(preclose, dtype=float)
+        snapshot_price = self.prev_price[position]
+        snapshot_volume = self.prev_volume[position]
+        high = self.high[position]
+        low = self.low[position]
+        valid = price > 0
+
+        # 只有量价变化的快照才进入最近窗口，避免没有成交的轮次稀释波动率
+        changed = valid & ((price != snapshot_price) | (volume != snapshot_volume))
+        moved = position[changed]
+        self.recent_prices[moved, :-1] = self.recent_prices[moved, 1:]
+        self.recent_prices[moved, -1] = price[changed]
+        self.recent_volumes[moved, :-1] = self.recent_volumes[moved, 1:]
+        self.recent_volumes[moved, -1] = volume[changed]
+
+        if previous is None:
+            frame = RuleFrame(price, volume, preclose, snapshot_price, snapshot_volume, high, low,
+                              self.limit_up[position], self.limit_down[position], self.recent_prices[position],
+                              self.recent_volumes[position], changed)
+        else:
+            frame = RuleFrame(price, volume, preclose, np.asarray(previous['price'], dtype=float),
+                              np.asarray(previous['volume'], dtype=float), np.asarray(previous['high'], dtype=float),
+                              np.asarray(previous.get('low', low), dtype=float), self.limit_up[position],
+                              self.limit_down[position], self.recent_prices[position], self.recent_volumes[position],
+                              changed)
+
+        triggered = []
+        for rule in list(self.rules):
+            value = frame.metric(rule.metric, rule.lookback)
+            with np.errstate(invalid='ignore'):
+                if rule.metric == 'breakout':
+                    # 按 价格 > 最高价 × (1 + 阈值) 比较，与逐条检测的写法保持一致
+                    mask = frame.valid & (frame.high > 0) & rule.compare(price, frame.high * (1 + rule.threshold))
+                else:
+                    mask = rule.compare(value, rule.threshold)
+            if rule.cooldown > 0:
+                fired_at = self._fired_at.get(rule.name)
+                if fired_at is None:
+                    fired_at = self._fired_at[rule.name] = np.full(len(self.codes), -np.inf)
+                mask &= now - fired_at[position] >= rule.cooldown
+                fired_at[position[mask]] = now
+            triggered.extend((i, rule, float(value[i])) for i in np.flatnonzero(mask))
+
+        # 更新状态：本轮成为下一轮的上一轮
+        self.prev_price[position[valid]] = price[valid]
+        self.prev_volume[position[valid]] = volume[valid]
+        self.high[position] = np.where(valid, np.maximum(high, price), high)
+        self.low[position] = np.where(valid, np.where(low > 0, np.minimum(low, price), price), low)
+        return triggered
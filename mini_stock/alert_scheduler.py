@@ -0,0 +1,146 @@
+"""
+异常检测调度器
+股票和股指期货检测器共用一个检测线程：每个周期只读取一次全部已注册品种的最新数据快照，
+再按代码类型分给各个检测器，不再每个检测器各自轮询Redis。
+"""
+
+import logging
+import threading
+from typing import Any, Dict
+
+from mini_stock.cache_config import get_cache_config
+from mini_stock.redis_cache_manager import get_cache_manager
+from mini_stock.utils.trading_time_utils import TradingTimeUtils
+from utils.code_type_utils import CodeTypeRecognizer
+
+
+class AlertScheduler:
+    """
+    共享的异常检测调度器
+
+    注册的检测器需要提供 code_type 属性（"stock" 或 "futures"）和 on_snapshot(最新数据快照) 方法
+
+    Args:
+        cache_manager: 缓存管理器，None时使用全局缓存管理器
+        interval: 交易时间内的检测间隔（秒）
+        idle_interval: 非交易时间检查是否开盘的间隔（秒）
+        start_thread: 是否在注册检测器时启动检测线程，回放和测试时手动调用 run_once
+        recorder: 快照录制器（alert_replay.AlertSnapshotRecorder），每个周期读取的快照先交给它写入文件再分给检测器
+    """
+
+    def __init__(self, cache_manager=None, interval: float = 5, idle_interval: float = 60, start_thread: bool = True,
+                 recorder=None):
+        self.cache_manager = cache_manager or get_cache_manager()
+        self.recorder = recorder
+        self.interval = interval
+        self.idle_interval = idle_interval
+        self.start_thread = start_thread
+        self.detectors = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.thread = None
+
+    def register(self, detector):
+        """注册检测器，第一个检测器注册时启动检测线程"""
+        with self._lock:
+            if detector not in self.detectors:
+                self.detectors.append(detector)
+            if self.start_thread and (self.thread is None or not self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._loop, daemon=True)
+                self.thread.start()
+                logging.info("异常检测调度器已启动")
+
+    def unregister(self, detector):
+        """注销检测器，没有检测器时停止检测线程"""
+        with self._lock:
+            if detector in self.detectors:
+                self.detectors.remove(detector)
+            if not self.detectors:
+                self._stop_event.set()
+
+    def _loop(self):
+        """检测循环"""
+        while True:
+            try:
+                # 只在交易时间内进行检测
+                if TradingTimeUtils.is_trading_time():
+                    self.run_once()
+                    wait = self.interval  # 交易时间内每5秒检测一次
+                else:
+                    wait = self.idle_interval  # 非交易时间减少检查频率
+            except Exception as e:
+                logging.error(f"异常检测调度出错: {e}")
+                wait = 10
+            if self._stop_event.wait(wait):
+                # 注销最后一个检测器后退出；退出前又有检测器注册时继续运行
+                with self._lock:
+                    if not self.detectors:
+                        self.thread = None
+                        break
+                    self._stop_event.clear()
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        执行一个检测周期：一次读取全部已注册代码类型的最新数据，分发给各检测器
+
+        Returns:
+            Dict: 本周期读取的快照 {代码: 最新数据}
+        """
+        if not self.cache_manager:
+            logging.warning("缓存管理器不可用，跳过异常检测")
+            return {}
+
+        with self._lock:
+            detectors = list(self.detectors)
+        code_types = {detector.code_type for detector in detectors}
+        if not code_types:
+            return {}
+
+        codes = self.cache_manager.get_active_codes("all" if len(code_types) > 1 else next(iter(code_types)))
+        snapshot = self.cache_manager.get_multiple_latest_data(codes) if codes else {}
+        if self.recorder:
+            try:
+                self.recorder.record(snapshot)
+            except Exception as e:
+                logging.error(f"录制异常检测快照出错: {e}")
+
+        parts = {code_type: {} for code_type in code_types}
+        for code, data in snapshot.items():
+            code_type = "futures" if CodeTypeRecognizer.is_futures_code(code) else "stock"
+            if code_type in parts:
+                parts[code_type][code] = data
+
+        for detector in detectors:
+            try:
+                detector.on_snapshot(parts[detector.code_type])
+            except Exception as e:
+                logging.error(f"{type(detector).__name__} 处理快照出错: {e}")
+        return snapshot
+
+    def stop(self):
+        """注销所有检测器并停止检测线程"""
+        with self._lock:
+            self.detectors.clear()
+            thread = self.thread
+        self._stop_event.set()
+        if thread:
+            thread.join(timeout=5)
+        if self.recorder:
+            self.recorder.close()
+
+
+# 全局调度器实例
+alert_scheduler = None
+
+
+def get_alert_scheduler() -> AlertScheduler:
+    """获取全局异常检测调度器实例"""
+    global alert_scheduler
+    if alert_scheduler is None:
+        recorder = None
+        recording = get_cache_config().alert_recording
+        if recording['enabled']:
+            from mini_stock.alert_replay import AlertSnapshotRecorder
+            recorder = AlertSnapshotRecorder(recording['directory'])
+        alert_scheduler = AlertScheduler(recorder=recorder)
+    return alert_scheduler
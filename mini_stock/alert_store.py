@@ -0,0 +1,211 @@
+"""
+内存提示存储
+有界的时间顺序存储，按类型、代码、级别建立二级索引，时间窗口查询用 bisect 定位，不再逐条扫描过滤；
+已提示标识按 TTL 过期，不会无限增长。股票和股指期货异常检测器共用。
+检测线程写入、接口线程查询，写入、淘汰和查询都在同一把锁内进行。
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+
+class _TimeSeries:
+    """按时间升序追加的序列，头部淘汰只移动偏移量，累计淘汰过半时再压缩底层列表"""
+
+    __slots__ = ('times', 'items', 'head')
+
+    def __init__(self):
+        self.times = []
+        self.items = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.items) - self.head
+
+    def append(self, moment: float, item):
+        self.times.append(moment)
+        self.items.append(item)
+
+    def popleft(self):
+        item = self.items[self.head]
+        self.items[self.head] = None
+        self.head += 1
+        if self.head * 2 > len(self.items):
+            del self.times[:self.head]
+            del self.items[:self.head]
+            self.head = 0
+        return item
+
+    def first_time(self) -> Optional[float]:
+        return self.times[self.head] if len(self) else None
+
+    def position(self, since: Optional[float]) -> int:
+        """第一个时间不早于 since 的位置"""
+        if since is None:
+            return self.head
+        return bisect_left(self.times, since, self.head)
+
+    def since(self, since: Optional[float]) -> List[Any]:
+        return self.items[self.position(since):]
+
+    def count_since(self, since: Optional[float]) -> int:
+        return len(self.items) - self.position(since)
+
+
+class DedupSet:
+    """
+    带过期时间的已提示标识集合，用法与 set 相同（in、add、clear）
+    标识写入 ttl_seconds 秒后过期，过期的标识在下一次访问时按写入顺序清理
+    """
+
+    def __init__(self, ttl_seconds: float = 86400, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._expiry = {}
+        self._order = deque()
+
+    def _expire(self):
+        now = self.clock()
+        while self._order and self._order[0][0] <= now:
+            expiry, key = self._order.popleft()
+            # 同一标识重新写入过时以最后一次为准
+            if self._expiry.get(key) == expiry:
+                del self._expiry[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        self._expire()
+        return key in self._expiry
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self._expiry)
+
+    def add(self, key: Hashable):
+        self._expire()
+        expiry = self.clock() + self.ttl_seconds
+        self._expiry[key] = expiry
+        self._order.append((expiry, key))
+
+    def clear(self):
+        self._expiry.clear()
+        self._order.clear()
+
+
+class AlertStore:
+    """
+    提示存储，超过 max_size 条时淘汰最早的提示
+
+    Args:
+        max_size: 最多保存的提示数
+        code_attr: 提示对象上代码的属性名（股票为 stock_code，股指期货为 futures_code）
+        dedup_ttl_seconds: 已提示标识的过期时间
+    """
+
+    def __init__(self, max_size: int = 1000, code_attr: str = 'stock_code', dedup_ttl_seconds: float = 86400):
+        self.max_size = max_size
+        self.code_attr = code_attr
+        self.dedup = DedupSet(dedup_ttl_seconds)
+        self._all = _TimeSeries()
+        self._indexes = {'type': {}, 'code': {}, 'level': {}}
+        self._last_time = float('-inf')
+        self._lock = threading.Lock()
+
+    def _keys(self, alert) -> Dict[str, Hashable]:
+        return {'type': alert.alert_type, 'code': getattr(alert, self.code_attr), 'level': alert.level}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._all)
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            return iter(self._all.since(None))
+
+    def add(self, alert):
+        """追加一条提示，时间早于上一条时按上一条的时间排序，保证序列有序"""
+        with self._lock:
+            moment = max(alert.timestamp.timestamp(), self._last_time)
+            self._last_time = moment
+            self._all.append(moment, alert)
+            for name, key in self._keys(alert).items():
+                self._indexes[name].setdefault(key, _TimeSeries()).append(moment, alert)
+            while len(self._all) > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """淘汰最早的一条，它同时也是各个索引里最早的一条；调用方需持有锁"""
+        alert = self._all.popleft()
+        for name, key in self._keys(alert).items():
+            series = self._indexes[name][key]
+            series.popleft()
+            if not len(series):
+                del self._indexes[name][key]
+
+    def clear_before(self, cutoff: datetime):
+        """删除早于 cutoff 的提示"""
+        moment = cutoff.timestamp()
+        with self._lock:
+            while len(self._all) and self._all.first_time() < moment:
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._all = _TimeSeries()
+            self._indexes = {'type': {}, 'code': {}, 'level': {}}
+            self.dedup.clear()
+
+    @staticmethod
+    def _cutoff(minutes: Optional[float]) -> Optional[float]:
+        if minutes is None:
+            return None
+        return (datetime.now() - timedelta(minutes=minutes)).timestamp()
+
+    def recent(self, minutes: Optional[float] = None) -> List[Any]:
+        """最近 minutes 分钟的提示，按时间正序；None表示全部"""
+        cutoff = self._cutoff(minutes)
+        with self._lock:
+            return self._all.since(cutoff)
+
+    def _query(self, name: str, key: Hashable, minutes: Optional[float]) -> List[Any]:
+        cutoff = self._cutoff(minutes)
+        with self._lock:
+            series = self._indexes[name].get(key)
+            return series.since(cutoff) if series else []
+
+    def by_type(self, alert_type, minutes: Optional[float] = None) -> List[Any]:
+        return self._query('type', alert_type, minutes)
+
+    def by_code(self, code: str, minutes: Optional[float] = None) -> List[Any]:
+        return self._query('code', code, minutes)
+
+    def by_level(self, level, minutes: Optional[float] = None) -> List[Any]:
+        return self._query('level', level, minutes)
+
+    def stats(self, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        提示统计，格式与检测器原来的 get_alert_stats 相同
+
+        Args:
+            since: 统计起点，None表示当天0点
+        """
+        since = since or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        moment = since.timestamp()
+        with self._lock:
+            stats = {
+                'total_alerts': len(self._all),
+                'today_alerts': self._all.count_since(moment),
+                'by_type': {},
+                'by_level': {}
+            }
+            for name, field in (('type', 'by_type'), ('level', 'by_level')):
+                index = self._indexes[name]
+                # 按枚举定义的顺序输出
+                for key in sorted(index, key=lambda member: list(type(member)).index(member)):
+                    count = index[key].count_since(moment)
+                    if count > 0:
+                        stats[field][key.value] = count
+        return stats
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Redis缓存统计核对工具
+SCAN 某天实际存在的行情数据key，与写入时增量维护的统计hash、当天索引集合比对，--fix 时按实际数据修正
+运行方式（项目根目录）：python -m mini_stock.cache_audit [--day YYYYMMDD] [--fix]
+"""
+
+import argparse
+import json
+import logging
+
+import environment
+from mini_stock.redis_cache_manager import RedisCacheManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="核对Redis缓存统计")
+    parser.add_argument('--host', default=getattr(environment, 'REDIS_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=getattr(environment, 'REDIS_PORT', 6379))
+    parser.add_argument('--db', type=int, default=getattr(environment, 'REDIS_DB', 0))
+    parser.add_argument('--day', default=None, help="日期 YYYYMMDD，默认当天")
+    parser.add_argument('--fix', action='store_true', help="用实际数据修正统计和索引")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    manager = RedisCacheManager(args.host, args.port, args.db, getattr(environment, 'REDIS_PASSWORD', None))
+    if not manager.redis_client:
+        raise SystemExit(1)
+    report = manager.audit_cache_stats(args.day, fix=args.fix)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    manager.stop()
+    if not all(item['consistent'] for item in report.values()) and not args.fix:
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,14 @@ class CacheConfig:
     # 默认配置
     DEFAULT_CONFIG = {
         'cache_mode': CacheMode.ESSENTIAL.value,
+        # tick 写入Redis时的编码：json（旧格式）、struct（定长二进制）、msgpack（需安装msgpack）
+        # 读取时按数据本身识别编码，切换编码不影响已缓存的数据
+        'tick_codec': 'struct',
+        # 当天历史数据的存储方式：list（列表，LPUSH + LTRIM）、stream（Redis Streams，ID为tick时间，支持按时间窗口读取）
+        # 切换后只读取新存储方式下的数据
+        'history_backend': 'list',
+        # 快照相对上次写入没有变化（tick时间、成交量、价格都相同）时不追加到当天历史，只刷新最新数据的过期时间
+        'skip_unchanged_ticks': True,
         'essential_fields': [
             'time', 'lastPrice', 'open', 'high', 'low', 'lastClose', 
             'amount', 'volume', 'timestamp'
@@ -35,10 +43,47 @@ class CacheConfig:
             'daily_data': 86400,  # 日数据24小时过期
             'preclose_data': 86400,  # 前收盘价24小时过期
             'filter_cache': 300,  # 筛选结果5分钟过期
+            'alert_journal': 604800,  # 提示日志保留7天，不随每日清理删除
         },
         'max_cache_size': {
             'daily_records_per_stock': 1000,  # 每只股票每天最多缓存1000条记录
             'total_stocks': 5000,  # 最多缓存5000只股票
+        },
+        # 后台把较早的tick压缩为1分钟线（开高低收、成交量、成交额），压缩后的tick从当天历史中删除
+        # 需要完整tick的消费方（如开板检测）在开启前确认只用到最近 horizon_minutes 分钟的tick
+        'rollup': {
+            'enabled': False,
+            'horizon_minutes': 30,  # 只压缩早于最近30分钟的tick
+            'interval_seconds': 60,  # 压缩间隔
+            'chunk_size': 200,  # 列表存储从尾部每次读取的条数
+        },
+        # 异常检测调度器把每个周期分给检测器的快照按天录制成压缩文件，用于离线回放调整阈值（mini_stock/alert_replay.py）
+        'alert_recording': {
+            'enabled': False,
+            'directory': 'alert_recordings',  # 录制文件目录，相对路径按运行目录解析
+        },
+        # 异常检测在默认规则之外开启的可选规则（mini_stock/alert_rules.py 的 OPTIONAL_STOCK_RULES / OPTIONAL_FUTURES_RULES），如 ['reversal', 'liquidity']
+        'alert_rules': {
+            'optional': [],
+        },
+        # 每个交易日的合约信息快照（mini_stock/instrument_registry.py）
+        'instrument_registry': {
+            'directory': 'instrument_snapshots',  # 快照目录，相对路径按运行目录解析
+        },
+        # 行情接入方式：poll 每3秒拉取全部代码；push 订阅行情推送，只写入有变化的代码（mini_stock/tick_ingestor.py）
+        'tick_ingest': {
+            'mode': 'poll',
+            'queue_size': 20000,  # 推送队列容量（条）
+            'batch_size': 500,  # 一批达到该条数时立即写入
+            'flush_interval': 0.5,  # 队列中最早的tick等待超过该秒数时写入
+        },
+        # 进程内共享的Redis连接池
+        'connection_pool': {
+            'max_connections': 50,  # 最大连接数
+            'pool_timeout': 5,  # 连接用完时等待空闲连接的秒数
+            'socket_timeout': 5,  # 读写超时（秒）
+            'socket_connect_timeout': 3,  # 建立连接超时（秒）
+            'health_check_interval': 30,  # 连接空闲超过该秒数后使用前先PING
         }
     }
     
@@ -56,6 +101,21 @@ class CacheConfig:
         """获取缓存模式"""
         return self.config.get('cache_mode', CacheMode.ESSENTIAL.value)
     
+    @property
+    def tick_codec(self) -> str:
+        """获取tick编码名称"""
+        return self.config.get('tick_codec', self.DEFAULT_CONFIG['tick_codec'])
+    
+    @property
+    def history_backend(self) -> str:
+        """获取当天历史数据的存储方式"""
+        return self.config.get('history_backend', self.DEFAULT_CONFIG['history_backend'])
+    
+    @property
+    def skip_unchanged_ticks(self) -> bool:
+        """是否跳过没有变化的快照"""
+        return self.config.get('skip_unchanged_ticks', self.DEFAULT_CONFIG['skip_unchanged_ticks'])
+    
     @property
     def essential_fields(self) -> list:
         """获取核心字段列表"""
@@ -76,6 +136,36 @@ class CacheConfig:
         """获取最大缓存大小配置"""
         return self.config.get('max_cache_size', self.DEFAULT_CONFIG['max_cache_size'])
     
+    @property
+    def rollup(self) -> Dict[str, Any]:
+        """获取分钟线压缩配置，未配置的项使用默认值"""
+        return {**self.DEFAULT_CONFIG['rollup'], **self.config.get('rollup', {})}
+    
+    @property
+    def alert_recording(self) -> Dict[str, Any]:
+        """获取异常检测快照录制配置，未配置的项使用默认值"""
+        return {**self.DEFAULT_CONFIG['alert_recording'], **self.config.get('alert_recording', {})}
+    
+    @property
+    def alert_rules(self) -> Dict[str, Any]:
+        """获取异常检测规则配置，未配置的项使用默认值"""
+        return {**self.DEFAULT_CONFIG['alert_rules'], **self.config.get('alert_rules', {})}
+    
+    @property
+    def instrument_registry(self) -> Dict[str, Any]:
+        """获取合约信息快照配置，未配置的项使用默认值"""
+        return {**self.DEFAULT_CONFIG['instrument_registry'], **self.config.get('instrument_registry', {})}
+    
+    @property
+    def tick_ingest(self) -> Dict[str, Any]:
+        """获取行情接入配置，未配置的项使用默认值"""
+        return {**self.DEFAULT_CONFIG['tick_ingest'], **self.config.get('tick_ingest', {})}
+    
+    @property
+    def connection_pool(self) -> Dict[str, Any]:
+        """获取连接池配置，未配置的项使用默认值"""
+        return {**self.DEFAULT_CONFIG['connection_pool'], **self.config.get('connection_pool', {})}
+    
     def get_expire_seconds(self, cache_type: str) -> int:
         """
         获取指定类型的缓存过期时间
@@ -0,0 +1,61 @@
+"""
+截面异常检测
+把所有品种本轮和上一轮的快照组装成 NumPy 数组，每个检测周期用数组表达式一次算完全部规则，
+返回触发的 (代码, 提示类型, 级别)。提示类型和级别使用 AlertType / IndexFuturesAlertType 与对应级别枚举的取值。
+规则的声明和计算见 alert_rules，这里包含默认规则和全部可选规则（反转、高波动、流动性危机）。
+
+与检测器的区别：比较对象是上一轮快照而不是前一条tick，品种在两轮之间没有新成交时量价不变，不会触发量价类规则；
+没有冷却时间的规则在后续周期会重复返回，去重由调用方负责。
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from mini_stock.alert_rules import AlertRuleEngine, OPTIONAL_FUTURES_RULES, OPTIONAL_STOCK_RULES, default_rules
+
+
+class CrossSectionAlertEvaluator(AlertRuleEngine):
+    """
+    截面异常检测器
+
+    Args:
+        kind: "stock" 检测涨跌停、异常放量、价格异动、突破、反转；
+              "futures" 检测成交量异动、价格异动、突破、反转、高波动、流动性危机
+        thresholds: 覆盖默认阈值 {规则名: 阈值}
+    """
+
+    def __init__(self, kind: str = "stock", thresholds: Optional[Dict[str, float]] = None):
+        optional = OPTIONAL_STOCK_RULES if kind == "stock" else OPTIONAL_FUTURES_RULES
+        rules = default_rules(kind, optional=[rule['name'] for rule in optional])
+        for rule in rules:
+            rule['threshold'] = (thresholds or {}).get(rule['name'], rule['threshold'])
+        self.kind = kind
+        super().__init__(rules)
+
+    def evaluate(self, latest: Dict[str, Dict[str, Any]], preclose: Optional[Dict[str, float]] = None,
+                 now: Optional[float] = None) -> List[tuple]:
+        """
+        检测一轮最新快照
+
+        Args:
+            latest: {代码: 最新数据}，与 get_multiple_latest_data 的返回一致
+            preclose: {代码: 前收盘价}，缺少的代码使用数据里的 lastClose
+            now: 当前时间（秒），用于冷却时间，None时取系统时间
+
+        Returns:
+            List[tuple]: [(代码, 提示类型, 级别)]
+        """
+        codes, triggered = self.evaluate_snapshot(latest, preclose, now=now)
+        return [(codes[i], rule.alert_type, rule.level) for i, rule, _ in triggered]
+
+    def evaluate_arrays(self, codes: List[str], price: np.ndarray, volume: np.ndarray, preclose: np.ndarray,
+                        now: Optional[float] = None) -> List[tuple]:
+        """
+        检测一轮已经组装成数组的快照，数组与 codes 一一对应
+
+        Returns:
+            List[tuple]: [(代码, 提示类型, 级别)]
+        """
+        return [(codes[i], rule.alert_type, rule.level)
+                for i, rule, _ in self.evaluate_frame(codes, price, volume, preclose, now=now)]
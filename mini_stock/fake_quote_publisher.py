@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线模拟的行情推送
+FakeQuotePublisher 提供与 xtdata 相同签名的 subscribe_whole_quote / subscribe_quote / unsubscribe_quote / get_full_tick，
+每调用一次 publish_round 就让一部分股票产生新的tick并推送给订阅者，用于在没有QMT客户端时测试和基准测试行情接入。
+"""
+
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class FakeQuotePublisher:
+    """
+    模拟的行情推送源
+
+    Args:
+        codes: 股票代码列表
+        change_ratio: 每轮有新tick的股票比例
+        repeat_ratio: 每轮把没有变化的股票原样再推送一次的比例（subscribe_whole_quote 会推送未变化的代码）
+        seed: 随机数种子
+        start: 第一笔tick的时间
+    """
+
+    def __init__(self, codes: Iterable[str], change_ratio: float = 0.3, repeat_ratio: float = 0.1, seed: int = 7,
+                 start: datetime = datetime(2025, 7, 1, 9, 30)):
+        self.codes = list(codes)
+        self.change_ratio = change_ratio
+        self.repeat_ratio = repeat_ratio
+        self.rng = random.Random(seed)
+        self.time_ms = int(start.timestamp() * 1000)
+        self.ticks = {code: self._initial_tick(code) for code in self.codes}
+        self.published = 0  # 推送的tick数（含重复推送）
+        self.rounds = 0
+        self._subscriptions: Dict[int, tuple] = {}
+        self._next_seq = 1
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def _initial_tick(self, code: str) -> Dict[str, Any]:
+        price = round(self.rng.uniform(3, 60), 2)
+        return {'time': self.time_ms, 'lastPrice': price, 'open': price, 'high': price, 'low': price,
+                'lastClose': price, 'amount': 0.0, 'volume': 0, 'pvolume': 0, 'tickvol': 0, 'stockStatus': 3,
+                'openInt': 13, 'lastSettlementPrice': 0.0,
+                'askPrice': [round(price + 0.01 * level, 2) for level in range(1, 6)],
+                'bidPrice': [round(price - 0.01 * level, 2) for level in range(5)],
+                'askVol': [100] * 5, 'bidVol': [100] * 5, 'settlementPrice': 0.0, 'transactionNum': 0, 'pe': 0.0}
+
+    def _advance(self, tick: Dict[str, Any]) -> Dict[str, Any]:
+        """生成下一笔tick（新字典）"""
+        price = round(max(tick['lastPrice'] * (1 + self.rng.gauss(0, 0.002)), 0.01), 2)
+        volume = self.rng.randint(1, 500)
+        return dict(tick, time=self.time_ms, lastPrice=price, high=max(tick['high'], price), low=min(tick['low'], price),
+                    volume=tick['volume'] + volume, amount=tick['amount'] + volume * 100 * price, tickvol=volume,
+                    pvolume=tick['pvolume'] + volume * 100, transactionNum=tick['transactionNum'] + 1,
+                    askPrice=[round(price + 0.01 * level, 2) for level in range(1, 6)],
+                    bidPrice=[round(price - 0.01 * level, 2) for level in range(5)])
+
+    # ---- 与 xtdata 相同的接口 ----
+
+    def subscribe_whole_quote(self, code_list: List[str], callback: Optional[Callable] = None) -> int:
+        return self._subscribe(code_list, callback, whole=True)
+
+    def subscribe_quote(self, stock_code: str, period: str = '1d', start_time: str = '', end_time: str = '',
+                        count: int = 0, callback: Optional[Callable] = None) -> int:
+        return self._subscribe([stock_code], callback, whole=False)
+
+    def unsubscribe_quote(self, seq: int):
+        with self._lock:
+            self._subscriptions.pop(seq, None)
+
+    def get_full_tick(self, code_list: List[str]) -> Dict[str, Dict[str, Any]]:
+        return {code: dict(self.ticks[code]) for code in code_list if code in self.ticks}
+
+    def _subscribe(self, codes: List[str], callback: Optional[Callable], whole: bool) -> int:
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._subscriptions[seq] = (set(codes), callback, whole)
+        return seq
+
+    # ---- 推送 ----
+
+    def publish_round(self, interval_ms: int = 3000) -> Dict[str, Dict[str, Any]]:
+        """
+        推进 interval_ms 毫秒：change_ratio 比例的股票产生新tick，连同 repeat_ratio 比例的未变化股票推送给订阅者
+
+        Returns:
+            Dict: 本轮有新tick的股票 {代码: tick}
+        """
+        self.time_ms += interval_ms
+        self.rounds += 1
+        changed = {}
+        pushed = {}
+        for code in self.codes:
+            if self.rng.random() < self.change_ratio:
+                self.ticks[code] = changed[code] = self._advance(self.ticks[code])
+                pushed[code] = changed[code]
+            elif self.rng.random() < self.repeat_ratio:
+                pushed[code] = self.ticks[code]
+
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        for codes, callback, whole in subscriptions:
+            if callback is None:
+                continue
+            if whole:
+                datas = {code: tick for code, tick in pushed.items() if code in codes}
+                if datas:
+                    self.published += len(datas)
+                    callback(datas)
+            else:
+                for code in codes:
+                    if code in pushed:
+                        self.published += 1
+                        callback({code: [pushed[code]]})
+        return changed
+
+    def start(self, interval: float, rounds: Optional[int] = None, interval_ms: int = 3000):
+        """后台线程每 interval 秒推送一轮，推送 rounds 轮后停止（None表示一直推送）"""
+        self._stop_event.clear()
+
+        def run():
+            count = 0
+            while not self._stop_event.is_set() and (rounds is None or count < rounds):
+                started = time.perf_counter()
+                self.publish_round(interval_ms)
+                count += 1
+                self._stop_event.wait(max(interval - (time.perf_counter() - started), 0))
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None):
+        """等待后台推送结束"""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stop(self):
+        """停止后台推送"""
+        self._stop_event.set()
+        self.join()
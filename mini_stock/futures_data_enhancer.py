@@ -18,14 +18,14 @@ class FuturesDataEnhancer:
         
         Args:
             kline_data (dict): 原始行情数据，格式为 {code: [columns, dataframe]}
-            futures_list (list): FuturesInstrumentModel 列表
+            futures_list (list | dict): FuturesInstrumentModel 列表，或已构建的 {合约代码: 模型} 映射
             
         Returns:
             dict: 添加了关键字段的增强行情数据
         """
         enhanced_kline_data = {}
         
-        # 构建代码到模型的映射字典
+        # 构建代码到模型的映射字典，传入已构建的映射时直接使用
         code_to_model_map = FuturesDataEnhancer._build_code_to_model_map(futures_list)
         
         for code, data in kline_data.items():
@@ -42,7 +42,9 @@ class FuturesDataEnhancer:
     
     @staticmethod
     def _build_code_to_model_map(futures_list):
-        """构建代码到模型的映射字典，提高查找效率"""
+        """构建代码到模型的映射字典，提高查找效率；传入的已经是映射时原样返回"""
+        if isinstance(futures_list, dict):
+            return futures_list
         code_to_model_map = {}
         for model in futures_list:
             if isinstance(model, FuturesInstrumentModel):
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合约信息注册表
+每个交易日第一次使用时一次读取全部股票和期货合约信息（get_instrument_detail），保存为本地 Parquet 快照，
+并在内存中按代码索引；同一天重启直接读取快照，跨天时后台整体替换。服务启动和接口请求的合约信息查询只读内存。
+
+快照文件 instruments_{日期}.parquet：每个代码一行，index 为代码，kind（stock/futures）、sectors（所属板块名的 JSON 列表）
+和合约信息各字段为列，detail 列保存 xtquant 返回的原始字典（JSON），查询结果与直接调用 get_instrument_detail 相同。
+同一代码可以属于多个板块（如同时在沪深A股和沪深300中），板块成员在内存中另存为 {板块名: [代码]}。
+没有安装 Parquet 引擎（pyarrow）时只在内存中保存，重启后重新读取。
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from xtquant import xtdata
+
+from date_utils import DateUtils
+from mini_stock.cache_config import get_cache_config
+
+# 默认读取的板块：{板块名: 品种类型}
+DEFAULT_SECTORS = {'沪深A股': 'stock', 'IF': 'futures'}
+# 股票代码的交易所后缀，用于推断补充读取的板块的品种类型
+STOCK_MARKETS = ('SH', 'SZ', 'BJ')
+
+
+class _Snapshot:
+    """某一天的合约信息，创建后不再修改（按需读取的板块外代码除外），整体替换实现原子刷新"""
+
+    __slots__ = ('day', 'details', 'frame', 'members', 'extra')
+
+    def __init__(self, day: str, details: Dict[str, Dict[str, Any]], frame: pd.DataFrame,
+                 members: Dict[str, List[str]]):
+        self.day = day
+        self.details = details
+        self.frame = frame
+        self.members = members  # {板块名: [代码]}，按快照中的顺序
+        self.extra = {}  # 不在已读取板块中的代码，按需读取，不写入快照
+
+
+class InstrumentRegistry:
+    """
+    合约信息注册表
+
+    Args:
+        directory: 快照目录，None时使用缓存配置 instrument_registry.directory
+        sectors: 启动时读取的板块 {板块名: 品种类型}，查询其他板块时按需补充
+        today: 返回当天日期的函数，测试时可替换
+    """
+
+    def __init__(self, directory: Optional[str] = None, sectors: Optional[Dict[str, str]] = None,
+                 today: Callable[[], datetime] = DateUtils.today):
+        self.directory = directory or get_cache_config().instrument_registry['directory']
+        self.sectors = dict(sectors or DEFAULT_SECTORS)
+        self.today = today
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    def snapshot_path(self, day: str) -> str:
+        """某一天的快照文件路径"""
+        return os.path.join(self.directory, f"instruments_{day}.parquet")
+
+    def _current(self) -> _Snapshot:
+        """当天的合约信息；跨天时由第一个发现的线程刷新，刷新期间其他线程继续使用前一天的数据"""
+        day = self._current_day()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.day == day:
+            return snapshot
+        if not self._lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self._snapshot is None or self._snapshot.day != day:
+                self._snapshot = self._load(day)
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def refresh(self, force: bool = False):
+        """刷新合约信息，force 为 True 时忽略当天快照重新读取"""
+        if not force:
+            self._current()
+            return
+        day = self._current_day()
+        with self._lock:
+            self._snapshot = self._load(day, use_file=False)
+
+    def _load(self, day: str, use_file: bool = True) -> _Snapshot:
+        """优先读取当天快照文件，没有或不包含全部板块时调用接口读取并保存"""
+        path = self.snapshot_path(day)
+        if use_file and os.path.exists(path):
+            try:
+                snapshot = self._snapshot_from_frame(day, pd.read_parquet(path))
+                if set(self.sectors) <= set(snapshot.members):
+                    # 快照里当天补充读取过的板块也一并登记，品种类型取第一个成员的类型
+                    for sector, codes in snapshot.members.items():
+                        self.sectors.setdefault(sector, snapshot.frame.at[codes[0], 'kind'])
+                    logging.info(f"从快照读取合约信息 {len(snapshot.frame)} 条: {path}")
+                    return snapshot
+            except Exception as e:
+                logging.warning(f"读取合约信息快照失败，重新读取: {e}")
+
+        rows = []
+        for sector, kind in self.sectors.items():
+            rows.extend(self._fetch_sector(sector, kind))
+        frame = self._build_frame(rows)
+        self._save(frame, path)
+        logging.info(f"读取合约信息 {len(frame)} 条，板块: {', '.join(self.sectors)}")
+        return self._snapshot_from_frame(day, frame)
+
+    @staticmethod
+    def _fetch_sector(sector: str, kind: str) -> List[Dict[str, Any]]:
+        """读取一个板块全部代码的合约信息，每条带 code、kind、sector"""
+        return InstrumentRegistry._fetch_details(xtdata.get_stock_list_in_sector(sector) or [], sector, kind)
+
+    @staticmethod
+    def _fetch_details(codes: List[str], sector: str, kind: str) -> List[Dict[str, Any]]:
+        """逐只读取合约信息，每条带 code、kind、sector，读取不到的代码跳过"""
+        rows = []
+        for code in codes:
+            try:
+                detail = xtdata.get_instrument_detail(code)
+            except Exception as e:
+                logging.error(f"获取合约{code}信息时出错: {str(e)}")
+                continue
+            if detail:
+                rows.append({'code': code, 'kind': kind, 'sector': sector, 'detail': detail})
+        return rows
+
+    @staticmethod
+    def _build_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+        """合约信息组装为 DataFrame，每个代码一行；同一代码出现在多个板块时合并到 sectors，其余字段保留第一个"""
+        records = {}
+        for row in rows:
+            record = records.get(row['code'])
+            if record is None:
+                records[row['code']] = dict(row['detail'], code=row['code'], kind=row['kind'], sectors=[row['sector']],
+                                            detail=json.dumps(row['detail'], ensure_ascii=False, default=str))
+            elif row['sector'] not in record['sectors']:
+                record['sectors'].append(row['sector'])
+        for record in records.values():
+            record['sectors'] = json.dumps(record['sectors'], ensure_ascii=False)
+        frame = pd.DataFrame.from_records(list(records.values()),
+                                          columns=None if records else ['code', 'kind', 'sectors', 'detail'])
+        return InstrumentRegistry._normalize(frame.set_index('code'))
+
+    @staticmethod
+    def _normalize(frame: pd.DataFrame) -> pd.DataFrame:
+        """同一列混有不同类型（如上市日期有的是字符串有的是整数）时 Parquet 无法保存，统一转为字符串"""
+        for column in frame.columns[frame.dtypes == object]:
+            values = frame[column].dropna()
+            if values.map(type).nunique() > 1:
+                frame[column] = frame[column].map(lambda value: value if value is None or value != value else str(value))
+        return frame
+
+    def _save(self, frame: pd.DataFrame, path: str):
+        """写入临时文件后替换，读到的快照总是完整的"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.tmp"
+            frame.to_parquet(temp_path)
+            os.replace(temp_path, path)
+        except ImportError:
+            logging.warning("没有安装 Parquet 引擎（pyarrow），合约信息只保存在内存中")
+        except Exception as e:
+            logging.error(f"保存合约信息快照失败: {e}")
+
+    @staticmethod
+    def _snapshot_from_frame(day: str, frame: pd.DataFrame) -> _Snapshot:
+        details = {code: json.loads(detail) for code, detail in zip(frame.index, frame['detail'])}
+        members = {}
+        for code, sectors in zip(frame.index, frame['sectors']):
+            for sector in json.loads(sectors):
+                members.setdefault(sector, []).append(code)
+        return _Snapshot(day, details, frame, members)
+
+    @staticmethod
+    def _infer_kind(codes: List[str]) -> str:
+        """按代码后缀推断品种类型：全部是沪深京交易所的代码时为 stock，否则为 futures"""
+        if codes and all(code.rsplit('.', 1)[-1] in STOCK_MARKETS for code in codes):
+            return 'stock'
+        return 'futures'
+
+    def _add_sector(self, sector: str, kind: Optional[str] = None):
+        """
+        补充读取一个板块，合并后整体替换当天数据并重新保存快照
+        已有的代码只记录板块成员，不重新读取合约信息；kind 为 None 时按代码推断
+        """
+        self._current()
+        with self._lock:
+            if sector in self.sectors:
+                return
+            snapshot = self._snapshot
+            codes = list(dict.fromkeys(xtdata.get_stock_list_in_sector(sector) or []))
+            kind = kind or self._infer_kind(codes)
+            frame = snapshot.frame.copy()
+            known = [code for code in codes if code in snapshot.details]
+            if known:
+                frame.loc[known, 'sectors'] = [json.dumps(json.loads(sectors) + [sector], ensure_ascii=False)
+                                               for sectors in frame.loc[known, 'sectors']]
+            added = self._build_frame(self._fetch_details([code for code in codes if code not in snapshot.details],
+                                                          sector, kind))
+            frame = self._normalize(pd.concat([frame, added]))
+            self._save(frame, self.snapshot_path(snapshot.day))
+            self._snapshot = self._snapshot_from_frame(snapshot.day, frame)
+            self.sectors[sector] = kind
+
+    def _current_day(self) -> str:
+        return self.today().strftime('%Y%m%d')
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        按代码查询合约信息，结果与 xtdata.get_instrument_detail 相同；不在已读取板块中的代码按需读取一次
+
+        Returns:
+            Optional[Dict]: 合约信息字典（副本），没有时返回None
+        """
+        snapshot = self._current()
+        detail = snapshot.details.get(code)
+        if detail is None:
+            if code not in snapshot.extra:
+                try:
+                    snapshot.extra[code] = xtdata.get_instrument_detail(code) or None
+                except Exception as e:
+                    logging.error(f"获取合约{code}信息时出错: {str(e)}")
+                    return None
+            detail = snapshot.extra[code]
+        return dict(detail) if detail else None
+
+    def codes(self, sector: Optional[str] = None, kind: Optional[str] = None) -> List[str]:
+        """
+        已读取的代码列表，可以按板块或品种类型筛选；板块不在注册表中时补充读取，
+        板块的品种类型为 kind，没有指定时按板块中的代码推断
+
+        Args:
+            sector: 板块名，如 '沪深A股'、'IF'
+            kind: 品种类型，'stock' 或 'futures'
+        """
+        if sector is not None and sector not in self.sectors:
+            self._add_sector(sector, kind)
+        snapshot = self._current()
+        frame = snapshot.frame
+        codes = frame.index if sector is None else pd.Index(snapshot.members.get(sector, []), dtype=frame.index.dtype)
+        if kind is not None:
+            codes = codes[frame['kind'].reindex(codes).to_numpy() == kind]
+        return codes.tolist()
+
+    def frame(self, kind: Optional[str] = None, sector: Optional[str] = None) -> pd.DataFrame:
+        """
+        合约信息的整表，index 为代码，列为 kind、sectors（板块名的 JSON 列表）和合约信息各字段（不含 detail 列）
+
+        Args:
+            kind: 品种类型，None表示全部
+            sector: 板块名，None表示全部
+        """
+        codes = self.codes(sector=sector, kind=kind)
+        return self._current().frame.loc[codes].drop(columns='detail')
+
+    @property
+    def day(self) -> Optional[str]:
+        """当前数据的日期（YYYYMMDD），还没有读取时为None"""
+        snapshot = self._snapshot
+        return snapshot.day if snapshot else None
+
+
+# 全局注册表实例
+instrument_registry = None
+
+
+def get_instrument_registry() -> InstrumentRegistry:
+    """获取全局合约信息注册表实例"""
+    global instrument_registry
+    if instrument_registry is None:
+        instrument_registry = InstrumentRegistry()
+    return instrument_registry
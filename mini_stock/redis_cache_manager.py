@@ -1,20 +1,220 @@
 import redis
 import json
+import os
+import socket
+import struct
 import logging
 import threading
 import time
+import weakref
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union
 import pandas as pd
-from mini_stock.stock_data_model import StockTickData, StockDataFactory
+from mini_stock.stock_data_model import SlottedStockTickData, StockTickData, StockDataFactory
 from mini_stock.cache_config import get_cache_config, CacheMode
+from mini_stock.tick_batch import TickBatch
+from mini_stock.tick_codec import decode_tick, get_tick_codec
 from utils.code_type_utils import CodeTypeRecognizer
 
+# 分钟线有序集合成员里依次保存的字段
+ROLLUP_FIELDS = ('minute', 'open', 'high', 'low', 'close', 'cum_volume', 'cum_amount', 'ticks')
+
+# 截面排行榜指标：涨跌幅(%)、成交额、量比、振幅(%)，每个指标一个当天的有序集合
+LEADERBOARD_METRICS = ('pct_change', 'turnover', 'volume_ratio', 'amplitude')
+
+# 进程内共享的连接池，key为 (host, port, db, password, decode_responses)
+_connection_pools = {}
+# 外部传入的客户端对应的返回bytes的连接池（读取二进制编码的tick）
+_raw_pools = weakref.WeakKeyDictionary()
+# 已经有清理线程的连接池，同一个Redis在一个进程里只跑一个清理线程
+_cleanup_pools = weakref.WeakSet()
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(host='localhost', port=6379, db=0, password=None,
+                        decode_responses=True) -> redis.ConnectionPool:
+    """
+    获取进程内共享的连接池，同样的连接参数只创建一次
+    连接数用完时等待 pool_timeout 秒而不是直接报错，大小、超时和健康检查间隔来自缓存配置的 connection_pool
+    decode_responses 为 False 时返回读取二进制tick用的连接池
+    """
+    key = (host, port, db, password, decode_responses)
+    with _pools_lock:
+        pool = _connection_pools.get(key)
+        if pool is None:
+            settings = get_cache_config().connection_pool
+            pool = redis.BlockingConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                password=password,
+                decode_responses=decode_responses,
+                max_connections=settings['max_connections'],
+                timeout=settings['pool_timeout'],
+                socket_timeout=settings['socket_timeout'],
+                socket_connect_timeout=settings['socket_connect_timeout'],
+                health_check_interval=settings['health_check_interval'],
+            )
+            _connection_pools[key] = pool
+        return pool
+
+
+def close_connection_pools(host='localhost', port=6379, db=0, password=None):
+    """断开并移除这组连接参数的共享连接池（解码和二进制两个），之后再获取时重新创建"""
+    with _pools_lock:
+        pools = [_connection_pools.pop((host, port, db, password, decode), None) for decode in (True, False)]
+    for pool in pools:
+        if pool is not None:
+            pool.disconnect()
+
+
+def _connection_counts(pool: redis.ConnectionPool):
+    """
+    连接池的 (已创建, 空闲) 连接数，读不到时返回 (None, None)
+    redis-py 8.0 起有公开的 get_connection_count()；更早的版本（requirements 要求 >=4.5）没有公开的计数接口，
+    只能读取 BlockingConnectionPool 的 _connections / pool 和 ConnectionPool 的 _created_connections /
+    _available_connections，这些内部属性在 4.5 到 7.x 都存在，以后的版本改名时不影响其他统计
+    """
+    if hasattr(pool, 'get_connection_count'):
+        (idle, _), (in_use, _) = pool.get_connection_count()
+        return idle + in_use, idle
+    try:
+        if isinstance(pool, redis.BlockingConnectionPool):
+            return len(pool._connections), sum(1 for connection in list(pool.pool.queue) if connection is not None)
+        return pool._created_connections, len(pool._available_connections)
+    except AttributeError:
+        return None, None
+
+
+def get_pool_stats(pool: redis.ConnectionPool) -> Dict[str, Any]:
+    """连接池使用情况：上限、已创建、使用中、空闲的连接数和使用率，连接数读不到时为 None"""
+    created, idle = _connection_counts(pool)
+    in_use = None if created is None else created - idle
+    return {
+        "max_connections": pool.max_connections,
+        "created_connections": created,
+        "in_use_connections": in_use,
+        "idle_connections": idle,
+        "utilization": round(in_use / pool.max_connections, 4) if in_use is not None and pool.max_connections
+        else 0.0,
+    }
+
 
 class RedisCacheManager:
     """Redis缓存管理类，用于管理股票实时数据缓存"""
 
-    def __init__(self, host='localhost', port=6379, db=0, password=None, cache_mode=None):
+    # 维护类命令（清理历史数据）使用 SCAN 时每批返回的 key 数量
+    SCAN_BATCH_SIZE = 1000
+    # 一次脚本调用最多写入的代码数量，控制单次脚本执行时间
+    SCRIPT_CHUNK_SIZE = 500
+    # 压缩分钟线时被并发写入打断（WatchError）后的最多尝试次数，仍失败时留到下一轮
+    ROLLUP_RETRIES = 3
+    # 增量读取新数据时第一页的条数，之后每页翻倍
+    SINCE_PAGE_SIZE = 8
+    # 前收盘价缓存8小时过期
+    PRECLOSE_EXPIRE_SECONDS = 28800
+    # 本地前收盘价缓存检查Redis中版本号的最小间隔（秒），间隔内的查询只读本地字典
+    PRECLOSE_VERSION_CHECK_SECONDS = 5
+    # 每日清理的分布式锁过期时间（秒），拿到锁的进程清理后不释放，其他进程当天不再重复清理
+    CLEANUP_LOCK_SECONDS = 3600
+    # 提示日志每天最多保留的条数（近似裁剪）
+    ALERT_JOURNAL_MAXLEN = 100000
+
+    # 两个写入脚本共用的结尾：刷新索引过期时间，把本批次的增量累加到当天统计hash
+    # 统计字段：codes（代码数）、records（当前保留的记录数）、bytes（累计写入字节数）、last_write（最后写入毫秒时间）、
+    # latest（新建的最新快照数，过期不扣减）；股票统计另有 filters（新建的筛选结果缓存数，由 cache_filter_result 维护）
+    _STATS_EPILOGUE = """
+for kind = 1, 2 do
+    if redis.call('EXISTS', KEYS[kind]) == 1 then
+        redis.call('EXPIRE', KEYS[kind], daily_expire)
+    end
+    if written[kind] > 0 then
+        local stats_key = KEYS[2 + kind]
+        redis.call('HINCRBY', stats_key, 'codes', codes[kind])
+        redis.call('HINCRBY', stats_key, 'records', records[kind])
+        redis.call('HINCRBY', stats_key, 'bytes', bytes[kind])
+        redis.call('HINCRBY', stats_key, 'latest', latest[kind])
+        redis.call('HSET', stats_key, 'last_write', ARGV[4])
+        redis.call('EXPIRE', stats_key, daily_expire)
+    end
+end
+return count
+"""
+
+    # 服务端一次完成 写入当天列表 + 截断 + 刷新过期时间 + 更新最新快照 + 加入当天索引 + 更新当天统计
+    # KEYS: [股票索引, 股指期货索引, 股票统计, 股指期货统计, 当天列表1, 最新快照1, 当天列表2, 最新快照2, ...]
+    # ARGV: [最大条数, 当天数据过期秒数, 最新数据过期秒数, 写入毫秒时间, 代码1, 是否期货1, 数据1, 代码2, ...]
+    PUSH_TRIM_EXPIRE_SCRIPT = """
+local max_records = tonumber(ARGV[1])
+local daily_expire = tonumber(ARGV[2])
+local latest_expire = tonumber(ARGV[3])
+local count = (#KEYS - 4) / 2
+local codes, records, bytes, latest, written = {0, 0}, {0, 0}, {0, 0}, {0, 0}, {0, 0}
+for i = 0, count - 1 do
+    local today_key = KEYS[5 + i * 2]
+    local payload = ARGV[7 + i * 3]
+    local kind = 1
+    if ARGV[6 + i * 3] == '1' then
+        kind = 2
+    end
+    local length = redis.call('LPUSH', today_key, payload)
+    redis.call('LTRIM', today_key, 0, max_records - 1)
+    redis.call('EXPIRE', today_key, daily_expire)
+    latest[kind] = latest[kind] + 1 - redis.call('EXISTS', KEYS[6 + i * 2])
+    redis.call('SET', KEYS[6 + i * 2], payload, 'EX', latest_expire)
+    codes[kind] = codes[kind] + redis.call('SADD', KEYS[kind], ARGV[5 + i * 3])
+    records[kind] = records[kind] + math.min(length, max_records) - (length - 1)
+    bytes[kind] = bytes[kind] + string.len(payload)
+    written[kind] = written[kind] + 1
+end
+""" + _STATS_EPILOGUE
+
+    # Streams 存储：当天数据写入以tick时间为ID的Stream，MAXLEN~ 近似截断（按节点整块删除，实际条数可能略多于上限）
+    # 同一毫秒或乱序到达的tick沿用最后一条的毫秒数、序号加一，保证ID单调递增
+    # KEYS: [股票索引, 股指期货索引, 股票统计, 股指期货统计, 当天Stream1, 最新快照1, 当天Stream2, 最新快照2, ...]
+    # ARGV: [最大条数, 当天数据过期秒数, 最新数据过期秒数, 写入毫秒时间, 代码1, 是否期货1, 数据1, 毫秒时间1, 代码2, ...]
+    XADD_TRIM_EXPIRE_SCRIPT = """
+local max_records = tonumber(ARGV[1])
+local daily_expire = tonumber(ARGV[2])
+local latest_expire = tonumber(ARGV[3])
+local count = (#KEYS - 4) / 2
+local codes, records, bytes, latest, written = {0, 0}, {0, 0}, {0, 0}, {0, 0}, {0, 0}
+for i = 0, count - 1 do
+    local stream_key = KEYS[5 + i * 2]
+    local payload = ARGV[7 + i * 4]
+    local ms = ARGV[8 + i * 4]
+    local kind = 1
+    if ARGV[6 + i * 4] == '1' then
+        kind = 2
+    end
+    local seq = 0
+    local last = redis.call('XREVRANGE', stream_key, '+', '-', 'COUNT', 1)
+    if #last > 0 then
+        local last_id = last[1][1]
+        local dash = string.find(last_id, '-', 1, true)
+        local last_ms = string.sub(last_id, 1, dash - 1)
+        if tonumber(ms) <= tonumber(last_ms) then
+            ms = last_ms
+            seq = tonumber(string.sub(last_id, dash + 1)) + 1
+        end
+    end
+    local before = redis.call('XLEN', stream_key)
+    redis.call('XADD', stream_key, 'MAXLEN', '~', max_records, ms .. '-' .. seq, 'd', payload)
+    redis.call('EXPIRE', stream_key, daily_expire)
+    latest[kind] = latest[kind] + 1 - redis.call('EXISTS', KEYS[6 + i * 2])
+    redis.call('SET', KEYS[6 + i * 2], payload, 'EX', latest_expire)
+    codes[kind] = codes[kind] + redis.call('SADD', KEYS[kind], ARGV[5 + i * 4])
+    records[kind] = records[kind] + redis.call('XLEN', stream_key) - before
+    bytes[kind] = bytes[kind] + string.len(payload)
+    written[kind] = written[kind] + 1
+end
+""" + _STATS_EPILOGUE
+
+    # Stream 条目里保存序列化tick的字段名
+    STREAM_FIELD = b'd'
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, cache_mode=None, redis_client=None,
+                 history_backend=None):
         """
         初始化Redis缓存管理器
         
@@ -24,15 +224,16 @@ class RedisCacheManager:
             db: Redis数据库编号
             password: Redis密码
             cache_mode: 缓存模式，如果为None则使用全局配置
+            redis_client: 已创建好的Redis客户端（如测试用的fakeredis），传入时忽略host/port等参数
+            history_backend: 当天数据的存储方式，"list" 或 "stream"，如果为None则使用全局配置
         """
+        self.connection_params = (host, port, db, password)
+        self.cleanup_thread = None
+        self.rollup_thread = None
+        self._stop_event = threading.Event()
         try:
-            self.redis_client = redis.Redis(
-                host=host,
-                port=port,
-                db=db,
-                password=password,
-                decode_responses=True  # 自动解码响应
-            )
+            # 同一进程内相同连接参数的管理器共用一个连接池
+            self.redis_client = redis_client or redis.Redis(connection_pool=get_connection_pool(host, port, db, password))
             # 测试连接
             self.redis_client.ping()
             logging.info("Redis连接成功")
@@ -40,16 +241,100 @@ class RedisCacheManager:
             # 获取缓存配置
             self.config = get_cache_config()
             self.cache_mode = cache_mode or self.config.cache_mode
+            self.history_backend = history_backend or self.config.history_backend
+
+            # tick按配置的编码写入，读取时按数据本身识别编码（兼容旧的JSON数据）
+            self.codec = get_tick_codec(self.config.tick_codec)
+            # 二进制编码的tick需要用不自动解码响应的客户端读取
+            if redis_client is None:
+                self.raw_client = redis.Redis(
+                    connection_pool=get_connection_pool(host, port, db, password, decode_responses=False))
+            else:
+                self.raw_client = self._make_raw_client(redis_client)
+
+            # 写入脚本的SHA（按脚本内容缓存），第一次写入时加载；服务端不支持脚本时退回管道写入
+            self._script_shas = {}
+            self._script_supported = True
+
+            # 本地前收盘价缓存 {代码类型: (日期, 版本号, 上次检查时间, {代码: 前收盘价})}
+            self._preclose_cache = {}
+
+            # 每个代码最后写入历史的tick指纹，快照没有变化时只刷新最新数据的过期时间；跨天后清空
+            self._fingerprints = {}
+            self._fingerprint_day = datetime.now().strftime('%Y%m%d')
+            self._tick_counters = {'appended': 0, 'unchanged': 0}
+
+            # 本地5日平均成交量缓存 (日期, 上次加载时间, {代码: 日均成交量})，用于计算量比
+            self._volume_baseline = None
+
+            # 已创建的提示日志消费组 {(日志key, 消费组)}
+            self._alert_groups = set()
             
-            # 启动定时清理任务
+            # 启动定时清理任务，同一个连接池只有第一个管理器启动
             self.running = True
-            self.cleanup_thread = threading.Thread(target=self._cleanup_task, daemon=True)
-            self.cleanup_thread.start()
+            if self._claim_cleanup():
+                self.cleanup_thread = threading.Thread(target=self._cleanup_task, daemon=True)
+                self.cleanup_thread.start()
+                # 分钟线压缩也只由这个管理器负责
+                if self.config.rollup['enabled']:
+                    self.rollup_thread = threading.Thread(target=self._rollup_task, daemon=True)
+                    self.rollup_thread.start()
 
         except Exception as e:
             logging.error(f"Redis连接失败: {e}")
             self.redis_client = None
 
+    @staticmethod
+    def _make_raw_client(client):
+        """
+        为外部传入的客户端创建一个返回bytes的客户端，同一个连接池对应的bytes连接池只创建一次
+        只用到连接池公开的 connection_class / connection_kwargs / max_connections 和 ConnectionPool 的构造参数
+        """
+        pool = client.connection_pool
+        with _pools_lock:
+            raw_pool = _raw_pools.get(pool)
+            if raw_pool is None:
+                connection_kwargs = dict(pool.connection_kwargs)
+                connection_kwargs['decode_responses'] = False
+                raw_pool = redis.ConnectionPool(connection_class=pool.connection_class,
+                                                max_connections=pool.max_connections, **connection_kwargs)
+                _raw_pools[pool] = raw_pool
+        return redis.Redis(connection_pool=raw_pool)
+
+    def _claim_cleanup(self) -> bool:
+        """当前进程里这个连接池还没有清理线程时由本管理器负责清理"""
+        pool = self.redis_client.connection_pool
+        with _pools_lock:
+            if pool in _cleanup_pools:
+                return False
+            _cleanup_pools.add(pool)
+            return True
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池使用情况，decoded 为自动解码的连接池，raw 为读取二进制tick的连接池"""
+        if not self.redis_client:
+            return {}
+        return {"decoded": get_pool_stats(self.redis_client.connection_pool),
+                "raw": get_pool_stats(self.raw_client.connection_pool)}
+
+    def _decode_tick(self, raw) -> Optional[Dict[str, Any]]:
+        """解码一条缓存的tick，无法解析时返回None"""
+        try:
+            return decode_tick(raw)
+        except (ValueError, struct.error) as e:
+            logging.debug(f"解析缓存数据失败: {e}")
+            return None
+
+    def _to_result(self, data: Dict[str, Any], return_stock_data: bool) -> Union[Dict[str, Any], StockTickData]:
+        if not return_stock_data:
+            return data
+        # 尝试转换为StockTickData实例
+        try:
+            return StockTickData.from_dict(data)
+        except Exception as e:
+            logging.debug(f"转换StockTickData失败，使用原始dict: {e}")
+            return data
+
     def _is_futures_code(self, code: str) -> bool:
         return CodeTypeRecognizer.is_futures_code(code)
 
@@ -61,6 +346,22 @@ class RedisCacheManager:
         else:
             return f"stock_data:{stock_code}:{today}"
 
+    def _get_stream_key(self, stock_code: str, day: str = None) -> str:
+        """生成当天的Stream key（history_backend 为 stream 时使用），区分股票和股指期货"""
+        day = day or datetime.now().strftime('%Y%m%d')
+        return f"{self._get_code_type(stock_code)}_ticks:{stock_code}:{day}"
+
+    def _get_history_key(self, stock_code: str) -> str:
+        """按配置的存储方式返回当天数据的key"""
+        if self.history_backend == 'stream':
+            return self._get_stream_key(stock_code)
+        return self._get_today_key(stock_code)
+
+    def _get_bars_key(self, stock_code: str, day: str = None) -> str:
+        """生成当天1分钟线的key（有序集合，score为分钟开始的毫秒时间），区分股票和股指期货"""
+        day = day or datetime.now().strftime('%Y%m%d')
+        return f"{self._get_code_type(stock_code)}_bars:{stock_code}:{day}"
+
     def _get_latest_key(self, stock_code: str) -> str:
         """生成最新数据的key，区分股票和股指期货"""
         if self._is_futures_code(stock_code):
@@ -68,6 +369,76 @@ class RedisCacheManager:
         else:
             return f"stock_latest:{stock_code}"
 
+    def _get_code_type(self, stock_code: str) -> str:
+        return "futures" if self._is_futures_code(stock_code) else "stock"
+
+    def _get_active_codes_key(self, code_type: str, day: str = None) -> str:
+        """生成某天有数据写入的代码索引集合key，区分股票和股指期货"""
+        day = day or datetime.now().strftime('%Y%m%d')
+        return f"active_codes:{code_type}:{day}"
+
+    def _get_stats_key(self, code_type: str, day: str = None) -> str:
+        """当天写入统计（hash：codes、records、bytes、last_write），随写入增量维护"""
+        day = day or datetime.now().strftime('%Y%m%d')
+        return f"cache_stats:{code_type}:{day}"
+
+    def _get_leaderboard_key(self, metric: str, day: str = None) -> str:
+        """当天某个指标的排行榜（有序集合，member为股票代码，score为指标值）"""
+        day = day or datetime.now().strftime('%Y%m%d')
+        return f"leaderboard:{metric}:{day}"
+
+    def _get_volume_baseline_key(self, day: str = None) -> str:
+        """当天量比使用的5日平均成交量（hash，field为股票代码）"""
+        day = day or datetime.now().strftime('%Y%m%d')
+        return f"volume_baseline:{day}"
+
+    def _get_alert_journal_key(self, code_type: str, day: str = None) -> str:
+        """某天的提示日志（Stream，条目ID为写入的毫秒时间），区分股票和股指期货"""
+        day = day or datetime.now().strftime('%Y%m%d')
+        return f"alert_journal:{code_type}:{day}"
+
+    def _index_code(self, pipe, stock_code: str):
+        """在写数据的同一个管道里把代码加入当天的索引集合"""
+        index_key = self._get_active_codes_key(self._get_code_type(stock_code))
+        pipe.sadd(index_key, stock_code)
+        pipe.expire(index_key, self.config.get_expire_seconds('daily_data'))
+
+    def _code_types_of(self, code_type: str) -> List[str]:
+        return ["stock", "futures"] if code_type == "all" else [code_type]
+
+    def get_active_codes(self, code_type: str = "all", day: str = None) -> List[str]:
+        """
+        获取某天有数据写入的代码，读取索引集合，不遍历keyspace
+
+        Args:
+            code_type: 代码类型，"stock"、"futures" 或 "all"
+            day: 日期（YYYYMMDD），None表示当天
+
+        Returns:
+            List[str]: 代码列表
+        """
+        if not self.redis_client:
+            return []
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for one_type in self._code_types_of(code_type):
+            pipe.smembers(self._get_active_codes_key(one_type, day))
+        codes = []
+        for members in pipe.execute():
+            codes.extend(sorted(members))
+        return codes
+
+    def _scan_keys(self, pattern: str) -> List[str]:
+        """按游标SCAN匹配的key，只用于维护类操作，不会长时间阻塞Redis"""
+        return list(self.redis_client.scan_iter(match=pattern, count=self.SCAN_BATCH_SIZE))
+
+    def _delete_keys(self, keys: List[str]) -> int:
+        """分批删除key，返回删除数量"""
+        deleted = 0
+        for start in range(0, len(keys), self.SCAN_BATCH_SIZE):
+            deleted += self.redis_client.delete(*keys[start:start + self.SCAN_BATCH_SIZE])
+        return deleted
+
     def _get_filter_cache_key(self, conditions: Dict) -> str:
         """生成筛选结果缓存key"""
         import hashlib
@@ -75,13 +446,17 @@ class RedisCacheManager:
         hash_value = hashlib.md5(conditions_str.encode()).hexdigest()
         return f"filter_cache:{hash_value}"
 
-    def _get_preclose_key(self, code_type: str = "stock") -> str:
-        """生成前收盘价缓存key，区分股票和股指期货"""
-        today = datetime.now().strftime('%Y%m%d')
+    def _get_preclose_key(self, code_type: str = "stock", day: str = None) -> str:
+        """生成前收盘价缓存key（hash，field为代码），区分股票和股指期货"""
+        day = day or datetime.now().strftime('%Y%m%d')
         if code_type == "futures":
-            return f"futures_preclose:{today}"
+            return f"futures_preclose:{day}"
         else:
-            return f"preclose:{today}"
+            return f"preclose:{day}"
+
+    def _get_preclose_version_key(self, code_type: str = "stock", day: str = None) -> str:
+        """前收盘价的版本号，每次整体写入时加一，用于让各进程的本地缓存失效"""
+        return f"{self._get_preclose_key(code_type, day)}:version"
 
     def _prepare_data_for_cache(self, data: Union[Dict, StockTickData]) -> Dict[str, Any]:
         """
@@ -93,7 +468,7 @@ class RedisCacheManager:
         Returns:
             Dict: 准备缓存的数据
         """
-        if isinstance(data, StockTickData):
+        if isinstance(data, (StockTickData, SlottedStockTickData)):
             # 如果是StockTickData实例，根据缓存模式选择字段
             if self.cache_mode == CacheMode.ESSENTIAL.value:
                 return data.get_essential_fields()
@@ -145,6 +520,317 @@ class RedisCacheManager:
         except Exception as e:
             logging.error(f"限制缓存大小失败 {stock_code}: {e}")
 
+    @staticmethod
+    def _tick_time_ms(data: Dict[str, Any]) -> int:
+        """
+        tick时间转为毫秒时间戳，作为Stream ID和时间窗口过滤的依据
+        支持毫秒时间戳（13位）和 YYYYMMDDHHMMSS（本地时间），都不是时用缓存时间戳，再不行用当前时间
+        """
+        value = str(data.get('time', ''))
+        if value.isdigit():
+            if len(value) == 13:
+                return int(value)
+            if len(value) == 14:
+                try:
+                    return int(datetime.strptime(value, '%Y%m%d%H%M%S').timestamp() * 1000)
+                except ValueError:
+                    pass
+        try:
+            return int(datetime.fromisoformat(data['timestamp']).timestamp() * 1000)
+        except (KeyError, TypeError, ValueError):
+            return int(time.time() * 1000)
+
+    @staticmethod
+    def _to_ms(moment: Union[datetime, int, None]) -> Optional[int]:
+        if moment is None or isinstance(moment, int):
+            return moment
+        return int(moment.timestamp() * 1000)
+
+    @staticmethod
+    def _tick_fingerprint(data: Dict[str, Any]) -> Optional[tuple]:
+        """tick时间、成交量和价格组成的指纹，缺少tick时间时返回None（总是写入）"""
+        if data.get('time') in (None, ''):
+            return None
+        return (data.get('time'), data.get('volume'), data.get('amount'), data.get('lastPrice'),
+                data.get('high'), data.get('low'))
+
+    def _serialize_tick(self, stock_code: str, data: Union[Dict[str, Any], StockTickData]) -> tuple:
+        """
+        按缓存模式准备数据，并用配置的编码序列化
+        返回 (代码, 序列化后的数据, tick毫秒时间, 指纹, 排行榜指标)
+        """
+        cache_data = self._prepare_data_for_cache(data)
+        fingerprint = self._tick_fingerprint(cache_data)
+
+        # 确保有时间戳
+        if 'timestamp' not in cache_data:
+            cache_data['timestamp'] = datetime.now().isoformat()
+        time_ms = self._tick_time_ms(cache_data)
+        return (stock_code, self.codec.encode(cache_data), time_ms, fingerprint,
+                self._leaderboard_metrics(stock_code, cache_data, time_ms))
+
+    @staticmethod
+    def _elapsed_trading_minutes(time_ms: int) -> float:
+        """tick时间当天已经过的连续竞价分钟数（9:30-11:30、13:00-15:00），收盘后为240"""
+        moment = datetime.fromtimestamp(time_ms / 1000)
+        minutes = moment.hour * 60 + moment.minute + moment.second / 60
+        return min(max(minutes - 570, 0), 120) + min(max(minutes - 780, 0), 120)
+
+    def _get_volume_baseline(self) -> Dict[str, float]:
+        """
+        读取本地5日平均成交量缓存，日期变化时从Redis重新加载
+        当天还没有数据时最多每 PRECLOSE_VERSION_CHECK_SECONDS 秒重新读取一次，返回的字典不要修改
+        """
+        today = datetime.now().strftime('%Y%m%d')
+        now = time.monotonic()
+        cached = self._volume_baseline
+        if cached and cached[0] == today and (cached[2] or now - cached[1] < self.PRECLOSE_VERSION_CHECK_SECONDS):
+            return cached[2]
+
+        data = {code: float(value)
+                for code, value in self.redis_client.hgetall(self._get_volume_baseline_key(today)).items()}
+        self._volume_baseline = (today, now, data)
+        return data
+
+    def _leaderboard_metrics(self, stock_code: str, data: Dict[str, Any], time_ms: int) -> Dict[str, float]:
+        """
+        计算一条tick的排行榜指标，股指期货和没有价格或前收盘价的tick不参与排行
+        量比 = 当前成交量 / (5日平均成交量 × 已交易分钟数 / 240)，没有5日平均成交量时不计算
+        """
+        if self._is_futures_code(stock_code):
+            return {}
+        try:
+            last_price = float(data.get('lastPrice') or 0)
+            preclose = float(data.get('lastClose') or 0) or float(self.get_stock_preclose(stock_code) or 0)
+            high, low = float(data.get('high') or 0), float(data.get('low') or 0)
+            volume, amount = float(data.get('volume') or 0), float(data.get('amount') or 0)
+        except (TypeError, ValueError):
+            return {}
+        if last_price <= 0 or preclose <= 0:
+            return {}
+
+        metrics = {'pct_change': round((last_price - preclose) / preclose * 100, 4), 'turnover': amount}
+        if high > 0 and low > 0:
+            metrics['amplitude'] = round((high - low) / preclose * 100, 4)
+        baseline = self._get_volume_baseline().get(stock_code)
+        elapsed = self._elapsed_trading_minutes(time_ms)
+        if baseline and elapsed >= 1:
+            metrics['volume_ratio'] = round(volume / (baseline * elapsed / 240), 4)
+        return metrics
+
+    def _update_leaderboards(self, pipe, leaderboard: Optional[Dict[str, Dict[str, float]]]):
+        """在写入tick的同一个管道里更新排行榜，每个指标一条ZADD"""
+        if not leaderboard:
+            return
+        expire_seconds = self.config.get_expire_seconds('daily_data')
+        for metric in LEADERBOARD_METRICS:
+            scores = {code: metrics[metric] for code, metrics in leaderboard.items() if metric in metrics}
+            if scores:
+                key = self._get_leaderboard_key(metric)
+                pipe.zadd(key, scores)
+                pipe.expire(key, expire_seconds)
+
+    def _refresh_latest(self, stock_codes: List[str],
+                        leaderboard: Optional[Dict[str, Dict[str, float]]] = None) -> List[str]:
+        """
+        刷新最新数据的过期时间，返回需要完整写入的代码：最新数据已经不存在（过期或被清理），
+        或者不在当天的索引集合里（当天历史还没有这个代码，如其他进程清理过当天数据）
+        量比随时间变化，没有变化的tick也在同一个管道里更新排行榜
+        """
+        latest_expire = self.config.get_expire_seconds('latest_data')
+        pipe = self.redis_client.pipeline(transaction=False)
+        for stock_code in stock_codes:
+            pipe.expire(self._get_latest_key(stock_code), latest_expire)
+            pipe.sismember(self._get_active_codes_key(self._get_code_type(stock_code)), stock_code)
+        self._update_leaderboards(pipe, leaderboard)
+        results = pipe.execute()
+        return [stock_code for index, stock_code in enumerate(stock_codes)
+                if not (results[index * 2] and results[index * 2 + 1])]
+
+    def _write_changed_ticks(self, prepared: List[tuple]):
+        """
+        只把相对上次写入有变化的tick追加到当天历史，没有变化的只刷新最新数据的过期时间
+
+        Args:
+            prepared: [(代码, 序列化后的数据, tick毫秒时间, 指纹, 排行榜指标)]
+        """
+        today = datetime.now().strftime('%Y%m%d')
+        if today != self._fingerprint_day:
+            # 新的一天还没有历史和索引，每个代码的第一条tick都要完整写入
+            self._fingerprints.clear()
+            self._fingerprint_day = today
+        changed, unchanged = [], {}
+        for entry in prepared:
+            stock_code, fingerprint = entry[0], entry[3]
+            if (self.config.skip_unchanged_ticks and fingerprint is not None
+                    and self._fingerprints.get(stock_code) == fingerprint):
+                unchanged[stock_code] = entry
+            else:
+                changed.append(entry)
+
+        if unchanged:
+            # 最新数据已不存在（如Redis重启）或当天索引里没有时按有变化处理，重新写入
+            leaderboard = {stock_code: entry[4] for stock_code, entry in unchanged.items() if entry[4]}
+            missing = self._refresh_latest(list(unchanged), leaderboard)
+            changed.extend(unchanged.pop(stock_code) for stock_code in missing)
+        if changed:
+            self._write_ticks([(stock_code, payload, time_ms) for stock_code, payload, time_ms, _, _ in changed],
+                              {entry[0]: entry[4] for entry in changed if entry[4]})
+            for stock_code, _, _, fingerprint, _ in changed:
+                self._fingerprints[stock_code] = fingerprint
+        self._tick_counters['appended'] += len(changed)
+        self._tick_counters['unchanged'] += len(unchanged)
+
+    def _load_script(self, script: str) -> Optional[str]:
+        """加载写入脚本，返回SHA；服务端不支持脚本时返回None"""
+        if script not in self._script_shas and self._script_supported:
+            try:
+                self._script_shas[script] = self.redis_client.script_load(script)
+            except redis.exceptions.ResponseError as e:
+                logging.warning(f"Redis不支持Lua脚本，退回管道写入: {e}")
+                self._script_supported = False
+        return self._script_shas.get(script)
+
+    def _write_ticks(self, entries: List[tuple], leaderboard: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        写入一批已序列化的tick，按SCRIPT_CHUNK_SIZE分块调用EVALSHA，所有分块在一次往返内发送
+
+        Args:
+            entries: [(代码, 序列化后的数据, tick毫秒时间)]
+            leaderboard: {代码: {指标: 值}}，在同一次往返内更新排行榜
+        """
+        stream = self.history_backend == 'stream'
+        script = self.XADD_TRIM_EXPIRE_SCRIPT if stream else self.PUSH_TRIM_EXPIRE_SCRIPT
+        if self._load_script(script) is None:
+            if stream:
+                self._write_stream_pipeline(entries, leaderboard)
+            else:
+                self._write_ticks_pipeline(entries, leaderboard)
+            return
+
+        common_args = [self.config.get_max_records_per_stock(),
+                       self.config.get_expire_seconds('daily_data'),
+                       self.config.get_expire_seconds('latest_data'),
+                       int(time.time() * 1000)]
+        index_keys = [self._get_active_codes_key("stock"), self._get_active_codes_key("futures"),
+                      self._get_stats_key("stock"), self._get_stats_key("futures")]
+        for attempt in range(2):
+            pipe = self.redis_client.pipeline(transaction=False)
+            for start in range(0, len(entries), self.SCRIPT_CHUNK_SIZE):
+                keys = list(index_keys)
+                args = list(common_args)
+                for stock_code, payload, time_ms in entries[start:start + self.SCRIPT_CHUNK_SIZE]:
+                    keys.extend((self._get_history_key(stock_code), self._get_latest_key(stock_code)))
+                    args.extend((stock_code, '1' if self._is_futures_code(stock_code) else '0', payload))
+                    if stream:
+                        args.append(time_ms)
+                pipe.evalsha(self._script_shas[script], len(keys), *keys, *args)
+            self._update_leaderboards(pipe, leaderboard)
+            try:
+                pipe.execute()
+                return
+            except redis.exceptions.NoScriptError:
+                # Redis重启或执行过SCRIPT FLUSH，重新加载后再试一次
+                if attempt:
+                    raise
+                self._script_shas.pop(script, None)
+                self._load_script(script)
+
+    def _add_stats_delta(self, deltas: Dict[str, Dict[str, int]], stock_code: str, added: int, records: int,
+                         size: int, latest_existed: int):
+        """
+        累加一条写入对当天统计的影响，added 为SADD的返回值，records 为保留记录数的变化，
+        latest_existed 为写入前最新快照是否存在（EXISTS的返回值）
+        """
+        delta = deltas.setdefault(self._get_code_type(stock_code),
+                                  {'codes': 0, 'records': 0, 'bytes': 0, 'latest': 0})
+        delta['codes'] += added
+        delta['records'] += records
+        delta['bytes'] += size
+        delta['latest'] += 1 - latest_existed
+
+    def _write_stats_deltas(self, deltas: Dict[str, Dict[str, int]]):
+        """不支持脚本时把一批写入的统计增量写入当天统计hash"""
+        expire_seconds = self.config.get_expire_seconds('daily_data')
+        pipe = self.redis_client.pipeline()
+        for code_type, delta in deltas.items():
+            stats_key = self._get_stats_key(code_type)
+            for field, value in delta.items():
+                pipe.hincrby(stats_key, field, value)
+            pipe.hset(stats_key, 'last_write', int(time.time() * 1000))
+            pipe.expire(stats_key, expire_seconds)
+        pipe.execute()
+
+    def _write_ticks_pipeline(self, entries: List[tuple], leaderboard: Optional[Dict[str, Dict[str, float]]] = None):
+        """不支持脚本时的写入方式：管道写入后逐个代码截断列表"""
+        expire_seconds = self.config.get_expire_seconds('daily_data')
+        latest_expire = self.config.get_expire_seconds('latest_data')
+        max_records = self.config.get_max_records_per_stock()
+        pipe = self.redis_client.pipeline()
+        for stock_code, payload, _ in entries:
+            # 缓存到当天的历史数据列表
+            today_key = self._get_today_key(stock_code)
+            pipe.lpush(today_key, payload)
+            pipe.expire(today_key, expire_seconds)
+
+            # 更新最新数据
+            pipe.exists(self._get_latest_key(stock_code))
+            pipe.setex(self._get_latest_key(stock_code), latest_expire, payload)
+            self._index_code(pipe, stock_code)
+        self._update_leaderboards(pipe, leaderboard)
+        results = pipe.execute()
+
+        # 每个代码依次是 LPUSH、EXPIRE、EXISTS、SETEX、SADD、EXPIRE 的结果，截断在下面完成
+        deltas = {}
+        for index, (stock_code, payload, _) in enumerate(entries):
+            length, existed, added = results[index * 6], results[index * 6 + 2], results[index * 6 + 4]
+            self._add_stats_delta(deltas, stock_code, added, min(length, max_records) - (length - 1), len(payload),
+                                  existed)
+        self._write_stats_deltas(deltas)
+
+        # 限制缓存大小
+        for stock_code, _, _ in entries:
+            self._limit_cache_size(stock_code)
+
+    def _write_stream_pipeline(self, entries: List[tuple], leaderboard: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        不支持脚本时写入Stream：按tick时间指定ID（ms-*，需要Redis 7.0+），
+        ID小于已有最后一条（乱序）或服务端不支持时改用服务端生成的ID
+        """
+        expire_seconds = self.config.get_expire_seconds('daily_data')
+        latest_expire = self.config.get_expire_seconds('latest_data')
+        max_records = self.config.get_max_records_per_stock()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for stock_code, payload, time_ms in entries:
+            stream_key = self._get_stream_key(stock_code)
+            pipe.xlen(stream_key)
+            pipe.xadd(stream_key, {self.STREAM_FIELD: payload}, id=f"{time_ms}-*", maxlen=max_records,
+                      approximate=True)
+        results = pipe.execute(raise_on_error=False)
+
+        for (stock_code, payload, _), result in zip(entries, results[1::2]):
+            if isinstance(result, redis.exceptions.ResponseError):
+                pipe.xadd(self._get_stream_key(stock_code), {self.STREAM_FIELD: payload}, maxlen=max_records,
+                          approximate=True)
+        pipe.execute()
+
+        for stock_code, payload, _ in entries:
+            stream_key = self._get_stream_key(stock_code)
+            pipe.expire(stream_key, expire_seconds)
+            pipe.exists(self._get_latest_key(stock_code))
+            pipe.setex(self._get_latest_key(stock_code), latest_expire, payload)
+            self._index_code(pipe, stock_code)
+            pipe.xlen(stream_key)
+        self._update_leaderboards(pipe, leaderboard)
+        after = pipe.execute()
+
+        # 每个代码依次是 EXPIRE、EXISTS、SETEX、SADD、EXPIRE、XLEN 的结果
+        deltas = {}
+        for index, (stock_code, payload, _) in enumerate(entries):
+            existed, added, length = after[index * 6 + 1], after[index * 6 + 3], after[index * 6 + 5]
+            self._add_stats_delta(deltas, stock_code, added, length - results[index * 2], len(payload), existed)
+        self._write_stats_deltas(deltas)
+
     def cache_stock_data(self, stock_code: str, data: Union[Dict[str, Any], StockTickData]) -> bool:
         """
         缓存单只股票或股指期货的实时数据
@@ -160,29 +846,7 @@ class RedisCacheManager:
             return False
 
         try:
-            # 准备缓存数据
-            cache_data = self._prepare_data_for_cache(data)
-            
-            # 确保有时间戳
-            if 'timestamp' not in cache_data:
-                cache_data['timestamp'] = datetime.now().isoformat()
-
-            # 缓存到当天的历史数据列表
-            today_key = self._get_today_key(stock_code)
-            self.redis_client.lpush(today_key, json.dumps(cache_data, ensure_ascii=False))
-
-            # 限制缓存大小
-            self._limit_cache_size(stock_code)
-
-            # 设置过期时间（第二天凌晨自动过期）
-            expire_seconds = self.config.get_expire_seconds('daily_data')
-            self.redis_client.expire(today_key, expire_seconds)
-
-            # 更新最新数据
-            latest_key = self._get_latest_key(stock_code)
-            latest_expire = self.config.get_expire_seconds('latest_data')
-            self.redis_client.setex(latest_key, latest_expire, json.dumps(cache_data, ensure_ascii=False))
-
+            self._write_changed_ticks([self._serialize_tick(stock_code, data)])
             return True
 
         except Exception as e:
@@ -203,41 +867,56 @@ class RedisCacheManager:
             return False
 
         try:
-            # 使用管道批量操作
-            pipe = self.redis_client.pipeline()
+            prepared = [self._serialize_tick(stock_code, data) for stock_code, data in stocks_data.items()]
+            if prepared:
+                self._write_changed_ticks(prepared)
+            return True
 
-            for stock_code, data in stocks_data.items():
-                # 准备缓存数据
-                cache_data = self._prepare_data_for_cache(data)
-                
-                # 确保有时间戳
-                if 'timestamp' not in cache_data:
-                    cache_data['timestamp'] = datetime.now().isoformat()
+        except Exception as e:
+            logging.error(f"批量缓存数据失败: {e}")
+            return False
 
-                # 缓存到当天的历史数据列表
-                today_key = self._get_today_key(stock_code)
-                pipe.lpush(today_key, json.dumps(cache_data, ensure_ascii=False))
+    def cache_tick_batch(self, batch: TickBatch) -> bool:
+        """
+        批量缓存一批列存tick，与 cache_stocks_batch 写入相同的数据，但不为每条tick构造 StockTickData：
+        按缓存模式整列编码（struct 编码时一次 tobytes 再按行切分），指纹和排行榜指标从列中读取
 
-                # 设置过期时间
-                expire_seconds = self.config.get_expire_seconds('daily_data')
-                pipe.expire(today_key, expire_seconds)
+        Args:
+            batch: TickBatch，如 TickBatch.from_xtquant(行情数据)
 
-                # 更新最新数据
-                latest_key = self._get_latest_key(stock_code)
-                latest_expire = self.config.get_expire_seconds('latest_data')
-                pipe.setex(latest_key, latest_expire, json.dumps(cache_data, ensure_ascii=False))
+        Returns:
+            bool: 是否成功缓存
+        """
+        if not self.redis_client:
+            return False
 
-            # 执行批量操作
-            pipe.execute()
-            
-            # 批量限制缓存大小
-            for stock_code in stocks_data.keys():
-                self._limit_cache_size(stock_code)
-                
+        try:
+            if not len(batch):
+                return True
+            full = self.cache_mode != CacheMode.ESSENTIAL.value
+            payloads = batch.encode(self.codec, full=full)
+
+            columns = {name: batch[name].tolist() for name in ('volume', 'amount', 'lastPrice', 'high', 'low',
+                                                               'lastClose')}
+            times = batch['time'].tolist()
+            prepared = []
+            for index, stock_code in enumerate(batch.codes):
+                if index in batch.fallback or not 10 ** 12 <= times[index] < 10 ** 13:
+                    # 不是13位毫秒时间的tick按字典计算，与 cache_stocks_batch 一致
+                    data = batch.record(index, full=False)
+                    fingerprint, time_ms = self._tick_fingerprint(data), self._tick_time_ms(data)
+                else:
+                    data = {name: values[index] for name, values in columns.items()}
+                    time_ms = times[index]
+                    fingerprint = (str(time_ms), data['volume'], data['amount'], data['lastPrice'], data['high'],
+                                   data['low'])
+                prepared.append((stock_code, payloads[index], time_ms, fingerprint,
+                                 self._leaderboard_metrics(stock_code, data, time_ms)))
+            self._write_changed_ticks(prepared)
             return True
 
         except Exception as e:
-            logging.error(f"批量缓存数据失败: {e}")
+            logging.error(f"批量缓存列存数据失败: {e}")
             return False
 
     def get_stock_data_today(self, stock_code: str, limit: Optional[int] = None, return_stock_data: bool = False) -> List[Union[Dict[str, Any], StockTickData]]:
@@ -256,30 +935,20 @@ class RedisCacheManager:
             return []
 
         try:
-            today_key = self._get_today_key(stock_code)
-
-            if limit:
-                data_list = self.redis_client.lrange(today_key, 0, limit - 1)
+            if self.history_backend == 'stream':
+                entries = self.raw_client.xrevrange(self._get_stream_key(stock_code), count=limit or None)
+                data_list = [fields.get(self.STREAM_FIELD) for _, fields in entries]
+            elif limit:
+                data_list = self.raw_client.lrange(self._get_today_key(stock_code), 0, limit - 1)
             else:
-                data_list = self.redis_client.lrange(today_key, 0, -1)
+                data_list = self.raw_client.lrange(self._get_today_key(stock_code), 0, -1)
 
-            # 解析JSON数据
+            # 解码数据，兼容旧的JSON格式
             result = []
-            for data_str in data_list:
-                try:
-                    data = json.loads(data_str)
-                    if return_stock_data:
-                        # 尝试转换为StockTickData实例
-                        try:
-                            stock_data = StockTickData.from_dict(data)
-                            result.append(stock_data)
-                        except Exception as e:
-                            logging.debug(f"转换StockTickData失败，使用原始dict: {e}")
-                            result.append(data)
-                    else:
-                        result.append(data)
-                except json.JSONDecodeError:
-                    continue
+            for raw in data_list:
+                data = self._decode_tick(raw)
+                if data is not None:
+                    result.append(self._to_result(data, return_stock_data))
 
             return result
 
@@ -287,6 +956,325 @@ class RedisCacheManager:
             logging.error(f"获取当天数据失败 {stock_code}: {e}")
             return []
 
+    def get_stock_data_window(self, stock_code: str, start: Union[datetime, int, None] = None,
+                              end: Union[datetime, int, None] = None, minutes: Optional[float] = None,
+                              count: Optional[int] = None,
+                              return_stock_data: bool = False) -> List[Union[Dict[str, Any], StockTickData]]:
+        """
+        按tick时间获取某只股票或股指期货当天某个时间窗口内的数据
+        stream 存储时用 XRANGE/XREVRANGE 只读取窗口内的条目；list 存储时读取当天全部数据后按时间过滤
+
+        Args:
+            stock_code: 股票代码或股指期货代码
+            start: 窗口开始时间（datetime 或毫秒时间戳），None表示不限
+            end: 窗口结束时间（datetime 或毫秒时间戳），None表示不限
+            minutes: 最近N分钟，指定时忽略start，从 end（None时为当前时间）往前推
+            count: 最多返回窗口内最新的多少条，None表示不限
+            return_stock_data: 是否返回StockTickData实例，False返回dict
+
+        Returns:
+            List[Dict] 或 List[StockTickData]: 数据列表，按时间正序排列
+        """
+        if not self.redis_client:
+            return []
+
+        try:
+            end_ms = self._to_ms(end)
+            start_ms = self._to_ms(start)
+            if minutes is not None:
+                start_ms = (end_ms if end_ms is not None else int(time.time() * 1000)) - int(minutes * 60000)
+
+            if self.history_backend == 'stream':
+                # 按最新的count条读取，再翻转为正序
+                entries = self.raw_client.xrevrange(self._get_stream_key(stock_code),
+                                                    max='+' if end_ms is None else end_ms,
+                                                    min='-' if start_ms is None else start_ms,
+                                                    count=count)
+                decoded = (self._decode_tick(fields.get(self.STREAM_FIELD)) for _, fields in reversed(entries))
+                records = [data for data in decoded if data is not None]
+            else:
+                records = []
+                for raw in reversed(self.raw_client.lrange(self._get_today_key(stock_code), 0, -1)):
+                    data = self._decode_tick(raw)
+                    if data is None:
+                        continue
+                    time_ms = self._tick_time_ms(data)
+                    if (start_ms is None or time_ms >= start_ms) and (end_ms is None or time_ms <= end_ms):
+                        records.append(data)
+                if count:
+                    records = records[-count:]
+
+            return [self._to_result(data, return_stock_data) for data in records]
+
+        except Exception as e:
+            logging.error(f"获取时间窗口数据失败 {stock_code}: {e}")
+            return []
+
+    def get_stock_data_since(self, stock_code: str, watermark: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按写入顺序获取某只股票或股指期货写入时间戳（timestamp）晚于 watermark 的当天数据，用于增量消费
+        从最新一条往前分页读取（第一页 SINCE_PAGE_SIZE 条，之后翻倍），遇到不晚于水位的记录即停止
+
+        Args:
+            stock_code: 股票代码或股指期货代码
+            watermark: 已处理的最后一条数据的 timestamp，None表示读取当天全部数据
+
+        Returns:
+            List[Dict]: 数据列表，按写入顺序正序排列
+        """
+        if not self.redis_client:
+            return []
+        if watermark is None:
+            return list(reversed(self.get_stock_data_today(stock_code)))
+
+        try:
+            records = []
+            stream = self.history_backend == 'stream'
+            key = self._get_history_key(stock_code)
+            page, offset, cursor = self.SINCE_PAGE_SIZE, 0, '+'
+            while True:
+                if stream:
+                    entries = self.raw_client.xrevrange(key, max=cursor, min='-', count=page)
+                    raws = [fields.get(self.STREAM_FIELD) for _, fields in entries]
+                    if entries:
+                        cursor = b'(' + entries[-1][0]
+                else:
+                    raws = self.raw_client.lrange(key, offset, offset + page - 1)
+                    offset += len(raws)
+                for raw in raws:
+                    data = self._decode_tick(raw)
+                    if data is None:
+                        continue
+                    if str(data.get('timestamp', '')) <= watermark:
+                        return records[::-1]
+                    records.append(data)
+                if len(raws) < page:
+                    return records[::-1]
+                page *= 2
+
+        except Exception as e:
+            logging.error(f"增量获取数据失败 {stock_code}: {e}")
+            return []
+
+    @staticmethod
+    def _encode_bar(bar: Dict[str, Any]) -> str:
+        """分钟线编码为有序集合成员：分钟毫秒时间|开|高|低|收|累计成交量|累计成交额|tick数"""
+        return '|'.join(repr(bar[name]) for name in ROLLUP_FIELDS)
+
+    @staticmethod
+    def _decode_bar(member: Union[str, bytes]) -> Dict[str, Any]:
+        if isinstance(member, bytes):
+            member = member.decode()
+        values = member.split('|')
+        bar = {name: float(value) for name, value in zip(ROLLUP_FIELDS, values)}
+        bar['minute'] = int(values[0])
+        bar['ticks'] = int(values[-1])
+        return bar
+
+    def _aggregate_ticks(self, ticks: List[Dict[str, Any]], bars: Dict[int, Dict[str, Any]]):
+        """把tick按到达顺序合并进分钟线字典 {分钟毫秒时间: 分钟线}，价格取lastPrice，成交量和成交额保留累计值"""
+        for data in ticks:
+            time_ms = self._tick_time_ms(data)
+            minute = time_ms - time_ms % 60000
+            price = float(data.get('lastPrice', 0) or 0)
+            volume = float(data.get('volume', 0) or 0)
+            amount = float(data.get('amount', 0) or 0)
+            bar = bars.get(minute)
+            if bar is None:
+                bars[minute] = {'minute': minute, 'open': price, 'high': price, 'low': price, 'close': price,
+                                'cum_volume': volume, 'cum_amount': amount, 'ticks': 1}
+                continue
+            bar['high'] = max(bar['high'], price)
+            bar['low'] = min(bar['low'], price)
+            bar['close'] = price
+            bar['cum_volume'] = max(bar['cum_volume'], volume)
+            bar['cum_amount'] = max(bar['cum_amount'], amount)
+            bar['ticks'] += 1
+
+    @staticmethod
+    def _merge_bar(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+        """合并同一分钟先后两部分数据（已压缩的分钟线和之后到达的tick）"""
+        return {'minute': older['minute'], 'open': older['open'], 'high': max(older['high'], newer['high']),
+                'low': min(older['low'], newer['low']), 'close': newer['close'],
+                'cum_volume': max(older['cum_volume'], newer['cum_volume']),
+                'cum_amount': max(older['cum_amount'], newer['cum_amount']),
+                'ticks': older['ticks'] + newer['ticks']}
+
+    def compact_rollups(self, now: Union[datetime, int, None] = None) -> int:
+        """
+        把早于 rollup.horizon_minutes 的原始tick合并为1分钟线写入有序集合，并从当天历史中删除这些tick
+        只压缩完整的分钟；WATCH 当天历史和分钟线两个key，读取旧tick和已有分钟线、合并、写入和删除在同一个事务里完成，
+        期间有其他写入时重试（列表存储从尾部即最旧的一端按块读取）
+
+        Args:
+            now: 当前时间（datetime 或毫秒时间戳），None表示当前时间
+
+        Returns:
+            int: 压缩掉的tick条数
+        """
+        if not self.redis_client:
+            return 0
+
+        now_ms = self._to_ms(now) if now is not None else int(time.time() * 1000)
+        cutoff = now_ms - self.config.rollup['horizon_minutes'] * 60000
+        cutoff -= cutoff % 60000
+        compacted = 0
+        compact = self._compact_stream if self.history_backend == 'stream' else self._compact_list
+        for stock_code in self.get_active_codes("all"):
+            try:
+                for attempt in range(self.ROLLUP_RETRIES):
+                    try:
+                        compacted += compact(stock_code, cutoff)
+                        break
+                    except redis.exceptions.WatchError:
+                        if attempt == self.ROLLUP_RETRIES - 1:
+                            raise
+            except redis.exceptions.WatchError:
+                logging.debug(f"{stock_code} 压缩时有新数据写入，下一轮再压缩")
+            except Exception as e:
+                logging.error(f"压缩分钟线失败 {stock_code}: {e}")
+        return compacted
+
+    def _compact_list(self, stock_code: str, cutoff: int) -> int:
+        today_key = self._get_today_key(stock_code)
+        bars_key = self._get_bars_key(stock_code)
+        chunk = self.config.rollup['chunk_size']
+        with self.raw_client.pipeline() as pipe:
+            pipe.watch(today_key, bars_key)
+            old_ticks = []
+            while True:
+                # 列表头部是最新数据，从尾部往前按块读取，直到遇到不早于cutoff的tick
+                raw_list = pipe.lrange(today_key, -(len(old_ticks) + chunk), -(len(old_ticks) + 1))
+                reached_recent = False
+                for raw in reversed(raw_list):
+                    data = self._decode_tick(raw)
+                    if data is not None and self._tick_time_ms(data) >= cutoff:
+                        reached_recent = True
+                        break
+                    old_ticks.append(data)
+                if reached_recent or len(raw_list) < chunk:
+                    break
+            if not old_ticks:
+                return 0
+
+            bars, replaced = self._merge_rollups(pipe, bars_key, [data for data in old_ticks if data is not None])
+            pipe.multi()
+            self._write_rollups(pipe, bars_key, bars, replaced)
+            pipe.ltrim(today_key, 0, -(len(old_ticks) + 1))
+            pipe.hincrby(self._get_stats_key(self._get_code_type(stock_code)), 'records', -len(old_ticks))
+            pipe.execute()
+        return len(old_ticks)
+
+    def _compact_stream(self, stock_code: str, cutoff: int) -> int:
+        stream_key = self._get_stream_key(stock_code)
+        bars_key = self._get_bars_key(stock_code)
+        with self.raw_client.pipeline() as pipe:
+            pipe.watch(stream_key, bars_key)
+            entries = pipe.xrange(stream_key, min='-', max=cutoff - 1)
+            if not entries:
+                return 0
+            decoded = (self._decode_tick(fields.get(self.STREAM_FIELD)) for _, fields in entries)
+            bars, replaced = self._merge_rollups(pipe, bars_key, [data for data in decoded if data is not None])
+            pipe.multi()
+            self._write_rollups(pipe, bars_key, bars, replaced)
+            pipe.xdel(stream_key, *[entry_id for entry_id, _ in entries])
+            pipe.hincrby(self._get_stats_key(self._get_code_type(stock_code)), 'records', -len(entries))
+            pipe.execute()
+        return len(entries)
+
+    def _merge_rollups(self, pipe, bars_key: str, ticks: List[Dict[str, Any]]):
+        """
+        WATCH 之后、MULTI 之前用同一个管道读取同一分钟已有的分钟线并合并
+        Returns:
+            ({分钟: 合并后的分钟线}, 已有分钟线需要替换的分钟集合)
+        """
+        bars = {}
+        self._aggregate_ticks(ticks, bars)
+        if not bars:
+            return bars, set()
+        replaced = set()
+        for member in pipe.zrangebyscore(bars_key, min(bars), max(bars)):
+            existing = self._decode_bar(member)
+            minute = existing['minute']
+            if minute in bars:
+                bars[minute] = self._merge_bar(existing, bars[minute])
+                replaced.add(minute)
+        return bars, replaced
+
+    def _write_rollups(self, pipe, bars_key: str, bars: Dict[int, Dict[str, Any]], replaced: set):
+        """在事务中写入合并后的分钟线，替换同一分钟已有的分钟线"""
+        if not bars:
+            return
+        for minute, bar in bars.items():
+            if minute in replaced:
+                pipe.zremrangebyscore(bars_key, minute, minute)
+            pipe.zadd(bars_key, {self._encode_bar(bar): minute})
+        pipe.expire(bars_key, self.config.get_expire_seconds('daily_data'))
+
+    def get_minute_bars(self, stock_code: str, start: Union[datetime, int, None] = None,
+                        end: Union[datetime, int, None] = None, minutes: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        获取当天的1分钟线：已压缩的分钟线加上尚未压缩的原始tick现场合并，两部分衔接为一个序列
+
+        Args:
+            stock_code: 股票代码或股指期货代码
+            start: 开始时间（datetime 或毫秒时间戳），None表示不限
+            end: 结束时间（datetime 或毫秒时间戳），None表示不限
+            minutes: 最近N分钟，指定时忽略start，从 end（None时为当前时间）往前推
+
+        Returns:
+            List[Dict]: 按时间正序的分钟线，字段为 time（分钟开始的毫秒时间）、datetime、open、high、low、close、
+            volume、amount（本分钟成交量和成交额，由累计值相减得到，当天第一根为开盘以来累计）、ticks
+        """
+        if not self.redis_client:
+            return []
+
+        try:
+            bars = {}
+            for member in self.raw_client.zrange(self._get_bars_key(stock_code), 0, -1):
+                bar = self._decode_bar(member)
+                bars[bar['minute']] = bar
+            recent = {}
+            self._aggregate_ticks(self.get_stock_data_window(stock_code), recent)
+            for minute, bar in recent.items():
+                bars[minute] = self._merge_bar(bars[minute], bar) if minute in bars else bar
+
+            end_ms = self._to_ms(end)
+            start_ms = self._to_ms(start)
+            if minutes is not None:
+                start_ms = (end_ms if end_ms is not None else int(time.time() * 1000)) - int(minutes * 60000)
+
+            result = []
+            prev_volume = prev_amount = 0.0
+            for minute in sorted(bars):
+                bar = bars[minute]
+                volume, amount = bar['cum_volume'] - prev_volume, bar['cum_amount'] - prev_amount
+                prev_volume, prev_amount = bar['cum_volume'], bar['cum_amount']
+                if (start_ms is not None and minute < start_ms - start_ms % 60000) or \
+                        (end_ms is not None and minute > end_ms):
+                    continue
+                result.append({'time': minute, 'datetime': datetime.fromtimestamp(minute / 1000).isoformat(),
+                               'open': bar['open'], 'high': bar['high'], 'low': bar['low'], 'close': bar['close'],
+                               'volume': volume, 'amount': amount, 'ticks': bar['ticks']})
+            return result
+
+        except Exception as e:
+            logging.error(f"获取分钟线失败 {stock_code}: {e}")
+            return []
+
+    def _rollup_task(self):
+        """定时把较早的tick压缩为分钟线，多个进程之间用Redis锁保证同一时间只有一个进程执行"""
+        interval = self.config.rollup['interval_seconds']
+        while self.running and not self._stop_event.wait(interval):
+            try:
+                if self.redis_client.set("rollup_lock", f"{socket.gethostname()}:{os.getpid()}", nx=True,
+                                         ex=interval):
+                    compacted = self.compact_rollups()
+                    if compacted:
+                        logging.info(f"分钟线压缩完成，合并 {compacted} 条tick")
+            except Exception as e:
+                logging.error(f"分钟线压缩任务失败: {e}")
+
     def get_latest_stock_data(self, stock_code: str, return_stock_data: bool = False) -> Optional[Union[Dict[str, Any], StockTickData]]:
         """
         获取某只股票或股指期货的最新数据
@@ -303,18 +1291,12 @@ class RedisCacheManager:
 
         try:
             latest_key = self._get_latest_key(stock_code)
-            data_str = self.redis_client.get(latest_key)
+            raw = self.raw_client.get(latest_key)
 
-            if data_str:
-                data = json.loads(data_str)
-                if return_stock_data:
-                    try:
-                        return StockTickData.from_dict(data)
-                    except Exception as e:
-                        logging.debug(f"转换StockTickData失败，使用原始dict: {e}")
-                        return data
-                else:
-                    return data
+            if raw:
+                data = self._decode_tick(raw)
+                if data is not None:
+                    return self._to_result(data, return_stock_data)
             return None
 
         except Exception as e:
@@ -336,42 +1318,23 @@ class RedisCacheManager:
             return {}
 
         try:
-            # 如果传入空列表，获取所有股票和股指期货的最新数据
+            # 如果传入空列表，从当天索引集合取所有股票和股指期货代码，最新数据已过期的代码在下面被跳过
             if not stock_codes:
-                stock_keys = self.redis_client.keys("stock_latest:*")
-                futures_keys = self.redis_client.keys("futures_latest:*")
-                # 由于设置了decode_responses=True，返回的已经是字符串，不需要decode
-                stock_codes = [key.split(':', 1)[1] for key in stock_keys]
-                futures_codes = [key.split(':', 1)[1] for key in futures_keys]
-                stock_codes.extend(futures_codes)
+                stock_codes = self.get_active_codes("all")
             
             if not stock_codes:
                 return {}
 
-            # 使用管道批量获取
-            pipe = self.redis_client.pipeline()
-            for code in stock_codes:
-                latest_key = self._get_latest_key(code)
-                pipe.get(latest_key)
-
-            results = pipe.execute()
+            # 一次MGET批量获取
+            results = self.raw_client.mget([self._get_latest_key(code) for code in stock_codes])
 
             # 解析结果
             data_dict = {}
-            for i, data_str in enumerate(results):
-                if data_str:
-                    try:
-                        data = json.loads(data_str)
-                        if return_stock_data:
-                            try:
-                                data_dict[stock_codes[i]] = StockTickData.from_dict(data)
-                            except Exception as e:
-                                logging.debug(f"转换StockTickData失败，使用原始dict: {e}")
-                                data_dict[stock_codes[i]] = data
-                        else:
-                            data_dict[stock_codes[i]] = data
-                    except json.JSONDecodeError:
-                        continue
+            for code, raw in zip(stock_codes, results):
+                if raw:
+                    data = self._decode_tick(raw)
+                    if data is not None:
+                        data_dict[code] = self._to_result(data, return_stock_data)
 
             return data_dict
 
@@ -379,6 +1342,59 @@ class RedisCacheManager:
             logging.error(f"批量获取最新数据失败: {e}")
             return {}
 
+    def get_latest_batch(self, stock_codes: List[str]) -> TickBatch:
+        """
+        批量获取最新数据并组装成列存的 TickBatch，struct 编码的数据整段按数组读取，不逐条解码成字典
+
+        Args:
+            stock_codes: 股票代码或股指期货代码列表，如果为空则取当天有数据的全部代码
+
+        Returns:
+            TickBatch: 最新数据存在的代码，顺序与 stock_codes 相同
+        """
+        if not self.redis_client:
+            return TickBatch.from_records({})
+
+        try:
+            if not stock_codes:
+                stock_codes = self.get_active_codes("all")
+            if not stock_codes:
+                return TickBatch.from_records({})
+
+            results = self.raw_client.mget([self._get_latest_key(code) for code in stock_codes])
+            found = [(code, raw) for code, raw in zip(stock_codes, results) if raw]
+            return TickBatch.from_encoded([code for code, _ in found], [raw for _, raw in found])
+
+        except Exception as e:
+            logging.error(f"批量获取最新数据失败: {e}")
+            return TickBatch.from_records({})
+
+    def get_top_movers(self, metric: str = 'pct_change', n: int = 20, ascending: bool = False) -> List[Dict[str, Any]]:
+        """
+        读取当天排行榜的前N名，ZRANGE 复杂度 O(log N + n)，不读取全部最新数据再排序
+
+        Args:
+            metric: 排行指标，LEADERBOARD_METRICS 之一
+            n: 返回数量
+            ascending: True 时从小到大（如跌幅榜），默认从大到小
+
+        Returns:
+            List[Dict]: [{"code": 股票代码, "value": 指标值}]
+        """
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"不支持的排行指标: {metric}，可选 {', '.join(LEADERBOARD_METRICS)}")
+        if not self.redis_client or n <= 0:
+            return []
+
+        try:
+            rows = self.redis_client.zrange(self._get_leaderboard_key(metric), 0, n - 1, desc=not ascending,
+                                            withscores=True)
+            return [{"code": code, "value": value} for code, value in rows]
+
+        except Exception as e:
+            logging.error(f"获取{metric}排行榜失败: {e}")
+            return []
+
     def cache_filter_result(self, conditions: Dict, result: List[Dict], expire_seconds: int = 300) -> bool:
         """
         缓存筛选结果
@@ -396,7 +1412,16 @@ class RedisCacheManager:
 
         try:
             cache_key = self._get_filter_cache_key(conditions)
-            self.redis_client.setex(cache_key, expire_seconds, json.dumps(result))
+            pipe = self.redis_client.pipeline()
+            pipe.exists(cache_key)
+            pipe.setex(cache_key, expire_seconds, json.dumps(result))
+            existed, _ = pipe.execute()
+            if not existed:
+                # 新建的筛选缓存计入当天股票统计hash，get_cache_stats 不再遍历缓存
+                stats_key = self._get_stats_key("stock")
+                pipe.hincrby(stats_key, 'filters', 1)
+                pipe.expire(stats_key, self.config.get_expire_seconds('daily_data'))
+                pipe.execute()
             return True
 
         except Exception as e:
@@ -428,6 +1453,125 @@ class RedisCacheManager:
             logging.error(f"获取缓存筛选结果失败: {e}")
             return None
 
+    def append_alert(self, alert: Dict[str, Any], code_type: str = "stock") -> Optional[str]:
+        """
+        把一条提示追加到当天的提示日志，其他进程按时间范围查询或用消费组增量读取
+
+        Args:
+            alert: 提示内容（alert.to_dict()）
+            code_type: "stock" 或 "futures"
+
+        Returns:
+            str: 条目ID，失败时返回None
+        """
+        if not self.redis_client:
+            return None
+
+        try:
+            key = self._get_alert_journal_key(code_type)
+            pipe = self.redis_client.pipeline()
+            pipe.xadd(key, {'alert': json.dumps(alert, ensure_ascii=False)}, maxlen=self.ALERT_JOURNAL_MAXLEN,
+                      approximate=True)
+            pipe.expire(key, self.config.get_expire_seconds('alert_journal'))
+            return pipe.execute()[0]
+
+        except Exception as e:
+            logging.error(f"写入提示日志失败: {e}")
+            return None
+
+    @staticmethod
+    def _decode_alert_entries(entries) -> List[Dict[str, Any]]:
+        """Stream条目转换为提示字典，附带条目ID（id）"""
+        alerts = []
+        for entry_id, fields in entries:
+            alert = json.loads(fields['alert'])
+            alert['id'] = entry_id
+            alerts.append(alert)
+        return alerts
+
+    def get_alerts(self, code_type: str = "stock", start: Union[datetime, int, None] = None,
+                   end: Union[datetime, int, None] = None, day: str = None,
+                   count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按时间范围读取某天的提示，一次 XRANGE
+
+        Args:
+            code_type: "stock" 或 "futures"
+            start: 起始时间（datetime 或毫秒时间戳，包含），None表示当天第一条
+            end: 结束时间（datetime 或毫秒时间戳，包含），None表示最新一条
+            day: 日期（YYYYMMDD），None表示当天
+            count: 最多返回的条数
+
+        Returns:
+            List[Dict]: 按时间正序的提示
+        """
+        if not self.redis_client:
+            return []
+
+        try:
+            start_ms, end_ms = self._to_ms(start), self._to_ms(end)
+            entries = self.redis_client.xrange(self._get_alert_journal_key(code_type, day),
+                                               min='-' if start_ms is None else start_ms,
+                                               max='+' if end_ms is None else end_ms, count=count)
+            return self._decode_alert_entries(entries)
+
+        except Exception as e:
+            logging.error(f"读取提示日志失败: {e}")
+            return []
+
+    def read_new_alerts(self, group: str, consumer: str, code_type: str = "stock", count: int = 100,
+                        block_ms: Optional[int] = None, pending: bool = False) -> List[Dict[str, Any]]:
+        """
+        以消费组方式读取当天还没有分给本组的提示，处理完后用 ack_alerts 确认
+        每个消费组第一次读取某天的日志时从当天第一条开始；同一组的多个消费者分摊提示
+
+        Args:
+            group: 消费组名（如 dashboard、monitor、wechat）
+            consumer: 组内消费者名
+            code_type: "stock" 或 "futures"
+            count: 最多返回的条数
+            block_ms: 没有新提示时阻塞等待的毫秒数，None表示不等待
+            pending: True 时重新读取分给本消费者但还没有确认的提示（进程重启后恢复）
+
+        Returns:
+            List[Dict]: 提示列表，条目ID在 id 字段
+        """
+        if not self.redis_client:
+            return []
+
+        try:
+            key = self._get_alert_journal_key(code_type)
+            if (key, group) not in self._alert_groups:
+                try:
+                    self.redis_client.xgroup_create(key, group, id='0', mkstream=True)
+                except redis.ResponseError as e:
+                    if 'BUSYGROUP' not in str(e):
+                        raise
+                self._alert_groups.add((key, group))
+
+            response = self.redis_client.xreadgroup(group, consumer, {key: '0' if pending else '>'}, count=count,
+                                                    block=None if pending else block_ms)
+            if not response:
+                return []
+            # 重新读取待确认条目时，已被裁剪删除的条目字段为空
+            return self._decode_alert_entries([(entry_id, fields) for entry_id, fields in response[0][1] if fields])
+
+        except Exception as e:
+            logging.error(f"消费组 {group} 读取提示日志失败: {e}")
+            return []
+
+    def ack_alerts(self, group: str, ids: List[str], code_type: str = "stock", day: str = None) -> int:
+        """确认消费组已处理的提示，返回确认的条数"""
+        if not self.redis_client or not ids:
+            return 0
+
+        try:
+            return self.redis_client.xack(self._get_alert_journal_key(code_type, day), group, *ids)
+
+        except Exception as e:
+            logging.error(f"消费组 {group} 确认提示失败: {e}")
+            return 0
+
     def clear_today_data(self, code_type: str = "all") -> bool:
         """
         清空当天的数据
@@ -442,22 +1586,19 @@ class RedisCacheManager:
             return False
 
         try:
-            today = datetime.now().strftime('%Y%m%d')
-            
-            if code_type == "stock":
-                pattern = f"stock_data:*:{today}"
-            elif code_type == "futures":
-                pattern = f"futures_data:*:{today}"
-            else:  # "all"
-                pattern = f"*_data:*:{today}"
-
-            # 获取所有匹配的key
-            keys = self.redis_client.keys(pattern)
-
-            if keys:
-                # 批量删除
-                self.redis_client.delete(*keys)
-                logging.info(f"清空当天{code_type}数据成功，共删除 {len(keys)} 个key")
+            # 从当天索引集合拿到代码，不遍历keyspace；切换过存储方式时两种key都可能存在
+            keys = []
+            for code in self.get_active_codes(code_type):
+                keys.extend((self._get_today_key(code), self._get_stream_key(code), self._get_bars_key(code)))
+            for one_type in self._code_types_of(code_type):
+                keys.extend((self._get_active_codes_key(one_type), self._get_stats_key(one_type),
+                             self._get_alert_journal_key(one_type)))
+            if code_type != "futures":
+                keys.extend(self._get_leaderboard_key(metric) for metric in LEADERBOARD_METRICS)
+            deleted = self._delete_keys(keys)
+            self._fingerprints.clear()
+            if deleted:
+                logging.info(f"清空当天{code_type}数据成功，共删除 {deleted} 个key")
 
             return True
 
@@ -479,18 +1620,25 @@ class RedisCacheManager:
             return False
 
         try:
+            # 历史日期的数据不一定都有索引，这里属于维护操作，用SCAN遍历
             if code_type == "stock":
-                patterns = ["stock_data:*", "stock_latest:*"]
+                patterns = ["stock_data:*", "stock_ticks:*", "stock_bars:*", "stock_latest:*", "active_codes:stock:*",
+                            "cache_stats:stock:*", "leaderboard:*", "volume_baseline:*", "alert_journal:stock:*"]
             elif code_type == "futures":
-                patterns = ["futures_data:*", "futures_latest:*"]
+                patterns = ["futures_data:*", "futures_ticks:*", "futures_bars:*", "futures_latest:*",
+                            "active_codes:futures:*", "cache_stats:futures:*", "alert_journal:futures:*"]
             else:  # "all"
-                patterns = ["stock_data:*", "stock_latest:*", "futures_data:*", "futures_latest:*", "filter_cache:*"]
+                patterns = ["stock_data:*", "stock_ticks:*", "stock_bars:*", "stock_latest:*", "futures_data:*",
+                            "futures_ticks:*", "futures_bars:*", "futures_latest:*", "filter_cache:*",
+                            "active_codes:*", "cache_stats:*", "leaderboard:*", "volume_baseline:*",
+                            "alert_journal:*"]
 
             for pattern in patterns:
-                keys = self.redis_client.keys(pattern)
+                keys = self._scan_keys(pattern)
                 if keys:
-                    self.redis_client.delete(*keys)
-                    logging.info(f"清空 {pattern} 成功，共删除 {len(keys)} 个key")
+                    deleted = self._delete_keys(keys)
+                    logging.info(f"清空 {pattern} 成功，共删除 {deleted} 个key")
+            self._fingerprints.clear()
 
             return True
 
@@ -499,7 +1647,7 @@ class RedisCacheManager:
             return False
 
     def _cleanup_task(self):
-        """定时清理任务，每天凌晨清空前一天的数据"""
+        """定时清理任务，每天凌晨清空前一天的数据，多个进程之间用Redis锁保证只有一个进程执行"""
         while self.running:
             try:
                 now = datetime.now()
@@ -509,33 +1657,57 @@ class RedisCacheManager:
                 next_midnight = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
                 sleep_seconds = (next_midnight - now).total_seconds()
 
-                # 等待到凌晨
-                time.sleep(sleep_seconds)
+                # 等待到凌晨，stop() 时提前退出
+                if self._stop_event.wait(sleep_seconds):
+                    break
 
                 # 清空前一天的数据
-                yesterday = (now - timedelta(days=1)).strftime('%Y%m%d')
-                
-                # 清理股票数据
-                stock_pattern = f"stock_data:*:{yesterday}"
-                stock_keys = self.redis_client.keys(stock_pattern)
-                if stock_keys:
-                    self.redis_client.delete(*stock_keys)
-                    logging.info(f"定时清理完成，删除前一天股票数据 {len(stock_keys)} 个key")
-                
-                # 清理股指期货数据
-                futures_pattern = f"futures_data:*:{yesterday}"
-                futures_keys = self.redis_client.keys(futures_pattern)
-                if futures_keys:
-                    self.redis_client.delete(*futures_keys)
-                    logging.info(f"定时清理完成，删除前一天股指期货数据 {len(futures_keys)} 个key")
+                yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+                if self._acquire_cleanup_lock(yesterday):
+                    self.cleanup_day(yesterday)
 
             except Exception as e:
                 logging.error(f"定时清理任务失败: {e}")
-                time.sleep(60)  # 出错后等待1分钟再重试
+                if self._stop_event.wait(60):  # 出错后等待1分钟再重试
+                    break
+
+    def _acquire_cleanup_lock(self, day: str) -> bool:
+        """抢占某天的清理锁（SET NX EX），拿到锁返回True"""
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        acquired = self.redis_client.set(f"cleanup_lock:{day}", owner, nx=True, ex=self.CLEANUP_LOCK_SECONDS)
+        if not acquired:
+            logging.info(f"{day}数据已由其他进程清理: {self.redis_client.get(f'cleanup_lock:{day}')}")
+        return bool(acquired)
+
+    def cleanup_day(self, day: str):
+        """
+        删除某天的历史数据，优先按当天索引集合删除，索引不存在时（旧版本写入的数据）退回SCAN
+
+        Args:
+            day: 日期（YYYYMMDD）
+        """
+        names = {"stock": "股票", "futures": "股指期货"}
+        for code_type, name in names.items():
+            index_key = self._get_active_codes_key(code_type, day)
+            if self.redis_client.exists(index_key):
+                codes = self.redis_client.smembers(index_key)
+                keys = [f"{code_type}_{kind}:{code}:{day}" for code in codes for kind in ("data", "ticks", "bars")]
+                keys.append(index_key)
+            else:
+                keys = [key for kind in ("data", "ticks", "bars") for key in self._scan_keys(f"{code_type}_{kind}:*:{day}")]
+            keys.append(self._get_stats_key(code_type, day))
+            if code_type == "stock":
+                keys.extend(self._get_leaderboard_key(metric, day) for metric in LEADERBOARD_METRICS)
+                keys.append(self._get_volume_baseline_key(day))
+            deleted = self._delete_keys(keys)
+            if deleted:
+                logging.info(f"定时清理完成，删除{day}{name}数据 {deleted} 个key")
 
     def get_cache_stats(self, code_type: str = "all") -> Dict[str, Any]:
         """
-        获取缓存统计信息
+        获取缓存统计信息，只读取写入时增量维护的当天统计hash，不遍历代码和keyspace
+        latest_stocks、filter_caches 是当天新建的最新快照数和筛选缓存数，过期不扣减（最新快照在午间休市等
+        超过过期时间没有行情后会重新创建），是实际存在数量的上界；统计与实际数据的核对和重置见 audit_cache_stats
         
         Args:
             code_type: 代码类型，"stock"、"futures" 或 "all"
@@ -548,64 +1720,142 @@ class RedisCacheManager:
 
         try:
             today = datetime.now().strftime('%Y%m%d')
+            code_types = self._code_types_of(code_type)
 
-            if code_type == "stock":
-                # 统计当天股票数据
-                today_pattern = f"stock_data:*:{today}"
-                today_keys = self.redis_client.keys(today_pattern)
-                # 统计最新股票数据
-                latest_keys = self.redis_client.keys("stock_latest:*")
-                # 统计筛选缓存
-                filter_keys = self.redis_client.keys("filter_cache:*")
-            elif code_type == "futures":
-                # 统计当天股指期货数据
-                today_pattern = f"futures_data:*:{today}"
-                today_keys = self.redis_client.keys(today_pattern)
-                # 统计最新股指期货数据
-                latest_keys = self.redis_client.keys("futures_latest:*")
-                # 股指期货没有筛选缓存
-                filter_keys = []
-            else:  # "all"
-                # 统计当天所有数据
-                stock_today_pattern = f"stock_data:*:{today}"
-                futures_today_pattern = f"futures_data:*:{today}"
-                stock_today_keys = self.redis_client.keys(stock_today_pattern)
-                futures_today_keys = self.redis_client.keys(futures_today_pattern)
-                today_keys = stock_today_keys + futures_today_keys
-                
-                # 统计最新所有数据
-                stock_latest_keys = self.redis_client.keys("stock_latest:*")
-                futures_latest_keys = self.redis_client.keys("futures_latest:*")
-                latest_keys = stock_latest_keys + futures_latest_keys
-                
-                # 统计筛选缓存
-                filter_keys = self.redis_client.keys("filter_cache:*")
-
-            # 计算总数据量
-            total_records = 0
-            for key in today_keys:
-                total_records += self.redis_client.llen(key)
+            pipe = self.redis_client.pipeline(transaction=False)
+            for one_type in code_types:
+                pipe.hgetall(self._get_stats_key(one_type, today))
+            stats = pipe.execute()
 
+            last_write = max((int(one.get('last_write', 0)) for one in stats), default=0)
             return {
-                "today_stocks": len(today_keys),
-                "latest_stocks": len(latest_keys),
-                "filter_caches": len(filter_keys),
-                "total_records": total_records,
+                "today_stocks": sum(int(one.get('codes', 0)) for one in stats),
+                "latest_stocks": sum(int(one.get('latest', 0)) for one in stats),
+                "filter_caches": sum(int(one.get('filters', 0)) for one in stats),
+                "total_records": sum(int(one.get('records', 0)) for one in stats),
+                "bytes_written": sum(int(one.get('bytes', 0)) for one in stats),
+                "last_write_time": datetime.fromtimestamp(last_write / 1000).isoformat() if last_write else None,
                 "date": today,
-                "code_type": code_type
+                "code_type": code_type,
+                "connection_pool": self.get_pool_stats(),
+                # 本进程写入的tick：追加到历史的条数、快照未变化只刷新过期时间的条数
+                "process_ticks": dict(self._tick_counters)
             }
 
         except Exception as e:
             logging.error(f"获取{code_type}缓存统计失败: {e}")
             return {}
 
+    def audit_cache_stats(self, day: str = None, fix: bool = False) -> Dict[str, Any]:
+        """
+        离线核对某天的统计hash和索引集合：SCAN实际存在的当天数据key，统计代码数和记录数
+        当天还统计实际存在的最新快照数和筛选缓存数，它们是过期不扣减的计数，不参与一致性判断
+        属于维护操作，不要在行情处理的循环里调用
+
+        Args:
+            day: 日期（YYYYMMDD），None表示当天
+            fix: 是否用实际数据覆盖统计hash中的codes、records（当天还有latest、filters），并重建索引集合
+
+        Returns:
+            Dict: {代码类型: {"maintained": 统计hash, "actual": 实际数据, "consistent": 是否一致}}
+        """
+        if not self.redis_client:
+            return {}
+
+        day = day or datetime.now().strftime('%Y%m%d')
+        report = {}
+        for code_type in ("stock", "futures"):
+            keys = self._scan_keys(f"{code_type}_data:*:{day}") + self._scan_keys(f"{code_type}_ticks:*:{day}")
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key in keys:
+                if key.startswith(f"{code_type}_ticks:"):
+                    pipe.xlen(key)
+                else:
+                    pipe.llen(key)
+            lengths = pipe.execute() if keys else []
+            codes = sorted({key.split(':')[1] for key in keys})
+            actual = {"codes": len(codes), "records": sum(lengths)}
+            if day == datetime.now().strftime('%Y%m%d'):
+                actual["latest"] = len(self._scan_keys(f"{code_type}_latest:*"))
+                if code_type == "stock":
+                    actual["filters"] = len(self._scan_keys("filter_cache:*"))
+
+            stats_key = self._get_stats_key(code_type, day)
+            maintained = {field: int(value) for field, value in self.redis_client.hgetall(stats_key).items()}
+            index_key = self._get_active_codes_key(code_type, day)
+            indexed = self.redis_client.smembers(index_key)
+            consistent = (maintained.get('codes', 0) == actual['codes'] and
+                          maintained.get('records', 0) == actual['records'] and indexed == set(codes))
+            report[code_type] = {"maintained": maintained, "actual": actual, "consistent": consistent}
+
+            if fix:
+                expire_seconds = self.config.get_expire_seconds('daily_data')
+                pipe = self.redis_client.pipeline()
+                pipe.hset(stats_key, mapping=actual)
+                pipe.expire(stats_key, expire_seconds)
+                pipe.delete(index_key)
+                if codes:
+                    pipe.sadd(index_key, *codes)
+                    pipe.expire(index_key, expire_seconds)
+                pipe.execute()
+                logging.info(f"已修正{day} {code_type} 缓存统计: {maintained} -> {actual}")
+        return report
+
     def stop(self):
         """停止缓存管理器"""
         self.running = False
-        if hasattr(self, 'cleanup_thread'):
+        self._stop_event.set()
+        if self.rollup_thread:
+            self.rollup_thread.join(timeout=5)
+        if self.cleanup_thread:
             self.cleanup_thread.join(timeout=5)
+            with _pools_lock:
+                _cleanup_pools.discard(self.redis_client.connection_pool)
         if self.redis_client:
             self.redis_client.close()
+            self.raw_client.close()
+
+    def _write_preclose(self, preclose_dict: Dict[str, float], code_type: str):
+        """整体替换前收盘价hash并把版本号加一，同一个事务内完成"""
+        preclose_key = self._get_preclose_key(code_type)
+        version_key = self._get_preclose_version_key(code_type)
+        pipe = self.redis_client.pipeline()
+        pipe.delete(preclose_key)
+        if preclose_dict:
+            pipe.hset(preclose_key, mapping=preclose_dict)
+            pipe.expire(preclose_key, self.PRECLOSE_EXPIRE_SECONDS)
+        pipe.incr(version_key)
+        pipe.expire(version_key, self.PRECLOSE_EXPIRE_SECONDS)
+        pipe.execute()
+        self._preclose_cache.pop(code_type, None)
+
+    def _load_preclose(self, preclose_key: str) -> Dict[str, float]:
+        """读取整个前收盘价hash，兼容旧版本写入的JSON字符串"""
+        key_type = self.redis_client.type(preclose_key)
+        if key_type == 'hash':
+            return {code: float(value) for code, value in self.redis_client.hgetall(preclose_key).items()}
+        if key_type == 'string':
+            return json.loads(self.redis_client.get(preclose_key))
+        return {}
+
+    def _get_preclose_map(self, code_type: str) -> Dict[str, float]:
+        """
+        读取本地前收盘价缓存，日期变化或Redis中的版本号变化时重新加载
+        版本号最多每 PRECLOSE_VERSION_CHECK_SECONDS 秒检查一次，返回的字典不要修改
+        """
+        today = datetime.now().strftime('%Y%m%d')
+        now = time.monotonic()
+        cached = self._preclose_cache.get(code_type)
+        if cached and cached[0] == today and now - cached[2] < self.PRECLOSE_VERSION_CHECK_SECONDS:
+            return cached[3]
+
+        version = self.redis_client.get(self._get_preclose_version_key(code_type, today))
+        if cached and cached[0] == today and version is not None and cached[1] == version:
+            data = cached[3]
+        else:
+            data = self._load_preclose(self._get_preclose_key(code_type, today))
+        self._preclose_cache[code_type] = (today, version, now, data)
+        return data
 
     def cache_preclose_data(self, preclose_dict: Dict[str, float], code_type: str = "stock") -> bool:
         """
@@ -622,10 +1872,7 @@ class RedisCacheManager:
             return False
 
         try:
-            preclose_key = self._get_preclose_key(code_type)
-            
-            # 缓存前收盘价数据
-            self.redis_client.setex(preclose_key, 28800, json.dumps(preclose_dict))  # 8小时过期
+            self._write_preclose(preclose_dict, code_type)
             
             logging.info(f"成功缓存{code_type}前收盘价数据，共{len(preclose_dict)}个")
             return True
@@ -639,7 +1886,7 @@ class RedisCacheManager:
         获取前收盘价数据
         
         Args:
-            key_prefix: 键前缀
+            key_prefix: 键前缀，指定时直接读取Redis，不经过本地缓存
             code_type: 代码类型，"stock" 或 "futures"
             
         Returns:
@@ -649,20 +1896,47 @@ class RedisCacheManager:
             return {}
 
         try:
-            preclose_key = key_prefix + self._get_preclose_key(code_type)
-            data_str = self.redis_client.get(preclose_key)
+            if key_prefix:
+                return self._load_preclose(key_prefix + self._get_preclose_key(code_type))
+            return dict(self._get_preclose_map(code_type))
 
-            if data_str:
-                return json.loads(data_str)
+        except Exception as e:
+            logging.error(f"获取{code_type}前收盘价数据失败: {e}")
+            return {}
+
+    def get_multiple_preclose(self, stock_codes: List[str]) -> Dict[str, float]:
+        """
+        批量获取前收盘价，直接用HMGET读取Redis，不经过本地缓存
+
+        Args:
+            stock_codes: 股票代码或股指期货代码列表
+
+        Returns:
+            Dict[str, float]: 代码到前收盘价的映射，不存在的代码不返回
+        """
+        if not self.redis_client or not stock_codes:
             return {}
 
+        try:
+            codes_by_type = {}
+            for code in stock_codes:
+                codes_by_type.setdefault(self._get_code_type(code), []).append(code)
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for code_type, codes in codes_by_type.items():
+                pipe.hmget(self._get_preclose_key(code_type), codes)
+            result = {}
+            for codes, values in zip(codes_by_type.values(), pipe.execute()):
+                result.update((code, float(value)) for code, value in zip(codes, values) if value is not None)
+            return result
+
         except Exception as e:
-            logging.error(f"获取{code_type}前收盘价数据失败: {e}")
+            logging.error(f"批量获取前收盘价失败: {e}")
             return {}
 
     def get_stock_preclose(self, stock_code: str) -> float:
         """
-        获取单只股票或股指期货的前收盘价
+        获取单只股票或股指期货的前收盘价，读取本地缓存
         
         Args:
             stock_code: 股票代码或股指期货代码
@@ -670,9 +1944,15 @@ class RedisCacheManager:
         Returns:
             float: 前收盘价，如果不存在返回0
         """
-        code_type = "futures" if self._is_futures_code(stock_code) else "stock"
-        preclose_dict = self.get_preclose_data(code_type=code_type)
-        return preclose_dict.get(stock_code, 0)
+        if not self.redis_client:
+            return 0
+
+        try:
+            return self._get_preclose_map(self._get_code_type(stock_code)).get(stock_code, 0)
+
+        except Exception as e:
+            logging.error(f"获取前收盘价失败 {stock_code}: {e}")
+            return 0
 
     def cache_preclose_data_if_not_exists(self, preclose_dict: Dict[str, float], code_type: str = "stock") -> bool:
         """
@@ -696,8 +1976,7 @@ class RedisCacheManager:
                 logging.debug(f"Redis中已存在{code_type} preclose数据，跳过缓存")
                 return True
             
-            # 缓存前收盘价数据
-            self.redis_client.setex(preclose_key, 28800, json.dumps(preclose_dict))  # 8小时过期
+            self._write_preclose(preclose_dict, code_type)
             
             logging.info(f"成功缓存{code_type}前收盘价数据，共{len(preclose_dict)}个")
             return True
@@ -706,16 +1985,58 @@ class RedisCacheManager:
             logging.error(f"缓存{code_type}前收盘价数据失败: {e}")
             return False
 
+    def cache_volume_baseline(self, baseline: Dict[str, float]) -> bool:
+        """
+        缓存当天计算量比使用的5日平均成交量，整体替换
+
+        Args:
+            baseline: 股票代码到5日平均成交量的映射
+
+        Returns:
+            bool: 是否成功缓存
+        """
+        if not self.redis_client:
+            return False
+
+        try:
+            baseline_key = self._get_volume_baseline_key()
+            pipe = self.redis_client.pipeline()
+            pipe.delete(baseline_key)
+            if baseline:
+                pipe.hset(baseline_key, mapping=baseline)
+                pipe.expire(baseline_key, self.config.get_expire_seconds('daily_data'))
+            pipe.execute()
+            self._volume_baseline = None
+
+            logging.info(f"成功缓存5日平均成交量，共{len(baseline)}个")
+            return True
+
+        except Exception as e:
+            logging.error(f"缓存5日平均成交量失败: {e}")
+            return False
 
 # 全局缓存管理器实例
 cache_manager = None
 
 
+_init_lock = threading.Lock()
+
+
 def init_cache_manager(host='localhost', port=6379, db=0, password=None):
-    """初始化全局缓存管理器"""
+    """
+    初始化全局缓存管理器，已经用同样的连接参数初始化过时直接返回已有实例
+    替换旧实例前先停止它的后台线程；连接参数变了时同时断开旧参数的共享连接池
+    """
     global cache_manager
-    cache_manager = RedisCacheManager(host, port, db, password)
-    return cache_manager
+    with _init_lock:
+        if cache_manager is None or cache_manager.redis_client is None or \
+                cache_manager.connection_params != (host, port, db, password):
+            if cache_manager is not None:
+                cache_manager.stop()
+                if cache_manager.connection_params != (host, port, db, password):
+                    close_connection_pools(*cache_manager.connection_params)
+            cache_manager = RedisCacheManager(host, port, db, password)
+        return cache_manager
 
 
 def get_cache_manager():
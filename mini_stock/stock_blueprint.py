@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 import os
+from datetime import datetime
 from werkzeug.utils import secure_filename
 
 # 使用导入工具设置项目路径
@@ -8,6 +9,7 @@ setup_project_path()
 
 from app import UPLOAD_FOLDER, allowed_file
 from mini_stock.stock_market_service import StockMarketService
+from mini_stock.redis_cache_manager import LEADERBOARD_METRICS
 
 # 创建股票服务蓝图
 stock_blueprint = Blueprint('stock', __name__, url_prefix='/stock')
@@ -116,6 +118,38 @@ def get_stock_data_today(stock_code):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@stock_blueprint.route('/stock_data_window/<stock_code>', methods=['GET'])
+def get_stock_data_window(stock_code):
+    """获取某只股票最近N分钟数据接口，按时间正序，用于分时图"""
+    if not market_service:
+        return jsonify({"error": "服务未启动"}), 503
+
+    try:
+        minutes = request.args.get('minutes', default=5, type=float)
+        count = request.args.get('count', type=int)
+        data = market_service.get_stock_data_window(stock_code, minutes, count)
+        return jsonify(data)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@stock_blueprint.route('/top_movers', methods=['GET'])
+def get_top_movers():
+    """获取当天排行榜接口，metric 可选 pct_change、turnover、volume_ratio、amplitude，order=asc 时从小到大"""
+    if not market_service:
+        return jsonify({"error": "服务未启动"}), 503
+
+    metric = request.args.get('metric', default='pct_change')
+    if metric not in LEADERBOARD_METRICS:
+        return jsonify({"error": f"不支持的排行指标: {metric}，可选 {', '.join(LEADERBOARD_METRICS)}"}), 400
+
+    try:
+        n = request.args.get('n', default=20, type=int)
+        ascending = request.args.get('order', default='desc') == 'asc'
+        data = market_service.get_top_movers(metric, n, ascending)
+        return jsonify(data)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @stock_blueprint.route('/cache_stats', methods=['GET'])
 def get_cache_stats():
     """获取缓存统计信息接口"""
@@ -169,6 +203,54 @@ def get_alerts_by_type(alert_type):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@stock_blueprint.route('/alerts/stock/<stock_code>', methods=['GET'])
+def get_alerts_by_stock(stock_code):
+    """获取指定股票的异常提示接口"""
+    if not market_service:
+        return jsonify({"error": "服务未启动"}), 503
+
+    try:
+        minutes = request.args.get('minutes', 30, type=int)
+        alerts = market_service.get_alerts_by_stock(stock_code, minutes)
+        return jsonify(alerts)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@stock_blueprint.route('/alerts/history', methods=['GET'])
+def get_alert_history():
+    """按时间范围查询提示日志接口，参数 start、end（ISO时间）、day（YYYYMMDD，默认当天）"""
+    if not market_service:
+        return jsonify({"error": "服务未启动"}), 503
+
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({"error": "start/end 需要ISO格式时间，如 2025-01-20T09:30:00"}), 400
+
+    try:
+        alerts = market_service.get_alert_history(start, end, request.args.get('day'))
+        return jsonify(alerts)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@stock_blueprint.route('/alerts/rules', methods=['GET', 'POST'])
+def alert_rules():
+    """查看异常检测规则；POST JSON {规则名: 阈值} 在运行中调整阈值"""
+    if not market_service:
+        return jsonify({"error": "服务未启动"}), 503
+
+    try:
+        if request.method == 'POST':
+            return jsonify(market_service.update_alert_rules(request.get_json(force=True) or {}))
+        return jsonify(market_service.get_alert_rules())
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @stock_blueprint.route('/alerts/stats', methods=['GET'])
 def get_alert_stats():
     """获取异常提示统计信息接口"""
@@ -2,9 +2,15 @@
 import logging
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any
+
+import pandas as pd
 from xtquant import xtdata
 from date_utils import DateUtils
+from mini_stock.instrument_registry import get_instrument_registry
+
+# 涨停阈值（涨跌幅百分比）
+LIMIT_UP_PERCENT = 9.5
 
 @dataclass
 class StockInfo:
@@ -25,6 +31,8 @@ class StockFilter:
     exclude_delisted: bool = True  # 是否排除退市股票
     exclude_limit_up: bool = True  # 是否排除涨停股票
     exclude_suspended: bool = True  # 是否排除停牌股票
+    min_market_value_in_yi: Optional[float] = None  # 最小市值（亿元），None表示不限制
+    max_market_value_in_yi: Optional[float] = None  # 最大市值（亿元），None表示不限制
 
 @dataclass
 class ExchangeStats:
@@ -48,8 +56,8 @@ class StockDataManager:
             Optional[StockInfo]: 股票信息对象，如果获取失败则返回None
         """
         try:
-            # 获取股票基本信息
-            stock_info = xtdata.get_instrument_detail(stock)
+            # 从合约信息注册表获取股票基本信息
+            stock_info = get_instrument_registry().get(stock)
             if stock_info is None:
                 return None
                 
@@ -109,6 +117,68 @@ class StockDataManager:
             logging.error(f"获取股票{stock}信息时出错: {str(e)}")
             return None
 
+    @staticmethod
+    def load_instrument_details(stocks: Iterable[str], refresh: bool = False) -> pd.DataFrame:
+        """
+        从合约信息注册表批量读取股票基本信息（每个交易日只调用一次接口）
+
+        Args:
+            stocks: 股票代码列表
+            refresh: 是否忽略当天快照重新读取
+
+        Returns:
+            pd.DataFrame: index为股票代码，列为 name、status、open_date、total_volume，没有信息的代码不在结果中
+        """
+        registry = get_instrument_registry()
+        if refresh:
+            registry.refresh(force=True)
+
+        # 注册表整表按列取出，不在已读取板块中的代码逐只查询
+        stocks = list(stocks)
+        columns = {'InstrumentName': 'name', 'InstrumentStatus': 'status', 'OpenDate': 'open_date',
+                   'TotalVolume': 'total_volume'}
+        details = registry.frame()
+        known = details.index.get_indexer(stocks) >= 0
+        frame = details.reindex(index=[stock for stock, found in zip(stocks, known) if found],
+                                columns=list(columns)).rename(columns=columns)
+        rows = {}
+        for stock, found in zip(stocks, known):
+            if not found:
+                detail = registry.get(stock)
+                if detail is not None:
+                    rows[stock] = {name: detail.get(key) for key, name in columns.items()}
+        if rows:
+            frame = pd.concat([frame, pd.DataFrame.from_dict(rows, orient='index')])
+        frame = frame[frame['name'].notna()]
+        frame['open_date'] = frame['open_date'].astype(str)
+        frame['status'] = pd.to_numeric(frame['status'], errors='coerce').fillna(0)
+        frame['total_volume'] = pd.to_numeric(frame['total_volume'], errors='coerce')
+        return frame
+
+    @staticmethod
+    def load_quotes(stocks: List[str]) -> pd.DataFrame:
+        """
+        一次调用 get_full_tick 读取全部股票的最新行情
+
+        Returns:
+            pd.DataFrame: index为股票代码，列为 price、last_close、open_int，没有行情的代码不在结果中
+        """
+        quote_data = xtdata.get_full_tick(list(stocks)) or {}
+        rows = {stock: (quote.get('lastPrice'), quote.get('lastClose'), quote.get('openInt', 0))
+                for stock, quote in quote_data.items() if isinstance(quote, dict)}
+        frame = pd.DataFrame.from_dict(rows, orient='index', columns=['price', 'last_close', 'open_int'])
+        return frame.apply(pd.to_numeric, errors='coerce')
+
+    @staticmethod
+    def _load_universe(stocks: List[str]) -> pd.DataFrame:
+        """合约信息和最新行情按代码合并，两者都有且市值可以计算的股票，顺序与 stocks 相同"""
+        details = StockDataManager.load_instrument_details(stocks)
+        quotes = StockDataManager.load_quotes(stocks)
+        frame = details.join(quotes, how='inner')
+        frame = frame.reindex([stock for stock in stocks if stock in frame.index])
+        frame['market_value'] = frame['price'] * frame['total_volume']
+        return frame[frame['name'].notna() & frame['market_value'].notna()]
+
     @staticmethod
     def get_market_share(stocks: List[str], target_date: Optional[datetime] = None) -> Dict[str, float]:
         """
@@ -136,38 +206,12 @@ class StockDataManager:
                     'market_value': 0.0,
                     'share_percent': 0.0
                 }
-                
-            # 计算市场总市值
-            market_value = 0.0
-            strategy_value = 0.0
-            
-            # 批量获取股票信息
-            for stock in all_stocks:
-                try:
-                    # 获取股票基本信息
-                    stock_info = xtdata.get_instrument_detail(stock)
-                    if stock_info is None:
-                        continue
-                        
-                    # 获取市值数据
-                    quote_data = xtdata.get_full_tick([stock])
-                    if not quote_data or stock not in quote_data:
-                        continue
-                        
-                    quote = quote_data[stock]
-                    
-                    # 计算总市值（股价 * 总股本）
-                    stock_market_value = quote['lastPrice'] * stock_info['TotalVolume']
-                    market_value += stock_market_value
-                    
-                    # 如果是策略中的股票，累加到策略市值中
-                    if stock in stocks:
-                        strategy_value += stock_market_value
-                    
-                except Exception as e:
-                    logging.error(f"计算股票{stock}市值时出错: {str(e)}")
-                    continue
-            
+
+            # 一次读取全部行情，按列计算总市值（股价 * 总股本）
+            values = StockDataManager._load_universe(all_stocks)['market_value']
+            market_value = float(values.sum())
+            strategy_value = float(values[values.index.isin(set(stocks))].sum())
+
             # 计算占比
             share_percent = (strategy_value / market_value * 100) if market_value > 0 else 0
             
@@ -189,6 +233,7 @@ class StockDataManager:
     def filter_stocks(filter_condition: StockFilter, target_date: Optional[datetime] = None) -> Dict[str, StockInfo]:
         """
         根据条件筛选股票
+        一次读取全部股票的行情，合约信息从注册表读取，各筛选条件按列计算
         
         Args:
             filter_condition: 筛选条件
@@ -206,100 +251,77 @@ class StockDataManager:
                 
             # 获取目标日期
             target_date = target_date if target_date else DateUtils.now()
-            
-            # 获取股票信息
-            stock_info_dict = {}
-            for stock in stocks:
-                try:
-                    # 获取股票基本信息
-                    stock_info = xtdata.get_instrument_detail(stock)
-                    
-                    # 排除ST和退市股票
-                    if stock_info is None:
-                        continue
-                        
-                    if filter_condition.exclude_st and ('ST' in stock_info['InstrumentName'] or stock_info['InstrumentStatus'] > 0):
-                        continue
 
-                    if filter_condition.exclude_delisted and ('退' in stock_info['InstrumentName'] or stock_info['InstrumentStatus'] > 0):
-                        continue
+            frame = StockDataManager._load_universe(stocks)
+            return StockDataManager._apply_filter(frame, filter_condition, target_date)
 
-                    if filter_condition.exclude_delisted and ('退市' in stock_info['InstrumentName'] or stock_info['InstrumentStatus'] > 0):
-                        continue
-                    
-                    # 检查上市日期
-                    open_date = stock_info.get('OpenDate', '')
-                    if not open_date or open_date == '0' or open_date == '19700101':
-                        logging.warning(f"股票 {stock} 没有有效的上市日期信息")
-                        continue
-                        
-                    # 计算上市天数
-                    try:
-                        open_date = datetime.strptime(open_date, '%Y%m%d')
-                        days_listed = (target_date - open_date).days
-                        
-                        # 检查上市日期是否合理（不能早于1990年，不能晚于目标日期）
-                        if open_date.year < 1990 or open_date > target_date:
-                            logging.warning(f"股票 {stock} 上市日期不合理: {open_date.strftime('%Y-%m-%d')}")
-                            continue
-                            
-                    except ValueError as e:
-                        logging.warning(f"股票 {stock} 上市日期格式错误: {open_date}")
-                        continue
-                    
-                    # 排除上市不足指定天数的股票
-                    if days_listed < filter_condition.min_listed_days:
-                        logging.info(f"股票 {stock} 上市天数不足{filter_condition.min_listed_days}天: {days_listed}天")
-                        continue
-                    
-                    # 获取市值数据
-                    quote_data = xtdata.get_full_tick([stock])
-                    if not quote_data or stock not in quote_data:
-                        continue
-                        
-                    quote = quote_data[stock]
-                    
-                    # 排除停牌股票
-                    if filter_condition.exclude_suspended and quote.get('openInt', 0) == 1:
-                        logging.info(f"股票 {stock} 当前停牌")
-                        continue
-                    
-                    # 计算涨跌幅
-                    pct_chg = (quote['lastPrice'] - quote['lastClose']) / quote['lastClose'] * 100
-                    
-                    # 排除涨停股票
-                    if filter_condition.exclude_limit_up and pct_chg >= 9.5:  # 涨停阈值设为9.5%
-                        continue
-                    
-                    # 获取总市值（股价 * 总股本）
-                    market_value = quote['lastPrice'] * stock_info['TotalVolume']
-                    
-                    # 计算最小投资金额（一手）
-                    min_investment = quote['lastPrice'] * 100
-                    
-                    # 创建StockInfo对象
-                    stock_info_obj = StockInfo(
-                        code=stock,
-                        name=stock_info['InstrumentName'],
-                        price=quote['lastPrice'],
-                        market_value=market_value,
-                        days_listed=days_listed,
-                        min_investment=min_investment,
-                        market_value_in_yi=market_value / 100000000
-                    )
-                    
-                    stock_info_dict[stock] = stock_info_obj
-                    
-                except Exception as e:
-                    logging.error(f"处理股票{stock}时出错: {str(e)}")
-                    continue
-                    
-            return stock_info_dict
-            
         except Exception as e:
             logging.error(f"筛选股票时出错: {str(e)}")
             return {}
-            
+
+    @staticmethod
+    def _apply_filter(frame: pd.DataFrame, filter_condition: StockFilter, target_date: datetime) -> Dict[str, StockInfo]:
+        """在合并后的合约信息和行情上按列筛选，返回 {代码: StockInfo}"""
+        names = frame['name'].astype(str)
+        abnormal = frame['status'] > 0
+        keep = pd.Series(True, index=frame.index)
+
+        # 排除ST和退市股票
+        if filter_condition.exclude_st:
+            keep &= ~(names.str.contains('ST', regex=False) | abnormal)
+        if filter_condition.exclude_delisted:
+            keep &= ~(names.str.contains('退', regex=False) | abnormal)
+
+        # 检查上市日期（不能早于1990年，不能晚于目标日期）
+        target = pd.Timestamp(target_date).tz_localize(None)
+        open_dates = pd.to_datetime(frame['open_date'], format='%Y%m%d', errors='coerce')
+        valid_date = open_dates.notna() & (open_dates.dt.year >= 1990) & (open_dates <= target)
+        invalid_count = int((keep & ~valid_date).sum())
+        if invalid_count:
+            logging.warning(f"{invalid_count}只股票没有有效的上市日期信息")
+        keep &= valid_date
+
+        # 排除上市不足指定天数的股票
+        days_listed = (target - open_dates).dt.days
+        too_new = keep & (days_listed < filter_condition.min_listed_days)
+        if too_new.any():
+            logging.info(f"{int(too_new.sum())}只股票上市天数不足{filter_condition.min_listed_days}天")
+        keep &= ~too_new
+
+        # 昨收价无效时无法计算涨跌幅
+        keep &= frame['last_close'].notna() & (frame['last_close'] != 0)
+
+        # 排除停牌股票
+        if filter_condition.exclude_suspended:
+            keep &= frame['open_int'] != 1
+
+        # 排除涨停股票
+        if filter_condition.exclude_limit_up:
+            pct_chg = (frame['price'] - frame['last_close']) / frame['last_close'] * 100
+            keep &= ~(pct_chg >= LIMIT_UP_PERCENT)
+
+        # 市值范围
+        market_value_in_yi = frame['market_value'] / 100000000
+        if filter_condition.min_market_value_in_yi is not None:
+            keep &= market_value_in_yi >= filter_condition.min_market_value_in_yi
+        if filter_condition.max_market_value_in_yi is not None:
+            keep &= market_value_in_yi <= filter_condition.max_market_value_in_yi
+
+        selected = frame[keep]
+        return {
+            stock: StockInfo(
+                code=stock,
+                name=name,
+                price=float(price),
+                market_value=float(market_value),
+                days_listed=int(days),
+                min_investment=float(price) * 100,  # 最小投资金额（一手）
+                market_value_in_yi=float(market_value) / 100000000
+            )
+            for stock, name, price, market_value, days in zip(
+                selected.index, selected['name'], selected['price'], selected['market_value'], days_listed[keep])
+        }
+
     @staticmethod
     def get_stock_info_from_dict(stocks: Dict[str, StockInfo], stock: str) -> Optional[StockInfo]:
         """
@@ -1,64 +1,25 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import json
 
 
-@dataclass
-class StockTickData:
-    """
-    股票tick数据模型
-    根据迅投API文档：https://dict.thinktrader.net/dictionary/stock.html?id=7zqjlm#%E5%86%85%E7%BD%AEpython-2
-    """
-    
-    # 基础时间价格信息
-    time: str  # 时间，格式：YYYYMMDDHHMMSS
-    lastPrice: float  # 最新价
-    open: float  # 开盘价
-    high: float  # 最高价
-    low: float  # 最低价
-    lastClose: float  # 昨收价
-    
-    # 成交量和金额
-    amount: float  # 成交额（元）
-    volume: float  # 成交量（手）
-    pvolume: float  # 盘口成交量
-    tickvol: float  # 逐笔成交量
-    
-    # 状态和持仓信息
-    stockStatus: int  # 股票状态
-    openInt: int  # 持仓量（期货）
-    lastSettlementPrice: float  # 昨结算价
-    
-    # 盘口信息
-    askPrice: List[float]  # 卖价数组[卖一价, 卖二价, 卖三价, 卖四价, 卖五价]
-    bidPrice: List[float]  # 买价数组[买一价, 买二价, 买三价, 买四价, 买五价]
-    askVol: List[int]  # 卖量数组[卖一量, 卖二量, 卖三量, 卖四量, 卖五量]
-    bidVol: List[int]  # 买量数组[买一量, 买二量, 买三量, 买四量, 买五量]
-    
-    # 其他信息
-    settlementPrice: float  # 结算价
-    transactionNum: int  # 成交笔数
-    pe: float  # 市盈率
-    
-    # 缓存相关字段
-    timestamp: Optional[str] = None  # 数据缓存时间戳
-    
+class _StockTickFields:
+    """StockTickData 与 SlottedStockTickData 共用的构造、字段选择和派生指标"""
+
+    __slots__ = ()
+
     def __post_init__(self):
         """初始化后处理"""
         if self.timestamp is None:
             self.timestamp = datetime.now().isoformat()
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
-        return asdict(self)
-    
     def to_json(self) -> str:
         """转换为JSON字符串"""
         return json.dumps(self.to_dict(), ensure_ascii=False)
     
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'StockTickData':
+    def from_dict(cls, data: Dict[str, Any]) -> '_StockTickFields':
         """从字典创建实例"""
         # 创建数据副本避免修改原始数据
         data_copy = data.copy()
@@ -76,7 +37,7 @@ class StockTickData:
         return cls(**data_copy)
     
     @classmethod
-    def from_json(cls, json_str: str) -> 'StockTickData':
+    def from_json(cls, json_str: str) -> '_StockTickFields':
         """从JSON字符串创建实例"""
         data = json.loads(json_str)
         return cls.from_dict(data)
@@ -131,6 +92,92 @@ class StockTickData:
         return f"StockTickData({self.time}, 价格:{self.lastPrice}, 涨跌幅:{self.price_change_pct:.2f}%)"
 
 
+@dataclass
+class StockTickData(_StockTickFields):
+    """
+    股票tick数据模型
+    根据迅投API文档：https://dict.thinktrader.net/dictionary/stock.html?id=7zqjlm#%E5%86%85%E7%BD%AEpython-2
+    """
+    
+    # 基础时间价格信息
+    time: str  # 时间，格式：YYYYMMDDHHMMSS
+    lastPrice: float  # 最新价
+    open: float  # 开盘价
+    high: float  # 最高价
+    low: float  # 最低价
+    lastClose: float  # 昨收价
+    
+    # 成交量和金额
+    amount: float  # 成交额（元）
+    volume: float  # 成交量（手）
+    pvolume: float  # 盘口成交量
+    tickvol: float  # 逐笔成交量
+    
+    # 状态和持仓信息
+    stockStatus: int  # 股票状态
+    openInt: int  # 持仓量（期货）
+    lastSettlementPrice: float  # 昨结算价
+    
+    # 盘口信息
+    askPrice: List[float]  # 卖价数组[卖一价, 卖二价, 卖三价, 卖四价, 卖五价]
+    bidPrice: List[float]  # 买价数组[买一价, 买二价, 买三价, 买四价, 买五价]
+    askVol: List[int]  # 卖量数组[卖一量, 卖二量, 卖三量, 卖四量, 卖五量]
+    bidVol: List[int]  # 买量数组[买一量, 买二量, 买三量, 买四量, 买五量]
+    
+    # 其他信息
+    settlementPrice: float  # 结算价
+    transactionNum: int  # 成交笔数
+    pe: float  # 市盈率
+    
+    # 缓存相关字段
+    timestamp: Optional[str] = None  # 数据缓存时间戳
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式"""
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class SlottedStockTickData(_StockTickFields):
+    """
+    带 __slots__ 的股票tick数据模型，字段、方法与 StockTickData 相同
+    实例不带 __dict__，内存约为 StockTickData 的一半；to_dict 直接按字段复制，不经过 asdict 的递归深拷贝
+    """
+
+    time: str
+    lastPrice: float
+    open: float
+    high: float
+    low: float
+    lastClose: float
+    amount: float
+    volume: float
+    pvolume: float
+    tickvol: float
+    stockStatus: int
+    openInt: int
+    lastSettlementPrice: float
+    askPrice: List[float]
+    bidPrice: List[float]
+    askVol: List[int]
+    bidVol: List[int]
+    settlementPrice: float
+    transactionNum: int
+    pe: float
+    timestamp: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式，与 StockTickData.to_dict 的结果相同"""
+        data = {name: getattr(self, name) for name in _TICK_FIELD_NAMES}
+        for name in _ORDER_BOOK_FIELD_NAMES:
+            data[name] = list(data[name])
+        return data
+
+
+_TICK_FIELD_NAMES = tuple(field.name for field in fields(StockTickData))
+_ORDER_BOOK_FIELD_NAMES = ('askPrice', 'bidPrice', 'askVol', 'bidVol')
+
+
 class StockDataFactory:
     """
     股票数据工厂类，用于创建和解析股票数据
@@ -19,6 +19,9 @@ from mini_stock.stock_data_manager import StockDataManager, StockFilter
 from mini_stock.redis_cache_manager import init_cache_manager, get_cache_manager
 from mini_stock.alert_detector import get_alert_detector
 from mini_stock.stock_data_model import StockTickData, StockDataFactory
+from mini_stock.tick_batch import TickBatch
+from mini_stock.tick_ingestor import QuoteIngestor
+from mini_stock.cache_config import get_cache_config
 
 
 class StockMarketService:
@@ -57,10 +60,14 @@ class StockMarketService:
             password=getattr(environment, 'REDIS_PASSWORD', None)
         )
         self.preclose_dict = StockPriceUtils.get_all_preclose(self.code_list)
+        self.cache_volume_baseline()
 
-        # 启动数据更新线程
+        # 启动数据更新线程：poll 定时拉取全部股票，push 订阅行情推送只写入有变化的股票
+        self.ingest_mode = get_cache_config().tick_ingest['mode']
+        self.ingestor = None
         self.running = True
-        self.update_thread = threading.Thread(target=self._update_market_data, daemon=True)
+        target = self._ingest_market_data if self.ingest_mode == 'push' else self._update_market_data
+        self.update_thread = threading.Thread(target=target, daemon=True)
         self.update_thread.start()
 
     def load_stock_list(self):
@@ -93,6 +100,16 @@ class StockMarketService:
         except Exception as e:
             logging.error(f"缓存前收盘价数据失败: {e}")
 
+    def cache_volume_baseline(self):
+        """计算并缓存5日平均成交量，写入tick时用于计算量比排行"""
+        if not self.cache_manager or not self.code_list:
+            return
+
+        try:
+            self.cache_manager.cache_volume_baseline(StockPriceUtils.get_all_average_volume(self.code_list))
+        except Exception as e:
+            logging.error(f"缓存5日平均成交量失败: {e}")
+
     def _update_market_data(self):
         """更新市场数据的后台线程（用监控日期）"""
         # 使用 TradingTimeUtils 获取最新数据
@@ -109,19 +126,18 @@ class StockMarketService:
 
                 # 缓存数据到Redis
                 if self.cache_manager and kline_data and TradingTimeUtils.is_trading_time():
-                    # 使用StockDataFactory转换数据格式
+                    # 按列转换数据格式
                     try:
 
                         if not self.cache_manager.get_preclose_data():
                             self.preclose_dict = StockPriceUtils.get_all_preclose(self.code_list)
                             # 使用专门的方法缓存前收盘价
                             self.cache_preclose_if_needed()
+                            # 新的交易日同时更新量比使用的5日平均成交量
+                            self.cache_volume_baseline()
 
-                        # 将原始数据转换为StockTickData实例
-                        stock_data_dict = StockDataFactory.create_batch_from_xtquant_data(kline_data)
-                        
-                        # 批量缓存到Redis - 修复类型问题
-                        self.cache_manager.cache_stocks_batch(stock_data_dict)
+                        # 按列组装成TickBatch后批量缓存，不为每只股票构造StockTickData
+                        self.cache_manager.cache_tick_batch(TickBatch.from_xtquant(kline_data))
                         
                     except Exception as e:
                         logging.error(f"转换和缓存股票数据失败: {e}")
@@ -150,6 +166,37 @@ class StockMarketService:
                 logging.error(f"更新行情数据失败: {e}")
                 time.sleep(5)  # 发生错误时5秒后重试
 
+    def _ingest_market_data(self):
+        """推送模式的后台线程：QuoteIngestor 接收推送并批量写入，本线程在新交易日更新前收盘价和5日平均成交量"""
+        self.ingestor = QuoteIngestor(
+            self.cache_manager,
+            on_batch=self._on_pushed_batch,
+            active=lambda: self.cache_manager is not None and TradingTimeUtils.is_trading_time()
+        )
+        self.ingestor.start(self.code_list)
+        last_report = time.time()
+
+        while self.running:
+            try:
+                if self.cache_manager and TradingTimeUtils.is_trading_time() and not self.cache_manager.get_preclose_data():
+                    self.preclose_dict = StockPriceUtils.get_all_preclose(self.code_list)
+                    self.cache_preclose_if_needed()
+                    self.cache_volume_baseline()
+
+                if time.time() - last_report >= 60:
+                    logging.info(f"[market data]行情推送统计: {self.ingestor.stats()}")
+                    last_report = time.time()
+            except Exception as e:
+                logging.error(f"更新推送行情状态失败: {e}")
+            time.sleep(3)
+
+        self.ingestor.stop()
+
+    def _on_pushed_batch(self, latest):
+        """推送的一批tick更新到最新行情，格式与拉取的单行数据转换后相同"""
+        with self.data_lock:
+            self.last_data.update((code, [tick]) for code, tick in latest.items())
+
     def _convert_to_json_serializable(self, data):
         """将数据转换为JSON可序列化格式"""
         if isinstance(data, pd.DataFrame):
@@ -212,6 +259,9 @@ class StockMarketService:
                 self.code_list = codes
                 # 重新获取前收盘价
                 self.preclose_dict = StockPriceUtils.get_all_preclose(self.code_list)
+            self.cache_volume_baseline()
+            if self.ingestor:
+                self.ingestor.subscribe(codes)
 
             logging.info(f"成功从文件更新股票列表，共{len(codes)}只股票")
             return True, f"成功更新股票列表，共{len(codes)}只股票"
@@ -269,6 +319,33 @@ class StockMarketService:
             logging.error(f"获取股票当天数据失败 {stock_code}: {e}")
             return []
 
+    def get_stock_data_window(self, stock_code: str, minutes: float | None = None, count: int | None = None):
+        """获取某只股票最近一段时间的数据，按时间正序"""
+        if not self.cache_manager:
+            return []
+
+        try:
+            data = self.cache_manager.get_stock_data_window(stock_code, minutes=minutes, count=count)
+            return self._convert_to_json_serializable(data)
+        except Exception as e:
+            logging.error(f"获取股票时间窗口数据失败 {stock_code}: {e}")
+            return []
+
+    def get_top_movers(self, metric: str = 'pct_change', n: int = 20, ascending: bool = False):
+        """获取当天某个指标排行的前N只股票，附带最新价"""
+        if not self.cache_manager:
+            return []
+
+        try:
+            movers = self.cache_manager.get_top_movers(metric, n, ascending)
+            latest = self.cache_manager.get_multiple_latest_data([item['code'] for item in movers])
+            for item in movers:
+                item['lastPrice'] = latest.get(item['code'], {}).get('lastPrice')
+            return movers
+        except Exception as e:
+            logging.error(f"获取{metric}排行失败: {e}")
+            return []
+
     def get_cache_stats(self):
         """获取缓存统计信息"""
         if not self.cache_manager:
@@ -304,7 +381,7 @@ class StockMarketService:
     def get_alerts_by_type(self, alert_type: str, minutes: int = 30):
         """获取指定类型的异常提示"""
         try:
-            from alert_detector import AlertType
+            from mini_stock.alert_detector import AlertType
             alert_enum = None
             for at in AlertType:
                 if at.value == alert_type:
@@ -320,6 +397,41 @@ class StockMarketService:
             logging.error(f"获取指定类型异常提示失败: {e}")
             return []
 
+    def get_alerts_by_stock(self, stock_code: str, minutes: int = 30):
+        """获取指定股票的异常提示"""
+        try:
+            detector = get_alert_detector()
+            alerts = detector.get_alerts_by_stock(stock_code, minutes)
+            return [alert.to_dict() for alert in alerts]
+        except Exception as e:
+            logging.error(f"获取指定股票异常提示失败: {e}")
+            return []
+
+    def get_alert_history(self, start=None, end=None, day: str = None):
+        """从Redis提示日志按时间范围读取某天的异常提示（含其他进程和重启前产生的提示）"""
+        if not self.cache_manager:
+            return []
+        return self.cache_manager.get_alerts("stock", start, end, day)
+
+    def get_alert_rules(self):
+        """获取异常检测规则"""
+        return get_alert_detector().get_rules()
+
+    def update_alert_rules(self, updates: dict):
+        """
+        运行中调整异常检测规则的阈值
+
+        Args:
+            updates: {规则名: 阈值} 或 {规则名: {"threshold": 阈值, "cooldown": 冷却秒数}}，规则名不存在时抛出ValueError
+        """
+        detector = get_alert_detector()
+        for name, value in updates.items():
+            if isinstance(value, dict):
+                detector.set_threshold(name, value['threshold'], value.get('cooldown'))
+            else:
+                detector.set_threshold(name, value)
+        return detector.get_rules()
+
     def get_alert_stats(self):
         """获取异常提示统计信息"""
         try:
@@ -0,0 +1,333 @@
+"""
+tick 列存批量容器
+一批tick（每只股票一行）保存在一个 NumPy 结构化数组里，字段按列访问，不为每条tick构造 StockTickData。
+数组的内存布局就是 struct 编码（tick_codec.StructTickCodec）的 FULL 布局、盘口固定5档：
+一段连续的编码数据可以直接用 np.frombuffer 当作数组读取，编码时一次 tobytes 再按行切分，不逐条 struct.pack。
+"""
+
+import struct
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from mini_stock.stock_data_model import SlottedStockTickData, StockDataFactory
+from mini_stock.tick_codec import (ESSENTIAL_FLOAT_FIELDS, FULL_FLOAT_FIELDS, FULL_INT_FIELDS,
+                                   LAYOUT_ESSENTIAL, LAYOUT_FULL, ORDER_BOOK_FIELDS, StructTickCodec, TickCodec,
+                                   decode_tick, get_tick_codec, _time_to_int, _timestamp_to_micros)
+
+# 盘口固定档位数，档位数不同的tick按原始字典保存，编码时走编解码器
+BOOK_LEVELS = 5
+
+_HEADER_DTYPE = [('magic', 'u1'), ('version', 'u1'), ('layout', 'u1')]
+_ESSENTIAL_DTYPE = [('time', '<i8'), ('timestamp', '<i8')] + [(name, '<f8') for name in ESSENTIAL_FLOAT_FIELDS]
+_FULL_DTYPE = ([(name, '<f8') for name in FULL_FLOAT_FIELDS] + [(name, '<i8') for name in FULL_INT_FIELDS] +
+               [(f'{name}Levels', 'u1') for name, _ in ORDER_BOOK_FIELDS] +
+               [(name, '<f8' if kind == 'd' else '<i8', (BOOK_LEVELS,)) for name, kind in ORDER_BOOK_FIELDS])
+
+# struct 编码 ESSENTIAL 布局的一条记录
+ESSENTIAL_RECORD_DTYPE = np.dtype(_HEADER_DTYPE + _ESSENTIAL_DTYPE)
+# struct 编码 FULL 布局（5档盘口）的一条记录，也是 TickBatch 的行类型
+TICK_BATCH_DTYPE = np.dtype(_HEADER_DTYPE + _ESSENTIAL_DTYPE + _FULL_DTYPE)
+
+_STRUCT = StructTickCodec
+assert ESSENTIAL_RECORD_DTYPE.itemsize == _STRUCT._header.size + _STRUCT._essential.size
+assert TICK_BATCH_DTYPE.itemsize == (ESSENTIAL_RECORD_DTYPE.itemsize + _STRUCT._full_extra.size +
+                                     BOOK_LEVELS * 8 * len(ORDER_BOOK_FIELDS))
+
+_EPOCH = datetime(1970, 1, 1)
+_BOOK_NAMES = tuple(name for name, _ in ORDER_BOOK_FIELDS)
+_LEVEL_NAMES = tuple(f'{name}Levels' for name in _BOOK_NAMES)
+# 与 StockTickData.get_essential_fields 的字段顺序相同，JSON 编码结果才一致
+_ESSENTIAL_ORDER = ('time',) + ESSENTIAL_FLOAT_FIELDS + ('timestamp',)
+_FULL_ONLY_FIELDS = frozenset(FULL_FLOAT_FIELDS + FULL_INT_FIELDS + _BOOK_NAMES)
+
+
+def _float_column(values: List[Any]) -> np.ndarray:
+    """一列取值转为 float64，无法转换的取值按 StockDataFactory 的规则记为0"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([StockDataFactory._safe_convert_to_float(value) for value in values], dtype=np.float64)
+
+
+def _int_column(values: List[Any]) -> np.ndarray:
+    """一列取值转为 int64，无法转换的取值记为0"""
+    try:
+        return np.asarray(values, dtype=np.int64)
+    except (TypeError, ValueError, OverflowError):
+        return np.array([StockDataFactory._safe_convert_to_int(value) for value in values], dtype=np.int64)
+
+
+def _time_value(value: Any) -> Optional[int]:
+    """tick 时间转为整数（与 struct 编码相同），xtquant 返回的整数毫秒时间戳直接使用"""
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        value = str(int(value))
+    return _time_to_int(value)
+
+
+def _micros_to_timestamp(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class TickBatch:
+    """
+    一批tick的列存容器：codes 与结构化数组 data 一一对应
+
+    layout 列为 LAYOUT_FULL 的行带完整字段和5档盘口（不足5档补0，档位数记在 *Levels 列），
+    LAYOUT_ESSENTIAL 的行只有核心字段。时间、缓存时间戳或盘口无法按定长布局无损保存的tick，
+    原始字典（补上缓存时间戳）记在 fallback 里，转换和编码时按 StockDataFactory 的规则处理。
+
+    Args:
+        codes: 股票或股指期货代码
+        data: TICK_BATCH_DTYPE 结构化数组，长度与 codes 相同
+        fallback: {行号: 带 timestamp 的原始字典}
+    """
+
+    __slots__ = ('codes', 'data', 'fallback', '_positions')
+
+    def __init__(self, codes: Sequence[str], data: np.ndarray, fallback: Optional[Dict[int, Dict[str, Any]]] = None):
+        if data.dtype != TICK_BATCH_DTYPE or len(data) != len(codes):
+            raise ValueError("TickBatch 的数组类型或长度不匹配")
+        self.codes = list(codes)
+        self.data = data
+        self.fallback = fallback or {}
+        self._positions = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """按字段名取一列（数组视图）"""
+        return self.data[name]
+
+    def position(self, code: str) -> int:
+        """代码所在的行号，不存在时抛出 KeyError"""
+        if self._positions is None:
+            self._positions = {code: index for index, code in enumerate(self.codes)}
+        return self._positions[code]
+
+    @staticmethod
+    def _empty(count: int) -> np.ndarray:
+        data = np.zeros(count, dtype=TICK_BATCH_DTYPE)
+        data['magic'] = StructTickCodec.MAGIC
+        data['version'] = StructTickCodec.SCHEMA_VERSION
+        return data
+
+    @classmethod
+    def from_records(cls, records: Dict[str, Dict[str, Any]]) -> 'TickBatch':
+        """
+        从 {代码: tick字典} 按列创建，字典可以是缓存读出的数据或 xtquant 的行情字典
+        缺少的字段按 StockDataFactory 的规则取默认值，没有缓存时间戳的tick使用当前时间
+        """
+        codes = list(records)
+        rows = [records[code] for code in codes]
+        data = cls._empty(len(rows))
+        fallback = cls._fill(data, rows)
+        return cls(codes, data, fallback)
+
+    @staticmethod
+    def _fill(data: np.ndarray, rows: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """把字典按列写入数组，返回无法按定长布局保存的行 {行号: 字典}"""
+        fallback = {}
+        now = datetime.now().isoformat()
+        data['layout'] = [LAYOUT_FULL if _FULL_ONLY_FIELDS & row.keys() else LAYOUT_ESSENTIAL for row in rows]
+        for name in ESSENTIAL_FLOAT_FIELDS + FULL_FLOAT_FIELDS:
+            data[name] = _float_column([row.get(name) or 0 for row in rows])
+        for name in FULL_INT_FIELDS:
+            data[name] = _int_column([row.get(name) or 0 for row in rows])
+
+        times = [_time_value(row.get('time')) for row in rows]
+        stamps = [_timestamp_to_micros(row.get('timestamp') or now) for row in rows]
+        for index, (time_value, micros) in enumerate(zip(times, stamps)):
+            if time_value is None or micros is None:
+                fallback[index] = dict(rows[index], timestamp=rows[index].get('timestamp') or now)
+        data['time'] = [value or 0 for value in times]
+        data['timestamp'] = [value or 0 for value in stamps]
+
+        full_rows = np.flatnonzero(data['layout'] == LAYOUT_FULL)
+        for (name, kind), level_name in zip(ORDER_BOOK_FIELDS, _LEVEL_NAMES):
+            books = [StockDataFactory._safe_convert_to_list(rows[index].get(name)) for index in full_rows]
+            if not books:
+                continue
+            levels = np.fromiter((len(book) for book in books), dtype=np.int64, count=len(books))
+            data[level_name][full_rows] = np.minimum(levels, BOOK_LEVELS)
+            try:
+                values = np.asarray(books, dtype=np.float64) if (levels == BOOK_LEVELS).all() else None
+            except (TypeError, ValueError):
+                values = None
+            if values is None:
+                values = np.zeros((len(books), BOOK_LEVELS))
+                for position, book in enumerate(books):
+                    if len(book) <= BOOK_LEVELS:
+                        values[position, :len(book)] = [StockDataFactory._safe_convert_to_float(v) for v in book]
+            # 档位超过5档、成交量不是整数的盘口无法按定长布局无损保存
+            lossy = levels > BOOK_LEVELS
+            if kind == 'q':
+                lossy |= (values != np.floor(values)).any(axis=1)
+            for position in np.flatnonzero(lossy):
+                index = int(full_rows[position])
+                fallback.setdefault(index, dict(rows[index], timestamp=rows[index].get('timestamp') or now))
+            data[name][full_rows] = np.where(lossy[:, None], 0, values)
+        return fallback
+
+    @classmethod
+    def from_xtquant(cls, data_dict: Dict[str, Any]) -> 'TickBatch':
+        """
+        从迅投行情数据创建，取值可以是字典或单行 DataFrame（get_market_data_ex 的返回）
+        其他格式交给 StockDataFactory 解析
+        """
+        records = {}
+        for code, data in data_dict.items():
+            if isinstance(data, dict):
+                records[code] = data
+            elif hasattr(data, 'columns') and hasattr(data, 'iloc'):
+                if len(data):
+                    records[code] = data.iloc[0].to_dict()
+            else:
+                records[code] = StockDataFactory.create_from_xtquant_data(data, code).to_dict()
+        return cls.from_records(records)
+
+    @classmethod
+    def from_encoded(cls, codes: Sequence[str], payloads: Sequence[Union[bytes, str]]) -> 'TickBatch':
+        """
+        从缓存读出的编码数据创建，struct 编码的记录整段按数组读取，其他编码逐条解码，无法解析的数据跳过
+        """
+        codes = list(codes)
+        data = cls._empty(len(codes))
+        groups = {LAYOUT_ESSENTIAL: [], LAYOUT_FULL: []}
+        sizes = {LAYOUT_ESSENTIAL: ESSENTIAL_RECORD_DTYPE.itemsize, LAYOUT_FULL: TICK_BATCH_DTYPE.itemsize}
+        others = []
+        for index, raw in enumerate(payloads):
+            if (isinstance(raw, bytes) and len(raw) > 2 and raw[0] == StructTickCodec.MAGIC
+                    and raw[1] == StructTickCodec.SCHEMA_VERSION and len(raw) == sizes.get(raw[2])):
+                groups[raw[2]].append(index)
+            else:
+                others.append(index)
+
+        rows = groups[LAYOUT_ESSENTIAL]
+        if rows:
+            view = np.frombuffer(b''.join(payloads[index] for index in rows), dtype=ESSENTIAL_RECORD_DTYPE)
+            for name in ESSENTIAL_RECORD_DTYPE.names:
+                data[name][rows] = view[name]
+        rows = groups[LAYOUT_FULL]
+        if rows:
+            view = np.frombuffer(b''.join(payloads[index] for index in rows), dtype=TICK_BATCH_DTYPE)
+            # 长度相同但各盘口档位数不是5的记录逐条解码
+            fixed = np.all([view[name] == BOOK_LEVELS for name in _LEVEL_NAMES], axis=0)
+            data[np.asarray(rows)[fixed]] = view[fixed]
+            others.extend(np.asarray(rows)[~fixed].tolist())
+
+        fallback, broken = {}, []
+        if others:
+            others.sort()
+            decoded = []
+            for index in others:
+                try:
+                    decoded.append(decode_tick(payloads[index]))
+                except (ValueError, struct.error):
+                    broken.append(index)
+                    decoded.append({})
+            subset = cls._empty(len(others))
+            for position, record in cls._fill(subset, decoded).items():
+                fallback[others[position]] = record
+            data[others] = subset
+
+        batch = cls(codes, data, fallback)
+        if broken:
+            # 无法解析的数据跳过
+            batch = batch._take(sorted(set(range(len(codes))) - set(broken)))
+        return batch
+
+    def encode(self, codec: Optional[TickCodec] = None, full: bool = True) -> List[bytes]:
+        """
+        按缓存模式编码每一行，结果与 codec.encode(self.record(i, full)) 相同
+
+        Args:
+            codec: 编解码器，None时使用 struct 编码
+            full: True 时带完整字段的行按 FULL 布局编码，False 时只编码核心字段
+        """
+        codec = codec or get_tick_codec('struct')
+        count = len(self)
+        if not isinstance(codec, StructTickCodec):
+            return [codec.encode(self.record(index, full)) for index in range(count)]
+
+        payloads = [None] * count
+        is_full = self.data['layout'] == LAYOUT_FULL
+        fixed = np.ones(count, dtype=bool)
+        if self.fallback:
+            fixed[list(self.fallback)] = False
+        if full:
+            five = np.all([self.data[name] == BOOK_LEVELS for name in _LEVEL_NAMES], axis=0)
+            full_rows = np.flatnonzero(fixed & is_full & five)
+            essential_rows = np.flatnonzero(fixed & ~is_full)
+        else:
+            full_rows = np.array([], dtype=np.int64)
+            essential_rows = np.flatnonzero(fixed)
+
+        if len(full_rows):
+            self._split(self.data[full_rows].tobytes(), TICK_BATCH_DTYPE.itemsize, full_rows, payloads)
+        if len(essential_rows):
+            records = np.empty(len(essential_rows), dtype=ESSENTIAL_RECORD_DTYPE)
+            for name in ESSENTIAL_RECORD_DTYPE.names:
+                records[name] = self.data[name][essential_rows]
+            records['layout'] = LAYOUT_ESSENTIAL
+            self._split(records.tobytes(), ESSENTIAL_RECORD_DTYPE.itemsize, essential_rows, payloads)
+        for index in range(count):
+            if payloads[index] is None:
+                payloads[index] = codec.encode(self.record(index, full))
+        return payloads
+
+    @staticmethod
+    def _split(buffer: bytes, size: int, rows: Iterable[int], payloads: List[Optional[bytes]]):
+        for position, index in enumerate(rows):
+            payloads[index] = buffer[position * size:(position + 1) * size]
+
+    def record(self, index: int, full: bool = True) -> Dict[str, Any]:
+        """
+        第 index 行转为字典，字段与 StockTickData 的 get_full_fields / get_essential_fields 相同
+        full 为 False 或该行只有核心字段时只返回核心字段
+        """
+        if index in self.fallback:
+            source = self.fallback[index]
+            data = StockDataFactory._validate_data_dict(source)
+            data['timestamp'] = source['timestamp']
+            if not full or not _FULL_ONLY_FIELDS & source.keys():
+                return {name: data[name] for name in _ESSENTIAL_ORDER}
+            return data
+
+        row = self.data[index]
+        data = {'time': str(int(row['time']))}
+        data.update((name, float(row[name])) for name in ESSENTIAL_FLOAT_FIELDS)
+        if full and row['layout'] == LAYOUT_FULL:
+            data.update((name, float(row[name])) for name in FULL_FLOAT_FIELDS)
+            data.update((name, int(row[name])) for name in FULL_INT_FIELDS)
+            for name, level_name in zip(_BOOK_NAMES, _LEVEL_NAMES):
+                data[name] = row[name][:row[level_name]].tolist()
+        data['timestamp'] = _micros_to_timestamp(int(row['timestamp']))
+        return data
+
+    def to_records(self, full: bool = True) -> Dict[str, Dict[str, Any]]:
+        """全部行转为 {代码: 字典}"""
+        return {code: self.record(index, full) for index, code in enumerate(self.codes)}
+
+    def tick(self, index: int) -> SlottedStockTickData:
+        """第 index 行转为 SlottedStockTickData，只有核心字段的行其他字段取默认值，保留缓存时间戳"""
+        data = self.record(index)
+        tick = SlottedStockTickData.from_dict(data)
+        tick.timestamp = data['timestamp']
+        return tick
+
+    def select(self, codes: Iterable[str]) -> 'TickBatch':
+        """按代码取出子集，不存在的代码跳过"""
+        rows = []
+        for code in codes:
+            try:
+                rows.append(self.position(code))
+            except KeyError:
+                continue
+        return self._take(rows)
+
+    def _take(self, rows: List[int]) -> 'TickBatch':
+        fallback = {position: self.fallback[index] for position, index in enumerate(rows) if index in self.fallback}
+        return TickBatch([self.codes[index] for index in rows], self.data[rows], fallback)
@@ -0,0 +1,249 @@
+"""
+tick 数据编解码
+用于把缓存到Redis的tick数据编码为字节串，支持JSON（旧格式）和带版本号的定长二进制格式
+"""
+
+import json
+import struct
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # msgpack 是可选依赖，没有安装时不提供 msgpack 编码
+    msgpack = None
+
+
+# 字段顺序即字段序号，调整顺序或增删字段时必须提升 SCHEMA_VERSION
+ESSENTIAL_FLOAT_FIELDS = ('lastPrice', 'open', 'high', 'low', 'lastClose', 'amount', 'volume')
+FULL_FLOAT_FIELDS = ('pvolume', 'tickvol', 'lastSettlementPrice', 'settlementPrice', 'pe')
+FULL_INT_FIELDS = ('stockStatus', 'openInt', 'transactionNum')
+ORDER_BOOK_FIELDS = (('askPrice', 'd'), ('bidPrice', 'd'), ('askVol', 'q'), ('bidVol', 'q'))
+ESSENTIAL_FIELDS = frozenset(('time', 'timestamp') + ESSENTIAL_FLOAT_FIELDS)
+FULL_FIELDS = ESSENTIAL_FIELDS | frozenset(FULL_FLOAT_FIELDS + FULL_INT_FIELDS) | \
+    frozenset(name for name, _ in ORDER_BOOK_FIELDS)
+
+LAYOUT_ESSENTIAL = 1
+LAYOUT_FULL = 2
+# 盘口最多档位，超过时退回 JSON
+MAX_ORDER_BOOK_LEVELS = 20
+
+_EPOCH = datetime(1970, 1, 1)
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _time_to_int(value: Any) -> Optional[int]:
+    """tick 时间（如 '20250701105100' 或毫秒时间戳字符串）转为整数，无法无损还原时返回 None"""
+    if not isinstance(value, str) or not value.isdigit() or str(int(value)) != value:
+        return None
+    number = int(value)
+    return number if number <= _INT64_MAX else None
+
+
+def _timestamp_to_micros(value: Any) -> Optional[int]:
+    """缓存时间戳（datetime.isoformat()，不带时区）转为微秒数，无法无损还原时返回 None"""
+    if not isinstance(value, str):
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None or moment.isoformat() != value:
+        return None
+    return (moment - _EPOCH) // timedelta(microseconds=1)
+
+
+def _micros_to_timestamp(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_int64(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and _INT64_MIN <= value <= _INT64_MAX
+
+
+def _layout_of(data: Dict[str, Any]) -> Optional[int]:
+    """判断字典能否按定长布局编码，返回布局编号"""
+    keys = data.keys()
+    if keys == ESSENTIAL_FIELDS:
+        layout = LAYOUT_ESSENTIAL
+    elif keys == FULL_FIELDS:
+        layout = LAYOUT_FULL
+    else:
+        return None
+    if _time_to_int(data['time']) is None or _timestamp_to_micros(data['timestamp']) is None:
+        return None
+    if not all(_is_number(data[name]) for name in ESSENTIAL_FLOAT_FIELDS):
+        return None
+    if layout == LAYOUT_FULL:
+        if not all(_is_number(data[name]) for name in FULL_FLOAT_FIELDS):
+            return None
+        if not all(_is_int64(data[name]) for name in FULL_INT_FIELDS):
+            return None
+        for name, kind in ORDER_BOOK_FIELDS:
+            values = data[name]
+            if not isinstance(values, list) or len(values) > MAX_ORDER_BOOK_LEVELS:
+                return None
+            check = _is_number if kind == 'd' else _is_int64
+            if not all(check(value) for value in values):
+                return None
+    return layout
+
+
+class TickCodec:
+    """tick 编解码器基类，encode 返回写入 Redis 的字节串"""
+
+    name = ''
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, raw: bytes) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class JsonTickCodec(TickCodec):
+    """旧格式：JSON 文本"""
+
+    name = 'json'
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def decode(self, raw: bytes) -> Dict[str, Any]:
+        return json.loads(raw)
+
+
+class StructTickCodec(TickCodec):
+    """
+    定长二进制格式
+    头部 3 字节：魔数、schema 版本、布局（ESSENTIAL / FULL）；
+    ESSENTIAL 之后依次为 time(int64)、timestamp(int64 微秒)、7 个 float64；
+    FULL 在此基础上追加 5 个 float64、3 个 int64、4 个盘口长度(uint8) 和盘口数组。
+    字段不完整或取值无法无损还原时退回 JSON，解码时按首字节区分。
+    """
+
+    name = 'struct'
+    MAGIC = 0xB7
+    SCHEMA_VERSION = 1
+    _header = struct.Struct('<BBB')
+    _essential = struct.Struct('<qq7d')
+    _full_extra = struct.Struct('<5d3q4B')
+
+    def __init__(self):
+        self._fallback = JsonTickCodec()
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        layout = _layout_of(data)
+        if layout is None:
+            return self._fallback.encode(data)
+
+        parts = [self._header.pack(self.MAGIC, self.SCHEMA_VERSION, layout),
+                 self._essential.pack(_time_to_int(data['time']), _timestamp_to_micros(data['timestamp']),
+                                      *(data[name] for name in ESSENTIAL_FLOAT_FIELDS))]
+        if layout == LAYOUT_FULL:
+            books = [data[name] for name, _ in ORDER_BOOK_FIELDS]
+            parts.append(self._full_extra.pack(*(data[name] for name in FULL_FLOAT_FIELDS),
+                                               *(data[name] for name in FULL_INT_FIELDS),
+                                               *(len(values) for values in books)))
+            book_format = '<' + ''.join(f'{len(values)}{kind}' for values, (_, kind) in zip(books, ORDER_BOOK_FIELDS))
+            parts.append(struct.pack(book_format, *(value for values in books for value in values)))
+        return b''.join(parts)
+
+    def decode(self, raw: bytes) -> Dict[str, Any]:
+        magic, version, layout = self._header.unpack_from(raw)
+        if magic != self.MAGIC or version != self.SCHEMA_VERSION:
+            raise ValueError(f"不支持的tick编码: magic={magic}, version={version}")
+
+        offset = self._header.size
+        time_value, micros, *floats = self._essential.unpack_from(raw, offset)
+        offset += self._essential.size
+        data = {'time': str(time_value)}
+        data.update(zip(ESSENTIAL_FLOAT_FIELDS, floats))
+        if layout == LAYOUT_FULL:
+            values = self._full_extra.unpack_from(raw, offset)
+            offset += self._full_extra.size
+            data.update(zip(FULL_FLOAT_FIELDS, values[:5]))
+            data.update(zip(FULL_INT_FIELDS, values[5:8]))
+            for (name, kind), count in zip(ORDER_BOOK_FIELDS, values[8:]):
+                item = struct.Struct(f'<{count}{kind}')
+                data[name] = list(item.unpack_from(raw, offset))
+                offset += item.size
+        data['timestamp'] = _micros_to_timestamp(micros)
+        return data
+
+
+class MsgpackTickCodec(TickCodec):
+    """
+    msgpack 格式：首字节为魔数，之后是 [schema 版本, 布局, 按字段序号排列的取值]
+    不写字段名，浮点数保持 float64，整数按大小变长编码
+    """
+
+    name = 'msgpack'
+    MAGIC = 0xB8
+    SCHEMA_VERSION = 1
+
+    def __init__(self):
+        self._fallback = JsonTickCodec()
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        layout = _layout_of(data)
+        if layout is None:
+            return self._fallback.encode(data)
+        values = [self.SCHEMA_VERSION, layout, _time_to_int(data['time']), _timestamp_to_micros(data['timestamp'])]
+        values.extend(float(data[name]) for name in ESSENTIAL_FLOAT_FIELDS)
+        if layout == LAYOUT_FULL:
+            values.extend(float(data[name]) for name in FULL_FLOAT_FIELDS)
+            values.extend(data[name] for name in FULL_INT_FIELDS)
+            values.extend([float(value) for value in data[name]] if kind == 'd' else data[name]
+                          for name, kind in ORDER_BOOK_FIELDS)
+        return bytes((self.MAGIC,)) + msgpack.packb(values)
+
+    def decode(self, raw: bytes) -> Dict[str, Any]:
+        version, layout, time_value, micros, *values = msgpack.unpackb(raw[1:])
+        if version != self.SCHEMA_VERSION:
+            raise ValueError(f"不支持的tick编码: msgpack version={version}")
+        data = {'time': str(time_value)}
+        data.update(zip(ESSENTIAL_FLOAT_FIELDS, values[:7]))
+        if layout == LAYOUT_FULL:
+            data.update(zip(FULL_FLOAT_FIELDS, values[7:12]))
+            data.update(zip(FULL_INT_FIELDS, values[12:15]))
+            data.update(zip((name for name, _ in ORDER_BOOK_FIELDS), values[15:19]))
+        data['timestamp'] = _micros_to_timestamp(micros)
+        return data
+
+
+TICK_CODECS = {codec.name: codec for codec in (JsonTickCodec(), StructTickCodec())}
+if msgpack is not None:
+    TICK_CODECS[MsgpackTickCodec.name] = MsgpackTickCodec()
+
+_CODECS_BY_MAGIC = {StructTickCodec.MAGIC: TICK_CODECS['struct']}
+if msgpack is not None:
+    _CODECS_BY_MAGIC[MsgpackTickCodec.MAGIC] = TICK_CODECS['msgpack']
+
+
+def get_tick_codec(name: str) -> TickCodec:
+    """按名称获取编解码器，未安装 msgpack 时 'msgpack' 退回 'struct'"""
+    if name not in TICK_CODECS:
+        if name == MsgpackTickCodec.name:
+            return TICK_CODECS['struct']
+        raise ValueError(f"未知的tick编码: {name}")
+    return TICK_CODECS[name]
+
+
+def decode_tick(raw: Union[bytes, str]) -> Dict[str, Any]:
+    """
+    解码一条缓存的tick，不依赖当前配置的编码：按首字节识别二进制格式，其他按旧的JSON文本解析
+
+    Raises:
+        ValueError: 无法解析时抛出（json.JSONDecodeError 也是 ValueError）
+    """
+    if isinstance(raw, str):
+        return json.loads(raw)
+    codec = _CODECS_BY_MAGIC.get(raw[0]) if raw else None
+    if codec is None:
+        return json.loads(raw)
+    return codec.decode(raw)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情推送接入
+QuoteIngestor 用 xtdata.subscribe_whole_quote（或逐只 subscribe_quote）注册回调接收行情推送，
+回调里只把与上一次推送相比有变化的代码放进有界队列；写入线程按条数或时间阈值取出一批，
+同一代码只保留最新的tick，组装成 TickBatch 后用 cache_tick_batch 写入Redis。
+
+回调运行在 xtquant 的推送线程里，只做指纹比较和入队，不做转换和网络读写；
+队列满时丢弃最早的tick并计入统计，容量应明显大于订阅的代码数。
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from mini_stock.cache_config import get_cache_config
+from mini_stock.redis_cache_manager import RedisCacheManager
+from mini_stock.tick_batch import TickBatch
+
+
+class QuoteIngestor:
+    """
+    推送行情写入器
+
+    Args:
+        cache_manager: 缓存管理器
+        xtdata_module: 提供 subscribe_whole_quote / subscribe_quote / unsubscribe_quote 的行情模块，
+                       None时使用 xtquant.xtdata，基准和测试时传入 FakeQuotePublisher
+        queue_size: 队列容量（条）
+        batch_size: 一批达到该条数时立即写入
+        flush_interval: 队列中最早的tick等待超过该秒数时写入
+        whole_quote: True 使用 subscribe_whole_quote 一次订阅全部代码，False 逐只 subscribe_quote
+        on_batch: 每批写入后调用，参数为 {代码: 最新tick}
+        active: 返回 False 时收到的批次不写入Redis（如非交易时间），None表示总是写入
+    """
+
+    def __init__(self, cache_manager: RedisCacheManager, xtdata_module=None, queue_size: Optional[int] = None,
+                 batch_size: Optional[int] = None, flush_interval: Optional[float] = None, whole_quote: bool = True,
+                 on_batch: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None,
+                 active: Optional[Callable[[], bool]] = None):
+        config = get_cache_config().tick_ingest
+        if xtdata_module is None:
+            from xtquant import xtdata as xtdata_module
+        self.cache_manager = cache_manager
+        self.xtdata = xtdata_module
+        self.queue = queue.Queue(maxsize=queue_size or config['queue_size'])
+        self.batch_size = batch_size or config['batch_size']
+        self.flush_interval = flush_interval if flush_interval is not None else config['flush_interval']
+        self.whole_quote = whole_quote
+        self.on_batch = on_batch
+        self.active = active
+
+        self.codes = set()
+        self._fingerprints = {}
+        self._subscriptions = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=10000)  # 最近的入队到写入完成耗时（秒）
+        self.received = 0  # 回调收到的tick数
+        self.unchanged = 0  # 与上一次推送相同被跳过的tick数
+        self.dropped = 0  # 队列满时丢弃的tick数
+        self.written = 0  # 写入Redis的tick数
+        self.batches = 0  # 写入批次数
+
+    def start(self, codes: Iterable[str]):
+        """订阅代码并启动写入线程"""
+        self.subscribe(codes)
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._write_loop, daemon=True)
+            self._thread.start()
+            logging.info("行情推送写入线程已启动")
+
+    def subscribe(self, codes: Iterable[str]):
+        """按新的代码列表重新订阅，不在列表中的代码之后的推送被忽略"""
+        self.unsubscribe()
+        codes = list(dict.fromkeys(codes))
+        self.codes = set(codes)
+        if not codes:
+            return
+        try:
+            if self.whole_quote:
+                self._subscriptions.append(self.xtdata.subscribe_whole_quote(codes, callback=self.on_quote))
+            else:
+                for code in codes:
+                    self._subscriptions.append(
+                        self.xtdata.subscribe_quote(code, period='tick', count=0, callback=self.on_quote))
+            logging.info(f"已订阅 {len(codes)} 只股票的行情推送")
+        except Exception as e:
+            logging.error(f"订阅行情推送失败: {e}")
+
+    def unsubscribe(self):
+        """取消全部订阅"""
+        for seq in self._subscriptions:
+            try:
+                self.xtdata.unsubscribe_quote(seq)
+            except Exception as e:
+                logging.error(f"取消订阅{seq}失败: {e}")
+        self._subscriptions = []
+
+    def on_quote(self, datas: Dict[str, Any]):
+        """
+        行情推送回调：subscribe_whole_quote 推送 {代码: tick字典}，subscribe_quote 推送 {代码: [tick字典]}
+        只把有变化的代码放进队列
+        """
+        now = time.perf_counter()
+        for code, data in datas.items():
+            if isinstance(data, list):
+                if not data:
+                    continue
+                data = data[-1]
+            if code not in self.codes or not isinstance(data, dict):
+                continue
+            self.received += 1
+            fingerprint = RedisCacheManager._tick_fingerprint(data)
+            if fingerprint is not None and self._fingerprints.get(code) == fingerprint:
+                self.unchanged += 1
+                continue
+            self._fingerprints[code] = fingerprint
+            self._put((code, data, now))
+
+    def _put(self, item: tuple):
+        """
+        放入队列，队列满时丢弃最早的一条
+        丢弃的tick如果是该代码最后一次变化，清掉它的指纹，之后相同的推送还会入队，避免Redis里一直是旧的行情
+        """
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    code, data, _ = self.queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped += 1
+                fingerprint = self._fingerprints.get(code)
+                if fingerprint is not None and fingerprint == RedisCacheManager._tick_fingerprint(data):
+                    del self._fingerprints[code]
+
+    def _write_loop(self):
+        """写入线程：凑满 batch_size 条或最早的tick等待超过 flush_interval 秒时写入一批"""
+        while not self._stop_event.is_set() or not self.queue.empty():
+            try:
+                first = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            items = [first]
+            deadline = first[2] + self.flush_interval
+            while len(items) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    items.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._flush(items)
+            except Exception as e:
+                logging.error(f"写入推送行情失败: {e}")
+
+    def _flush(self, items: List[tuple]):
+        """
+        同一代码只保留最新的tick，整批写入Redis
+        非交易时间不写入，清掉这些tick的指纹，交易开始后相同的推送还会入队写入
+        """
+        latest = {}
+        for code, data, _ in items:
+            latest[code] = data
+        written = self.active is None or self.active()
+        if written:
+            self.cache_manager.cache_tick_batch(TickBatch.from_xtquant(latest))
+        else:
+            for code, data in latest.items():
+                fingerprint = self._fingerprints.get(code)
+                if fingerprint is not None and fingerprint == RedisCacheManager._tick_fingerprint(data):
+                    del self._fingerprints[code]
+        if self.on_batch:
+            self.on_batch(latest)
+
+        done = time.perf_counter()
+        with self._stats_lock:
+            self._latencies.extend(done - received for _, _, received in items)
+            if written:
+                self.written += len(latest)
+                self.batches += 1
+
+    def stop(self, timeout: float = 5):
+        """取消订阅，写完队列中剩余的tick后停止写入线程"""
+        self.unsubscribe()
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """接收、跳过、丢弃、写入的计数和最近的写入延迟（毫秒）"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+        result = {'received': self.received, 'unchanged': self.unchanged, 'dropped': self.dropped,
+                  'written': self.written, 'batches': self.batches, 'queued': self.queue.qsize()}
+        if latencies:
+            result['latency_p50_ms'] = latencies[len(latencies) // 2] * 1000
+            result['latency_p99_ms'] = latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000
+            result['latency_max_ms'] = latencies[-1] * 1000
+        return result
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单元测试共用的构造函数：使用 fakeredis 的缓存管理器和简单的行情tick
+"""
+
+import fakeredis
+
+from mini_stock.redis_cache_manager import RedisCacheManager
+
+
+def make_manager(manager_class=RedisCacheManager, redis_client=None, **kwargs):
+    """
+    使用 fakeredis 的缓存管理器
+
+    Args:
+        manager_class: 缓存管理器类，可以传入测试用的子类
+        redis_client: 客户端，None时新建一个独立的 fakeredis
+        kwargs: 传给构造函数的其他参数，如 history_backend、cache_mode
+    """
+    client = redis_client or fakeredis.FakeRedis(decode_responses=True)
+    return manager_class(redis_client=client, **kwargs)
+
+
+def make_tick(price, volume=100, preclose=None, time=1700000000000, **fields):
+    """
+    构造一条行情tick，开盘价和前收盘价取 preclose（None时取 price），最高/最低价取 price，成交额为量乘价
+
+    Args:
+        time: tick时间（毫秒），None时不带 time 字段
+        fields: 覆盖的字段
+    """
+    preclose = price if preclose is None else preclose
+    tick = {'lastPrice': price, 'open': preclose, 'high': price, 'low': price, 'lastClose': preclose,
+            'amount': volume * price, 'volume': volume}
+    if time is not None:
+        tick['time'] = time
+    tick.update(fields)
+    return tick
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异常检测回放测试：录制调度器分给检测器的快照，离线回放得到与实时检测相同的提示，并行扫描阈值网格
+"""
+
+import gzip
+import os
+import tempfile
+
+from features.index_futures_alert_detector import IndexFuturesAlertDetector
+from mini_stock.alert_detector import AlertDetector
+from mini_stock.alert_replay import (AlertReplayPlayer, AlertSnapshotRecorder, VirtualClock, load_recording,
+                                     recording_path, summarize_alerts, sweep_thresholds, threshold_grid)
+from mini_stock.alert_scheduler import AlertScheduler
+from mini_stock.unit_test.helpers import make_manager, make_tick
+
+START = 1749691800.0  # 2025-06-12 09:30（UTC+8）附近，只用于决定录制文件日期
+STOCK_PRICES = [10.0, 10.1, 10.35, 10.4, 11.0, 11.0, 10.8, 10.9]
+FUTURES_PRICES = [3900, 3905, 3990, 3992, 3995, 3980, 3981, 3985]
+
+
+def record_live_session(directory):
+    """用 fakeredis 运行实时检测并录制快照，返回实时检测写入的提示"""
+    manager = make_manager()
+    manager.cache_preclose_data({'600000.SH': 10.0})
+    clock = VirtualClock(START)
+    recorder = AlertSnapshotRecorder(directory, cache_manager=manager, clock=clock)
+    scheduler = AlertScheduler(cache_manager=manager, start_thread=False, recorder=recorder)
+    stock = AlertDetector(cache_manager=manager, start_thread=False, clock=clock)
+    futures = IndexFuturesAlertDetector(cache_manager=manager, start_thread=False, clock=clock)
+    scheduler.register(stock)
+    scheduler.register(futures)
+
+    for index, (stock_price, futures_price) in enumerate(zip(STOCK_PRICES, FUTURES_PRICES)):
+        clock.now = START + index * 5
+        manager.cache_stock_data('600000.SH', make_tick(stock_price, 100 * (index + 1) ** 2, 10.0))
+        # 股指期货最后两轮不再更新，录制文件只写入有变化的代码
+        if index < 6:
+            manager.cache_stock_data('IF2506.IF', make_tick(futures_price, 5000 + index * 4000, 3900))
+        scheduler.run_once()
+    scheduler.stop()
+    return [alert.to_dict() for alert in stock.alert_history], [alert.to_dict() for alert in futures.alert_history]
+
+
+def test_replay_matches_live_detection():
+    with tempfile.TemporaryDirectory() as directory:
+        live_stock, live_futures = record_live_session(directory)
+        path = recording_path(directory, '20250612')
+        assert os.path.exists(path)
+        entries = load_recording(path)
+
+    assert entries[0] == {'t': START, 'preclose': {'600000.SH': 10.0}}
+    frames = [entry for entry in entries if 'changed' in entry]
+    assert len(frames) == len(STOCK_PRICES) and frames[0]['full']
+    assert set(frames[-1]['changed']) == {'600000.SH'}
+
+    # 涨停、开板、价格异动、突破等都出现过，回放结果与实时检测逐条相同（包括虚拟时钟给出的提示时间）
+    assert {'涨停', '开板', '价格异动', '突破'} <= {alert['alert_type'] for alert in live_stock}
+    assert live_futures
+    replayed = AlertReplayPlayer(entries).play()
+    assert replayed['stock'] == live_stock
+    assert replayed['futures'] == live_futures
+
+    # 可选规则默认不开启，回放时开启并调整阈值用于校准
+    assert '流动性危机' not in {alert['alert_type'] for alert in live_futures}
+    replayed = AlertReplayPlayer(entries, kinds=("futures",), optional=['liquidity']).play(
+        {'futures': {'liquidity': 1e6}})
+    assert '流动性危机' in {alert['alert_type'] for alert in replayed['futures']}
+
+    # 调高阈值后价格异动不再提示
+    replayed = AlertReplayPlayer(entries, kinds=("stock",)).play({'stock': {'price_surge': 0.5}})
+    assert '价格异动' not in {alert['alert_type'] for alert in replayed['stock']}
+
+
+def test_truncated_recording_keeps_complete_lines():
+    with tempfile.TemporaryDirectory() as directory:
+        record_live_session(directory)
+        path = recording_path(directory, '20250612')
+        entries = load_recording(path)
+        with gzip.open(path, 'rb') as file:
+            raw = gzip.compress(file.read())
+        with open(path, 'wb') as file:
+            file.write(raw[:len(raw) * 3 // 4])
+        truncated = load_recording(path)
+    assert 0 < len(truncated) < len(entries)
+    assert truncated == entries[:len(truncated)]
+
+
+def test_sweep_reports_counts_and_lead_times():
+    assert threshold_grid({'a': [1, 2], 'b': [3]}) == [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
+    summary = summarize_alerts([('A', '突破', 95.0), ('A', '突破', 99.0), ('B', '涨停', 50.0)],
+                               {('A', '突破'): 100.0, ('C', '涨停'): 10.0})
+    assert (summary['alerts'], summary['matched'], summary['new'], summary['missed']) == (3, 1, 1, 1)
+    assert summary['lead_mean'] == 5.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        record_live_session(directory)
+        results = sweep_thresholds(recording_path(directory, '20250612'), 'stock',
+                                   {'price_surge': [0.01, 0.05, 0.5]}, max_workers=2)
+    assert [result['thresholds'] for result in results] == [{'price_surge': value} for value in (0.01, 0.05, 0.5)]
+    surges = [result['by_type'].get('价格异动', 0) for result in results]
+    assert surges[0] >= surges[1] > surges[2] == 0
+    # 阈值调低后价格异动提前一个检测周期
+    assert results[0]['lead_mean'] > 0
+    # 默认阈值就是 0.05，与默认回放完全一致
+    assert results[1]['missed'] == results[1]['new'] == 0 and results[1]['lead_mean'] == 0
+    assert results[2]['missed'] > 0
+
+
+if __name__ == "__main__":
+    test_replay_matches_live_detection()
+    test_truncated_recording_keeps_complete_lines()
+    test_sweep_reports_counts_and_lead_times()
+    print("异常检测回放测试通过")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则引擎测试：指标共用、运行中调整阈值、冷却时间、增加规则，整轮快照的数组计算与逐只计算的结果一致
+"""
+
+import random
+
+import numpy as np
+
+from mini_stock import alert_rules
+from mini_stock.alert_rules import (AlertRule, AlertRuleEngine, FUTURES_RULES, STOCK_RULES, default_rules,
+                                   limit_thresholds)
+from mini_stock.cache_config import get_cache_config, set_cache_config
+
+
+def snapshot(price, volume, preclose=10.0):
+    return {'600000.SH': {'lastPrice': price, 'volume': volume, 'lastClose': preclose}}
+
+
+def alerts(codes, triggered):
+    """evaluate_snapshot 的结果转为 [(代码, 提示类型, 级别)]"""
+    return [(codes[i], rule.alert_type, rule.level) for i, rule, _ in triggered]
+
+
+def test_metric_computed_once_per_round():
+    calls = []
+    original = alert_rules.METRICS['volume_ratio']
+
+    def counting(frame, lookback):
+        calls.append(lookback)
+        return original(frame, lookback)
+
+    alert_rules.METRICS['volume_ratio'] = counting
+    try:
+        engine = AlertRuleEngine([
+            {'name': 'surge', 'alert_type': "异常放量", 'metric': 'volume_ratio', 'comparator': '>=', 'threshold': 3},
+            {'name': 'dry', 'alert_type': "成交量异动", 'metric': 'volume_ratio', 'comparator': '<', 'threshold': 0.5},
+        ])
+        engine.evaluate_snapshot(snapshot(10.0, 100))
+        _, triggered = engine.evaluate_snapshot(snapshot(10.1, 400))
+    finally:
+        alert_rules.METRICS['volume_ratio'] = original
+    assert calls == [1, 1]
+    assert [(rule.name, value) for _, rule, value in triggered] == [('surge', 4.0)]
+
+
+def test_runtime_threshold_and_cooldown():
+    engine = AlertRuleEngine(STOCK_RULES)
+    engine.evaluate_snapshot(snapshot(10.0, 100), now=0)
+    _, triggered = engine.evaluate_snapshot(snapshot(9.85, 200), now=5)
+    assert not triggered
+
+    engine.set_threshold('price_surge', 0.02)
+    _, triggered = engine.evaluate_snapshot(snapshot(9.6, 300), now=10)
+    assert [rule.name for _, rule, _ in triggered] == ['price_surge']
+    assert engine.thresholds['price_surge'] == 0.02
+
+    try:
+        engine.set_threshold('missing', 1)
+        assert False
+    except ValueError:
+        pass
+
+    # 涨停每天只提示一次，冷却期内再次满足条件不触发
+    engine = AlertRuleEngine([rule for rule in STOCK_RULES if rule['name'] == 'limit_up'])
+    _, triggered = engine.evaluate_snapshot(snapshot(11.0, 300), now=15)
+    assert [rule.name for _, rule, _ in triggered] == ['limit_up']
+    engine.evaluate_snapshot(snapshot(10.9, 300), now=20)
+    _, triggered = engine.evaluate_snapshot(snapshot(11.0, 300), now=25)
+    assert not triggered
+    _, triggered = engine.evaluate_snapshot(snapshot(11.0, 300), now=25 + 86400)
+    assert [rule.name for _, rule, _ in triggered] == ['limit_up']
+
+
+def test_add_rule_with_longer_lookback():
+    engine = AlertRuleEngine(STOCK_RULES)
+    for price in (10.0, 10.1, 10.2):
+        engine.evaluate_snapshot(snapshot(price, 100), now=0)
+    engine.add_rule(AlertRule('drift', "价格异动", 'price_move', '>=', 0.04, lookback=3))
+    assert engine.recent_prices.shape[1] == 4
+    # 加规则之前只保存了最新一条，补上的列为 NaN，再积累3条后才能回看
+    for price in (10.15, 10.1):
+        _, triggered = engine.evaluate_snapshot(snapshot(price, 100), now=0)
+        assert not triggered
+    _, triggered = engine.evaluate_snapshot(snapshot(9.78, 100), now=0)
+    assert [rule.name for _, rule, _ in triggered] == ['drift']
+    assert np.isclose(triggered[0][2], 0.42 / 10.2)
+
+    engine.remove_rule('drift')
+    assert 'drift' not in engine.thresholds
+
+
+def test_tick_mode_uses_previous_tick():
+    engine = AlertRuleEngine(STOCK_RULES)
+    previous = {'price': [10.0, 10.0], 'volume': [100, 0], 'high': [10.0, 0], 'low': [9.9, 0]}
+    triggered = engine.evaluate_frame(['600000.SH', '600001.SH'], [10.6, 10.6], [500, 500], [10.0, 10.0],
+                                      previous=previous, now=0)
+    assert sorted((i, rule.name) for i, rule, _ in triggered) == [
+        (0, 'breakout'), (0, 'price_surge'), (0, 'volume_surge'), (1, 'price_surge')]
+
+
+def scalar_rules(code, price, volume, preclose, state, thresholds):
+    """逐只计算股票规则，作为数组实现的对照；有冷却时间的规则（涨跌停、反转）在测试期间只触发一次"""
+    triggered = [alert_type for alert_type in _scalar_rules(code, price, volume, preclose, state, thresholds)
+                 if alert_type not in ("涨停", "跌停", "反转") or (code, alert_type) not in state]
+    state.update(((code, alert_type), True) for alert_type in triggered)
+    return triggered
+
+
+def _scalar_rules(code, price, volume, preclose, state, thresholds):
+    prev_price, prev_volume, high, low = state.get(code, (0.0, 0.0, 0.0, 0.0))
+    if price <= 0:
+        return []
+    triggered = []
+    limit_up, limit_down = limit_thresholds([code])
+    change_pct = (price - preclose) / preclose if preclose > 0 else 0.0
+    if preclose > 0 and change_pct >= limit_up[0]:
+        triggered.append("涨停")
+    if preclose > 0 and change_pct <= limit_down[0]:
+        triggered.append("跌停")
+    if prev_volume > 0 and volume > 0 and volume / prev_volume >= thresholds['volume_surge']:
+        triggered.append("异常放量")
+    if prev_price > 0 and abs(price - prev_price) / prev_price >= thresholds['price_surge']:
+        triggered.append("价格异动")
+    if high > 0 and price > high * (1 + thresholds['breakout']):
+        triggered.append("突破")
+    day_high, day_low = max(high, price), min(low, price) if low > 0 else price
+    if preclose > 0 and ((day_high - preclose) / preclose >= thresholds['reversal'] and change_pct <= 0
+                         or (day_low - preclose) / preclose <= -thresholds['reversal'] and change_pct >= 0):
+        triggered.append("反转")
+    state[code] = (price, volume, day_high, day_low)
+    return triggered
+
+
+def test_snapshot_matches_scalar_rules():
+    rng = random.Random(3)
+    codes = [f"{prefix}{index:03d}.{'SH' if prefix.startswith('6') else 'SZ'}"
+             for prefix in ('600', '300', '688', '000') for index in range(50)]
+    engine = AlertRuleEngine(default_rules('stock', optional=['reversal']))
+    state = {}
+    prices = {code: 10.0 for code in codes}
+    volumes = {code: 100.0 for code in codes}
+    seen = set()
+    for _ in range(30):
+        latest = {}
+        for code in rng.sample(codes, 150):
+            prices[code] = round(max(prices[code] * (1 + rng.gauss(0, 0.04)), 0.01), 2)
+            volumes[code] *= rng.choice((1, 1.2, 4))
+            latest[code] = {'lastPrice': prices[code], 'volume': volumes[code], 'lastClose': 10.0}
+        latest['900001.SH'] = {'lastPrice': 0, 'volume': 0, 'lastClose': 10.0}
+        expected = sorted((code, alert_type) for code, data in latest.items()
+                          for alert_type in scalar_rules(code, data['lastPrice'], data['volume'], 10.0, state,
+                                                         engine.thresholds))
+        actual = alerts(*engine.evaluate_snapshot(latest))
+        assert sorted((code, alert_type) for code, alert_type, _ in actual) == expected
+        seen.update(alert_type for _, alert_type, _ in actual)
+    assert seen == {"涨停", "跌停", "异常放量", "价格异动", "突破", "反转"}
+
+
+def test_optional_rules_are_opt_in():
+    original = get_cache_config().to_dict()
+    try:
+        assert 'reversal' not in AlertRuleEngine(default_rules('stock')).thresholds
+        assert 'reversal' not in AlertRuleEngine(default_rules('futures')).thresholds
+        assert [rule['name'] for rule in default_rules('futures')] == [rule['name'] for rule in FUTURES_RULES]
+        assert {'volatility', 'liquidity'}.isdisjoint(rule['name'] for rule in FUTURES_RULES)
+        set_cache_config({'alert_rules': {'optional': ['reversal']}})
+        assert AlertRuleEngine(default_rules('futures')).thresholds['reversal'] == 0.02
+        assert [rule['name'] for rule in default_rules('stock')][-1] == 'reversal'
+    finally:
+        set_cache_config(original)
+    # 返回副本，修改不影响默认规则
+    default_rules('stock')[0]['threshold'] = -1
+    assert STOCK_RULES[0]['threshold'] == 0
+
+
+if __name__ == "__main__":
+    test_metric_computed_once_per_round()
+    test_runtime_threshold_and_cooldown()
+    test_add_rule_with_longer_lookback()
+    test_tick_mode_uses_previous_tick()
+    test_snapshot_matches_scalar_rules()
+    test_optional_rules_are_opt_in()
+    print("规则引擎测试通过")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异常检测调度器测试：股票和股指期货检测器共用一份快照，阈值在运行中调整，使用 fakeredis 代替本地 Redis
+"""
+
+from features.index_futures_alert_detector import IndexFuturesAlertDetector, IndexFuturesAlertType
+from mini_stock.alert_detector import AlertDetector, AlertType
+from mini_stock.alert_scheduler import AlertScheduler
+from mini_stock.redis_cache_manager import RedisCacheManager
+from mini_stock.unit_test.helpers import make_manager, make_tick
+
+
+class CountingManager(RedisCacheManager):
+    """统计读取最新数据快照的次数"""
+
+    snapshot_reads = 0
+
+    def get_multiple_latest_data(self, stock_codes, return_stock_data=False):
+        self.snapshot_reads += 1
+        return super().get_multiple_latest_data(stock_codes, return_stock_data)
+
+
+def test_detectors_share_one_snapshot():
+    manager = make_manager(CountingManager)
+    manager.cache_preclose_data({'600000.SH': 10.0})
+    scheduler = AlertScheduler(cache_manager=manager, start_thread=False)
+    stock = AlertDetector(cache_manager=manager, scheduler=scheduler)
+    futures = IndexFuturesAlertDetector(cache_manager=manager, scheduler=scheduler)
+
+    rounds = [(10.0, 100, 3900, 5000), (10.2, 150, 3910, 6000), (10.3, 200, 3990, 20000)]
+    for stock_price, stock_volume, futures_price, futures_volume in rounds:
+        manager.cache_stock_data('600000.SH', make_tick(stock_price, stock_volume, 10.0))
+        manager.cache_stock_data('IF2506.IF', make_tick(futures_price, futures_volume, 3900))
+        snapshot = scheduler.run_once()
+        assert set(snapshot) == {'600000.SH', 'IF2506.IF'}
+    assert manager.snapshot_reads == len(rounds)
+
+    # 第三轮股指期货成交量放大3.3倍、价格变化2.05%、超过之前最高价2.05%
+    assert [alert.alert_type for alert in futures.alert_history] == [IndexFuturesAlertType.VOLUME_SURGE,
+                                                                     IndexFuturesAlertType.PRICE_SURGE,
+                                                                     IndexFuturesAlertType.BREAKOUT]
+    # 股票没有触发默认阈值，调低阈值后下一轮生效
+    assert stock.alert_history == []
+    stock.set_threshold('price_surge', 0.01)
+    manager.cache_stock_data('600000.SH', make_tick(10.45, 210, 10.0))
+    scheduler.run_once()
+    assert [alert.alert_type for alert in stock.alert_history] == [AlertType.PRICE_SURGE]
+    assert stock.get_rules()[3] == dict(stock.get_rules()[3], name='price_surge', threshold=0.01)
+
+    stock.stop()
+    futures.stop()
+    assert scheduler.detectors == []
+
+
+def test_futures_compare_with_previous_tick():
+    manager = make_manager()
+    scheduler = AlertScheduler(cache_manager=manager, start_thread=False)
+    futures = IndexFuturesAlertDetector(cache_manager=manager, scheduler=scheduler)
+
+    # 一个检测周期内写入多条tick时，与上一条tick比较，不与上一轮快照比较
+    manager.cache_stock_data('IF2506.IF', make_tick(3900, 5000, 3900))
+    manager.cache_stock_data('IF2506.IF', make_tick(3901, 5100, 3900))
+    scheduler.run_once()
+    manager.cache_stock_data('IF2506.IF', make_tick(3985, 5200, 3900))
+    manager.cache_stock_data('IF2506.IF', make_tick(3986, 5300, 3900))
+    scheduler.run_once()
+    # 3985 相对 3901 变化2.15%但不是最新一条；最新一条超过之前最高价 3985 不到1%
+    assert futures.alert_history == []
+
+    manager.cache_stock_data('IF2506.IF', make_tick(4070, 5400, 3900))
+    scheduler.run_once()
+    assert [alert.alert_type for alert in futures.alert_history] == [IndexFuturesAlertType.PRICE_SURGE,
+                                                                     IndexFuturesAlertType.BREAKOUT]
+    assert futures.alert_history[0].data['price_change'] == (4070 - 3986) / 3986
+    # 成交量很小也不提示流动性危机（可选规则，默认不开启）
+    assert all(rule['name'] != 'liquidity' for rule in futures.get_rules())
+    futures.stop()
+
+
+if __name__ == "__main__":
+    test_detectors_share_one_snapshot()
+    test_futures_compare_with_previous_tick()
+    print("异常检测调度器测试通过")
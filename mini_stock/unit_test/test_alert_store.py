@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存提示存储测试：淘汰、索引查询、时间窗口、统计和已提示标识过期
+"""
+
+import threading
+from datetime import datetime, timedelta
+from enum import Enum
+
+from mini_stock.alert_store import AlertStore, DedupSet
+
+
+class Kind(Enum):
+    UP = "上涨"
+    DOWN = "下跌"
+
+
+class Level(Enum):
+    LOW = "低"
+    HIGH = "高"
+
+
+class Alert:
+    def __init__(self, stock_code, alert_type, level, minutes_ago):
+        self.stock_code = stock_code
+        self.alert_type = alert_type
+        self.level = level
+        self.timestamp = datetime.now() - timedelta(minutes=minutes_ago)
+
+
+def scan(alerts, minutes, **filters):
+    """原来的逐条过滤写法，作为对照"""
+    cutoff = datetime.now() - timedelta(minutes=minutes)
+    return [alert for alert in alerts if alert.timestamp >= cutoff
+            and all(getattr(alert, name) == value for name, value in filters.items())]
+
+
+def test_queries_match_scan():
+    store = AlertStore(max_size=50)
+    alerts = []
+    for index in range(120):
+        alert = Alert(f"60000{index % 4}.SH", Kind.DOWN if index % 3 == 0 else Kind.UP,
+                      Level.HIGH if index % 5 == 0 else Level.LOW, minutes_ago=120 - index)
+        alerts.append(alert)
+        store.add(alert)
+    kept = alerts[-50:]
+    assert len(store) == 50
+    assert list(store) == kept
+    for minutes in (0.5, 10, 30, 200):
+        assert store.recent(minutes) == scan(kept, minutes)
+        assert store.by_type(Kind.DOWN, minutes) == scan(kept, minutes, alert_type=Kind.DOWN)
+        assert store.by_code('600002.SH', minutes) == scan(kept, minutes, stock_code='600002.SH')
+        assert store.by_level(Level.HIGH, minutes) == scan(kept, minutes, level=Level.HIGH)
+    assert store.by_code('000001.SZ') == []
+
+
+def test_clear_before_and_stats():
+    store = AlertStore(max_size=10)
+    store.add(Alert('600000.SH', Kind.DOWN, Level.HIGH, minutes_ago=60 * 30))
+    store.add(Alert('600000.SH', Kind.UP, Level.LOW, minutes_ago=5))
+    store.add(Alert('600001.SH', Kind.UP, Level.HIGH, minutes_ago=1))
+    stats = store.stats(since=datetime.now() - timedelta(hours=1))
+    assert stats == {'total_alerts': 3, 'today_alerts': 2, 'by_type': {"上涨": 2}, 'by_level': {"低": 1, "高": 1}}
+    assert list(stats['by_level']) == ["低", "高"]
+
+    store.clear_before(datetime.now() - timedelta(hours=24))
+    assert len(store) == 2
+    # 最早的一条淘汰后，只属于它的索引一并删除
+    assert store.by_type(Kind.DOWN) == []
+    assert Kind.DOWN not in store._indexes['type']
+
+
+def test_out_of_order_timestamp_kept_sorted():
+    store = AlertStore()
+    store.add(Alert('600000.SH', Kind.UP, Level.LOW, minutes_ago=1))
+    late = Alert('600001.SH', Kind.UP, Level.LOW, minutes_ago=10)
+    store.add(late)
+    # 时间早于上一条的提示排在最后，按上一条的时间参与窗口查询
+    assert store.recent(5)[-1] is late
+
+
+def test_dedup_expires():
+    now = [0.0]
+    dedup = DedupSet(ttl_seconds=60, clock=lambda: now[0])
+    dedup.add('a')
+    now[0] = 30
+    dedup.add('b')
+    assert 'a' in dedup and len(dedup) == 2
+    now[0] = 60
+    assert 'a' not in dedup and 'b' in dedup
+    dedup.add('b')
+    now[0] = 100
+    # 重新写入后以最后一次写入的时间计算过期
+    assert 'b' in dedup
+    now[0] = 120
+    assert len(dedup) == 0
+
+
+def test_concurrent_add_and_query():
+    store = AlertStore(max_size=64)
+    done = threading.Event()
+    errors = []
+
+    def write():
+        for index in range(20000):
+            store.add(Alert(f"{index % 7:06d}.SZ", Kind.UP if index % 2 else Kind.DOWN, Level.LOW, 0))
+        done.set()
+
+    def read():
+        # 写入和淘汰时查询，结果不重复、不超过容量、按时间有序
+        while not done.is_set():
+            for alerts in (store.recent(), store.by_code('000003.SZ'), store.by_type(Kind.UP)):
+                if len(alerts) > 64 or len(set(map(id, alerts))) != len(alerts) or None in alerts \
+                        or any(a.timestamp > b.timestamp for a, b in zip(alerts, alerts[1:])):
+                    errors.append(len(alerts))
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors and len(store) == 64
+
+
+if __name__ == "__main__":
+    test_queries_match_scan()
+    test_clear_before_and_stats()
+    test_out_of_order_timestamp_kept_sorted()
+    test_dedup_expires()
+    test_concurrent_add_and_query()
+    print("内存提示存储测试通过")
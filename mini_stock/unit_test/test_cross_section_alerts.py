@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截面异常检测测试：包含全部可选规则，字典快照与列数据两种输入结果相同，股指期货的窗口规则
+"""
+
+import random
+
+import numpy as np
+
+from mini_stock.alert_rules import FUTURES_RULES, OPTIONAL_FUTURES_RULES, OPTIONAL_STOCK_RULES, STOCK_RULES
+from mini_stock.cross_section_alerts import CrossSectionAlertEvaluator
+
+
+def test_snapshot_and_arrays_match():
+    evaluator = CrossSectionAlertEvaluator("stock", thresholds={'price_surge': 0.03})
+    assert list(evaluator.thresholds) == [rule['name'] for rule in STOCK_RULES + OPTIONAL_STOCK_RULES]
+    assert evaluator.thresholds['price_surge'] == 0.03
+    assert CrossSectionAlertEvaluator("stock").thresholds['price_surge'] == 0.05
+
+    rng = random.Random(5)
+    codes = [f"{prefix}{index:03d}.{'SH' if prefix.startswith('6') else 'SZ'}"
+             for prefix in ('600', '300', '000') for index in range(40)]
+    arrays = CrossSectionAlertEvaluator("stock", thresholds={'price_surge': 0.03})
+    prices = np.full(len(codes), 10.0)
+    volumes = np.full(len(codes), 100.0)
+    seen = set()
+    for round_index in range(20):
+        prices = np.round(np.maximum(prices * (1 + np.array([rng.gauss(0, 0.04) for _ in codes])), 0.01), 2)
+        volumes = volumes * np.array([rng.choice((1, 1.2, 4)) for _ in codes])
+        latest = {code: {'lastPrice': price, 'volume': volume, 'lastClose': 10.0}
+                  for code, price, volume in zip(codes, prices, volumes)}
+        expected = evaluator.evaluate(latest, now=round_index * 5.0)
+        assert arrays.evaluate_arrays(codes, prices, volumes, np.full(len(codes), 10.0), now=round_index * 5.0) == expected
+        seen.update(alert_type for _, alert_type, _ in expected)
+    assert seen == {"涨停", "跌停", "异常放量", "价格异动", "突破", "反转"}
+
+
+def test_futures_window_rules():
+    evaluator = CrossSectionAlertEvaluator("futures")
+    assert list(evaluator.thresholds) == [rule['name'] for rule in FUTURES_RULES + OPTIONAL_FUTURES_RULES]
+    triggered = []
+    for round_index in range(8):
+        price = 3900 * (1 + 0.04 * (-1) ** round_index)
+        triggered.append(evaluator.evaluate({'IF2506.IF': {'lastPrice': price, 'volume': 100 + round_index,
+                                                           'lastClose': 3900},
+                                             'IH2506.IF': {'lastPrice': 2700, 'volume': 50000, 'lastClose': 2700}}))
+    # 少于5个价格时不计算波动率，窗口不满5个成交量时不判断流动性
+    assert not any(alert_type == "高波动" for _, alert_type, _ in triggered[3])
+    assert ('IF2506.IF', "高波动", "高") in triggered[4]
+    assert ('IF2506.IF', "流动性危机", "紧急") in triggered[4]
+    # 没有变化的快照不进入窗口
+    assert all(code == 'IF2506.IF' for batch in triggered for code, _, _ in batch)
+
+
+if __name__ == "__main__":
+    test_snapshot_and_arrays_match()
+    test_futures_window_rules()
+    print("截面异常检测测试通过")
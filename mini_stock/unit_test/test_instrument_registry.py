@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合约信息注册表测试：每天一次读取全部板块，查询只读内存，跨天整体刷新，同一天重启读取 Parquet 快照，使用模拟的 xtdata
+"""
+
+import importlib.util
+import os
+import tempfile
+from datetime import datetime
+
+from mini_stock import instrument_registry
+from mini_stock.instrument_registry import InstrumentRegistry
+
+HAS_PARQUET = any(importlib.util.find_spec(name) for name in ('pyarrow', 'fastparquet'))
+
+
+class FakeXtdata:
+    """模拟 xtdata，统计 get_instrument_detail 调用次数"""
+
+    def __init__(self):
+        self.sectors = {
+            '沪深A股': ['600000.SH', '000001.SZ'],
+            'IF': ['IF2507.IF', 'IF2508.IF', 'IO2507-C-4000.IF'],
+            'IH': ['IH2507.IF'],
+            '沪深300': ['601318.SH', '600000.SH'],
+        }
+        self.details = {
+            '600000.SH': {'InstrumentName': '浦发银行', 'OpenDate': '19991110', 'TotalVolume': 29352080397},
+            '000001.SZ': {'InstrumentName': '平安银行', 'OpenDate': 19910403, 'TotalVolume': 19405918198},
+            'IF2507.IF': {'InstrumentID': 'IF2507', 'InstrumentName': '沪深2507', 'MainContract': 1,
+                          'IsTrading': True, 'ExpireDate': '20250718', 'PriceTick': 0.2},
+            'IF2508.IF': {'InstrumentID': 'IF2508', 'InstrumentName': '沪深2508', 'MainContract': 0,
+                          'IsTrading': True, 'ExpireDate': '20250815', 'PriceTick': 0.2},
+            'IO2507-C-4000.IF': {'InstrumentID': 'IO2507-C-4000', 'InstrumentName': '沪深300购7月4000'},
+            'IH2507.IF': {'InstrumentID': 'IH2507', 'InstrumentName': '上证2507', 'MainContract': 1},
+            '510300.SH': {'InstrumentName': '沪深300ETF'},
+            '601318.SH': {'InstrumentName': '中国平安', 'OpenDate': '20070301'},
+        }
+        self.detail_calls = 0
+
+    def get_stock_list_in_sector(self, sector):
+        return list(self.sectors.get(sector, []))
+
+    def get_instrument_detail(self, code):
+        self.detail_calls += 1
+        detail = self.details.get(code)
+        return dict(detail) if detail else None
+
+
+class Clock:
+    def __init__(self, day):
+        self.day = day
+
+    def __call__(self):
+        return self.day
+
+
+def test_lookups_read_memory():
+    fake = FakeXtdata()
+    instrument_registry.xtdata = fake
+    clock = Clock(datetime(2025, 7, 1))
+    with tempfile.TemporaryDirectory() as directory:
+        registry = InstrumentRegistry(directory, today=clock)
+        assert registry.get('000001.SZ') == fake.details['000001.SZ']
+        assert registry.day == '20250701'
+        calls = fake.detail_calls
+        assert calls == 5
+
+        # 当天的查询只读内存
+        for _ in range(3):
+            assert registry.get('IF2507.IF')['MainContract'] == 1
+            assert registry.codes(kind='stock') == ['600000.SH', '000001.SZ']
+        assert registry.codes(sector='IF') == ['IF2507.IF', 'IF2508.IF', 'IO2507-C-4000.IF']
+        frame = registry.frame(kind='futures')
+        assert list(frame.index) == registry.codes(sector='IF') and 'detail' not in frame.columns
+        assert frame.loc['IF2508.IF', 'ExpireDate'] == '20250815'
+        assert fake.detail_calls == calls
+
+        # 板块外的代码按需读取一次；新的板块补充读取
+        assert registry.get('510300.SH') == {'InstrumentName': '沪深300ETF'}
+        assert registry.get('510300.SH') == {'InstrumentName': '沪深300ETF'}
+        assert registry.get('999999.SH') is None
+        assert registry.codes(sector='IH') == ['IH2507.IF']
+        assert fake.detail_calls == calls + 3
+
+        # 跨天整体刷新
+        fake.details['IF2508.IF']['MainContract'] = 1
+        clock.day = datetime(2025, 7, 2)
+        assert registry.get('IF2508.IF')['MainContract'] == 1
+        assert registry.day == '20250702'
+        assert registry.codes(sector='IH') == ['IH2507.IF']
+        assert fake.detail_calls == calls + 3 + 6
+
+        if HAS_PARQUET:
+            # 同一天重启读取快照，不调用接口
+            assert os.path.exists(registry.snapshot_path('20250702'))
+            restarted = InstrumentRegistry(directory, today=clock)
+            assert restarted.get('000001.SZ') == fake.details['000001.SZ']
+            assert restarted.codes(sector='IH') == ['IH2507.IF']
+            assert fake.detail_calls == calls + 3 + 6
+
+
+def test_overlapping_sectors():
+    fake = FakeXtdata()
+    instrument_registry.xtdata = fake
+    clock = Clock(datetime(2025, 7, 1))
+    with tempfile.TemporaryDirectory() as directory:
+        registry = InstrumentRegistry(directory, today=clock)
+        registry.codes()
+        calls = fake.detail_calls
+
+        # 已在沪深A股中的代码同样属于沪深300，只读取新代码的合约信息；没有指定 kind 时按代码推断为 stock
+        assert registry.codes(sector='沪深300') == ['600000.SH', '601318.SH']
+        assert fake.detail_calls == calls + 1
+        assert registry.codes(sector='沪深A股') == ['600000.SH', '000001.SZ']
+        assert registry.codes(kind='stock') == ['600000.SH', '000001.SZ', '601318.SH']
+        assert registry.codes(sector='沪深300', kind='futures') == []
+        assert list(registry.frame(sector='沪深300').index) == ['600000.SH', '601318.SH']
+        assert registry.codes(sector='IH') == registry.codes(sector='IH', kind='futures') == ['IH2507.IF']
+
+        if HAS_PARQUET:
+            restarted = InstrumentRegistry(directory, today=clock)
+            assert restarted.codes(sector='沪深300') == ['600000.SH', '601318.SH']
+            assert restarted.sectors['沪深300'] == 'stock'
+            assert fake.detail_calls == calls + 2
+
+
+def test_service_lookups_use_registry():
+    fake = FakeXtdata()
+    instrument_registry.xtdata = fake
+    with tempfile.TemporaryDirectory() as directory:
+        instrument_registry.instrument_registry = InstrumentRegistry(directory, today=Clock(datetime(2025, 7, 1)))
+        from features.index_futures_market_service import IndexFuturesMarketService
+        from mini_stock.futures_data_enhancer import FuturesDataEnhancer
+
+        # 只借用合约信息相关的方法，不启动行情线程
+        service = IndexFuturesMarketService.__new__(IndexFuturesMarketService)
+        service.sector_name = 'IF'
+        models = service.load_futures_list()
+        assert [model.InstrumentID for model in models] == ['IF2507']
+        assert service.get_futures_info('IF2508.IF')['ExpireDate'] == '20250815'
+        calls = fake.detail_calls
+        service.load_futures_list()
+        assert fake.detail_calls == calls
+
+        code_to_model_map = FuturesDataEnhancer._build_code_to_model_map(models)
+        assert FuturesDataEnhancer._build_code_to_model_map(code_to_model_map) is code_to_model_map
+
+
+if __name__ == "__main__":
+    test_lookups_read_memory()
+    test_overlapping_sectors()
+    test_service_lookups_use_registry()
+    print("合约信息注册表测试通过")
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RedisCacheManager 测试脚本，使用 fakeredis 代替本地 Redis
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import fakeredis
+
+from mini_stock.cache_config import CacheConfig
+from mini_stock import redis_cache_manager
+from mini_stock.redis_cache_manager import RedisCacheManager, get_connection_pool
+from mini_stock.unit_test.helpers import make_manager, make_tick
+
+
+def test_active_code_index():
+    manager = make_manager()
+    manager.cache_stocks_batch({'000001.SZ': make_tick(10.0), '600000.SH': make_tick(8.0)})
+    manager.cache_stock_data('IF2506.IF', make_tick(3900.0))
+
+    assert manager.get_active_codes('stock') == ['000001.SZ', '600000.SH']
+    assert manager.get_active_codes('futures') == ['IF2506.IF']
+    latest = manager.get_multiple_latest_data([])
+    assert set(latest) == {'000001.SZ', '600000.SH', 'IF2506.IF'}
+
+    # 最新数据过期后不再返回
+    manager.redis_client.delete('stock_latest:600000.SH')
+    assert set(manager.get_multiple_latest_data([])) == {'000001.SZ', 'IF2506.IF'}
+
+    manager.cache_filter_result({'min_pct': 5}, [{'code': '000001.SZ'}])
+    manager.cache_filter_result({'min_pct': 5}, [{'code': '600000.SH'}])
+    stats = manager.get_cache_stats()
+    assert stats['today_stocks'] == 3
+    assert stats['latest_stocks'] == 3
+    assert stats['filter_caches'] == 1
+    assert stats['total_records'] == 3
+    assert stats['bytes_written'] > 0
+    assert stats['last_write_time'] is not None
+    assert manager.get_cache_stats('futures')['today_stocks'] == 1
+    assert manager.get_cache_stats('futures')['filter_caches'] == 0
+
+    assert manager.clear_today_data('stock')
+    assert manager.get_active_codes('stock') == []
+    assert manager.get_cache_stats('stock')['today_stocks'] == 0
+    assert manager.get_stock_data_today('000001.SZ') == []
+    assert len(manager.get_stock_data_today('IF2506.IF')) == 1
+
+    assert manager.clear_all_data()
+    assert manager.redis_client.dbsize() == 0
+
+
+def test_cleanup_day():
+    manager = make_manager()
+    client = manager.redis_client
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+    # 有索引的股票数据
+    client.lpush(f'stock_data:000001.SZ:{yesterday}', '{}')
+    client.sadd(f'active_codes:stock:{yesterday}', '000001.SZ')
+    # 旧版本写入、没有索引的期货数据
+    client.lpush(f'futures_data:IF2506.IF:{yesterday}', '{}')
+    manager.cache_stock_data('000002.SZ', make_tick(5.0))
+
+    manager.cleanup_day(yesterday)
+    assert not client.exists(f'stock_data:000001.SZ:{yesterday}')
+    assert not client.exists(f'active_codes:stock:{yesterday}')
+    assert not client.exists(f'futures_data:IF2506.IF:{yesterday}')
+    assert manager.get_active_codes('stock') == ['000002.SZ']
+
+
+def without_timestamp(data):
+    data = dict(data)
+    data.pop('timestamp', None)
+    return data
+
+
+def snapshot(manager, codes):
+    client = manager.redis_client
+    state = {}
+    for code in codes:
+        state[code] = ([without_timestamp(data) for data in manager.get_stock_data_today(code)],
+                       client.ttl(manager._get_today_key(code)) > 0,
+                       without_timestamp(manager.get_latest_stock_data(code)),
+                       client.ttl(manager._get_latest_key(code)) > 0)
+    stats = manager.get_cache_stats()
+    return state, manager.get_active_codes(), stats['today_stocks'], stats['total_records'], stats['bytes_written']
+
+
+def test_push_script_matches_pipeline():
+    codes = [f"{index:06d}.SZ" for index in range(7)] + ['IF2506.IF', 'IC2506.IF']
+    managers = []
+    for script in (True, False):
+        manager = make_manager()
+        config = dict(CacheConfig.DEFAULT_CONFIG)
+        config['max_cache_size'] = {'daily_records_per_stock': 5, 'total_stocks': 5000}
+        manager.config = CacheConfig(config)
+        manager.SCRIPT_CHUNK_SIZE = 4
+        manager._script_supported = script
+        managers.append(manager)
+        for round_index in range(8):
+            manager.cache_stocks_batch({code: make_tick(10.0 + round_index) for code in codes})
+        manager.cache_stock_data(codes[0], make_tick(99.0))
+
+    script_state, pipeline_state = (snapshot(manager, codes) for manager in managers)
+    assert managers[0]._script_shas
+    assert script_state == pipeline_state
+    assert len(script_state[0][codes[0]][0]) == 5
+    assert script_state[2:4] == (9, 45)
+
+
+def test_push_script_reloads_after_flush():
+    manager = make_manager()
+    manager.cache_stock_data('000001.SZ', make_tick(10.0))
+    manager.redis_client.script_flush()
+    assert manager.cache_stock_data('000001.SZ', make_tick(11.0))
+    assert len(manager.get_stock_data_today('000001.SZ')) == 2
+
+
+def test_stream_window_matches_list():
+    base = 1700000000000
+    managers = [make_manager(history_backend=backend) for backend in ('stream', 'stream', 'list')]
+    managers[1]._script_supported = False
+    for manager in managers:
+        for index in range(200):
+            manager.cache_stocks_batch({'000001.SZ': make_tick(10.0 + index * 0.01, time=base + index * 3000),
+                                        'IF2506.IF': make_tick(3900.0 + index, time=base + index * 3000)})
+
+    end = base + 199 * 3000
+    windows = [dict(minutes=1, end=end), dict(start=base + 30000, end=base + 60000), dict(count=5),
+               dict(minutes=5, end=end, count=3), dict(start=end + 1)]
+    results = [[[without_timestamp(data) for data in manager.get_stock_data_window('000001.SZ', **window)]
+                for window in windows] for manager in managers]
+    assert results[0] == results[1] == results[2]
+    assert len(results[0][0]) == 21
+    assert [data['lastPrice'] for data in results[0][3]] == [11.97, 11.98, 11.99]
+    assert results[0][4] == []
+
+    # 乱序到达的tick排在Stream末尾，ID沿用最后一条的毫秒数
+    stream_manager = managers[0]
+    stream_manager.cache_stock_data('000001.SZ', make_tick(99.0, time=base))
+    assert stream_manager.get_stock_data_today('000001.SZ', limit=1)[0]['lastPrice'] == 99.0
+    assert len(stream_manager.get_stock_data_today('000001.SZ')) == 201
+    assert stream_manager.get_stock_data_window('000001.SZ', count=1)[0]['lastPrice'] == 99.0
+    last_id, _ = stream_manager.raw_client.xrevrange(stream_manager._get_stream_key('000001.SZ'), count=1)[0]
+    assert last_id == f'{end}-1'.encode()
+    assert stream_manager.get_cache_stats()['total_records'] == 401
+    assert managers[1].get_cache_stats()['total_records'] == 400
+    assert all(item['consistent'] for item in stream_manager.audit_cache_stats().values())
+
+    assert stream_manager.clear_today_data()
+    assert not stream_manager.redis_client.exists(stream_manager._get_stream_key('000001.SZ'))
+
+
+def test_preclose_hash_and_local_cache():
+    manager = make_manager()
+    client = manager.redis_client
+    # 旧版本写入的JSON字符串
+    client.set(manager._get_preclose_key(), json.dumps({'000001.SZ': 10.0}))
+    assert manager.get_stock_preclose('000001.SZ') == 10.0
+
+    assert manager.cache_preclose_data({'000001.SZ': 10.5, '600000.SH': 8.0})
+    assert manager.cache_preclose_data({'IF2506.IF': 3900.0}, code_type="futures")
+    assert client.type(manager._get_preclose_key()) == 'hash'
+    assert manager.get_stock_preclose('000001.SZ') == 10.5
+    assert manager.get_stock_preclose('IF2506.IF') == 3900.0
+    assert manager.get_stock_preclose('000002.SZ') == 0
+    assert manager.get_multiple_preclose(['600000.SH', 'IF2506.IF', '000002.SZ']) == {'600000.SH': 8.0,
+                                                                                     'IF2506.IF': 3900.0}
+
+    # 版本号不变时只读本地缓存
+    other = RedisCacheManager(redis_client=client)
+    other.PRECLOSE_VERSION_CHECK_SECONDS = 0
+    assert other.get_stock_preclose('000001.SZ') == 10.5
+    client.hset(manager._get_preclose_key(), '000001.SZ', 11.0)
+    assert other.get_stock_preclose('000001.SZ') == 10.5
+
+    # 其他进程整体写入后版本号变化，本地缓存失效
+    manager.cache_preclose_data({'000001.SZ': 12.0})
+    assert other.get_stock_preclose('000001.SZ') == 12.0
+    assert other.get_stock_preclose('600000.SH') == 0
+    assert manager.cache_preclose_data_if_not_exists({'000001.SZ': 1.0})
+    assert manager.get_preclose_data() == {'000001.SZ': 12.0}
+
+    # 日期变化后重新加载
+    day, version, checked_at, data = other._preclose_cache['stock']
+    other._preclose_cache['stock'] = ('20000101', version, checked_at, {'000001.SZ': 1.0})
+    assert other.get_stock_preclose('000001.SZ') == 12.0
+
+
+def test_shared_pool_and_single_cleanup_worker():
+    pool = get_connection_pool('10.0.0.1', 6380, 2)
+    assert get_connection_pool('10.0.0.1', 6380, 2) is pool
+    assert get_connection_pool('10.0.0.1', 6380, 3) is not pool
+    assert get_connection_pool('10.0.0.1', 6380, 2, decode_responses=False) is not pool
+    assert pool.max_connections == CacheConfig().connection_pool['max_connections']
+
+    server = fakeredis.FakeServer()
+    first = make_manager(redis_client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    second = RedisCacheManager(redis_client=first.redis_client)
+    assert first.cleanup_thread is not None and first.cleanup_thread.is_alive()
+    assert second.cleanup_thread is None
+    assert second.raw_client.connection_pool is first.raw_client.connection_pool
+
+    # 不同进程（不同客户端）共用一个Redis时只有一个拿到清理锁
+    other_process = make_manager(redis_client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    assert first._acquire_cleanup_lock('20250701')
+    assert not other_process._acquire_cleanup_lock('20250701')
+
+    first.get_latest_stock_data('000001.SZ')
+    stats = first.get_cache_stats()['connection_pool']
+    assert stats['decoded']['in_use_connections'] == 0
+    assert stats['decoded']['created_connections'] >= 1
+    assert stats['raw']['created_connections'] >= 1
+
+    first.stop()
+    assert not first.cleanup_thread.is_alive()
+    assert RedisCacheManager(redis_client=first.redis_client).cleanup_thread is not None
+
+
+def test_init_cache_manager_stops_replaced_manager():
+    original = redis_cache_manager.cache_manager
+    old = make_manager()
+    old.connection_params = ('10.0.0.1', 6380, 4, None)
+    pool = get_connection_pool(*old.connection_params)
+    redis_cache_manager.cache_manager = old
+    try:
+        # 连接参数变了：旧实例的清理线程停止，旧参数的共享连接池被移除
+        replaced = redis_cache_manager.init_cache_manager('127.0.0.1', 1, 0)
+        assert replaced is not old and not old.running
+        assert not old.cleanup_thread.is_alive()
+        assert get_connection_pool(*old.connection_params) is not pool
+    finally:
+        redis_cache_manager.cache_manager = original
+
+
+def test_audit_cache_stats():
+    manager = make_manager()
+    manager.cache_stocks_batch({'000001.SZ': make_tick(10.0), 'IF2506.IF': make_tick(3900.0)})
+    manager.cache_stock_data('000001.SZ', make_tick(10.1))
+    report = manager.audit_cache_stats()
+    assert report['stock']['actual'] == {'codes': 1, 'records': 2, 'latest': 1, 'filters': 0}
+    assert report['stock']['maintained']['latest'] == 1
+    assert report['stock']['consistent']
+    assert report['futures']['consistent']
+
+    # 最新快照过期后重新写入，计数不扣减，离线核对时重置为实际数量
+    manager.redis_client.delete(manager._get_latest_key('000001.SZ'))
+    manager.cache_stock_data('000001.SZ', make_tick(10.2))
+    assert manager.get_cache_stats('stock')['latest_stocks'] == 2
+    manager.audit_cache_stats(fix=True)
+    assert manager.get_cache_stats('stock')['latest_stocks'] == 1
+
+    # 绕过写入路径的数据（旧版本写入、手工删除）由离线核对发现并修正
+    client = manager.redis_client
+    client.lpush(manager._get_today_key('600000.SH'), '{}')
+    client.delete(manager._get_today_key('IF2506.IF'))
+    report = manager.audit_cache_stats(fix=True)
+    assert not report['stock']['consistent'] and not report['futures']['consistent']
+    assert all(item['consistent'] for item in manager.audit_cache_stats().values())
+    stats = manager.get_cache_stats()
+    assert (stats['today_stocks'], stats['total_records']) == (2, 4)
+    assert manager.get_active_codes() == ['000001.SZ', '600000.SH']
+
+
+def test_unchanged_ticks_only_refresh_latest():
+    manager = make_manager()
+    client = manager.redis_client
+    batch = {'000001.SZ': make_tick(10.0), '600000.SH': make_tick(8.0)}
+    manager.cache_stocks_batch(batch)
+    client.expire(manager._get_latest_key('000001.SZ'), 10)
+
+    # 快照没有变化：不追加历史，最新数据的过期时间被刷新
+    manager.cache_stocks_batch(batch)
+    assert len(manager.get_stock_data_today('000001.SZ')) == 1
+    assert client.ttl(manager._get_latest_key('000001.SZ')) > 10
+
+    # 有成交的代码照常追加
+    manager.cache_stocks_batch({'000001.SZ': make_tick(10.0, time=1700000003000), '600000.SH': make_tick(8.0)})
+    assert len(manager.get_stock_data_today('000001.SZ')) == 2
+    assert len(manager.get_stock_data_today('600000.SH')) == 1
+    assert manager.get_cache_stats()['process_ticks'] == {'appended': 3, 'unchanged': 3}
+
+    # 最新数据已不存在时重新写入
+    client.delete(manager._get_latest_key('600000.SH'))
+    manager.cache_stock_data('600000.SH', make_tick(8.0))
+    assert manager.get_latest_stock_data('600000.SH') is not None
+    assert len(manager.get_stock_data_today('600000.SH')) == 2
+
+    manager.config = CacheConfig(dict(CacheConfig.DEFAULT_CONFIG, skip_unchanged_ticks=False))
+    manager.cache_stock_data('600000.SH', make_tick(8.0))
+    assert len(manager.get_stock_data_today('600000.SH')) == 3
+
+
+def test_unchanged_ticks_after_midnight():
+    manager = make_manager()
+    tick = make_tick(10.0)
+    manager.cache_stock_data('000001.SZ', tick)
+    tomorrow = datetime.now() + timedelta(days=1)
+
+    class NextDay(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return tomorrow
+
+    original = redis_cache_manager.datetime
+    redis_cache_manager.datetime = NextDay
+    try:
+        # 行情没有变化（如停牌），跨天后的第一条仍然写入新一天的历史、索引和统计
+        manager.cache_stock_data('000001.SZ', tick)
+        assert manager.get_active_codes('stock') == ['000001.SZ']
+        assert len(manager.get_stock_data_today('000001.SZ')) == 1
+        assert manager.get_cache_stats('stock')['today_stocks'] == 1
+        manager.cache_stock_data('000001.SZ', tick)
+        assert len(manager.get_stock_data_today('000001.SZ')) == 1
+
+        # 当天索引被其他进程清理后，没有变化的tick也重新写入
+        manager.redis_client.delete(manager._get_active_codes_key('stock'))
+        manager.cache_stock_data('000001.SZ', tick)
+        assert manager.get_active_codes('stock') == ['000001.SZ']
+        assert len(manager.get_stock_data_today('000001.SZ')) == 2
+    finally:
+        redis_cache_manager.datetime = original
+
+
+def test_minute_rollups_are_seamless():
+    base = int(datetime(2025, 7, 1, 9, 30).timestamp() * 1000)
+    for history_backend in ('list', 'stream'):
+        manager = make_manager(history_backend=history_backend)
+        config = dict(CacheConfig.DEFAULT_CONFIG)
+        config['rollup'] = {'horizon_minutes': 5, 'chunk_size': 7}
+        manager.config = CacheConfig(config)
+        for index in range(200):
+            tick = make_tick(10.0 + (index % 7) * 0.01, time=base + index * 3000)
+            tick.update(volume=100.0 * (index + 1), amount=1000.0 * (index + 1))
+            manager.cache_stock_data('000001.SZ', tick)
+
+        before = manager.get_minute_bars('000001.SZ')
+        assert len(before) == 10 and before[0]['ticks'] == 20
+        assert before[0]['volume'] == 2000.0 and before[1]['volume'] == 2000.0
+        assert sum(bar['amount'] for bar in before) == 200000.0
+
+        # 最新tick在 09:39:57，压缩 09:35 之前的5分钟
+        compacted = manager.compact_rollups(base + 10 * 60000)
+        assert compacted == 100
+        assert len(manager.get_stock_data_today('000001.SZ')) == 100
+        assert manager.get_minute_bars('000001.SZ') == before
+        assert manager.compact_rollups(base + 10 * 60000) == 0
+        assert manager.get_cache_stats()['total_records'] == 100
+        assert all(item['consistent'] for item in manager.audit_cache_stats().values())
+
+        # 已压缩的分钟又到达的tick在下一次压缩时合并
+        late = make_tick(9.0, time=base + 1000)
+        late.update(volume=150.0, amount=1500.0)
+        manager.cache_stock_data('000001.SZ', late)
+        manager.compact_rollups(base + 10 * 60000)
+        first = manager.get_minute_bars('000001.SZ')[0]
+        assert (first['low'], first['close'], first['ticks'], first['volume']) == (9.0, 9.0, 21, 2000.0)
+        assert manager.get_minute_bars('000001.SZ', start=base + 8 * 60000) == before[8:]
+
+
+def test_rollups_retry_on_concurrent_write():
+    base = int(datetime(2025, 7, 1, 9, 30).timestamp() * 1000)
+    for history_backend in ('list', 'stream'):
+        manager = make_manager(history_backend=history_backend)
+        config = dict(CacheConfig.DEFAULT_CONFIG)
+        config['rollup'] = {'horizon_minutes': 5, 'chunk_size': 7}
+        manager.config = CacheConfig(config)
+        for index in range(200):
+            tick = make_tick(10.0, time=base + index * 3000)
+            tick.update(volume=100.0 * (index + 1), amount=1000.0 * (index + 1))
+            manager.cache_stock_data('000001.SZ', tick)
+
+        # 读取旧tick之后、事务提交之前写入一条tick，事务被打断后重试，新写入的tick不能被截断丢失
+        merge_rollups = manager._merge_rollups
+        calls = []
+
+        def merge_with_concurrent_write(*args):
+            calls.append(1)
+            if len(calls) == 1:
+                late = make_tick(9.0, time=base + 1000)
+                late.update(volume=150.0, amount=1500.0)
+                manager.cache_stock_data('000001.SZ', late)
+            return merge_rollups(*args)
+
+        manager._merge_rollups = merge_with_concurrent_write
+        assert manager.compact_rollups(base + 10 * 60000) == 100
+        assert len(calls) == 2
+        remaining = manager.get_stock_data_today('000001.SZ')
+        assert len(remaining) == 101 and sum(1 for data in remaining if data['lastPrice'] == 9.0) == 1
+        first = manager.get_minute_bars('000001.SZ')[0]
+        assert (first['low'], first['ticks'], first['volume']) == (9.0, 21, 2000.0)
+        assert manager.get_cache_stats()['total_records'] == 101
+        assert all(item['consistent'] for item in manager.audit_cache_stats().values())
+
+
+def test_top_movers_leaderboards():
+    # 10:30 已交易60分钟，量比 = 成交量 / (5日均量 × 60 / 240)
+    now = int(datetime.now().replace(hour=10, minute=30, second=0, microsecond=0).timestamp() * 1000)
+    for history_backend in ('list', 'stream'):
+        manager = make_manager(history_backend=history_backend)
+        manager.cache_volume_baseline({'000001.SZ': 400.0, '600000.SH': 4000.0})
+        batch = {}
+        for code, price, high, low, amount in (('000001.SZ', 11.0, 11.0, 9.8, 5.0e6), ('600000.SH', 9.5, 10.2, 9.4, 8.0e6),
+                                               ('300750.SZ', 10.3, 10.5, 10.0, 1.0e6)):
+            tick = make_tick(price, time=now)
+            tick.update(lastClose=10.0, high=high, low=low, amount=amount, volume=500)
+            batch[code] = tick
+        batch['IF2506.IF'] = make_tick(3900.0, time=now)
+        manager.cache_stocks_batch(batch)
+
+        assert manager.get_top_movers('pct_change', 2) == [{'code': '000001.SZ', 'value': 10.0},
+                                                           {'code': '300750.SZ', 'value': 3.0}]
+        assert manager.get_top_movers('pct_change', 1, ascending=True) == [{'code': '600000.SH', 'value': -5.0}]
+        assert [item['code'] for item in manager.get_top_movers('turnover', 5)] == ['600000.SH', '000001.SZ', '300750.SZ']
+        assert manager.get_top_movers('amplitude', 1) == [{'code': '000001.SZ', 'value': 12.0}]
+        # 没有5日均量的代码不参与量比排行
+        assert manager.get_top_movers('volume_ratio', 5) == [{'code': '000001.SZ', 'value': 5.0},
+                                                             {'code': '600000.SH', 'value': 0.5}]
+
+        # 没有变化的快照也更新排行（量比随时间下降）
+        later = {code: dict(tick, time=now) for code, tick in batch.items()}
+        manager.cache_volume_baseline({'000001.SZ': 800.0})
+        manager.cache_stocks_batch(later)
+        assert len(manager.get_stock_data_today('000001.SZ')) == 1
+        assert manager.get_top_movers('volume_ratio', 1) == [{'code': '000001.SZ', 'value': 2.5}]
+
+        try:
+            manager.get_top_movers('market_value')
+            assert False, "未知指标应该报错"
+        except ValueError:
+            pass
+
+        assert manager.clear_today_data('stock')
+        assert manager.get_top_movers('pct_change') == []
+
+
+def test_stock_data_since_watermark():
+    for history_backend in ('list', 'stream'):
+        manager = make_manager(history_backend=history_backend)
+        for index in range(50):
+            manager.cache_stock_data('000001.SZ', make_tick(10.0 + index * 0.01, time=1700000000000 + index * 3000))
+
+        everything = manager.get_stock_data_since('000001.SZ')
+        assert [tick['lastPrice'] for tick in everything] == [10.0 + index * 0.01 for index in range(50)]
+        # 跨越多页读取
+        assert manager.get_stock_data_since('000001.SZ', everything[10]['timestamp']) == everything[11:]
+        assert manager.get_stock_data_since('000001.SZ', everything[-1]['timestamp']) == []
+
+
+def test_alert_journal():
+    manager = make_manager()
+    ids = [manager.append_alert({'stock_code': f'60000{index}.SH', 'alert_type': "涨停", 'level': "高"})
+           for index in range(5)]
+    manager.append_alert({'futures_code': 'IF2506.IF', 'alert_type': "高波动", 'level': "高"}, "futures")
+
+    alerts = manager.get_alerts()
+    assert [alert['id'] for alert in alerts] == ids
+    assert alerts[0]['stock_code'] == '600000.SH'
+    # 时间范围只包含写入之后的提示
+    assert manager.get_alerts(start=int(ids[-1].split('-')[0]) + 1000) == []
+    assert [alert['futures_code'] for alert in manager.get_alerts("futures")] == ['IF2506.IF']
+
+    # 每个消费组独立从当天第一条开始读，组内消费者分摊
+    first = manager.read_new_alerts('dashboard', 'a', count=3)
+    second = manager.read_new_alerts('dashboard', 'b')
+    assert [alert['id'] for alert in first + second] == ids
+    assert len(manager.read_new_alerts('wechat', 'a')) == 5
+    assert manager.read_new_alerts('dashboard', 'a') == []
+
+    # 未确认的提示在重启后可以重新读取
+    assert manager.ack_alerts('dashboard', [first[0]['id']]) == 1
+    assert [alert['id'] for alert in manager.read_new_alerts('dashboard', 'a', pending=True)] == ids[1:3]
+
+    manager.append_alert({'stock_code': '000001.SZ', 'alert_type': "跌停", 'level': "高"})
+    assert [alert['stock_code'] for alert in manager.read_new_alerts('dashboard', 'b')] == ['000001.SZ']
+    assert manager.redis_client.ttl(manager._get_alert_journal_key("stock")) > 86400
+    assert not manager.redis_client.keys('filter_cache:*')
+
+
+if __name__ == "__main__":
+    test_active_code_index()
+    test_cleanup_day()
+    test_push_script_matches_pipeline()
+    test_push_script_reloads_after_flush()
+    test_stream_window_matches_list()
+    test_preclose_hash_and_local_cache()
+    test_shared_pool_and_single_cleanup_worker()
+    test_init_cache_manager_stops_replaced_manager()
+    test_audit_cache_stats()
+    test_unchanged_ticks_only_refresh_latest()
+    test_unchanged_ticks_after_midnight()
+    test_minute_rollups_are_seamless()
+    test_rollups_retry_on_concurrent_write()
+    test_top_movers_leaderboards()
+    test_stock_data_since_watermark()
+    test_alert_journal()
+    print("RedisCacheManager 测试通过")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+股票筛选测试：全市场一次读取行情，合约信息从注册表读取，筛选条件按列计算，使用模拟的 xtdata
+"""
+
+import tempfile
+from datetime import datetime
+
+from mini_stock import instrument_registry, stock_data_manager
+from mini_stock.instrument_registry import InstrumentRegistry
+from mini_stock.stock_data_manager import StockDataManager, StockFilter
+
+TARGET_DATE = datetime(2025, 7, 1, 10, 30)
+
+
+def make_detail(name, open_date='20200101', status=0, total_volume=1e8):
+    return {'InstrumentName': name, 'InstrumentStatus': status, 'OpenDate': open_date, 'TotalVolume': total_volume}
+
+
+def make_quote(price, last_close=10.0, open_int=0):
+    return {'lastPrice': price, 'lastClose': last_close, 'openInt': open_int}
+
+
+class FakeXtdata:
+    """模拟 xtdata，统计接口调用次数"""
+
+    def __init__(self):
+        self.details = {
+            '600000.SH': make_detail('浦发银行'),
+            '600001.SH': make_detail('*ST测试'),
+            '600002.SH': make_detail('退市测试'),
+            '600003.SH': make_detail('状态异常', status=1),
+            '600004.SH': make_detail('新股', open_date='20250601'),
+            '600005.SH': make_detail('无日期', open_date='0'),
+            '000001.SZ': make_detail('平安银行', total_volume=3e9),
+            '000002.SZ': make_detail('停牌', total_volume=2e8),
+            '000003.SZ': make_detail('涨停'),
+            '000004.SZ': make_detail('无行情'),
+            '000005.SZ': make_detail('昨收为0'),
+            '000006.SZ': None,
+        }
+        self.quotes = {
+            '600000.SH': make_quote(10.2), '600001.SH': make_quote(3.0), '600002.SH': make_quote(1.0),
+            '600003.SH': make_quote(5.0), '600004.SH': make_quote(30.0), '600005.SH': make_quote(8.0),
+            '000001.SZ': make_quote(10.5), '000002.SZ': make_quote(9.0, open_int=1),
+            '000003.SZ': make_quote(11.0), '000005.SZ': make_quote(8.0, last_close=0), '000006.SZ': make_quote(8.0),
+        }
+        self.detail_calls = 0
+        self.tick_calls = 0
+
+    def get_stock_list_in_sector(self, sector):
+        return list(self.details)
+
+    def get_instrument_detail(self, stock):
+        self.detail_calls += 1
+        return self.details[stock]
+
+    def get_full_tick(self, stocks):
+        self.tick_calls += 1
+        return {stock: self.quotes[stock] for stock in stocks if stock in self.quotes}
+
+
+def install_fake(directory):
+    fake = FakeXtdata()
+    stock_data_manager.xtdata = fake
+    instrument_registry.xtdata = fake
+    instrument_registry.instrument_registry = InstrumentRegistry(directory, sectors={'沪深A股': 'stock'})
+    return fake
+
+
+def test_filter_stocks_batched():
+    with tempfile.TemporaryDirectory() as directory:
+        check_filter_stocks(install_fake(directory))
+
+
+def check_filter_stocks(fake):
+    stocks = StockDataManager.filter_stocks(StockFilter(), TARGET_DATE)
+    assert list(stocks) == ['600000.SH', '000001.SZ']
+    info = stocks['000001.SZ']
+    assert (info.name, info.price, info.market_value, info.min_investment) == ('平安银行', 10.5, 3.15e10, 1050.0)
+    assert info.days_listed == (TARGET_DATE - datetime(2020, 1, 1)).days
+    assert info.market_value_in_yi == 315.0
+    # 合约信息整个板块读取一次，没有信息的代码不在注册表中，查询时再读取一次
+    assert (fake.tick_calls, fake.detail_calls) == (1, len(fake.details) + 1)
+
+    # 放宽条件：ST、退市、状态异常、新股、停牌、涨停都保留，日期无效、没有行情和昨收为0的仍然排除
+    stocks = StockDataManager.filter_stocks(StockFilter(min_listed_days=0, exclude_st=False, exclude_delisted=False,
+                                                        exclude_limit_up=False, exclude_suspended=False), TARGET_DATE)
+    assert set(stocks) == {'600000.SH', '600001.SH', '600002.SH', '600003.SH', '600004.SH', '000001.SZ',
+                           '000002.SZ', '000003.SZ'}
+    # 合约信息当天只读取一次
+    assert (fake.tick_calls, fake.detail_calls) == (2, len(fake.details) + 1)
+
+    stocks = StockDataManager.filter_stocks(StockFilter(min_market_value_in_yi=15, max_market_value_in_yi=100),
+                                            TARGET_DATE)
+    assert list(stocks) == []
+    stocks = StockDataManager.filter_stocks(StockFilter(max_market_value_in_yi=100), TARGET_DATE)
+    assert list(stocks) == ['600000.SH']
+
+
+def test_market_share_batched():
+    with tempfile.TemporaryDirectory() as directory:
+        check_market_share(install_fake(directory))
+
+
+def check_market_share(fake):
+    share = StockDataManager.get_market_share(['600000.SH', '000001.SZ', '999999.SH'])
+    market_value = sum(fake.quotes[stock]['lastPrice'] * detail['TotalVolume']
+                       for stock, detail in fake.details.items() if detail and stock in fake.quotes)
+    assert share['market_value'] == market_value
+    assert share['strategy_value'] == 10.2e8 + 3.15e10
+    assert share['share_percent'] == share['strategy_value'] / market_value * 100
+    assert fake.tick_calls == 1
+
+    fake.quotes = {}
+    assert StockDataManager.get_market_share(['600000.SH'])['share_percent'] == 0
+
+
+if __name__ == "__main__":
+    test_filter_stocks_batched()
+    test_market_share_batched()
+    print("股票筛选测试通过")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列存tick测试：TickBatch 整列编码与 struct 编码逐条结果相同，缓存写入与 cache_stocks_batch 一致，
+SlottedStockTickData 与 StockTickData 转换结果相同
+"""
+
+from mini_stock.cache_config import CacheMode
+from mini_stock.stock_data_model import SlottedStockTickData, StockDataFactory, StockTickData
+from mini_stock.tick_batch import TickBatch
+from mini_stock.tick_codec import decode_tick, get_tick_codec
+from mini_stock.unit_test.helpers import make_manager
+
+TIMESTAMP = '2025-07-01T10:51:00.123456'
+
+
+def full_tick(price=8.48, volume=27810.0):
+    """迅投 get_full_tick 返回的完整字段，带缓存时间戳"""
+    return {'time': '1751338260000', 'lastPrice': price, 'open': 8.31, 'high': 8.68, 'low': 8.23, 'lastClose': 8.24,
+            'amount': 23538925.000000004, 'volume': volume, 'pvolume': 2781033.0, 'tickvol': 4.0,
+            'stockStatus': 3, 'openInt': 13, 'lastSettlementPrice': 0.0,
+            'askPrice': [8.48, 8.51, 8.52, 8.53, 8.59], 'bidPrice': [8.47, 8.45, 8.44, 8.43, 8.42],
+            'askVol': [1, 8, 46, 25, 28], 'bidVol': [14, 76, 76, 129, 160],
+            'settlementPrice': 0.0, 'transactionNum': 2368, 'pe': 0.0, 'timestamp': TIMESTAMP}
+
+
+def make_records():
+    return {
+        '600000.SH': full_tick(),
+        '000001.SZ': {'time': '1751338263000', 'lastPrice': 10.5, 'volume': 100, 'timestamp': TIMESTAMP},
+        # 以下按字典逐条编码：盘口不是5档、时间不是整数、成交量带小数
+        '300750.SZ': dict(full_tick(), askPrice=[8.48, 8.5], askVol=[1, 2]),
+        'IF2507.IF': dict(full_tick(3900.0), time='2025-07-01 10:51:00'),
+        '688001.SH': dict(full_tick(), bidVol=[1.5, 2, 3, 4, 5]),
+    }
+
+
+def validated_record(data):
+    """按 StockDataFactory 的规则补全全部字段，保留缓存时间戳"""
+    record = StockDataFactory._validate_data_dict(data)
+    record['timestamp'] = data['timestamp']
+    return record
+
+
+def expected_record(data, full):
+    record = validated_record(data)
+    # 没有完整字段的字典只保存核心字段
+    if not full or 'askPrice' not in data:
+        return StockTickData(**record).get_essential_fields() | {'timestamp': data['timestamp']}
+    return record
+
+
+def test_encode_matches_struct_codec():
+    records = make_records()
+    batch = TickBatch.from_records(records)
+    codec = get_tick_codec('struct')
+    # 不足5档的盘口按列保存档位数，编码时逐条处理
+    assert set(batch.fallback) == {3, 4}
+    for full in (True, False):
+        payloads = batch.encode(codec, full=full)
+        for payload, data in zip(payloads, records.values()):
+            assert payload == codec.encode(expected_record(data, full))
+
+        decoded = TickBatch.from_encoded(batch.codes, payloads)
+        assert decoded.codes == batch.codes
+        assert decoded.to_records(full) == {code: decode_tick(payload) for code, payload in zip(batch.codes, payloads)}
+
+    assert batch['lastPrice'].tolist()[:2] == [8.48, 10.5]
+    assert batch.select(['000001.SZ', '不存在']).to_records() == {'000001.SZ': batch.record(1)}
+
+
+def test_broken_payload_is_skipped():
+    payloads = TickBatch.from_records({'600000.SH': full_tick()}).encode()
+    batch = TickBatch.from_encoded(['600000.SH', '000001.SZ'], payloads + [b'\xa7\x01\x02broken'])
+    assert batch.codes == ['600000.SH']
+
+
+def test_cache_tick_batch_matches_cache_stocks_batch():
+    for mode in (CacheMode.FULL.value, CacheMode.ESSENTIAL.value):
+        managers = [make_manager(cache_mode=mode) for _ in range(2)]
+        rounds = [make_records(), make_records(), dict(make_records(), **{'600000.SH': full_tick(8.5, 28000.0)})]
+        for records in rounds:
+            # 与迅投行情一样带全部字段；cache_stocks_batch 的 StockTickData 路径保留 timestamp，与 TickBatch 一致
+            records = {code: validated_record(data) for code, data in records.items()}
+            managers[0].cache_stocks_batch({code: StockTickData(**data) for code, data in records.items()})
+            managers[1].cache_tick_batch(TickBatch.from_records(records))
+
+        codes = list(make_records())
+        expected = managers[0].get_multiple_latest_data(codes)
+        assert managers[1].get_multiple_latest_data(codes) == expected
+        assert managers[1]._fingerprints == managers[0]._fingerprints
+        for code in codes:
+            # 重复的tick被跳过，两边列表长度相同
+            assert len(managers[1].get_stock_data_today(code)) == len(managers[0].get_stock_data_today(code))
+        assert managers[1].get_latest_batch(codes).to_records() == expected
+
+
+def test_slotted_tick_matches_dataclass():
+    data = validated_record(full_tick())
+    slotted, tick = SlottedStockTickData(**data), StockTickData(**data)
+    assert not hasattr(slotted, '__dict__')
+    assert slotted.to_dict() == tick.to_dict()
+    assert slotted.get_essential_fields() == tick.get_essential_fields()
+    assert TickBatch.from_records({'600000.SH': full_tick()}).tick(0).to_dict() == tick.to_dict()
+
+
+if __name__ == "__main__":
+    test_encode_matches_struct_codec()
+    test_broken_payload_is_skipped()
+    test_cache_tick_batch_matches_cache_stocks_batch()
+    test_slotted_tick_matches_dataclass()
+    print("列存tick测试通过")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tick 编解码测试：二进制编码与 JSON 结果一致，旧 JSON 数据可以透明读取
+"""
+
+import json
+
+import fakeredis
+
+from mini_stock.cache_config import CacheMode
+from mini_stock.redis_cache_manager import RedisCacheManager
+from mini_stock.stock_data_model import StockTickData
+from mini_stock.tick_codec import TICK_CODECS, decode_tick, get_tick_codec
+
+
+def make_tick_data():
+    return StockTickData(time='20250701105100', lastPrice=8.48, open=8.31, high=8.68, low=8.23, lastClose=8.24,
+                         amount=23538925.000000004, volume=27810.0, pvolume=2781033.0, tickvol=4.0, stockStatus=3,
+                         openInt=13, lastSettlementPrice=0.0,
+                         askPrice=[8.48, 8.51, 8.52, 8.53, 8.59],
+                         bidPrice=[8.47, 8.450000000000001, 8.440000000000001, 8.430000000000001, 8.420000000000002],
+                         askVol=[1, 8, 46, 25, 28], bidVol=[14, 76, 76, 129, 160],
+                         settlementPrice=0.0, transactionNum=2368, pe=0.0,
+                         timestamp='2025-07-01T10:51:00.123456')
+
+
+def test_round_trip_matches_json():
+    tick = make_tick_data()
+    for data in (tick.get_essential_fields(), tick.get_full_fields()):
+        expected = json.loads(json.dumps(data, ensure_ascii=False))
+        for codec in TICK_CODECS.values():
+            encoded = codec.encode(data)
+            assert codec.decode(encoded) == expected, codec.name
+            assert decode_tick(encoded) == expected, codec.name
+        assert len(get_tick_codec('struct').encode(data)) < len(get_tick_codec('json').encode(data))
+
+
+def test_fallback_to_json():
+    codec = get_tick_codec('struct')
+    odd = [
+        {'raw_data': 'xxx', 'timestamp': '2025-07-01T10:51:00'},
+        dict(make_tick_data().get_essential_fields(), time='2025-07-01 10:51:00'),
+        dict(make_tick_data().get_essential_fields(), timestamp='2025-07-01T10:51:00+08:00'),
+        dict(make_tick_data().get_full_fields(), askVol=[1.5, 2]),
+    ]
+    for data in odd:
+        encoded = codec.encode(data)
+        assert encoded.startswith(b'{')
+        assert decode_tick(encoded) == data
+
+
+def test_manager_reads_legacy_json():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    manager = RedisCacheManager(redis_client=client, cache_mode=CacheMode.FULL.value)
+    tick = make_tick_data()
+
+    # 旧版本写入的 JSON 数据
+    legacy = json.dumps(tick.get_full_fields(), ensure_ascii=False)
+    client.lpush(manager._get_today_key('000001.SZ'), legacy)
+    client.set(manager._get_latest_key('000001.SZ'), legacy)
+    client.sadd(manager._get_active_codes_key('stock'), '000001.SZ')
+
+    manager.cache_stock_data('000001.SZ', tick)
+    raw = manager.raw_client.lrange(manager._get_today_key('000001.SZ'), 0, -1)
+    assert raw[0][0] == get_tick_codec('struct').MAGIC
+    assert raw[1] == legacy.encode('utf-8')
+
+    # StockTickData.from_dict 会重新生成 timestamp，这里只比较行情字段
+    today = manager.get_stock_data_today('000001.SZ', return_stock_data=True)
+    expected = dict(tick.to_dict(), timestamp=None)
+    assert [dict(item.to_dict(), timestamp=None) for item in today] == [expected, expected]
+    assert manager.get_latest_stock_data('000001.SZ') == tick.get_full_fields()
+
+    client.set(manager._get_latest_key('600000.SH'), legacy)
+    latest = manager.get_multiple_latest_data(['000001.SZ', '600000.SH'])
+    assert latest == {'000001.SZ': tick.get_full_fields(), '600000.SH': tick.get_full_fields()}
+
+
+if __name__ == "__main__":
+    test_round_trip_matches_json()
+    test_fallback_to_json()
+    test_manager_reads_legacy_json()
+    print("tick 编解码测试通过")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情推送接入测试：只有变化的代码入队，按条数或时间阈值批量写入，队列有界，使用模拟的行情推送和 fakeredis
+"""
+
+import time
+
+from mini_stock.fake_quote_publisher import FakeQuotePublisher
+from mini_stock.tick_ingestor import QuoteIngestor
+from mini_stock.unit_test.helpers import make_manager
+
+CODES = [f"{600000 + index}.SH" for index in range(40)]
+
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_pushed_ticks_reach_redis():
+    for whole_quote in (True, False):
+        manager = make_manager()
+        publisher = FakeQuotePublisher(CODES, change_ratio=0.4, repeat_ratio=0.5)
+        batches = []
+        ingestor = QuoteIngestor(manager, xtdata_module=publisher, batch_size=16, flush_interval=0.05,
+                                 whole_quote=whole_quote, on_batch=batches.append)
+        ingestor.start(CODES + ['000001.SZ'])
+        changed = {}
+        for _ in range(5):
+            changed.update(publisher.publish_round())
+        ingestor.stop()
+
+        # 重复推送的tick不入队，写入的是每只股票最新的tick
+        stats = ingestor.stats()
+        assert stats['received'] == publisher.published
+        assert stats['unchanged'] > 0 and stats['dropped'] == 0 and stats['queued'] == 0
+        assert stats['latency_p99_ms'] >= stats['latency_p50_ms'] > 0
+        latest = manager.get_multiple_latest_data(CODES)
+        # 第一次推送的代码即使行情没有变化也写入
+        assert set(changed) < set(latest)
+        for code in latest:
+            tick = publisher.ticks[code]
+            assert (latest[code]['time'], latest[code]['lastPrice'], latest[code]['volume']) == \
+                   (str(tick['time']), tick['lastPrice'], tick['volume'])
+        assert all(len(batch) <= 16 for batch in batches)
+        assert publisher._subscriptions == {}
+
+
+def test_flush_on_size_or_interval():
+    manager = make_manager()
+    publisher = FakeQuotePublisher(CODES[:30], change_ratio=1.0, repeat_ratio=0)
+    ingestor = QuoteIngestor(manager, xtdata_module=publisher, batch_size=10, flush_interval=10)
+    ingestor.start(CODES)
+    publisher.publish_round()
+    # 等待时间远小于 flush_interval，凑满条数就写入
+    assert wait_until(lambda: ingestor.stats()['batches'] == 3, timeout=2)
+    ingestor.stop()
+
+    ingestor = QuoteIngestor(make_manager(), xtdata_module=publisher, batch_size=1000, flush_interval=0.05)
+    ingestor.start(CODES)
+    publisher.publish_round()
+    # 不足一批时等待 flush_interval 后写入
+    assert wait_until(lambda: ingestor.stats()['written'] == 30, timeout=2)
+    assert ingestor.stats()['batches'] == 1
+    ingestor.stop()
+
+
+def test_bounded_queue_and_inactive_writes():
+    publisher = FakeQuotePublisher(CODES, change_ratio=1.0, repeat_ratio=0)
+    ingestor = QuoteIngestor(make_manager(), xtdata_module=publisher, queue_size=5)
+    # 只订阅不启动写入线程，队列满时丢弃最早的tick
+    ingestor.subscribe(CODES)
+    publisher.publish_round()
+    assert ingestor.stats()['dropped'] == len(CODES) - 5
+    assert [item[0] for item in list(ingestor.queue.queue)] == CODES[-5:]
+    # 被丢弃的代码再推送相同的tick时重新入队，不会被当作没有变化
+    ingestor.on_quote({CODES[0]: publisher.ticks[CODES[0]]})
+    assert ingestor.stats()['unchanged'] == 0
+    assert list(ingestor.queue.queue)[-1][0] == CODES[0]
+    ingestor.on_quote({CODES[-1]: publisher.ticks[CODES[-1]]})
+    assert ingestor.stats()['unchanged'] == 1
+    ingestor.unsubscribe()
+
+    manager = make_manager()
+    pushed = []
+    trading = {'active': False}
+    ingestor = QuoteIngestor(manager, xtdata_module=publisher, flush_interval=0.01,
+                             active=lambda: trading['active'], on_batch=pushed.append)
+    ingestor.start(CODES)
+    publisher.publish_round()
+    ingestor.stop()
+    # 非交易时间不写入Redis，但仍然回调最新行情
+    assert manager.get_multiple_latest_data(CODES) == {}
+    assert sum(len(batch) for batch in pushed) == len(CODES) and ingestor.stats()['written'] == 0
+
+    # 没有写入的tick不记指纹，交易开始后相同的推送照常写入
+    trading['active'] = True
+    ingestor.start(CODES)
+    ingestor.on_quote(dict(publisher.ticks))
+    ingestor.stop()
+    assert ingestor.stats()['unchanged'] == 0 and ingestor.stats()['written'] == len(CODES)
+    assert set(manager.get_multiple_latest_data(CODES)) == set(CODES)
+
+
+if __name__ == "__main__":
+    test_pushed_ticks_reach_redis()
+    test_flush_on_size_or_interval()
+    test_bounded_queue_and_inactive_writes()
+    print("行情推送接入测试通过")
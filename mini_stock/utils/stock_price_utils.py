@@ -193,3 +193,27 @@ class StockPriceUtils:
                 preclose_dict[code] = preclose
         logging.info(f"成功拉取上个日数据 {len(preclose_dict)} 条")
         return preclose_dict
+
+    @staticmethod
+    def get_average_volume(code, days=5):
+        """最近days个交易日（不含当天）的日均成交量，用于计算量比"""
+        try:
+            today = DateUtils.now().strftime('%Y%m%d')
+            daily = xtdata.get_market_data_ex(['volume'], [code], period='1d', count=days + 1, end_time=today)
+            if code in daily and not daily[code].empty:
+                history = daily[code][daily[code].index.astype(str).str[:8] < today].tail(days)
+                if not history.empty:
+                    return float(history['volume'].mean())
+        except Exception as e:
+            logging.error(f"获取{code}日均成交量失败: {e}")
+        return None
+
+    @staticmethod
+    def get_all_average_volume(code_list, days=5):
+        baseline = {}
+        for code in code_list:
+            volume = StockPriceUtils.get_average_volume(code, days)
+            if volume:
+                baseline[code] = volume
+        logging.info(f"成功计算{days}日平均成交量 {len(baseline)} 条")
+        return baseline
@@ -5,97 +5,57 @@ from datetime import datetime
 from pinbar import Pinbar
 
 import numpy as np
-import pandas as pd
 
 from k_line import KLine
 from pinbar import PinbarType
+from pinbar_kernels import PinbarKernels
 from trading_time_helper import TradingTimeHelper
 
 
 class PinbarHelper:
+    _trend_lookbacks = {}
 
     @staticmethod
-    def is_bullish_pinbar(open_price, high, low, close):
-        # 计算实体长度
-        length = abs(high - low)
-
-        # 计算上下影线长度
-        lower_shadow = min(open_price, close) - low
-
-        # 判断是否为Pinbar
-        # 下影线是实体的2/3以上，且上影线较短
-        is_bullish_pinbar = (lower_shadow > (2 / 3.001 * length))
-
-        return is_bullish_pinbar
+    def direction_of(pinbar):
+        """pinbar 方向：下插针为 1，上插针为 -1，其他为 0"""
+        if pinbar.type == PinbarType.type_bullish:
+            return 1
+        if pinbar.type == PinbarType.type_bearish:
+            return -1
+        return 0
 
     @staticmethod
-    def is_bearish_pinbar(open_price, high, low, close):
-        # 计算实体长度
-        length = abs(high - low)
-
-        # 计算上下影线长度
-        upper_shadow = high - max(open_price, close)
-
-        # 判断是否为Pinbar
-        # 上影线是实体的2/3以上，且下影线较短
-        is_bearish_pinbar = (upper_shadow > (2 / 3.001 * length))
-
-        return is_bearish_pinbar
+    def trend_lookback(product_type):
+        """is_trend_following 的回看根数，只依赖品种的交易时长，按品种缓存"""
+        lookback = PinbarHelper._trend_lookbacks.get(product_type)
+        if lookback is None:
+            trading_time_lenght = TradingTimeHelper(product_type).calculate_daily_trading_hours()
+            # 根据 trading_time_lenght 决定 lookback 周期数
+            lookback = int(trading_time_lenght * 12)
+            PinbarHelper._trend_lookbacks[product_type] = lookback
+        return lookback
 
     @staticmethod
-    def is_excellent_pinbar(open_price, high, low, close):
-        # 创建 KLine 和 Pinbar 对象
-        k_line = KLine(open=open_price, high=high, low=low, close=close)
-        p = Pinbar(k_line)
-
-        # 计算实体长度
-        length = abs(high - low)
-
-        # 计算影线长度
-        lower_shadow = min(open_price, close) - low
-        upper_shadow = high - max(open_price, close)
-
-        # 判断影线是否大于总长度的75%
-        if lower_shadow > 0.75 * length:
-            p.is_excellent = True
-            p.type = PinbarType.type_bullish
-            return p
-        elif upper_shadow > 0.75 * length:
-            p.is_excellent = True
-            p.type = PinbarType.type_bearish
-            return p
-
-        return None
+    def recent_values(line, size):
+        """
+        取 line 最近 size 个值，按时间升序，最后一个为当前 K 线
+        历史足够时直接切片；不足时逐个负索引取值，与原来 data.high[-i] 的取值方式保持一致
+        """
+        if len(line) >= size:
+            return np.ascontiguousarray(line.get(size=size), dtype=np.float64)
+        return np.array([line[-i] for i in range(size - 1, -1, -1)], dtype=np.float64)
 
     @staticmethod
     def is_single_pinbar(open_price, high, low, close, minest):
-        k_line = KLine(open=open_price, high=high, low=low, close=close)
-        p = Pinbar(k_line)
-
-        # 计算实体长度
-        length = abs(high - low)
-        if length < minest:
-            ep = PinbarHelper.is_excellent_pinbar(open_price, high, low, close)
-            if ep is not None and length > minest * 0.75:
-                return ep
-            else:
-                return None
-
-        # 判断是否为Pinbar
-        # 上影线是实体的2/3以上，且下影线较短
-        is_bearish_pinbar = PinbarHelper.is_bearish_pinbar(open_price, high, low, close)
-
-        if is_bearish_pinbar:
-            p.type = PinbarType.type_bearish
-            return p
-
-        # 下影线是实体的2/3以上，且上影线较短
-        is_bullish_pinbar = PinbarHelper.is_bullish_pinbar(open_price, high, low, close)
-        if is_bullish_pinbar:
-            p.type = PinbarType.type_bullish
-            return p
+        pinbar_type, is_excellent = PinbarKernels.single_pinbar_type(
+            np.float64(open_price), np.float64(high), np.float64(low), np.float64(close), np.float64(minest))
+        if pinbar_type == PinbarKernels.type_none:
+            return None
 
-        return None
+        p = Pinbar(KLine(open=open_price, high=high, low=low, close=close))
+        p.type = PinbarType.type_bullish if pinbar_type == PinbarKernels.type_bullish else PinbarType.type_bearish
+        p.is_excellent = bool(is_excellent)
+        return p
 
     ## Evening Star	/Morning Star	/Bullish Engulfing Pattern	/Bearish Engulfing Pattern
     def combined_candle_with_previous(data, count):
@@ -143,14 +103,9 @@ class PinbarHelper:
     # 判断当前pinbar是否存在巨幅跳空
     @staticmethod
     def have_giant_price_gap(data, pinbar, base_atr):
-        # 计算跳空大小
-        current_open = pinbar.get_open()
         #warning 这里待修复（复合pinbar ）
-        prev_close = data.close[-1]
-
-        price_gap = abs(current_open - prev_close)
-        # 判断跳空是否大于 2 个 ATR
-        return price_gap > 2 * base_atr
+        return bool(PinbarKernels.have_giant_price_gap(float(pinbar.get_open()), float(data.close[-1]),
+                                                       float(base_atr)))
 
     @staticmethod
     def at_recent_high_low(data, pinbar, lookback, atr):
@@ -159,83 +114,20 @@ class PinbarHelper:
         1.中周期上，看 10 日均线是否梯度增加或减少（分别取 lookback 的 1.5 倍和 1/2.4 倍）
         2.小周期上，看最近的 lookback 根 K 线是否梯度上涨或者下跌
         '''
-        # 最近的高低点
-        recent_highs = data.high.get(size=lookback)
-        recent_lows = data.low.get(size=lookback)
-        # 判断是上插针还是下插针
-        is_bullish = pinbar.type == PinbarType.type_bullish
-        is_bearish = pinbar.type == PinbarType.type_bearish
-
-        current_high = pinbar.kline.high
-        current_low = pinbar.kline.low
-
-        # 计算满足条件的数量
-        valid_count = 0
+        recent_highs = np.ascontiguousarray(data.high.get(size=lookback), dtype=np.float64)
+        recent_lows = np.ascontiguousarray(data.low.get(size=lookback), dtype=np.float64)
+        # MA5 需要的收盘价窗口
         window = 5
-        # 将 LineBuffer 转换为 Pandas Series
         size = lookback * 1.2 + window + 1
-        close_series = pd.Series(data.close.get(size=round(size)))
-        # 计算局部 MA20
-        ma5_subset = close_series.rolling(window=window).mean()
-
-        # 定位关键点
-        idx = -round(lookback * 1.1)
-        if len(ma5_subset) > abs(idx):
-            prev_far = ma5_subset.iloc[idx]
-        else:
-            # 长度不够，直接返回False或None，或者跳过本次判断
-            return False  # 或者 return None，视你的业务逻辑而定
-        prev_mid = ma5_subset.iloc[-round(lookback / 2)]
-        current = ma5_subset.iloc[-1]
-
-        ma_condition_met = False
+        closes = np.ascontiguousarray(data.close.get(size=round(size)), dtype=np.float64)
 
-        if is_bullish:
-            if any(current_low >= low for low in recent_lows[:-1]):
-                return False
-            for i in range(len(recent_highs)):  # 确保索引不超出范围
-                # 计算前 i 根的中点
-                prev_midpoint = (recent_highs[i] + recent_lows[i]) / 2
-                logging.debug(f"===>计算前 i 根的中点 recent_highs[{i}]:{recent_highs[i]}, recent_lows[{i}]:{recent_lows[i]}")
-
-                # 检查前一根的中点是否高于当前
-                if i > 0:
-                    prev_prev_midpoint = (recent_highs[i - 1] + recent_lows[i - 1]) / 2
-                    logging.debug(
-                        f"===>计算前 i 根的中点 recent_highs[{i}]:{recent_highs[i]}, recent_lows[{i}]:{recent_lows[i]}")
-                    if prev_prev_midpoint >= prev_midpoint:
-                        valid_count += 1
-
-            # 检查20日平均线是否递增
-            ma_condition_met = prev_far > prev_mid > current
-
-        elif is_bearish:
-            # 确保 pinbar 的最高值高于 recent_highs 中的每一个元素
-            logging.debug(f"===>recent_highs[:-1]: {recent_highs[:-1]}")
-            if any(current_high <= high for high in recent_highs[:-1]):
-                return False
-            for i in range(len(recent_highs)):  # 确保索引不超出范围
-                # 计算前 i 根的中点
-                logging.debug(f"===>计算前 i 根的中点 recent_highs[{i}]:{recent_highs[i]}, recent_lows[{i}]:{recent_lows[i]}")
-                prev_midpoint = (recent_highs[i] + recent_lows[i]) / 2
-                # 检查前一根的中点是否低于当前
-                if i > 0:
-                    logging.debug(
-                        f"===>检查前一根的中点是否低于当前 recent_highs[{i - 1}]:{recent_highs[i - 1]}, recent_lows[{i - 1}]:{recent_lows[i - 1]}")
-                    prev_prev_midpoint = (recent_highs[i - 1] + recent_lows[i - 1]) / 2
-                    if prev_prev_midpoint <= prev_midpoint:
-                        valid_count += 1
-
-            # 检查20日平均线是否递减
-            ma_condition_met = prev_far < prev_mid < current
-
-        else:
+        direction = PinbarHelper.direction_of(pinbar)
+        if direction == 0:
             logging.error("===>不是 pinbar，怎么走到这里来了")
-
-        # 至少有一半的 lookback 满足条件
-        target_count = round(lookback / 2.4)
-        logging.info(f"valid_count:{valid_count}, ma_condition_met:{ma_condition_met}")
-        return valid_count >= target_count and ma_condition_met
+        return bool(PinbarKernels.at_recent_high_low(recent_highs, recent_lows, closes,
+                                                     float(pinbar.kline.high), float(pinbar.kline.low), direction,
+                                                     round(lookback * 1.1), round(lookback / 2),
+                                                     round(lookback / 2.4)))
 
     @staticmethod
     def is_at_key_level(current_high, current_low, key_levels, tolerance):
@@ -258,8 +150,8 @@ class PinbarHelper:
             low_distance = abs(current_low - level)
 
             # 检查是否接近关键位
-            is_high_near = high_distance > (tolerance * -1)
-            is_low_near = low_distance > (tolerance * -1)
+            is_high_near = high_distance <= tolerance
+            is_low_near = low_distance <= tolerance
 
             if is_high_near or is_low_near:
                 # 选择更接近的关键位
@@ -301,93 +193,28 @@ class PinbarHelper:
     @staticmethod
     def is_trend_following(data, pinbar, product_type):
 
-        trading_time_helper = TradingTimeHelper(product_type)
-        trading_time_lenght = trading_time_helper.calculate_daily_trading_hours()
-        # 根据 trading_time_lenght 决定 lookback 周期数
-        lookback = int(trading_time_lenght * 12)
+        lookback = PinbarHelper.trend_lookback(product_type)
 
         total_length = data.buflen()  # 数据源总长度
         if total_length < lookback:
             return False
 
-        # 获取最近 lookback 周期内的最高价和最低价
-        highs = [data.high[-i - 1] for i in range(lookback)]
-        lows = [data.low[-i - 1] for i in range(lookback)]
-
-        highest_high = max(highs)
-        lowest_low = min(lows)
-
-        # 计算 61.8% 的位置
-        fib_618 = lowest_low + 0.618 * (highest_high - lowest_low)
+        ma_length = 50
+        highs = PinbarHelper.recent_values(data.high, lookback + 1)
+        lows = PinbarHelper.recent_values(data.low, lookback + 1)
+        closes = PinbarHelper.recent_values(data.close, lookback + ma_length + 1)
+        is_trend_following_b, is_trend_following_a = PinbarKernels.trend_following(
+            highs, lows, closes, float(pinbar.get_close()), PinbarHelper.direction_of(pinbar), lookback, ma_length)
 
-        # 判断逻辑优化
-        is_bullish = pinbar.type == PinbarType.type_bullish
-        is_bearish = pinbar.type == PinbarType.type_bearish
-
-        # 方法 A: 使用斐波那契回撤判断趋势
-        is_trend_following_a = True
-        if pinbar.get_close() < fib_618 and is_bullish:
-            is_trend_following_a = False  # 逆势
-        elif pinbar.get_close() > fib_618 and is_bearish:
-            is_trend_following_a = False  # 逆势
-
-        # 方法 B: 使用 MA50 判断趋势
-        ma50_recent = np.mean([data.close[-i - 1] for i in range(50)])
-        ma50_past = np.mean([data.close[-i - 1 - lookback] for i in range(50)])
-        is_trend_following_b = (ma50_recent > ma50_past and is_bullish) or (ma50_recent < ma50_past and is_bearish)
-
-        # 返回两种方法的结果
-
-        if is_trend_following_a == is_trend_following_b:
-            return is_trend_following_b
-        else:
+        if is_trend_following_a != is_trend_following_b:
             logging.warning(f"Method A: {is_trend_following_a}, Method B: {is_trend_following_b} 不一致，看看什么情况")
-            return is_trend_following_b
+        return bool(is_trend_following_b)
 
     @staticmethod
     def is_engulfing(prev_open, prev_close, curr_open, curr_close):
         """吞没形态判断"""
-        prev_body = prev_close - prev_open
-        curr_body = curr_close - curr_open
-        # 方向相反且当前K线完全吞没前一根
-        return (prev_body * curr_body < 0) and \
-            (abs(curr_body) > abs(prev_body)) and \
-            (min(curr_open, curr_close) < min(prev_open, prev_close)) and \
-            (max(curr_open, curr_close) > max(prev_open, prev_close))
-
-    @staticmethod
-    def is_morning_star(opens, closes, lows):
-        """启明星形态（三日看涨）"""
-        if len(opens) < 3 or len(closes) < 3:
-            return False
-
-        # 第一根长阴线
-        cond1 = closes[-2] < opens[-2] and (opens[-2] - closes[-2]) / (opens[-2] + 1e-5) > 0.01
-
-        # 第二根小实体（可能跳空）
-        cond2 = abs(closes[-1] - opens[-1]) / (opens[-1] + 1e-5) < 0.005
-
-        # 第三根长阳线且收盘超过第一根 三分之二
-        cond3 = closes[0] > opens[0] and closes[0] > (opens[-2] + closes[-2]) / 3 * 2
-
-        return cond1 and cond2 and cond3
-
-    @staticmethod
-    def is_evening_star(opens, closes, highs):
-        """黄昏之星形态（三日看跌）"""
-        if len(opens) < 3 or len(closes) < 3:
-            return False
-
-        # 第一根长阳线
-        cond1 = closes[-2] > opens[-2] and (closes[-2] - opens[-2]) / (opens[-2] + 1e-5) > 0.01
-
-        # 第二根小实体（可能跳空）
-        cond2 = abs(closes[-1] - opens[-1]) / (opens[-1] + 1e-5) < 0.005
-
-        # 第三根长阴线且收盘低于第一根中点
-        cond3 = closes[0] < opens[0] and closes[0] < (opens[-2] + closes[-2]) / 3 * 2
-
-        return cond1 and cond2 and cond3
+        return bool(PinbarKernels.is_engulfing(np.float64(prev_open), np.float64(prev_close),
+                                               np.float64(curr_open), np.float64(curr_close)))
 
     @staticmethod
     def is_pinbar_or_variant(data, minest, valid_length=3):
@@ -437,13 +264,10 @@ class PinbarHelper:
         # 获取最近3根K线数据（包含当前最新K线，索引0为最新）
         opens = [data.open[i] for i in range(-valid_length + 1, 1)]
         closes = [data.close[i] for i in range(-valid_length + 1, 1)]
-        highs = [data.high[i] for i in range(-valid_length + 1, 1)]
-        lows = [data.low[i] for i in range(-valid_length + 1, 1)]
 
         # 三日形态判断
-        is_pin = PinbarHelper.is_morning_star(opens, closes, lows) or \
-                 PinbarHelper.is_evening_star(opens, closes, highs)
-        if is_pin:
+        if PinbarKernels.is_morning_or_evening_star(np.array(opens, dtype=np.float64),
+                                                    np.array(closes, dtype=np.float64)):
             combined_open, combined_high, combined_low, combined_close = PinbarHelper.combined_candle_with_previous(
                 data, 3)
             logging.info(
@@ -487,26 +311,11 @@ class PinbarHelper:
     @staticmethod
     def no_obvious_acceleration(data, pinbar, atr):
         """判断是否存在明显的加速"""
-        # 判断是否为下插针
-        is_bullish = pinbar.type == PinbarType.type_bullish
-        is_bearish = pinbar.type == PinbarType.type_bearish
-
-        if is_bullish:
-            # 获取前面15根的最高价
-            prev_highs = [data.high[-i - 1] for i in range(15)]
-            # 判断前面15根的最高价减去pinbar的收盘价是否大于10倍的ATR
-            if max(prev_highs) - pinbar.get_close() > 10 * atr:
-                return False
+        prev_highs = PinbarHelper.recent_values(data.high, 16)[:-1]
+        prev_lows = PinbarHelper.recent_values(data.low, 16)[:-1]
+        return bool(PinbarKernels.no_obvious_acceleration(prev_highs, prev_lows, float(pinbar.get_close()),
+                                                          PinbarHelper.direction_of(pinbar), float(atr)))
 
-        elif is_bearish:
-            # 获取前面15根的最低价
-            prev_lows = [data.low[-i - 1] for i in range(15)]
-            # 判断pinbar的收盘价减去前面15根的最低价是否大于10倍的ATR
-            if pinbar.get_close() - min(prev_lows) > 10 * atr:
-                return False
-
-        return True
-    
     def risk_reward_ratio_ok(pinbar,atr):
         """判断pinbar的盈亏比是否合理"""
         return True
@@ -0,0 +1,245 @@
+import environment  # 确保在其他模块之前导入
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from feature_info import FeatureInfo
+from key_level_engine import KeyLevelEngine
+from pinbar_helper import PinbarHelper
+from pinbar_kernels import PinbarKernels
+from pinbar_scanner import PinbarScanner
+from mini_stock.utils.interval_utils import IntervalUtils
+
+
+class PinbarHitRateEvaluator:
+    """
+    pinbar 条件的历史命中率统计
+
+    PinbarStrategy 只判断最新一根 K 线，这里把同样的规则作用在整段历史的每一根 K 线上（逐列向量化），
+    对每个出现 pinbar 形态的位置记录各项条件是否满足，并计算之后 N 根 K 线的顺势收益，
+    最后按条件和评分分组统计命中率。
+
+    与实盘判断的差异：
+    - 关键位的回看根数按完整的 lookback 计算，历史不足 lookback 根时没有关键位（实盘按已有根数计算）
+    - 刚开盘跳空的放宽规则依赖当前系统时间，历史统计中不采用
+    - 历史不足的 K 线（ATR、MA50 趋势等）视为条件不满足
+    """
+
+    default_horizons = (1, 3, 5, 10)
+    conditions = ['engulfing', 'star', 'key_level', 'recent_high_low', 'giant_price_gap', 'left_eye',
+                  'prominent', 'false_breakout', 'trend_following', 'no_acceleration']
+
+    def __init__(self, horizons=default_horizons):
+        self.horizons = tuple(horizons)
+
+    def evaluate_frame(self, df):
+        """
+        对单个品种/周期的整段历史做向量化评估
+        :param df: resample_data_with 返回的 DataFrame
+        :return: 每个 pinbar 形态一行的 DataFrame，包含方向、各条件、评分和前瞻收益
+        """
+        if df is None or len(df) < 3:
+            return pd.DataFrame()
+        product_type = df['product_type'].iloc[0]
+        interval = df['interval'].iloc[0] if 'interval' in df.columns else '1d'
+        interval_num = 1440 if interval == '1d' else IntervalUtils.convert_interval_to_minutes(interval)
+
+        opens = df['open'].to_numpy(dtype=np.float64)
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+        closes = df['close'].to_numpy(dtype=np.float64)
+        length = len(closes)
+
+        base_atr = PinbarKernels.average_true_range_series(highs, lows, closes) * environment.atr_muliter_of(interval_num)
+
+        # 形态：每根 K 线与前两根组成窗口，第 0、1 根没有完整窗口
+        pin_type = np.zeros(length, dtype=np.int64)
+        is_excellent = np.zeros(length, dtype=bool)
+        pin_open, pin_high, pin_low = opens.copy(), highs.copy(), lows.copy()
+        window_type, window_excellent, window_open, window_high, window_low, _ = PinbarKernels.pinbar_or_variant(
+            sliding_window_view(opens, 3), sliding_window_view(highs, 3), sliding_window_view(lows, 3),
+            sliding_window_view(closes, 3), base_atr[2:])
+        pin_type[2:] = window_type
+        is_excellent[2:] = window_excellent
+        pin_open[2:], pin_high[2:], pin_low[2:] = window_open, window_high, window_low
+        pin_type[np.isnan(base_atr)] = PinbarKernels.type_none
+
+        prev_open = np.concatenate([[np.nan], opens[:-1]])
+        prev_close = np.concatenate([[np.nan], closes[:-1]])
+        single_type, _ = PinbarKernels.single_pinbar_type(opens, highs, lows, closes, base_atr)
+        engulfing = (single_type == PinbarKernels.type_none) & \
+            PinbarKernels.is_engulfing(prev_open, prev_close, opens, closes)
+        star = np.zeros(length, dtype=bool)
+        star[2:] = PinbarKernels.is_morning_or_evening_star(sliding_window_view(opens, 3),
+                                                            sliding_window_view(closes, 3))
+        star &= (single_type == PinbarKernels.type_none) & ~engulfing
+
+        is_bullish = pin_type == PinbarKernels.type_bullish
+        is_bearish = pin_type == PinbarKernels.type_bearish
+        direction = np.where(is_bullish, 1, np.where(is_bearish, -1, 0))
+
+        def prev_rolling(values, window, how):
+            # 不含当前 K 线的前 window 根
+            rolled = getattr(pd.Series(values).rolling(window), how)()
+            return rolled.shift(1).to_numpy()
+
+        # 关键位：任一周期下最高/最低价距离关键位不超过容忍度
+        key_level = np.zeros(length, dtype=bool)
+        for lookback, atr_scale in PinbarScanner.key_level_lookbacks:
+            level_high, level_low = KeyLevelEngine.rolling_levels(highs, lows, lookback)
+            tolerance = 0.01 * base_atr * atr_scale * lookback
+            for level in (level_high, level_low):
+                key_level |= (np.abs(highs - level) <= tolerance) | (np.abs(lows - level) <= tolerance)
+
+        # 相对高低位（PinbarHelper.at_recent_high_low，lookback=16）
+        recent = PinbarScanner.recent_lookback
+        target_count = round(recent / 2.4)
+        midpoints = (highs + lows) / 2
+        falling = np.concatenate([[False], midpoints[:-1] >= midpoints[1:]]).astype(float)
+        rising = np.concatenate([[False], midpoints[:-1] <= midpoints[1:]]).astype(float)
+        falling_count = pd.Series(falling).rolling(recent - 1).sum().to_numpy()
+        rising_count = pd.Series(rising).rolling(recent - 1).sum().to_numpy()
+        ma5 = pd.Series(closes).rolling(5).mean()
+        ma_far = ma5.shift(round(recent * 1.1) - 1).to_numpy()
+        ma_mid = ma5.shift(round(recent / 2) - 1).to_numpy()
+        ma5 = ma5.to_numpy()
+        enough_history = np.arange(length) >= round(recent * 1.2 + 5 + 1) - 1
+        recent_high_low = enough_history & ((is_bullish & (pin_low < prev_rolling(lows, recent - 1, 'min')) &
+                                             (falling_count >= target_count) & (ma_far > ma_mid) & (ma_mid > ma5)) |
+                                            (is_bearish & (pin_high > prev_rolling(highs, recent - 1, 'max')) &
+                                             (rising_count >= target_count) & (ma_far < ma_mid) & (ma_mid < ma5)))
+
+        giant_price_gap = np.abs(pin_open - prev_close) > 2 * base_atr
+
+        prev_high = np.concatenate([[np.nan], highs[:-1]])
+        prev_low = np.concatenate([[np.nan], lows[:-1]])
+        pin_length = np.abs(pin_high - pin_low)
+        left_eye = (pin_length >= np.abs(prev_high - prev_low)) & \
+            (prev_low <= np.minimum(pin_open, closes)) & (prev_high >= np.maximum(pin_open, closes))
+
+        prominent = (pin_length > 2 * base_atr) | \
+            (is_bullish & (prev_rolling(lows, 6, 'min') - pin_low > 1.5 * base_atr)) | \
+            (is_bearish & (pin_high - prev_rolling(highs, 6, 'max') > 1.5 * base_atr))
+
+        breakout_window = PinbarScanner.false_breakout_lookback - 2
+        false_breakout = (is_bullish & (pin_low < prev_rolling(lows, breakout_window, 'min'))) | \
+            (is_bearish & (pin_high > prev_rolling(highs, breakout_window, 'max')))
+
+        trend_lookback = PinbarHelper.trend_lookback(product_type)
+        ma_recent = pd.Series(closes).rolling(PinbarScanner.ma_length).mean().shift(1)
+        ma_past = ma_recent.shift(trend_lookback).to_numpy()
+        ma_recent = ma_recent.to_numpy()
+        trend_following = ((ma_recent > ma_past) & is_bullish) | ((ma_recent < ma_past) & is_bearish)
+
+        no_acceleration = ~((is_bullish & (prev_rolling(highs, 15, 'max') - closes > 10 * base_atr)) |
+                            (is_bearish & (closes - prev_rolling(lows, 15, 'min') > 10 * base_atr)))
+
+        # 与 calculate_score 相同的计分方式，盈亏比条件恒为真
+        score = left_eye.astype(int) + prominent + false_breakout + trend_following + 1 + no_acceleration
+
+        rows = np.flatnonzero(direction != 0)
+        result = pd.DataFrame({
+            'time': df.index[rows],
+            'product_type': product_type,
+            'interval': interval,
+            'direction': direction[rows],
+            'is_excellent': is_excellent[rows],
+            'engulfing': engulfing[rows],
+            'star': star[rows],
+            'key_level': key_level[rows],
+            'recent_high_low': recent_high_low[rows],
+            'giant_price_gap': giant_price_gap[rows],
+            'left_eye': left_eye[rows],
+            'prominent': prominent[rows],
+            'false_breakout': false_breakout[rows],
+            'trend_following': trend_following[rows],
+            'no_acceleration': no_acceleration[rows],
+            'score': score[rows],
+        })
+        # 实盘策略的过滤条件：位于关键位、相对高低位且没有巨幅跳空
+        result['strategy_pass'] = result['key_level'] & result['recent_high_low'] & ~result['giant_price_gap']
+
+        for horizon in self.horizons:
+            future_close = np.concatenate([closes[horizon:], np.full(min(horizon, length), np.nan)])
+            forward_return = (future_close[rows] - closes[rows]) / closes[rows] * direction[rows]
+            result[f'return_{horizon}'] = forward_return
+            result[f'hit_{horizon}'] = np.where(np.isnan(forward_return), np.nan, forward_return > 0)
+        return result
+
+    def summarize(self, signals):
+        """
+        按条件和评分分组统计
+        :return: 行为分组（全部 / 各条件成立 / 各评分），列为样本数、各周期命中率和平均收益的统计表
+        """
+        if signals is None or signals.empty:
+            return pd.DataFrame()
+
+        groups = [('all', np.ones(len(signals), dtype=bool)),
+                  ('strategy_pass', signals['strategy_pass'].to_numpy(dtype=bool))]
+        groups += [(condition, signals[condition].to_numpy(dtype=bool)) for condition in self.conditions]
+        groups += [(f'score={score}', (signals['score'] == score).to_numpy())
+                   for score in sorted(signals['score'].unique())]
+
+        records = []
+        for name, mask in groups:
+            subset = signals[mask]
+            record = {'group': name, 'count': len(subset)}
+            for horizon in self.horizons:
+                record[f'hit_rate_{horizon}'] = subset[f'hit_{horizon}'].mean()
+                record[f'avg_return_{horizon}'] = subset[f'return_{horizon}'].mean()
+            records.append(record)
+        return pd.DataFrame(records).set_index('group')
+
+    def evaluate_frames(self, frames, max_workers=None):
+        """在进程池中并行评估多个 DataFrame，返回合并后的信号表"""
+        frames = [df for df in frames if df is not None and not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_evaluate_frame, frames, [self.horizons] * len(frames)))
+        return pd.concat(results, ignore_index=True)
+
+    def evaluate_products(self, product_types, intervals, max_workers=None):
+        """从数据库读取各品种/周期的完整历史，在进程池中并行评估"""
+        tasks = [(product_type, interval) for product_type in product_types for interval in intervals]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_load_and_evaluate, tasks, [self.horizons] * len(tasks)))
+        results = [result for result in results if not result.empty]
+        if not results:
+            return pd.DataFrame()
+        return pd.concat(results, ignore_index=True)
+
+
+def _evaluate_frame(df, horizons):
+    return PinbarHitRateEvaluator(horizons).evaluate_frame(df)
+
+
+def _load_and_evaluate(task, horizons):
+    from futures_process_center import FeatureProcessCenter
+    product_type, interval = task
+    try:
+        # 各个工作进程只读取并重采样 K 线，不更新特征库：统计自己计算整段历史的 ATR，用不到特征库
+        df = FeatureProcessCenter.read_resampled_data(product_type, interval=interval)
+    except Exception as e:
+        logging.error(f"读取 {product_type} {interval} 数据失败: {e}")
+        return pd.DataFrame()
+    return PinbarHitRateEvaluator(horizons).evaluate_frame(df)
+
+
+def main():
+    product_types = [product_type for product_types in FeatureInfo.get_exchange_product_types().values()
+                     for product_type in product_types]
+    intervals = ['5min', '15min', '30min', '60min']
+    evaluator = PinbarHitRateEvaluator()
+    signals = evaluator.evaluate_products(product_types, intervals, max_workers=os.cpu_count())
+    table = evaluator.summarize(signals)
+    logging.info(f"pinbar 命中率统计（共 {len(signals)} 个形态）:\n{table.to_string(float_format='{:.4f}'.format)}")
+    return table
+
+
+if __name__ == "__main__":
+    main()
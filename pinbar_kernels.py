@@ -0,0 +1,257 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except ImportError:  # numba 是可选依赖，没有安装时直接使用 numpy 实现
+    numba = None
+
+
+def _jit(func):
+    """安装了 numba 时编译为机器码，否则原样返回"""
+    if numba is None:
+        return func
+    return numba.njit(cache=True)(func)
+
+
+class PinbarKernels:
+    """
+    pinbar 判断的数组内核
+
+    滚动判断的输入均为按时间升序排列、连续存储的 float64 数组（最后一个元素为当前 K 线），
+    方向用整数表示：1 为下插针（看涨），-1 为上插针（看跌），0 为非 pinbar。
+    PinbarHelper 中的同名方法只负责从 backtrader 数据中取出数组并调用这里的内核。
+
+    形态判断和 ATR 是逐元素的 numpy 实现，可作用于标量、一维（整段历史）或二维（多个品种右对齐）数组，
+    PinbarHelper、PinbarScanner、PinbarHitRateEvaluator 和 FeatureStore 共用这一份实现。
+    """
+
+    enabled_numba = numba is not None
+
+    type_none = 0
+    type_bullish = 1
+    type_bearish = -1
+
+    @staticmethod
+    @_jit
+    def at_recent_high_low(recent_highs, recent_lows, closes, pin_high, pin_low, direction,
+                           far_ago, mid_ago, target_count):
+        """
+        PinbarHelper.at_recent_high_low 的内核
+        :param recent_highs: 最近 lookback 根的最高价（含当前）
+        :param closes: 最近 round(lookback * 1.2 + 6) 根的收盘价，用于计算 MA5
+        :param far_ago: MA5 远端取值位置 round(lookback * 1.1)
+        :param mid_ago: MA5 中间取值位置 round(lookback / 2)
+        :param target_count: 中点梯度变化的最少次数 round(lookback / 2.4)
+        """
+        size = closes.shape[0]
+        if size <= far_ago:
+            return False
+
+        # MA5 在窗口第 4 根之前没有值，与 pandas rolling 的 NaN 一样视为条件不满足
+        far_end = size - far_ago
+        mid_end = size - mid_ago
+        if far_end < 4 or mid_end < 4:
+            return False
+        prev_far = np.mean(closes[far_end - 4:far_end + 1])
+        prev_mid = np.mean(closes[mid_end - 4:mid_end + 1])
+        current = np.mean(closes[size - 5:size])
+
+        midpoints = (recent_highs + recent_lows) / 2
+        if direction == 1:
+            if np.any(pin_low >= recent_lows[:-1]):
+                return False
+            valid_count = np.sum(midpoints[:-1] >= midpoints[1:])
+            ma_condition_met = prev_far > prev_mid > current
+        elif direction == -1:
+            if np.any(pin_high <= recent_highs[:-1]):
+                return False
+            valid_count = np.sum(midpoints[:-1] <= midpoints[1:])
+            ma_condition_met = prev_far < prev_mid < current
+        else:
+            return False
+        return valid_count >= target_count and ma_condition_met
+
+    @staticmethod
+    @_jit
+    def trend_following(highs, lows, closes, pin_close, direction, lookback, ma_length):
+        """
+        PinbarHelper.is_trend_following 的内核
+        :param highs: 最近 lookback + 1 根的最高价（含当前）
+        :param closes: 最近 lookback + ma_length + 1 根的收盘价（含当前）
+        :return: (MA 趋势判断结果, 斐波那契回撤判断结果)
+        """
+        highest_high = np.max(highs[-1 - lookback:-1])
+        lowest_low = np.min(lows[-1 - lookback:-1])
+        fib_618 = lowest_low + 0.618 * (highest_high - lowest_low)
+
+        # 方法 A: 斐波那契回撤
+        follow_fib = True
+        if pin_close < fib_618 and direction == 1:
+            follow_fib = False
+        elif pin_close > fib_618 and direction == -1:
+            follow_fib = False
+
+        # 方法 B: MA50
+        size = closes.shape[0]
+        ma_recent = np.mean(closes[size - 1 - ma_length:size - 1])
+        ma_past = np.mean(closes[size - 1 - ma_length - lookback:size - 1 - lookback])
+        follow_ma = (ma_recent > ma_past and direction == 1) or (ma_recent < ma_past and direction == -1)
+        return follow_ma, follow_fib
+
+    @staticmethod
+    @_jit
+    def no_obvious_acceleration(prev_highs, prev_lows, pin_close, direction, atr):
+        """
+        PinbarHelper.no_obvious_acceleration 的内核
+        :param prev_highs: 当前 K 线之前的若干根最高价（不含当前）
+        """
+        if direction == 1:
+            return not (np.max(prev_highs) - pin_close > 10 * atr)
+        if direction == -1:
+            return not (pin_close - np.min(prev_lows) > 10 * atr)
+        return True
+
+    @staticmethod
+    @_jit
+    def have_giant_price_gap(pin_open, prev_close, base_atr):
+        """PinbarHelper.have_giant_price_gap 的内核：跳空是否大于 2 个 ATR"""
+        return abs(pin_open - prev_close) > 2 * base_atr
+
+    # ------------------------------------------------------------------
+    # 形态判断（逐元素，可作用于标量或任意形状的数组）
+    # ------------------------------------------------------------------
+    @staticmethod
+    def single_pinbar_type(open_price, high, low, close, minest):
+        """
+        单根 pinbar 判断，对应 PinbarHelper.is_single_pinbar
+        :return: (类型数组, 是否 excellent 数组)，类型取 type_bullish / type_bearish / type_none
+        """
+        length = np.abs(high - low)
+        lower_shadow = np.minimum(open_price, close) - low
+        upper_shadow = high - np.maximum(open_price, close)
+
+        # 长度不足 minest 时只接受 excellent pinbar
+        excellent_bullish = lower_shadow > 0.75 * length
+        excellent_bearish = np.logical_not(excellent_bullish) & (upper_shadow > 0.75 * length)
+        excellent_ok = length > minest * 0.75
+        small_type = np.where(excellent_ok & excellent_bullish, PinbarKernels.type_bullish,
+                              np.where(excellent_ok & excellent_bearish, PinbarKernels.type_bearish,
+                                       PinbarKernels.type_none))
+
+        is_bearish = upper_shadow > (2 / 3.001 * length)
+        is_bullish = lower_shadow > (2 / 3.001 * length)
+        normal_type = np.where(is_bearish, PinbarKernels.type_bearish,
+                               np.where(is_bullish, PinbarKernels.type_bullish, PinbarKernels.type_none))
+
+        is_small = length < minest
+        pinbar_type = np.where(is_small, small_type, normal_type)
+        is_excellent = is_small & (small_type != PinbarKernels.type_none)
+        return pinbar_type, is_excellent
+
+    @staticmethod
+    def is_engulfing(prev_open, prev_close, curr_open, curr_close):
+        """吞没形态判断"""
+        prev_body = prev_close - prev_open
+        curr_body = curr_close - curr_open
+        return (prev_body * curr_body < 0) & \
+            (np.abs(curr_body) > np.abs(prev_body)) & \
+            (np.minimum(curr_open, curr_close) < np.minimum(prev_open, prev_close)) & \
+            (np.maximum(curr_open, curr_close) > np.maximum(prev_open, prev_close))
+
+    @staticmethod
+    def is_morning_or_evening_star(opens, closes):
+        """
+        启明星 / 黄昏之星形态判断
+        opens/closes 的最后一维依次是 [-2, -1, 0] 三根 K 线，下标用法与原实现保持一致
+        """
+        first_open, first_close = opens[..., -2], closes[..., -2]
+        second_open, second_close = opens[..., -1], closes[..., -1]
+        third_open, third_close = opens[..., 0], closes[..., 0]
+
+        small_body = np.abs(second_close - second_open) / (second_open + 1e-5) < 0.005
+        two_thirds = (first_open + first_close) / 3 * 2
+
+        morning = (first_close < first_open) & ((first_open - first_close) / (first_open + 1e-5) > 0.01) & \
+                  small_body & (third_close > third_open) & (third_close > two_thirds)
+        evening = (first_close > first_open) & ((first_close - first_open) / (first_open + 1e-5) > 0.01) & \
+                  small_body & (third_close < third_open) & (third_close < two_thirds)
+        return morning | evening
+
+    @staticmethod
+    def pinbar_or_variant(opens, highs, lows, closes, minest):
+        """
+        单根 pinbar 及吞没、启明星/黄昏之星组合后的 pinbar，opens 等的最后一维是最近三根 K 线（最新在最后）
+        :return: (类型, 是否 excellent, pinbar 的 open/high/low/close)
+        """
+        o0, h0, l0, c0 = opens[..., -1], highs[..., -1], lows[..., -1], closes[..., -1]
+        o1, h1, l1, c1 = opens[..., -2], highs[..., -2], lows[..., -2], closes[..., -2]
+
+        single_type, single_excellent = PinbarKernels.single_pinbar_type(o0, h0, l0, c0, minest)
+
+        # 单根不是 pinbar 时才看组合形态，并且要求当前 K 线足够长
+        candle_length = np.abs(h0 - l0)
+        try_combined = (single_type == PinbarKernels.type_none) & (candle_length >= minest) & \
+                       (candle_length >= minest * 1.4)
+
+        engulfing = try_combined & PinbarKernels.is_engulfing(o1, c1, o0, c0)
+        h2, l2 = np.maximum(h0, h1), np.minimum(l0, l1)
+        engulfing_type, _ = PinbarKernels.single_pinbar_type(o1, h2, l2, c0, minest)
+
+        star = try_combined & np.logical_not(engulfing) & PinbarKernels.is_morning_or_evening_star(opens[..., -3:], closes[..., -3:])
+        o3 = opens[..., -3]
+        h3, l3 = np.maximum(h2, highs[..., -3]), np.minimum(l2, lows[..., -3])
+        star_type, _ = PinbarKernels.single_pinbar_type(o3, h3, l3, c0, minest)
+
+        pinbar_type = np.where(single_type != PinbarKernels.type_none, single_type,
+                               np.where(engulfing, engulfing_type,
+                                        np.where(star, star_type, PinbarKernels.type_none)))
+        pin_open = np.where(engulfing, o1, np.where(star, o3, o0))
+        pin_high = np.where(engulfing, h2, np.where(star, h3, h0))
+        pin_low = np.where(engulfing, l2, np.where(star, l3, l0))
+        return pinbar_type, single_excellent, pin_open, pin_high, pin_low, c0
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+    @staticmethod
+    def average_true_range(highs, lows, closes, lengths, period=14):
+        """
+        与 bt.indicators.AverageTrueRange 一致的 ATR（Wilder 平滑，首值为前 period 个 TR 的均值）
+        :param highs: 右对齐的二维数组，左侧不足部分为 NaN
+        :param lengths: 每行有效 K 线数量
+        :return: 每一行最后一根 K 线的 ATR，数据不足时为 NaN
+        """
+        rows, width = closes.shape
+        prev_close = np.empty_like(closes)
+        prev_close[:, 0] = np.nan
+        prev_close[:, 1:] = closes[:, :-1]
+        true_range = np.maximum(highs, prev_close) - np.minimum(lows, prev_close)
+
+        valid = np.minimum(lengths, width)
+        first = width - valid
+        seed_col = first + period
+        has_atr = valid > period
+
+        seed_idx = np.clip(first[:, None] + 1 + np.arange(period), 0, width - 1)
+        seed = np.take_along_axis(true_range, seed_idx, axis=1).mean(axis=1)
+
+        smoothed_input = true_range.copy()
+        smoothed_input[np.arange(width) < seed_col[:, None]] = np.nan
+        rows_with_atr = np.flatnonzero(has_atr)
+        smoothed_input[rows_with_atr, seed_col[rows_with_atr]] = seed[rows_with_atr]
+
+        atr = pd.DataFrame(smoothed_input.T).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()[-1]
+        return np.where(has_atr, atr, np.nan)
+
+    @staticmethod
+    def average_true_range_series(highs, lows, closes, period=14):
+        """整段历史的 ATR，与 bt.indicators.AverageTrueRange 一致，前 period 根为 NaN"""
+        prev_close = np.concatenate([[np.nan], closes[:-1]])
+        true_range = np.maximum(highs, prev_close) - np.minimum(lows, prev_close)
+        smoothed_input = np.full(len(closes), np.nan)
+        if len(closes) <= period:
+            return smoothed_input
+        smoothed_input[period] = true_range[1:period + 1].mean()
+        smoothed_input[period + 1:] = true_range[period + 1:]
+        return pd.Series(smoothed_input).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
@@ -0,0 +1,256 @@
+import environment
+import logging
+
+import numpy as np
+
+from date_utils import DateUtils
+from feature_info import FeatureInfo
+from k_line import KLine
+from key_level_engine import KeyLevelEngine
+from pinbar import Pinbar, PinbarType
+from pinbar_helper import PinbarHelper
+from pinbar_kernels import PinbarKernels
+from trading_time_helper import TradingTimeHelper
+from mini_stock.utils.interval_utils import IntervalUtils
+
+
+class PinbarScanner:
+    """
+    向量化的 pinbar 扫描器
+
+    PinbarStrategy 只在最后一根 K 线上做判断，但每个品种/周期都要新建一个 Cerebro 并遍历全部 K 线。
+    这里把所有品种/周期最近的 K 线右对齐堆叠成二维数组（行：品种/周期，列：距今第几根），
+    一次性算出 ATR、形态、关键位、相对高低位和评分，判断规则与 PinbarStrategy 逐条对应。
+    """
+
+    atr_period = 14
+    # Wilder 平滑的权重按 (13/14)^k 衰减，700 根之后的历史对 ATR 的影响已低于浮点精度
+    atr_warmup = 700
+    key_level_lookbacks = ((22, 1.0), (64, 1.1), (126, 1.2))
+    recent_lookback = 16
+    false_breakout_lookback = 36
+    ma_length = 50
+
+    type_none = PinbarKernels.type_none
+    type_bullish = PinbarKernels.type_bullish
+    type_bearish = PinbarKernels.type_bearish
+
+    def __init__(self, db_helper=None):
+        self.db_helper = db_helper
+
+    # ------------------------------------------------------------------
+    # 扫描
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _prepare(frames):
+        """过滤数据量不足的 DataFrame，与 run_pinbar_strategy_with_resampled_data 的前置检查一致"""
+        prepared = []
+        for df in frames:
+            if df is None or df.empty:
+                continue
+            if 'product_type' not in df.columns or df['product_type'].empty:
+                continue
+            product_type = df['product_type'].iloc[0]
+            interval = df['interval'].iloc[0] if 'interval' in df.columns else '1d'
+            interval_num = 1440 if interval == '1d' else IntervalUtils.convert_interval_to_minutes(interval)
+            min_required = max(20, interval_num)
+            if len(df) < min_required:
+                logging.warning(f"{product_type} {interval} 数据量不足（{len(df)} < {min_required}），跳过扫描")
+                continue
+            prepared.append((df, product_type, interval, environment.atr_muliter_of(interval_num)))
+        return prepared
+
+    @staticmethod
+    def _stack(prepared, width):
+        rows = len(prepared)
+        arrays = {name: np.full((rows, width), np.nan) for name in ('open', 'high', 'low', 'close')}
+        lengths = np.empty(rows, dtype=np.int64)
+        for row, (df, _, _, _) in enumerate(prepared):
+            tail = df.iloc[-width:]
+            for name, array in arrays.items():
+                array[row, width - len(tail):] = tail[name].to_numpy(dtype=np.float64)
+            lengths[row] = len(df)
+        return arrays['open'], arrays['high'], arrays['low'], arrays['close'], lengths
+
+    def scan(self, frames):
+        """
+        对所有品种/周期的最新一根 K 线做一次向量化判断
+        :param frames: resample_data_with 返回的 DataFrame 列表
+        :return: [(product_type, interval, candle_time, Pinbar)]，只包含最终判定为 pinbar 的结果
+        """
+        prepared = self._prepare(frames)
+        if not prepared:
+            return []
+
+        trend_lookbacks = np.array([PinbarHelper.trend_lookback(product_type) for _, product_type, _, _ in prepared])
+        width = max(self.atr_warmup, int(trend_lookbacks.max()) + self.ma_length + 1,
+                    self.key_level_lookbacks[-1][0])
+        opens, highs, lows, closes, lengths = self._stack(prepared, width)
+        multipliers = np.array([multiplier for _, _, _, multiplier in prepared])
+        last = width - 1
+
+        atr = PinbarKernels.average_true_range(highs, lows, closes, lengths, self.atr_period)
+        base_atr = atr * multipliers
+
+        # 形态
+        pin_type, is_excellent, pin_open, pin_high, pin_low, pin_close = PinbarKernels.pinbar_or_variant(
+            opens[:, -3:], highs[:, -3:], lows[:, -3:], closes[:, -3:], base_atr)
+        candidate = (pin_type != self.type_none) & ~np.isnan(base_atr)
+        is_bullish = pin_type == self.type_bullish
+        is_bearish = pin_type == self.type_bearish
+
+        # 关键位：22 / 64 / 126 根依次判断，命中即停止
+        at_key_level = np.zeros(len(prepared), dtype=bool)
+        levels = KeyLevelEngine.last_bar_levels(highs, lows, lengths,
+                                                [lookback for lookback, _ in self.key_level_lookbacks])
+        for lookback, atr_scale in self.key_level_lookbacks:
+            level_high, level_low, real_lookback = levels[lookback]
+            tolerance = 0.01 * base_atr * atr_scale * real_lookback
+            near = np.zeros(len(prepared), dtype=bool)
+            for level in (level_high, level_low):
+                # 与 PinbarHelper.is_at_key_level 一致：最高价或最低价与关键位的距离不超过容忍度
+                near |= (np.abs(highs[:, last] - level) <= tolerance) | (np.abs(lows[:, last] - level) <= tolerance)
+            at_key_level |= near
+        candidate &= at_key_level
+
+        candidate &= self._at_recent_high_low(highs, lows, closes, lengths, pin_high, pin_low,
+                                              is_bullish, is_bearish)
+        candidate &= ~(np.abs(pin_open - closes[:, last - 1]) > 2 * base_atr)
+
+        results = []
+        if not candidate.any():
+            return results
+
+        scores = self._score(prepared, highs, lows, closes, lengths, trend_lookbacks, base_atr,
+                             pin_open, pin_high, pin_low, pin_close, is_bullish, is_bearish, candidate)
+        for row in np.flatnonzero(candidate):
+            df, product_type, interval, _ = prepared[row]
+            kline = KLine(open=pin_open[row], high=pin_high[row], low=pin_low[row], close=pin_close[row])
+            kline.set_interval(interval)
+            pinbar = Pinbar(kline)
+            pinbar.type = PinbarType.type_bullish if is_bullish[row] else PinbarType.type_bearish
+            pinbar.is_excellent = bool(is_excellent[row])
+            pinbar.score_detail = scores[row]
+            results.append((product_type, interval, df.index[-1], pinbar))
+        return results
+
+    def _at_recent_high_low(self, highs, lows, closes, lengths, pin_high, pin_low, is_bullish, is_bearish):
+        """PinbarHelper.at_recent_high_low(lookback=16) 的数组版本"""
+        lookback = self.recent_lookback
+        recent_highs = highs[:, -lookback:]
+        recent_lows = lows[:, -lookback:]
+        midpoints = (recent_highs + recent_lows) / 2
+
+        # 对应 close_series 的 MA5：size=round(lookback*1.2+5+1)，取 -round(lookback*1.1)、-round(lookback/2)、-1 三个点
+        size = round(lookback * 1.2 + 5 + 1)
+        close_window = closes[:, -size:]
+
+        def ma5_at(ago):
+            end = size - ago
+            return close_window[:, end - 5:end].mean(axis=1)
+
+        prev_far = ma5_at(round(lookback * 1.1) - 1)
+        prev_mid = ma5_at(round(lookback / 2) - 1)
+        current = ma5_at(0)
+        target_count = round(lookback / 2.4)
+
+        bullish_ok = np.all(pin_low[:, None] < recent_lows[:, :-1], axis=1) & \
+            (np.sum(midpoints[:, :-1] >= midpoints[:, 1:], axis=1) >= target_count) & \
+            (prev_far > prev_mid) & (prev_mid > current)
+        bearish_ok = np.all(pin_high[:, None] > recent_highs[:, :-1], axis=1) & \
+            (np.sum(midpoints[:, :-1] <= midpoints[:, 1:], axis=1) >= target_count) & \
+            (prev_far < prev_mid) & (prev_mid < current)
+        enough = lengths >= size
+        return enough & ((is_bullish & bullish_ok) | (is_bearish & bearish_ok))
+
+    def _score(self, prepared, highs, lows, closes, lengths, trend_lookbacks, base_atr,
+               pin_open, pin_high, pin_low, pin_close, is_bullish, is_bearish, candidate):
+        """PinbarStrategy.calculate_score 的数组版本，返回每行的 score_detail 列表"""
+        width = highs.shape[1]
+        last = width - 1
+        prev_high, prev_low = highs[:, last - 1], lows[:, last - 1]
+        pin_length = np.abs(pin_high - pin_low)
+
+        larger_than_left_eye = pin_length >= np.abs(prev_high - prev_low)
+        body_in_left_eye = (prev_low <= np.minimum(pin_open, pin_close)) & (prev_high >= np.maximum(pin_open, pin_close))
+
+        left_lows = lows[:, last - 6:last].min(axis=1)
+        left_highs = highs[:, last - 6:last].max(axis=1)
+        prominent = (pin_length > 2 * base_atr) | \
+            (is_bullish & (left_lows - pin_low > 1.5 * base_atr)) | \
+            (is_bearish & (pin_high - left_highs > 1.5 * base_atr))
+
+        breakout_window = self.false_breakout_lookback - 2
+        highest = highs[:, last - breakout_window:last].max(axis=1)
+        lowest = lows[:, last - breakout_window:last].min(axis=1)
+        false_breakout = (lengths >= self.false_breakout_lookback) & \
+            ((is_bullish & (pin_low < lowest)) | (is_bearish & (pin_high > highest)))
+
+        # MA50 趋势：历史不足 lookback+50 根时，backtrader 的负索引会绕回缓冲区末尾，这里按同样方式取值
+        ago = np.arange(1, self.ma_length + 1)
+        lengths_col = lengths[:, None]
+        recent_idx = last - ago[None, :].repeat(len(lengths), axis=0)
+        past_ago = ago[None, :] + trend_lookbacks[:, None]
+        past_idx = np.where(lengths_col <= width,
+                            width - lengths_col + (lengths_col - 1 - past_ago) % lengths_col,
+                            last - past_ago)
+        ma_recent = np.take_along_axis(closes, recent_idx, axis=1).mean(axis=1)
+        ma_past = np.take_along_axis(closes, np.clip(past_idx, 0, last), axis=1).mean(axis=1)
+        trend_following = (lengths >= trend_lookbacks) & \
+            (((ma_recent > ma_past) & is_bullish) | ((ma_recent < ma_past) & is_bearish))
+
+        prev_highs = highs[:, last - 15:last].max(axis=1)
+        prev_lows = lows[:, last - 15:last].min(axis=1)
+        accelerated = (is_bullish & (prev_highs - pin_close > 10 * base_atr)) | \
+            (is_bearish & (pin_close - prev_lows > 10 * base_atr))
+
+        scores = {}
+        for row in np.flatnonzero(candidate):
+            _, product_type, interval, _ = prepared[row]
+            detail = []
+            if larger_than_left_eye[row] and body_in_left_eye[row]:
+                detail.append(Pinbar.Score.score_3)
+            elif larger_than_left_eye[row] and TradingTimeHelper(product_type).is_just_opened(interval):
+                # 刚开盘有跳空属于正常情况，只在这种少见分支上逐行判断时间
+                detail.append(Pinbar.Score.score_3)
+            if prominent[row]:
+                detail.append(Pinbar.Score.score_1)
+            if false_breakout[row]:
+                detail.append(Pinbar.Score.score_2)
+            if trend_following[row]:
+                detail.append(Pinbar.Score.score_4)
+            # PinbarHelper.risk_reward_ratio_ok 恒为 True
+            detail.append(Pinbar.Score.score_5)
+            if not accelerated[row]:
+                detail.append(Pinbar.Score.score_6)
+            scores[row] = detail
+        return scores
+
+    def scan_and_store(self, frames):
+        """扫描并通过 DatabaseHelper.store_pinbar_data 写入 pinbar 表，字段与 PinbarStrategy.next 一致"""
+        results = self.scan(frames)
+        if not results:
+            logging.info('scan completed, there is no pinbar. ')
+            return results
+
+        if self.db_helper is None:
+            from database_helper import DatabaseHelper
+            self.db_helper = DatabaseHelper()
+
+        for product_type, interval, candle_time, pinbar in results:
+            product_name = FeatureInfo.get_product_name(product_type)
+            logging.info(f"{product_type} :{product_name}->{interval} -> time:{candle_time} -> {pinbar}")
+            self.db_helper.store_pinbar_data(
+                timestamp=DateUtils.now(),
+                product_type=product_type,
+                interval=interval,
+                product_name=product_name,
+                score=len(pinbar.score_detail),
+                score_detail=",".join(pinbar.score_detail),
+                key_level_strength='strong',
+                open=pinbar.get_open(),
+                close=pinbar.get_close(),
+                high=pinbar.get_high(),
+                low=pinbar.get_low()
+            )
+        return results
@@ -10,7 +10,9 @@ import backtrader as bt
 import logging
 
 from feature_info import FeatureInfo
+from feature_store import get_feature_store
 from k_line import KLine
+from key_level_engine import get_key_level_engine
 from key_level_helper import KeyLevelHelper
 from pinbar import Pinbar
 from pinbar_helper import PinbarHelper
@@ -98,7 +100,7 @@ class PinbarStrategy(bt.Strategy):
         current_close = self.data.close[0]
 
         # 获取当前ATR值
-        real_atr = self.atr[0]
+        real_atr = self.current_atr()
         base_atr = real_atr * self.atr_multiplier
         product_name = FeatureInfo.get_product_name(self.product_type)
 
@@ -192,11 +194,32 @@ class PinbarStrategy(bt.Strategy):
 
         return pinbar
 
+    def current_atr(self):
+        # 特征库里已有当前 K 线的 ATR 时直接读取，否则使用 backtrader 指标
+        atr = get_feature_store().atr(self.product_type, self.interval, self.data.datetime.datetime(0))
+        return self.atr[0] if atr is None else atr
+
+    def key_levels_of_all_lookbacks(self, data_total_length):
+        # 优先读取特征库里预先算好的关键位
+        levels = get_feature_store().key_levels(self.product_type, self.interval, self.data.datetime.datetime(0))
+        if levels is not None:
+            return levels
+        # 22/64/126 三个周期的关键位一次算完，同一根 K 线内复用缓存
+        engine = get_key_level_engine()
+        size = min(max(engine.lookbacks), data_total_length)
+        return engine.levels_for(self.product_type, self.interval, self.data.datetime.datetime(0),
+                                 self.data.high.get(size=size), self.data.low.get(size=size))
+
     def at_key_values(self, lookback_length, data_total_length, current_high, current_low, atr):
         # 判断 k 线长度是否够
         lookback_real_length = lookback_length if data_total_length > lookback_length else data_total_length
         #拉取这段时间的关键位数组
-        latest_key_levels = KeyLevelHelper.identify_key_levels_without_noise(self.data, lookback_real_length)
+        all_key_levels = self.key_levels_of_all_lookbacks(data_total_length)
+        if lookback_length in all_key_levels:
+            key_high, key_low, _ = all_key_levels[lookback_length]
+            latest_key_levels = [key_high, key_low]
+        else:
+            latest_key_levels = KeyLevelHelper.identify_key_levels_without_noise(self.data, lookback_real_length)
         tolerance = 0.01 * atr * lookback_real_length
         is_at_key_level, key_level = PinbarHelper.is_at_key_level(current_high, current_low, latest_key_levels,
                                                                   tolerance)
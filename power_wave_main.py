@@ -21,14 +21,22 @@ def process(interval):
 
     logging.info(f"[power wave] start loading data of interval {interval} ...")
     checker = FeatureProcessCenter()
+    frames = []
     for product_type in shfe_product_types + cffex_product_types + dce_product_types + czce_product_types + ine_product_types + gfex_product_types:
         # 过滤非交易时段
+        if not TradingTimeHelper(product_type).is_trading_time():
+            logging.debug(f"[power wave] {product_type} it's not in trading time...")
+            continue
+        df = checker.resample_data_with(product_type=product_type, interval=interval, persist_features=True)
+        if df is None or df.empty:
+            continue
+        frames.append(df)
         if product_type in ['AU']:
-            if TradingTimeHelper(product_type).is_trading_time():
-                df = checker.resample_data_with(product_type=product_type, interval=interval)
-                checker.run_power_wave_strategy_with_resampled_data(df)
-            else:
-                logging.debug(f"[power wave] {product_type} it's not in trading time...")
+            checker.run_power_wave_strategy_with_resampled_data(df)
+
+    # 所有交易中品种的最新 K 线一次性扫描 pinbar，结果写入 pinbar 表，由 PinbarReporter 推送
+    if frames:
+        checker.run_pinbar_scanner_with_resampled_data(frames)
 
 
 def run_scheduled_tasks():
@@ -11,6 +11,8 @@ from text_utils import TextUtils
 from trading_time_helper import TradingTimeHelper
 from wechat_helper import WeChatHelper
 from database_helper import DatabaseHelper
+from feature_store import get_feature_store
+import numpy as np
 import pandas as pd
 from power_wave_helper import PowerWaveHelper
 
@@ -41,12 +43,28 @@ class PowerStatus:
         self.macd_status = PowerWaveHelper.get_macd_cross(strategy.macd)
         self.macd_msg = "不满足" if TextUtils.is_empty(self.macd_status) else self.macd_status
         self.direction = '多' if self.color_state.current_color == '红' else '空'
-        self.boll_status = PowerWaveHelper.check_boll_condition(strategy.data.close, self.direction)
+        self.boll_status = self._check_boll_condition()
         self.boll_ok = bool(self.boll_status)
         self.macd_ok = (self.direction == '多' and self.macd_status == '金叉') or (
                 self.direction == '空' and self.macd_status == '死叉')
         self.valid_percentile = (self.direction == '空' and self.percentile > 80) or (self.direction == '多' and self.percentile < 20)
 
+    def _check_boll_condition(self):
+        """收盘价相对布林带中轨（MA20）的位置，中轨优先从特征库读取，没有这根 K 线时用最近 20 根收盘价计算"""
+        strategy = self.strategy
+        window = 20
+        ma = get_feature_store().ma(strategy.product_type, strategy.interval, strategy.data.datetime.datetime(0),
+                                    window)
+        if ma is None:
+            if len(strategy.data.close) < window:
+                return None
+            ma = float(np.mean(strategy.data.close.get(size=window)))
+        close = strategy.data.close[0]
+        if self.direction == '多':
+            return close >= ma
+        elif self.direction == '空':
+            return close < ma
+
     def _calculate_percentile(self):
         return self.strategy.power.vare[0] if self.color_state.current_color == "红" else self.strategy.power.vard[0]
 
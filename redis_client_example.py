@@ -114,6 +114,7 @@ def demo_basic_usage():
         print(f"   最新数据数: {stats.get('latest_stocks', 0)}")
         print(f"   筛选缓存数: {stats.get('filter_caches', 0)}")
         print(f"   总记录数: {stats.get('total_records', 0)}")
+        print(f"   最后写入时间: {stats.get('last_write_time') or 'N/A'}")
         print(f"   日期: {stats.get('date', 'N/A')}")
     
     # 2. 获取股票列表
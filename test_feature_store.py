@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 FeatureStore 的增量特征与整段重算 / backtrader 指标一致
+"""
+
+import os
+import tempfile
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import feature_store
+from database_helper import DatabaseHelper
+from feature_store import FeatureStore
+from key_level_engine import KeyLevelEngine
+from test_pinbar_scanner import make_frame, run_strategy
+
+
+def assert_features_equal(actual, expected, context):
+    assert actual.keys() == expected.keys(), context
+    for name, value in expected.items():
+        assert np.isclose(actual[name], value, equal_nan=True), f"{context} {name}: {actual[name]} != {value}"
+
+
+def test_incremental_matches_backfill():
+    rng = np.random.default_rng(11)
+    df = make_frame(rng, 'AU', '5min', 400, '2025-01-01', 1)
+
+    # 一次性回填
+    batch = FeatureStore()
+    batch.update(df)
+
+    # 从很短的历史开始逐根追加，并且每次最后一根先给一个未走完的值
+    incremental = FeatureStore()
+    for end in range(2, len(df) + 1):
+        partial = df.iloc[:end].copy()
+        partial.iloc[-1, partial.columns.get_loc('high')] += 5
+        incremental.update(partial)
+        incremental.update(df.iloc[:end])
+
+    for bar_time in df.index[-FeatureStore.cache_bars:]:
+        assert_features_equal(incremental.get('AU', '5min', bar_time), batch.get('AU', '5min', bar_time), bar_time)
+
+
+def test_features_match_reference():
+    rng = np.random.default_rng(12)
+    df = make_frame(rng, 'RB', '5min', 300, '2025-01-01', -1)
+    store = FeatureStore()
+    store.update(df)
+
+    class AtrRecorder(bt.Strategy):
+        values = []
+
+        def __init__(self):
+            self.atr = bt.indicators.AverageTrueRange()
+
+        def next(self):
+            AtrRecorder.values.append((self.data.datetime.datetime(0), self.atr[0]))
+
+    AtrRecorder.values = []
+    cerebro = bt.Cerebro()
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(AtrRecorder)
+    cerebro.run()
+    for bar_time, atr in AtrRecorder.values:
+        if np.isnan(atr):
+            assert store.atr('RB', '5min', bar_time) is None
+        else:
+            assert np.isclose(store.atr('RB', '5min', bar_time), atr)
+
+    ma_20 = df['close'].rolling(20).mean()
+    highest_34 = df['high'].rolling(34).max()
+    engine = KeyLevelEngine()
+    for position in (40, 130, len(df) - 1):
+        bar_time = df.index[position]
+        assert np.isclose(store.ma('RB', '5min', bar_time, 20), ma_20.iloc[position])
+        assert np.isclose(store.highest('RB', '5min', bar_time, 34), highest_34.iloc[position])
+    assert store.highest('RB', '5min', df.index[20], 34) is None
+
+    for position in (5, 20, 40, 130, len(df) - 1):
+        bar_time = df.index[position]
+        size = min(126, position + 1)
+        expected = engine.levels_for('RB', '5min', bar_time, df['high'].to_numpy()[position + 1 - size:position + 1],
+                                     df['low'].to_numpy()[position + 1 - size:position + 1])
+        actual = store.key_levels('RB', '5min', bar_time)
+        for lookback, (level_high, level_low, real_lookback) in expected.items():
+            assert np.isclose(actual[lookback][0], level_high)
+            assert np.isclose(actual[lookback][1], level_low)
+            assert actual[lookback][2] == real_lookback
+
+
+class MemoryDatabase:
+    """只实现 FeatureStore 用到的两个方法"""
+
+    def __init__(self):
+        self.rows = []
+
+    def store_bar_features(self, product_type, interval, rows):
+        self.rows.extend(rows)
+
+    def get_latest_bar_feature(self, product_type, interval):
+        return self.rows[-1] if self.rows else None
+
+
+def test_restore_from_table():
+    rng = np.random.default_rng(13)
+    df = make_frame(rng, 'IF', '15min', 300, '2025-01-01', 0)
+    database = MemoryDatabase()
+    FeatureStore(db_helper=database).update(df.iloc[:200], persist=True)
+    assert len(database.rows) == 199
+
+    # 重启后只计算新增的 K 线
+    restarted = FeatureStore(db_helper=database)
+    restarted.update(df, persist=True)
+    assert len(database.rows) == 299
+
+    expected = FeatureStore()
+    expected.update(df)
+    assert_features_equal(restarted.get('IF', '15min'), expected.get('IF', '15min'), 'latest')
+    assert pd.Timestamp(database.rows[-1][0]) == df.index[-2]
+
+
+def test_backfill_twice_keeps_one_row_per_bar():
+    rng = np.random.default_rng(15)
+    df = make_frame(rng, 'AG', '5min', 120, '2025-01-01', 1)
+    current = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            database = DatabaseHelper()
+            store = FeatureStore(db_helper=database)
+            store.update(df, persist=True)
+            # 状态丢失后整段重新回填，已有的 K 线覆盖而不是再写一份
+            store.invalidate()
+            store.update(df, persist=True)
+            FeatureStore(db_helper=database).update(df, persist=False)
+            with database.engine.connect() as conn:
+                count, distinct = conn.execute(text(
+                    "SELECT COUNT(*), COUNT(DISTINCT time) FROM bar_feature")).one()
+            assert count == distinct == len(df) - 1
+            database.engine.dispose()
+        finally:
+            os.chdir(current)
+
+
+def test_default_store_opens_database_on_persist():
+    original = feature_store.feature_store
+    current = os.getcwd()
+    df = make_frame(np.random.default_rng(16), 'AU', '5min', 60, '2025-01-01', 1)
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            feature_store.feature_store = None
+            store = feature_store.get_feature_store()
+            store.update(df)
+            # 不持久化时不在工作目录下创建 futures_data.db
+            assert store.db_helper is None
+            assert not os.path.exists('futures_data.db')
+
+            store.invalidate()
+            store.update(df, persist=True)
+            assert os.path.exists('futures_data.db')
+            with store.db_helper.engine.connect() as conn:
+                assert conn.execute(text("SELECT COUNT(*) FROM bar_feature")).scalar() == len(df) - 1
+            store.db_helper.engine.dispose()
+        finally:
+            feature_store.feature_store = original
+            os.chdir(current)
+
+
+def test_strategy_reads_store():
+    rng = np.random.default_rng(14)
+    frames = [make_frame(rng, ['AU', 'RB', 'IF'][i % 3], '5min', 200, pd.Timestamp('2025-01-01') + pd.Timedelta(days=i),
+                         [-1, 1][i % 2]) for i in range(12)]
+    original = feature_store.feature_store
+    try:
+        feature_store.feature_store = FeatureStore()
+        expected = [run_strategy(df) for df in frames]
+        for df in frames:
+            feature_store.feature_store.update(df)
+        actual = [run_strategy(df) for df in frames]
+    finally:
+        feature_store.feature_store = original
+
+    assert any(pinbar is not None for _, pinbar in expected)
+    for (_, expected_pinbar), (_, actual_pinbar) in zip(expected, actual):
+        if expected_pinbar is None:
+            assert actual_pinbar is None
+        else:
+            assert actual_pinbar.score_detail == expected_pinbar.score_detail
+
+
+if __name__ == "__main__":
+    test_incremental_matches_backfill()
+    test_features_match_reference()
+    test_restore_from_table()
+    test_backfill_twice_keeps_one_row_per_bar()
+    test_default_store_opens_database_on_persist()
+    test_strategy_reads_store()
+    print("FeatureStore 特征一致")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 KeyLevelEngine 与 KeyLevelHelper 的关键位一致
+"""
+
+import numpy as np
+
+from key_level_engine import KeyLevelEngine
+from key_level_helper import KeyLevelHelper
+
+
+class FakeLine:
+    """模拟 backtrader 的 line，line[0] 为当前 K 线，line[-1] 为前一根"""
+
+    def __init__(self, values, current):
+        self.values = values
+        self.current = current
+
+    def __getitem__(self, ago):
+        return self.values[self.current + ago]
+
+
+class FakeData:
+    def __init__(self, highs, lows, current):
+        self.high = FakeLine(highs, current)
+        self.low = FakeLine(lows, current)
+
+
+def random_bars(seed, length):
+    rng = np.random.default_rng(seed)
+    closes = 100 + np.cumsum(rng.normal(0, 1, length))
+    highs = closes + rng.exponential(0.5, length)
+    lows = closes - rng.exponential(0.5, length)
+    return highs, lows
+
+
+def test_last_bar_levels_match_helper():
+    highs, lows = random_bars(1, 400)
+    engine = KeyLevelEngine()
+    for length in [20, 23, 40, 64, 65, 100, 126, 127, 400]:
+        data = FakeData(highs, lows, length - 1)
+        levels = engine.levels_for('AU', f'{length}', length, highs[:length], lows[:length])
+        for lookback in engine.lookbacks:
+            real_lookback = lookback if length > lookback else length
+            expected = KeyLevelHelper.identify_key_levels_without_noise(data, real_lookback)
+            key_high, key_low, actual_real = levels[lookback]
+            assert actual_real == real_lookback
+            assert [key_high, key_low] == expected
+
+
+def test_stacked_rows_match_helper():
+    lengths = np.array([30, 70, 130, 300])
+    width = 300
+    highs = np.full((len(lengths), width), np.nan)
+    lows = np.full((len(lengths), width), np.nan)
+    row_data = []
+    for row, length in enumerate(lengths):
+        row_highs, row_lows = random_bars(row + 10, length)
+        highs[row, width - length:] = row_highs
+        lows[row, width - length:] = row_lows
+        row_data.append(FakeData(row_highs, row_lows, length - 1))
+
+    levels = KeyLevelEngine.last_bar_levels(highs, lows, lengths)
+    for lookback, (key_highs, key_lows, real_lookbacks) in levels.items():
+        for row, data in enumerate(row_data):
+            expected = KeyLevelHelper.identify_key_levels_without_noise(data, int(real_lookbacks[row]))
+            assert [key_highs[row], key_lows[row]] == expected
+
+
+def test_rolling_levels_match_helper():
+    highs, lows = random_bars(3, 600)
+    for lookback in [5, 22, 64, 126]:
+        level_highs, level_lows = KeyLevelEngine.rolling_levels(highs, lows, lookback)
+        assert np.isnan(level_highs[:lookback - 1]).all()
+        for current in range(lookback - 1, len(highs)):
+            expected = KeyLevelHelper.identify_key_levels_without_noise(FakeData(highs, lows, current), lookback)
+            assert [level_highs[current], level_lows[current]] == expected
+
+
+def test_cache_until_new_bar():
+    highs, lows = random_bars(4, 200)
+    engine = KeyLevelEngine()
+    first = engine.levels_for('RB', '5min', 1, highs, lows)
+    # 同一根 K 线内即使传入不同数据也直接命中缓存
+    assert engine.levels_for('RB', '5min', 1, highs + 100, lows + 100) is first
+    assert engine.levels_for('RB', '5min', 2, highs + 100, lows + 100) is not first
+    engine.invalidate('RB', '5min')
+    assert engine.levels_for('RB', '5min', 2, highs, lows) == first
+
+
+if __name__ == "__main__":
+    test_last_bar_levels_match_helper()
+    test_stacked_rows_match_helper()
+    test_rolling_levels_match_helper()
+    test_cache_until_new_bar()
+    print("KeyLevelEngine 与 KeyLevelHelper 结果一致")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 PinbarHitRateEvaluator 的逐 K 线判断与 PinbarScanner 一致，以及统计表的生成
+"""
+
+import numpy as np
+import pandas as pd
+
+from pinbar import Pinbar, PinbarType
+from pinbar_hit_rate_evaluator import PinbarHitRateEvaluator
+from pinbar_scanner import PinbarScanner
+
+
+def make_frame(seed, product_type='RB', length=600):
+    rng = np.random.default_rng(seed)
+    closes = 1000 + np.cumsum(rng.normal(0, 1.0, length))
+    opens = np.concatenate([[closes[0]], closes[:-1]]) + rng.normal(0, 0.2, length)
+    # 一部分 K 线做成长影线，保证有足够多的 pinbar
+    wicks = rng.uniform(0, 6, length) * (rng.random(length) < 0.3)
+    down = rng.random(length) < 0.5
+    highs = np.maximum(opens, closes) + rng.exponential(0.4, length) + np.where(down, 0, wicks)
+    lows = np.minimum(opens, closes) - rng.exponential(0.4, length) - np.where(down, wicks, 0)
+    df = pd.DataFrame({'open': opens, 'high': highs, 'low': lows, 'close': closes},
+                      index=pd.date_range('2025-01-01', periods=length, freq='5min'))
+    df['product_type'] = product_type
+    df['interval'] = '5min'
+    return df
+
+
+def test_matches_scanner_on_each_bar():
+    df = make_frame(11)
+    signals = PinbarHitRateEvaluator().evaluate_frame(df).set_index('time')
+    ends = range(200, len(df) + 1)
+    scanned = {candle_time: pinbar
+               for _, _, candle_time, pinbar in PinbarScanner().scan([df.iloc[:end] for end in ends])}
+
+    passed = signals[signals['strategy_pass']]
+    assert len(passed) > 0
+    for end in ends:
+        candle_time = df.index[end - 1]
+        pinbar = scanned.get(candle_time)
+        if candle_time not in passed.index:
+            assert pinbar is None, f"{candle_time} 扫描器判定为 pinbar，但统计中未通过"
+            continue
+        row = passed.loc[candle_time]
+        assert pinbar is not None
+        expected_direction = 1 if pinbar.type == PinbarType.type_bullish else -1
+        assert row['direction'] == expected_direction
+        # 刚开盘跳空的放宽规则依赖当前时间，不参与比较
+        expected_score = len(pinbar.score_detail) - (Pinbar.Score.score_3 in pinbar.score_detail)
+        assert row['score'] - row['left_eye'] == expected_score
+
+
+def test_forward_returns_and_summary():
+    df = make_frame(12)
+    evaluator = PinbarHitRateEvaluator(horizons=(1, 5))
+    signals = evaluator.evaluate_frame(df)
+    assert len(signals) > 0
+
+    closes = df['close']
+    for _, row in signals.head(20).iterrows():
+        position = closes.index.get_loc(row['time'])
+        if position + 5 < len(closes):
+            expected = (closes.iloc[position + 5] - closes.iloc[position]) / closes.iloc[position] * row['direction']
+            assert np.isclose(row['return_5'], expected)
+            assert row['hit_5'] == (expected > 0)
+
+    table = evaluator.summarize(signals)
+    assert table.loc['all', 'count'] == len(signals)
+    assert set(evaluator.conditions) <= set(table.index)
+    assert {'hit_rate_1', 'avg_return_1', 'hit_rate_5', 'avg_return_5'} <= set(table.columns)
+
+
+def test_process_pool_matches_serial():
+    frames = [make_frame(seed, product_type) for seed, product_type in [(21, 'AU'), (22, 'IF'), (23, 'RB')]]
+    evaluator = PinbarHitRateEvaluator()
+    parallel = evaluator.evaluate_frames(frames, max_workers=2)
+    serial = pd.concat([evaluator.evaluate_frame(df) for df in frames], ignore_index=True)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+if __name__ == "__main__":
+    test_matches_scanner_on_each_bar()
+    test_forward_returns_and_summary()
+    test_process_pool_matches_serial()
+    print("PinbarHitRateEvaluator 测试通过")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 PinbarKernels 及 PinbarHelper 适配方法与原来逐根取值实现的结果一致
+"""
+
+import numpy as np
+import pandas as pd
+
+from k_line import KLine
+from pinbar import Pinbar, PinbarType
+from pinbar_helper import PinbarHelper
+from pinbar_kernels import PinbarKernels
+from trading_time_helper import TradingTimeHelper
+
+
+class FakeLine:
+    """模拟 backtrader 的 LineBuffer：负索引和 get 的切片方式与 backtrader 一致"""
+
+    def __init__(self, values, idx):
+        self.array = list(values)
+        self.idx = idx
+
+    def __getitem__(self, ago):
+        return self.array[self.idx + ago]
+
+    def __len__(self):
+        return self.idx + 1
+
+    def get(self, ago=0, size=1):
+        return self.array[self.idx + ago - size + 1:self.idx + ago + 1]
+
+
+class FakeData:
+    """停在最后一根 K 线上的数据源，与 PinbarStrategy 做判断时的状态一致"""
+
+    def __init__(self, df, idx):
+        df = df.iloc[:idx + 1]
+        self.open = FakeLine(df['open'], idx)
+        self.high = FakeLine(df['high'], idx)
+        self.low = FakeLine(df['low'], idx)
+        self.close = FakeLine(df['close'], idx)
+        self._buflen = len(df)
+
+    def buflen(self):
+        return self._buflen
+
+    def __len__(self):
+        return len(self.close)
+
+
+def legacy_at_recent_high_low(data, pinbar, lookback):
+    """改造前 PinbarHelper.at_recent_high_low 的判断逻辑"""
+    recent_highs = data.high.get(size=lookback)
+    recent_lows = data.low.get(size=lookback)
+    valid_count = 0
+    close_series = pd.Series(data.close.get(size=round(lookback * 1.2 + 5 + 1)))
+    ma5_subset = close_series.rolling(window=5).mean()
+    idx = -round(lookback * 1.1)
+    if len(ma5_subset) > abs(idx):
+        prev_far = ma5_subset.iloc[idx]
+    else:
+        return False
+    prev_mid = ma5_subset.iloc[-round(lookback / 2)]
+    current = ma5_subset.iloc[-1]
+    ma_condition_met = False
+    if pinbar.type == PinbarType.type_bullish:
+        if any(pinbar.kline.low >= low for low in recent_lows[:-1]):
+            return False
+        for i in range(1, len(recent_highs)):
+            if (recent_highs[i - 1] + recent_lows[i - 1]) / 2 >= (recent_highs[i] + recent_lows[i]) / 2:
+                valid_count += 1
+        ma_condition_met = prev_far > prev_mid > current
+    elif pinbar.type == PinbarType.type_bearish:
+        if any(pinbar.kline.high <= high for high in recent_highs[:-1]):
+            return False
+        for i in range(1, len(recent_highs)):
+            if (recent_highs[i - 1] + recent_lows[i - 1]) / 2 <= (recent_highs[i] + recent_lows[i]) / 2:
+                valid_count += 1
+        ma_condition_met = prev_far < prev_mid < current
+    return valid_count >= round(lookback / 2.4) and ma_condition_met
+
+
+def legacy_is_trend_following(data, pinbar, product_type):
+    """改造前 PinbarHelper.is_trend_following 的判断逻辑（方法 B）"""
+    lookback = int(TradingTimeHelper(product_type).calculate_daily_trading_hours() * 12)
+    if data.buflen() < lookback:
+        return False
+    is_bullish = pinbar.type == PinbarType.type_bullish
+    is_bearish = pinbar.type == PinbarType.type_bearish
+    ma50_recent = np.mean([data.close[-i - 1] for i in range(50)])
+    ma50_past = np.mean([data.close[-i - 1 - lookback] for i in range(50)])
+    return (ma50_recent > ma50_past and is_bullish) or (ma50_recent < ma50_past and is_bearish)
+
+
+def legacy_no_obvious_acceleration(data, pinbar, atr):
+    """改造前 PinbarHelper.no_obvious_acceleration 的判断逻辑"""
+    if pinbar.type == PinbarType.type_bullish:
+        if max(data.high[-i - 1] for i in range(15)) - pinbar.get_close() > 10 * atr:
+            return False
+    elif pinbar.type == PinbarType.type_bearish:
+        if pinbar.get_close() - min(data.low[-i - 1] for i in range(15)) > 10 * atr:
+            return False
+    return True
+
+
+def legacy_have_giant_price_gap(data, pinbar, base_atr):
+    """改造前 PinbarHelper.have_giant_price_gap 的判断逻辑"""
+    return abs(pinbar.get_open() - data.close[-1]) > 2 * base_atr
+
+
+def make_bars(seed, length, trend):
+    rng = np.random.default_rng(seed)
+    closes = 1000 + np.cumsum(trend * 0.4 + rng.normal(0, 1.0, length))
+    opens = np.concatenate([[closes[0]], closes[:-1]])
+    return pd.DataFrame({'open': opens,
+                         'high': np.maximum(opens, closes) + rng.exponential(0.5, length),
+                         'low': np.minimum(opens, closes) - rng.exponential(0.5, length),
+                         'close': closes})
+
+
+def make_pinbar(df, idx, pinbar_type, wick):
+    row = df.iloc[idx]
+    if pinbar_type == PinbarType.type_bullish:
+        kline = KLine(open=row['open'], high=row['high'], low=row['low'] - wick, close=row['close'])
+    else:
+        kline = KLine(open=row['open'], high=row['high'] + wick, low=row['low'], close=row['close'])
+    pinbar = Pinbar(kline)
+    pinbar.type = pinbar_type
+    return pinbar
+
+
+def iter_cases():
+    for seed in range(30):
+        trend = [-1, 1, 0][seed % 3]
+        length = [60, 120, 200, 400][seed % 4]
+        df = make_bars(seed, length, trend)
+        for idx in range(50, length, 7):
+            for pinbar_type in (PinbarType.type_bullish, PinbarType.type_bearish):
+                for wick in (0.0, 3.0, 15.0):
+                    yield FakeData(df, idx), make_pinbar(df, idx, pinbar_type, wick)
+
+
+def test_adapters_match_legacy():
+    checked = {'recent': 0, 'trend': 0}
+    for data, pinbar in iter_cases():
+        expected = legacy_at_recent_high_low(data, pinbar, 16)
+        assert PinbarHelper.at_recent_high_low(data, pinbar, 16, None) == expected
+        checked['recent'] += expected
+
+        for product_type in ('AU', 'IF'):
+            expected = legacy_is_trend_following(data, pinbar, product_type)
+            assert PinbarHelper.is_trend_following(data, pinbar, product_type) == expected
+            checked['trend'] += expected
+
+        for atr in (0.1, 1.0, 5.0):
+            assert PinbarHelper.no_obvious_acceleration(data, pinbar, atr) == \
+                legacy_no_obvious_acceleration(data, pinbar, atr)
+            # PinbarStrategy 用 `is True` 判断跳空，适配方法必须返回 Python bool
+            gap = PinbarHelper.have_giant_price_gap(data, pinbar, atr)
+            assert isinstance(gap, bool)
+            assert gap == legacy_have_giant_price_gap(data, pinbar, atr)
+    assert checked['recent'] > 0 and checked['trend'] > 0
+
+
+def test_numba_and_numpy_paths_agree():
+    if not PinbarKernels.enabled_numba:
+        return
+    for data, pinbar in iter_cases():
+        highs = PinbarHelper.recent_values(data.high, 16)
+        lows = PinbarHelper.recent_values(data.low, 16)
+        closes = np.ascontiguousarray(data.close.get(size=25), dtype=np.float64)
+        args = (highs, lows, closes, pinbar.get_high(), pinbar.get_low(), PinbarHelper.direction_of(pinbar), 18, 8, 7)
+        assert PinbarKernels.at_recent_high_low(*args) == PinbarKernels.at_recent_high_low.py_func(*args)
+
+        args = (highs[:-1], lows[:-1], pinbar.get_close(), PinbarHelper.direction_of(pinbar), 1.0)
+        assert PinbarKernels.no_obvious_acceleration(*args) == PinbarKernels.no_obvious_acceleration.py_func(*args)
+
+
+def test_scalar_patterns_match_arrays():
+    df = make_bars(5, 300, 0)
+    opens, highs, lows, closes = (df[name].to_numpy() for name in ('open', 'high', 'low', 'close'))
+    minest = np.full(len(df), 1.2)
+    types, excellent = PinbarKernels.single_pinbar_type(opens, highs, lows, closes, minest)
+    assert (types != PinbarKernels.type_none).any()
+    for i in range(len(df)):
+        pin = PinbarHelper.is_single_pinbar(opens[i], highs[i], lows[i], closes[i], minest[i])
+        if types[i] == PinbarKernels.type_none:
+            assert pin is None
+            continue
+        expected_type = PinbarType.type_bullish if types[i] == PinbarKernels.type_bullish else PinbarType.type_bearish
+        assert pin.type == expected_type and pin.is_excellent == excellent[i]
+        if i > 0:
+            assert PinbarHelper.is_engulfing(opens[i - 1], closes[i - 1], opens[i], closes[i]) == \
+                PinbarKernels.is_engulfing(opens[i - 1], closes[i - 1], opens[i], closes[i])
+
+
+def test_key_level_needs_price_near_level():
+    assert PinbarHelper.is_at_key_level(105, 100, [100.5, 120], 1.0) == (True, 100.5)
+    assert PinbarHelper.is_at_key_level(105, 100, [98, 110], 1.0) == (False, None)
+
+
+if __name__ == "__main__":
+    test_adapters_match_legacy()
+    test_numba_and_numpy_paths_agree()
+    test_scalar_patterns_match_arrays()
+    test_key_level_needs_price_near_level()
+    print("PinbarKernels 与原实现结果一致")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 PinbarScanner 与 PinbarStrategy 的判断结果一致
+"""
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+import environment
+from pinbar_kernels import PinbarKernels
+from pinbar_scanner import PinbarScanner
+from pinbar_strategy import PinbarStrategy
+
+
+class RecordingPinbarStrategy(PinbarStrategy):
+    """只记录最后一根 K 线的 check_pinbar 结果，不写数据库"""
+    results = []
+
+    def next(self):
+        if len(self.data) == self.data.buflen():
+            RecordingPinbarStrategy.results.append((self.data.datetime.datetime(0), self.check_pinbar()))
+
+
+def make_frame(rng, product_type, interval, length, start, trend):
+    """生成一段带趋势的随机 K 线，最后一根按趋势反方向做成插针"""
+    steps = trend * 0.3 + rng.normal(0, 1.0, length)
+    closes = 1000 + np.cumsum(steps)
+    opens = np.concatenate([[closes[0]], closes[:-1]]) + rng.normal(0, 0.2, length)
+    highs = np.maximum(opens, closes) + rng.exponential(0.6, length)
+    lows = np.minimum(opens, closes) - rng.exponential(0.6, length)
+
+    wick = rng.uniform(2, 12)
+    body = rng.uniform(-0.5, 0.5)
+    if trend < 0:
+        opens[-1] = closes[-2] + rng.normal(0, 0.3)
+        closes[-1] = opens[-1] + body
+        highs[-1] = max(opens[-1], closes[-1]) + rng.uniform(0, 0.5)
+        lows[-1] = min(opens[-1], closes[-1]) - wick
+    elif trend > 0:
+        opens[-1] = closes[-2] + rng.normal(0, 0.3)
+        closes[-1] = opens[-1] + body
+        lows[-1] = min(opens[-1], closes[-1]) - rng.uniform(0, 0.5)
+        highs[-1] = max(opens[-1], closes[-1]) + wick
+
+    index = pd.date_range(start=start, periods=length, freq='5min')
+    df = pd.DataFrame({'open': opens, 'high': highs, 'low': lows, 'close': closes,
+                       'volume': rng.integers(1, 1000, length).astype(float)}, index=index)
+    df['product_type'] = product_type
+    df['interval'] = interval
+    return df
+
+
+def run_strategy(df):
+    RecordingPinbarStrategy.results = []
+    cerebro = bt.Cerebro()
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(RecordingPinbarStrategy, product_type=df['product_type'].iloc[0],
+                        atr_multiplier=environment.atr_muliter_of(5), interval=df['interval'].iloc[0])
+    cerebro.run()
+    return RecordingPinbarStrategy.results[0] if RecordingPinbarStrategy.results else (None, None)
+
+
+def test_scanner_matches_strategy():
+    rng = np.random.default_rng(20250521)
+    frames = []
+    for i in range(120):
+        product_type = ['AU', 'RB', 'IF'][i % 3]
+        length = int(rng.choice([22, 40, 90, 150, 260, 900]))
+        trend = [-1, 1, 0][(i // 3) % 3]
+        start = pd.Timestamp('2025-01-01') + pd.Timedelta(days=i)
+        frames.append(make_frame(rng, product_type, '5min', length, start, trend))
+
+    scanned = {candle_time: pinbar for _, _, candle_time, pinbar in PinbarScanner().scan(frames)}
+
+    hits = 0
+    for df in frames:
+        candle_time, expected = run_strategy(df)
+        actual = scanned.get(df.index[-1])
+        if expected is None:
+            assert actual is None, f"scanner 多报了 {df.index[-1]}: {actual}"
+            continue
+        hits += 1
+        assert actual is not None, f"scanner 漏报了 {df.index[-1]}: {expected}"
+        assert actual.type == expected.type
+        assert np.isclose(actual.get_open(), expected.get_open())
+        assert np.isclose(actual.get_high(), expected.get_high())
+        assert np.isclose(actual.get_low(), expected.get_low())
+        assert np.isclose(actual.get_close(), expected.get_close())
+        assert actual.score_detail == expected.score_detail
+    assert hits > 0
+
+
+def test_atr_matches_backtrader():
+    rng = np.random.default_rng(7)
+    df = make_frame(rng, 'AU', '5min', 300, '2025-01-01', 0)
+
+    class AtrRecorder(bt.Strategy):
+        values = []
+
+        def __init__(self):
+            self.atr = bt.indicators.AverageTrueRange()
+
+        def next(self):
+            if len(self.data) == self.data.buflen():
+                AtrRecorder.values.append(self.atr[0])
+
+    cerebro = bt.Cerebro()
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(AtrRecorder)
+    cerebro.run()
+
+    width = 400
+    arrays = {name: np.full((1, width), np.nan) for name in ('high', 'low', 'close')}
+    for name, array in arrays.items():
+        array[0, -len(df):] = df[name].to_numpy()
+    atr = PinbarKernels.average_true_range(arrays['high'], arrays['low'], arrays['close'],
+                                           np.array([len(df)]))
+    assert np.isclose(atr[0], AtrRecorder.values[0])
+
+
+if __name__ == "__main__":
+    test_atr_matches_backtrader()
+    test_scanner_matches_strategy()
+    print("PinbarScanner 与 PinbarStrategy 结果一致")